@@ -10,7 +10,12 @@ This adapter uses pywinpty on Windows to create a PTY.
 
 IMPORTANT: For large prompts, we write to a temp file and use stdin
 because Windows command line has a 8191 character limit.
+
+Optional session pool (agent_config.session_pool.enabled): keeps N
+long-lived interactive agy processes and feeds prompts into them instead
+of spawning one process per call (see agents/pty_session.py).
 """
+import atexit
 import subprocess
 import os
 import time
@@ -20,8 +25,9 @@ import threading
 import tempfile
 from typing import Optional, List, Dict, Any
 from .base import AgentInterface
-from .exceptions import AgentExecutionError, AgentAuthenticationError
+from .exceptions import AgentExecutionError, AgentAuthenticationError, AgentCancelledError
 from .retry import RetryStrategy
+from .pty_session import FIRST_OUTPUT_TIMEOUT, AgySessionPool, FdReader, SessionError, ThreadReader, read_until
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +35,8 @@ logger = logging.getLogger(__name__)
 # Windows command line limit
 WINDOWS_CMD_LIMIT = 8000  # Be conservative, actual limit is 8191
 
+CALL_TIMEOUT = 600  # 10 minutes for local models
+
 
 class AntigravityAdapter(AgentInterface):
     """Antigravity CLI (agy) adapter.
@@ -55,6 +63,7 @@ class AntigravityAdapter(AgentInterface):
         self.retry_delay = config.get("agent_config", {}).get("retry_delay", 5)
         self.command_override = config.get("agent_config", {}).get("command_override")
         self._use_pywinpty = True  # Enable by default
+        self._pool = self._create_session_pool(config.get("agent_config", {}).get("session_pool") or {})
         
         # Thread-safe cooldown tracking
         self._last_call_time = 0
@@ -69,11 +78,32 @@ class AntigravityAdapter(AgentInterface):
             logger.warning("pywinpty not available, falling back to subprocess")
             self._use_pywinpty = False
     
+    def _create_session_pool(self, pool_config: Dict[str, Any]) -> Optional[AgySessionPool]:
+        """Create the long-lived session pool if enabled in config."""
+        if not pool_config.get("enabled", False):
+            return None
+        pool = AgySessionPool(
+            pool_config.get("command") or self.command_override or self.COMMAND,
+            size=pool_config.get("size", 2),
+            max_calls=pool_config.get("max_calls", 20),
+            max_age_sec=pool_config.get("max_age_sec", 1800),
+            startup_timeout=pool_config.get("startup_timeout", 60),
+            first_output_timeout=pool_config.get("first_output_timeout", FIRST_OUTPUT_TIMEOUT),
+            prompt_dir=os.path.join(os.getcwd(), "temp")
+        )
+        atexit.register(pool.close)
+        logger.info(f"agy session pool enabled (size={pool.size}, max_calls={pool.max_calls})")
+        return pool
+    
     def _cooldown(self):
-        """Wait for cooldown period between calls."""
+        """Wait for cooldown period between calls.
+        
+        Each caller reserves the next start slot under the lock and sleeps
+        after releasing it, so waiting threads queue up instead of
+        serializing behind one sleeping thread.
+        """
         with self._lock:
             now = time.time()
-            elapsed = now - self._last_call_time
             
             # Calculate required cooldown
             required_cooldown = self.COOLDOWN_DURATION
@@ -81,13 +111,13 @@ class AntigravityAdapter(AgentInterface):
                 required_cooldown += self.COOLDOWN_AFTER_LARGE
                 logger.debug(f"Large output detected ({self._last_output_size} chars), adding extra cooldown")
             
-            sleep_time = max(0, required_cooldown - elapsed)
-            
-            if sleep_time > 0:
-                logger.debug(f"Cooldown: waiting {sleep_time:.1f}s")
-                time.sleep(sleep_time)
-            
-            self._last_call_time = time.time()
+            start_at = max(now, self._last_call_time + required_cooldown)
+            self._last_call_time = start_at
+        
+        sleep_time = start_at - now
+        if sleep_time > 0:
+            logger.debug(f"Cooldown: waiting {sleep_time:.1f}s")
+            time.sleep(sleep_time)
     
     def _build_command_with_file(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> tuple[str, str]:
         """Build command using temp file for large prompts.
@@ -176,6 +206,12 @@ class AntigravityAdapter(AgentInterface):
         
         return text.strip()
     
+    @staticmethod
+    def _print_progress(elapsed: float):
+        minutes = int(elapsed // 60)
+        seconds = int(elapsed % 60)
+        print(f"  ⏳ [Antigravity] Processing... {minutes}m {seconds}s elapsed", flush=True)
+    
     def _execute_with_pywinpty(self, cmd_string: str) -> str:
         """Execute command using pywinpty for TTY support."""
         from winpty import PtyProcess
@@ -183,34 +219,12 @@ class AntigravityAdapter(AgentInterface):
         print(f"  🔄 [Antigravity] Executing command... (may take 1-10 minutes)", flush=True)
         
         proc = PtyProcess.spawn(cmd_string)
-        
-        full_output = ""
-        timeout = 600  # 10 minutes for local models
-        elapsed = 0
-        idle_time = 0
-        last_progress = 0
-        
-        while proc.isalive() and elapsed < timeout:
-            try:
-                chunk = proc.read(4096)
-                if chunk:
-                    full_output += chunk
-                    idle_time = 0
-                    # Show progress every 30 seconds
-                    if elapsed - last_progress > 30:
-                        minutes = int(elapsed // 60)
-                        seconds = int(elapsed % 60)
-                        print(f"  ⏳ [Antigravity] Processing... {minutes}m {seconds}s elapsed", flush=True)
-                        last_progress = elapsed
-            except EOFError:
-                break
-            
-            time.sleep(0.1)
-            elapsed += 0.1
+        # Blocking reads on a helper thread: woken by output, not by polling
+        full_output, reason = read_until(ThreadReader(proc.read), CALL_TIMEOUT, on_progress=self._print_progress)
         
         # Clean up process if still alive
-        if proc.isalive():
-            print(f"  ⚠️ [Antigravity] Timeout after {int(elapsed)}s, killing process", flush=True)
+        if reason == "timeout" and proc.isalive():
+            print(f"  ⚠️ [Antigravity] Timeout after {CALL_TIMEOUT}s, killing process", flush=True)
             proc.kill()
         
         print(f"  ✅ [Antigravity] Received {len(full_output)} chars", flush=True)
@@ -222,19 +236,27 @@ class AntigravityAdapter(AgentInterface):
             cmd_string,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
-            shell=True,
-            bufsize=1
+            shell=True
         )
+        reader = FdReader(process.stdout.fileno()) if os.name != "nt" else ThreadReader(process.stdout.read1)
+        full_output, reason = read_until(reader, CALL_TIMEOUT, on_progress=self._print_progress)
+        reader.close()
         
-        full_output = ""
-        for line in process.stdout:
-            full_output += line
-        
+        if reason == "timeout":
+            print(f"  ⚠️ [Antigravity] Timeout after {CALL_TIMEOUT}s, killing process", flush=True)
+            process.kill()
         process.wait()
+        process.stdout.close()
         return full_output
     
+    def _execute_with_session(self, prompt: str) -> Optional[str]:
+        """Run a prompt on a pooled session; None if the pool could not serve it."""
+        try:
+            return self._pool.run(prompt, CALL_TIMEOUT, on_progress=self._print_progress)
+        except SessionError as e:
+            logger.warning(f"agy session failed, falling back to a one-shot call: {e}")
+            return None
+    
     def execute(
         self,
         prompt: str,
@@ -250,8 +272,13 @@ class AntigravityAdapter(AgentInterface):
         # Apply cooldown before starting
         self._cooldown()
         
+        # The interactive CLI session cannot be interrupted mid-reply; a cancelled
+        # call is only stopped before it is sent
+        cancel = (options or {}).get("cancel")
         attempt = 0
         while attempt < max_retries:
+            if cancel is not None and cancel.is_set():
+                raise AgentCancelledError(self.NAME)
             timing = agent_logger.log_agent_call(
                 self.NAME, mode, model, attempt + 1, max_retries
             )
@@ -259,25 +286,27 @@ class AntigravityAdapter(AgentInterface):
             try:
                 logger.info(f"Calling {self.NAME} for {mode}... (Attempt {attempt + 1}/{max_retries})")
                 
-                # Build command string (uses temp file for large prompts)
-                cmd_string, temp_file = self._build_command(prompt, options)
-                logger.debug(f"Command: {cmd_string[:100]}...")
-                
-                if temp_file:
-                    logger.debug(f"Prompt file: {temp_file} ({os.path.getsize(temp_file)} bytes)")
-                
-                # Execute using pywinpty (TTY required)
-                if self._use_pywinpty:
-                    raw_output = self._execute_with_pywinpty(cmd_string)
-                else:
-                    raw_output = self._execute_with_subprocess(cmd_string)
-                
-                # Clean up temp file
-                if temp_file and os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
+                raw_output = self._execute_with_session(prompt) if self._pool else None
+                if raw_output is None:
+                    # Build command string (uses temp file for large prompts)
+                    cmd_string, temp_file = self._build_command(prompt, options)
+                    logger.debug(f"Command: {cmd_string[:100]}...")
+                    
+                    if temp_file:
+                        logger.debug(f"Prompt file: {temp_file} ({os.path.getsize(temp_file)} bytes)")
+                    
+                    # Execute using pywinpty (TTY required)
+                    if self._use_pywinpty:
+                        raw_output = self._execute_with_pywinpty(cmd_string)
+                    else:
+                        raw_output = self._execute_with_subprocess(cmd_string)
+                    
+                    # Clean up temp file
+                    if temp_file and os.path.exists(temp_file):
+                        try:
+                            os.remove(temp_file)
+                        except:
+                            pass
                 
                 # Clean up output
                 output = self._strip_ansi_codes(raw_output)
@@ -0,0 +1,148 @@
+"""
+Persistent response cache for PPTPlaner agent calls.
+
+Content-addressed: each entry is keyed on a hash of
+(agent, effective model, mode, final prompt), so an identical call made
+by a re-run, a resumed run or a retried phase is replayed from disk
+instead of being sent to the model again.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+
+class ResponseCache:
+    """
+    On-disk cache of agent responses with size and age based eviction.
+
+    Entries are stored one JSON file per key under a two-character
+    fan-out directory. Writes are atomic (write to .tmp, then rename),
+    so concurrent worker threads and processes never see partial entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size_mb: float = 512,
+        max_age_days: float = 30
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Full scan once at startup; afterwards the size is tracked incrementally
+        self._size_bytes = 0
+        self.evict()
+
+    @staticmethod
+    def make_key(agent: str, model: Optional[str], mode: str, prompt: str) -> str:
+        """Return the content hash identifying a call."""
+        payload = json.dumps(
+            [agent.lower().strip(), model or "default", mode, prompt],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _is_expired(self, created: float) -> bool:
+        return self.max_age_seconds > 0 and time.time() - created > self.max_age_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if self._is_expired(entry.get("created", 0)):
+            path.unlink(missing_ok=True)
+            return None
+
+        # Touch on hit so size-based eviction drops least recently used first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("response")
+
+    def put(self, key: str, response: str, metadata: Optional[Dict[str, Any]] = None):
+        """Store a response and evict old entries if over the size limit."""
+        if not response:
+            return
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"created": time.time(), "response": response}
+        if metadata:
+            entry.update(metadata)
+
+        data = json.dumps(entry, ensure_ascii=False)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        try:
+            replaced = path.stat().st_size  # Overwriting a key must not count it twice
+        except OSError:
+            replaced = 0
+        tmp_path.replace(path)
+
+        with self._lock:
+            self._size_bytes += len(data.encode("utf-8")) - replaced
+            over_limit = self._size_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries, then oldest entries until under max size.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            entries = []
+            removed = 0
+            now = time.time()
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if self.max_age_seconds > 0 and now - stat.st_mtime > self.max_age_seconds:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                for _, size, path in sorted(entries):
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+            self._size_bytes = total
+            return removed
+
+    def clear(self):
+        """Remove all cache entries."""
+        with self._lock:
+            for path in self.cache_dir.glob("*/*.json"):
+                path.unlink(missing_ok=True)
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count and total size on disk."""
+        entries = list(self.cache_dir.glob("*/*.json"))
+        return {
+            "entries": len(entries),
+            "size_bytes": sum(p.stat().st_size for p in entries if p.exists()),
+            "cache_dir": str(self.cache_dir)
+        }
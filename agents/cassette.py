@@ -0,0 +1,178 @@
+"""
+Record/replay cassettes for PPTPlaner agent calls.
+
+In record mode every agent call made by run_agent (mode, prompt hash,
+response or error, latency) is appended to a JSON Lines file in the
+output directory. In replay mode the same job can be re-run without any
+model calls: each call is answered from the cassette, and repeated
+identical prompts (retries, re-validations) get their recorded answers in
+the order they were recorded. Recorded latencies can optionally be
+reproduced (scaled), so scheduling and concurrency changes can be
+benchmarked offline against real response timing.
+
+Usage:
+    cassette = Cassette(output_dir / "cassette.jsonl")            # record
+    cassette.record("MEMO", prompt, response=text, latency_ms=8400)
+
+    cassette = Cassette.load(output_dir, replay_latency=True)    # replay
+    text = cassette.replay("MEMO", prompt)
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .exceptions import AgentExecutionError, CassetteMissError
+
+CASSETTE_FILENAME = "cassette.jsonl"
+
+
+class Cassette:
+    """
+    Agent calls recorded to, or replayed from, a JSON Lines file.
+
+    A recording cassette may be created before its path is known (the
+    output directory is only chosen after the analysis phase); entries are
+    buffered in memory until set_path() and appended line by line after
+    that, so an interrupted run still leaves everything recorded so far.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        replaying: bool = False,
+        replay_latency: bool = False,
+        latency_scale: float = 1.0
+    ):
+        self.path = Path(path) if path else None
+        self.replaying = replaying
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._seq = 0
+        self._pending: List[str] = []
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._stats = {"recorded": 0, "replayed": 0, "repeats": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(mode: str, prompt: str) -> str:
+        """Hash identifying a call; independent of agent and model so a job replays on any backend."""
+        return hashlib.sha256(json.dumps([mode, prompt], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def resolve_path(path: Path) -> Path:
+        """A cassette file, or the output directory holding cassette.jsonl."""
+        path = Path(path)
+        return path / CASSETTE_FILENAME if path.is_dir() else path
+
+    @classmethod
+    def load(cls, path: Path, replay_latency: bool = False, latency_scale: float = 1.0) -> "Cassette":
+        """Open a recorded cassette for replay."""
+        cassette = cls(cls.resolve_path(path), replaying=True, replay_latency=replay_latency, latency_scale=latency_scale)
+        with open(cassette.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    cassette._entries[entry["key"]].append(entry)
+        for entries in cassette._entries.values():
+            entries.sort(key=lambda e: e.get("seq", 0))
+        return cassette
+
+    # --- Recording ---
+
+    def set_path(self, path: Path):
+        """Set where a recording goes and flush the entries buffered so far."""
+        with self._lock:
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("".join(self._pending), encoding="utf-8")
+            self._pending.clear()
+
+    def record(
+        self,
+        mode: str,
+        prompt: str,
+        response: Optional[str] = None,
+        latency_ms: float = 0.0,
+        error: Optional[str] = None,
+        **metadata
+    ):
+        """Append one call; pass error instead of response for a failed call."""
+        with self._lock:
+            self._seq += 1
+            entry = {
+                "seq": self._seq,
+                "t_ms": round((time.perf_counter() - self._start) * 1000, 1),
+                "mode": mode,
+                "key": self.make_key(mode, prompt),
+                "latency_ms": round(latency_ms, 1),
+                **metadata,
+            }
+            if error is not None:
+                entry["error"] = error
+            else:
+                entry["response"] = response or ""
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            if self.path is None:
+                self._pending.append(line)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            self._stats["recorded"] += 1
+
+    # --- Replay ---
+
+    def has(self, mode: str, prompt: str) -> bool:
+        """True if the cassette holds an answer for this call (a miss is counted)."""
+        found = self.make_key(mode, prompt) in self._entries
+        if not found:
+            with self._lock:
+                self._stats["misses"] += 1
+        return found
+
+    def next_entry(self, mode: str, prompt: str) -> Dict[str, Any]:
+        """Take the next recorded entry for a call.
+
+        Once a prompt's recordings are used up, its last successful answer
+        is repeated (a replay may make more identical calls than the run it
+        was recorded from).
+        """
+        key = self.make_key(mode, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self._stats["misses"] += 1
+                raise CassetteMissError(mode, key, self.path)
+            index = self._cursor[key]
+            if index < len(entries):
+                self._cursor[key] += 1
+                self._stats["replayed"] += 1
+                return entries[index]
+            self._stats["repeats"] += 1
+            return next((e for e in reversed(entries) if "response" in e), entries[-1])
+
+    def replay(self, mode: str, prompt: str) -> str:
+        """Return the recorded response (sleeping for its latency if enabled).
+
+        A recorded failure is raised again as AgentExecutionError.
+        """
+        entry = self.next_entry(mode, prompt)
+        if self.replay_latency and entry.get("latency_ms"):
+            time.sleep(entry["latency_ms"] * self.latency_scale / 1000)
+        if "error" in entry:
+            raise AgentExecutionError(entry["error"], entry.get("agent", "cassette"))
+        return entry["response"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counts and the cassette path."""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": sum(len(e) for e in self._entries.values()),
+                "path": str(self.path) if self.path else None
+            }
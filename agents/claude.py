@@ -9,11 +9,13 @@ import time
 import logging
 from typing import Optional, List, Dict, Any
 from .base import AgentInterface
-from .exceptions import AgentExecutionError, AgentAuthenticationError
+from .exceptions import AgentExecutionError, AgentAuthenticationError, AgentCancelledError
 from .retry import RetryStrategy
 
 logger = logging.getLogger(__name__)
 
+CANCEL_POLL_INTERVAL = 0.5  # seconds between checks of a cancel event while the CLI runs
+
 
 class ClaudeCodeAdapter(AgentInterface):
     """Claude Code CLI adapter."""
@@ -52,6 +54,31 @@ class ClaudeCodeAdapter(AgentInterface):
             return "quota"
         return "other"
     
+    def _run_cancellable(self, cmd: list[str], prompt: str, cancel) -> subprocess.CompletedProcess:
+        """Like subprocess.run(check=True), but kills the CLI once `cancel` is set."""
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8"
+        )
+        pending_input = prompt
+        while True:
+            try:
+                stdout, stderr = process.communicate(input=pending_input, timeout=CANCEL_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pending_input = None  # communicate() keeps feeding the input it was first given
+                if cancel.is_set():
+                    process.kill()
+                    process.communicate()
+                    raise AgentCancelledError(self.NAME)
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    
     def execute(
         self,
         prompt: str,
@@ -61,21 +88,31 @@ class ClaudeCodeAdapter(AgentInterface):
         retry_delay: int = 5,
         options: Optional[Dict[str, Any]] = None
     ) -> str:
-        """Execute agent with given prompt and mode."""
+        """Execute agent with given prompt and mode.
+
+        options["cancel"] (a threading.Event) kills the CLI and raises
+        AgentCancelledError.
+        """
         cmd = self._build_command(prompt, mode, options)
+        cancel = (options or {}).get("cancel")
         
         attempt = 0
         while attempt < max_retries:
+            if cancel is not None and cancel.is_set():
+                raise AgentCancelledError(self.NAME)
             try:
                 logger.info(f"Calling {self.NAME} for {mode}... (Attempt {attempt + 1}/{max_retries})")
-                result = subprocess.run(
-                    cmd,
-                    input=prompt,
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",
-                    check=True
-                )
+                if cancel is not None:
+                    result = self._run_cancellable(cmd, prompt, cancel)
+                else:
+                    result = subprocess.run(
+                        cmd,
+                        input=prompt,
+                        capture_output=True,
+                        text=True,
+                        encoding="utf-8",
+                        check=True
+                    )
                 
                 output = result.stdout.strip()
                 if output:
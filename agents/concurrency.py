@@ -0,0 +1,205 @@
+"""
+Adaptive concurrency control for PPTPlaner agent backends.
+
+AIMD (additive increase, multiplicative decrease), as in TCP congestion
+control: parallelism grows by one slot per healthy window of calls and is
+cut multiplicatively on quota, timeout or network errors, or when latency
+inflates well above the backend's observed baseline.
+
+LLM latency mostly tracks output length, not load, so latency is compared
+per output token against a per-mode running median, and only the window's
+median decides: one long answer is not a sign of overload.
+
+Usage:
+    controller = AdaptiveConcurrencyController("ollama@localhost", initial=2, max_limit=8)
+    generation = controller.acquire()
+    try:
+        output = agent.execute(...)
+        controller.on_success(generation, latency_ms, mode, estimate_tokens(output))
+    except Exception as e:
+        controller.on_error(generation, parse_cli_error(str(e)).category)
+        raise
+    finally:
+        controller.release()
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .error_parser import ErrorCategory
+
+# Error categories that signal an overloaded backend
+BACKOFF_CATEGORIES = (ErrorCategory.QUOTA, ErrorCategory.TIMEOUT, ErrorCategory.NETWORK)
+
+HISTORY_SIZE = 200
+BASELINE_STEP = 0.02  # Relative move of the per-mode latency baseline per normal call
+WARMUP_CALLS = 5      # Calls per mode whose median seeds the baseline
+
+
+class AdaptiveConcurrencyController:
+    """
+    Per-backend AIMD concurrency limiter.
+
+    Thread-safe. Callers acquire a slot before each agent call and report
+    the outcome; the limit is adjusted from those reports. Errors from calls
+    started before the most recent decrease are ignored, so one burst of
+    failures only backs off once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.5,
+        baseline_step: float = BASELINE_STEP
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.baseline_step = baseline_step
+        self._limit = min(self.max_limit, max(self.min_limit, initial))
+        self._in_flight = 0
+        self._generation = 0
+        self._window: List[float] = []  # Latency / baseline of each call in the current window
+        self._baseline_ms: Dict[str, float] = {}  # Per mode, per output token when known
+        self._warmup: Dict[str, List[float]] = {}
+        self._cond = threading.Condition()
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=HISTORY_SIZE)
+        self._changes = 0
+        self._record_change("initial")
+
+    @classmethod
+    def from_config(cls, name: str, backend: str, config: Optional[Dict[str, Any]] = None) -> "AdaptiveConcurrencyController":
+        """Build a controller from the `concurrency` config section.
+
+        Per-backend values under `backends.<agent name>` override the globals.
+        """
+        config = dict(config or {})
+        overrides = (config.pop("backends", None) or {}).get(backend) or {}
+        config.update(overrides)
+        return cls(
+            name,
+            initial=config.get("initial", 2),
+            min_limit=config.get("min", 1),
+            max_limit=config.get("max", 8),
+            decrease_factor=config.get("decrease_factor", 0.5),
+            latency_tolerance=config.get("latency_tolerance", 2.5),
+            baseline_step=config.get("baseline_step", BASELINE_STEP)
+        )
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently holding a slot."""
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Block until a slot is free. Returns the generation for reporting."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < self._limit, timeout=timeout):
+                raise TimeoutError(f"No concurrency slot for {self.name} within {timeout}s")
+            self._in_flight += 1
+            return self._generation
+
+    def release(self):
+        """Return a slot acquired with acquire()."""
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify_all()
+
+    def on_success(self, generation: int, latency_ms: float, mode: str = "", output_tokens: int = 0):
+        """Report a successful call; grows the limit after a healthy window."""
+        with self._cond:
+            latency_ms = max(latency_ms, 1.0)
+            cost = latency_ms / output_tokens if output_tokens > 0 else latency_ms
+            baseline = self._baseline_ms.get(mode)
+            warming_up = baseline is None
+            if warming_up:
+                # Judge against the median so far, then seed the baseline with it
+                samples = self._warmup.setdefault(mode, [])
+                baseline = statistics.median(samples) if samples else cost
+                samples.append(cost)
+                if len(samples) >= WARMUP_CALLS:
+                    self._baseline_ms[mode] = statistics.median(self._warmup.pop(mode))
+            elif cost <= baseline * self.latency_tolerance:
+                # Step towards the running median of normal calls; slow ones are left out so
+                # sustained overload does not become the new normal
+                if cost != baseline:
+                    step = 1 + self.baseline_step
+                    self._baseline_ms[mode] = baseline * step if cost > baseline else baseline / step
+
+            if generation < self._generation:
+                return  # Started under an older, larger limit
+
+            ratio = cost / baseline
+            if warming_up and ratio <= self.latency_tolerance:
+                return  # Growing before normal latency is known would seed the baseline under load
+            self._window.append(ratio)
+            # One adjustment per window of `limit` completed calls
+            if len(self._window) < self._limit:
+                return
+            # median_low: a window of two needs both calls slow
+            if statistics.median_low(self._window) > self.latency_tolerance:
+                self._decrease("latency")
+            elif self._limit < self.max_limit:
+                self._limit += 1
+                self._new_window()
+                self._record_change("increase")
+                self._cond.notify_all()
+            else:
+                self._new_window()
+
+    def on_error(self, generation: int, category: str):
+        """Report a failed call; backs off on overload-type errors."""
+        with self._cond:
+            if category not in BACKOFF_CATEGORIES:
+                return
+            if generation < self._generation:
+                return  # Already backed off for this burst
+            self._decrease(category)
+
+    def _decrease(self, reason: str):
+        previous = self._limit
+        self._limit = max(self.min_limit, int(self._limit * self.decrease_factor))
+        self._generation += 1
+        self._new_window()
+        if self._limit != previous:
+            self._record_change(reason)
+
+    def _new_window(self):
+        self._window = []
+
+    def _record_change(self, reason: str):
+        if reason != "initial":
+            self._changes += 1
+        self._history.append({"timestamp": time.time(), "limit": self._limit, "reason": reason})
+        from .performance import performance_monitor
+        performance_monitor.record_concurrency_limit(self.name, self._limit, reason)
+
+    def get_history(self) -> List[Dict[str, Any]]:
+        """Return recorded limit changes, oldest first."""
+        with self._cond:
+            return list(self._history)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return current limit, in-flight count and bounds."""
+        with self._cond:
+            return {
+                "backend": self.name,
+                "limit": self._limit,
+                "in_flight": self._in_flight,
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "changes": self._changes
+            }
@@ -43,3 +43,36 @@ class AgentQuotaExceededError(AgentError):
     def __init__(self, message: str, agent_name: str):
         super().__init__(message)
         self.agent_name = agent_name
+
+
+class CircuitOpenError(AgentError):
+    """Backend circuit breaker is open; the call was not attempted."""
+    
+    def __init__(self, backend: str, retry_after: float = 0.0):
+        super().__init__(f"Circuit breaker for '{backend}' is open (retry in {retry_after:.0f}s)")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+class RetryBudgetExhaustedError(AgentError):
+    """The run's shared retry budget is used up."""
+    
+    def __init__(self, message: str = "Retry budget exhausted"):
+        super().__init__(message)
+
+
+class AgentCancelledError(AgentError):
+    """The call was cancelled by its caller (e.g. a losing hedged candidate)."""
+    
+    def __init__(self, agent_name: str = ""):
+        super().__init__(f"{agent_name or 'Agent'} call cancelled")
+        self.agent_name = agent_name
+
+
+class CassetteMissError(AgentError):
+    """A replayed call has no recorded response in the cassette."""
+    
+    def __init__(self, mode: str, key: str, path=None):
+        super().__init__(f"No recorded response for {mode} (prompt {key[:12]}) in cassette {path or ''}".rstrip())
+        self.mode = mode
+        self.key = key
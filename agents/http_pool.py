@@ -0,0 +1,352 @@
+"""
+Pooled keep-alive HTTP client for API-based agents.
+
+urllib.request.urlopen opens (and TLS-handshakes) a new connection for every
+call. HTTPClient keeps idle connections per host and hands them to whichever
+memo/SVG worker thread needs one next.
+
+Backends:
+- stdlib http.client (HTTP/1.1 keep-alive), always available
+- httpx with HTTP/2, when `http2: true` and httpx[http2] is installed
+
+Responses behave like urlopen responses (status, read(), line iteration,
+context manager), and HTTP errors are raised as urllib.error.HTTPError, so
+callers keep their existing error handling.
+
+A request may carry a cancel event: once it is set the stdlib client shuts
+the connection down, so a thread blocked waiting for the reply gets an
+error at once and the server sees the client go away (Ollama and
+llama.cpp then stop generating).
+
+Usage:
+    client = get_http_client(pool_size=8)
+    with client.request("POST", url, body=payload, headers=headers, timeout=120) as response:
+        result = json.loads(response.read())
+"""
+import http.client
+import io
+import logging
+import socket
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 8
+
+# Errors meaning a reused keep-alive connection was closed by the server
+# while idle; the request is retried once on a fresh connection.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+HostKey = Tuple[str, str, int]
+
+CANCEL_POLL_INTERVAL = 0.5  # seconds; how often an idle abort watcher checks its request is over
+
+
+class _AbortOnCancel:
+    """Shuts a connection down when `cancel` is set, until finish() is called."""
+
+    def __init__(self, cancel: threading.Event, conn: http.client.HTTPConnection):
+        self._cancel = cancel
+        self._conn = conn
+        self._lock = threading.Lock()
+        self._finished = False
+        threading.Thread(target=self._watch, name="http-abort", daemon=True).start()
+
+    def _watch(self):
+        while not self._finished:
+            if self._cancel.wait(CANCEL_POLL_INTERVAL):
+                with self._lock:
+                    sock = None if self._finished else self._conn.sock
+                    if sock is not None:
+                        try:
+                            sock.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
+                return
+
+    def finish(self):
+        """The request is over (the connection may go back to the pool)."""
+        with self._lock:
+            self._finished = True
+
+
+class PooledResponse:
+    """A response whose connection goes back to the pool once fully read."""
+
+    def __init__(
+        self,
+        pool: "HTTPClient",
+        key: HostKey,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        abort: Optional[_AbortOnCancel] = None
+    ):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._abort = abort
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read(amt)
+        if amt is None:
+            self._release()
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self._response:
+            yield line
+        self._release()
+
+    def _body_consumed(self) -> bool:
+        # readline() stops at Content-Length without closing the response
+        return self._response.isclosed() or self._response.length == 0
+
+    def _release(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._abort:
+            self._abort.finish()
+        if self._body_consumed() and not self._response.will_close:
+            self._response.close()
+            self._pool._put(self._key, conn)
+        else:
+            # Abandoned mid-body (e.g. streaming early stop): can't be reused
+            conn.close()
+
+    def close(self):
+        """Close the response. Unread responses close their connection."""
+        self._release()
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HTTPClient:
+    """
+    Thread-safe HTTP/1.1 client with per-host keep-alive connection pools.
+
+    At most pool_size idle connections are kept per host; extra connections
+    opened under load are closed after use instead of being pooled.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool_size = max(1, pool_size)
+        self._idle: Dict[HostKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self.stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+
+    def _get(self, key: HostKey, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            self.stats["requests"] += 1
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                self.stats["connections_reused"] += 1
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            self.stats["connections_opened"] += 1
+
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _put(self, key: HostKey, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _uses_proxy(scheme: str, host: str) -> bool:
+        return scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(host)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None
+    ) -> Any:
+        """Send a request on a pooled connection.
+
+        Raises urllib.error.HTTPError for 4xx/5xx responses. Setting `cancel`
+        shuts the connection down (not supported through a proxy).
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or "localhost"
+        if self._uses_proxy(scheme, host):
+            # Environment proxies are only honoured by urllib
+            req = urllib.request.Request(url, data=body, headers=headers or {}, method=method)
+            return urllib.request.urlopen(req, timeout=timeout)
+
+        key = (scheme, host, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        conn, reused = self._get(key, timeout)
+        abort = _AbortOnCancel(cancel, conn) if cancel is not None else None
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if abort:
+                abort.finish()
+            if not reused or (cancel is not None and cancel.is_set()):
+                raise
+            logger.debug(f"Stale keep-alive connection to {host}, reconnecting")
+            conn, _ = self._get(key, timeout)
+            abort = _AbortOnCancel(cancel, conn) if cancel is not None else None
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+            except Exception:
+                conn.close()
+                if abort:
+                    abort.finish()
+                raise
+        except Exception:
+            conn.close()
+            if abort:
+                abort.finish()
+            raise
+
+        if response.status >= 400:
+            data = response.read()
+            conn.close()
+            if abort:
+                abort.finish()
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+        return PooledResponse(self, key, conn, response, abort)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class _HttpxResponse:
+    """Adapts a streamed httpx.Response to the urlopen response interface."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read()
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self._response.iter_lines():
+            yield line.encode("utf-8") + b"\n"
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self) -> "_HttpxResponse":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Http2Client:
+    """HTTP/2 client backed by httpx (requires the optional httpx[http2])."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        import httpx
+        self.pool_size = max(1, pool_size)
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=self.pool_size),
+            trust_env=True
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None
+    ) -> _HttpxResponse:
+        """Send a request; raises urllib.error.HTTPError for 4xx/5xx responses.
+
+        `cancel` is accepted for interface parity; httpx requests are only
+        stopped between streamed chunks, by the caller.
+        """
+        request = self._client.build_request(method, url, content=body, headers=headers, timeout=timeout)
+        response = self._client.send(request, stream=True)
+        if response.status_code >= 400:
+            data = response.read()
+            response.close()
+            raise urllib.error.HTTPError(url, response.status_code, response.reason_phrase, response.headers, io.BytesIO(data))
+        return _HttpxResponse(response)
+
+    def close(self):
+        self._client.close()
+
+
+_clients: Dict[Tuple[int, bool], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(pool_size: Optional[int] = None, http2: bool = False):
+    """Return the process-wide shared client for the given settings."""
+    pool_size = pool_size or DEFAULT_POOL_SIZE
+    with _clients_lock:
+        key = (pool_size, http2)
+        client = _clients.get(key)
+        if client is None:
+            if http2:
+                try:
+                    client = Http2Client(pool_size)
+                except ImportError:
+                    logger.warning("HTTP/2 requires 'httpx[http2]'; falling back to HTTP/1.1 keep-alive")
+            if client is None:
+                client = HTTPClient(pool_size)
+            _clients[key] = client
+        return client
+
+
+def close_http_clients():
+    """Close all shared clients and their idle connections."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
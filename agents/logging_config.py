@@ -8,6 +8,7 @@ import logging
 import sys
 import time
 from typing import Any, Dict, Optional
+from .error_parser import parse_cli_error
 from .performance import performance_monitor
 
 
@@ -82,7 +83,7 @@ class AgentLogger:
             model=timing_info.get("model"),
             response_size=response_length,
             retry_count=timing_info.get("attempt", 1) - 1,
-            error_category="error" if error_msg else None
+            error_category=parse_cli_error(error_msg).category if error_msg else None
         )
         
         if success:
@@ -139,7 +140,7 @@ class AgentLogger:
             model=timing_info.get("model"),
             response_size=response_length,
             retry_count=timing_info.get("attempt", 1) - 1,
-            error_category="error" if error_msg else None
+            error_category=parse_cli_error(error_msg).category if error_msg else None
         )
         
         if success:
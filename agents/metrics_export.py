@@ -0,0 +1,269 @@
+"""
+Prometheus / OpenMetrics export of PerformanceMonitor metrics.
+
+For unattended batch runs: exposes call counts, latency histograms,
+retries, error categories, cache, concurrency, breaker and rate-limit
+state, scheduler queue depth / active workers and video pipeline steps in
+the Prometheus text format, either
+
+- over HTTP (`mode: http`): GET http://127.0.0.1:9464/metrics, or
+- as a node_exporter textfile-collector file (`mode: textfile`), rewritten
+  atomically every `interval_sec` and once more when the run ends.
+
+config.yaml:
+    metrics_export:
+      enabled: true
+      mode: textfile
+      textfile: /var/lib/node_exporter/textfile/pptplaner.prom
+
+Usage:
+    exporter = MetricsExporter.from_config(cfg.get("metrics_export"), process="orchestrate")
+    if exporter:
+        exporter.start()
+    ...
+    exporter.stop()
+"""
+import atexit
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .performance import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram bucket bounds in seconds (agent calls take seconds to minutes)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _value(value: float) -> str:
+    """Sample value at full precision (':g' would round large counters to 6 digits)."""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(pairs: Iterable[Tuple[str, Any]]) -> str:
+    text = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + text + "}" if text else ""
+
+
+class _Writer:
+    """Collects samples grouped by metric family, each with HELP/TYPE once."""
+
+    def __init__(self, prefix: str, const_labels: List[Tuple[str, str]]):
+        self.prefix = prefix
+        self.const_labels = const_labels
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {self.prefix}{name} {help_text}")
+        self.lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: Any):
+        pairs = self.const_labels + list(labels.items())
+        self.lines.append(f"{self.prefix}{name}{_labels(pairs)} {_value(value)}")
+
+    def histogram(self, name: str, histogram, **labels: Any):
+        counts = histogram.cumulative_counts([bound * 1000 for bound in LATENCY_BUCKETS])
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            self.sample(f"{name}_bucket", count, **labels, le=f"{bound:g}")
+        self.sample(f"{name}_bucket", histogram.count, **labels, le="+Inf")
+        self.sample(f"{name}_sum", histogram.total / 1000, **labels)
+        self.sample(f"{name}_count", histogram.count, **labels)
+
+
+def render_metrics(snapshot: Optional[Dict[str, Any]] = None, process: str = "", prefix: str = "pptplaner_") -> str:
+    """Render a PerformanceMonitor snapshot in the Prometheus text format."""
+    snap = snapshot if snapshot is not None else performance_monitor.snapshot()
+    w = _Writer(prefix, [("process", process)] if process else [])
+
+    w.family("uptime_seconds", "gauge", "Seconds since metrics collection started.")
+    w.sample("uptime_seconds", snap["uptime_seconds"])
+
+    calls = sorted(snap["calls"].items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or ""))
+    w.family("agent_calls_total", "counter", "Agent calls by agent, mode, model and outcome.")
+    for (agent, mode, model), entry in calls:
+        total, ok = entry["latency"].count, entry["successes"]
+        w.sample("agent_calls_total", ok, agent=agent, mode=mode, model=model or "default", status="success")
+        w.sample("agent_calls_total", total - ok, agent=agent, mode=mode, model=model or "default", status="failure")
+    w.family("agent_call_duration_seconds", "histogram", "Agent call latency.")
+    for (agent, mode, model), entry in calls:
+        w.histogram("agent_call_duration_seconds", entry["latency"], agent=agent, mode=mode, model=model or "default")
+
+    w.family("agent_retries_total", "counter", "Agent call attempts that were retries.")
+    for (agent, mode), count in sorted(snap["retries"].items()):
+        w.sample("agent_retries_total", count, agent=agent, mode=mode)
+    w.family("agent_errors_total", "counter", "Failed agent calls by error category.")
+    for (agent, category), count in sorted(snap["errors"].items()):
+        w.sample("agent_errors_total", count, agent=agent, category=category)
+
+    w.family("cache_lookups_total", "counter", "Response cache lookups by mode and result.")
+    for mode in sorted(set(snap["cache_hits"]) | set(snap["cache_misses"])):
+        w.sample("cache_lookups_total", snap["cache_hits"].get(mode, 0), mode=mode, result="hit")
+        w.sample("cache_lookups_total", snap["cache_misses"].get(mode, 0), mode=mode, result="miss")
+
+    w.family("json_parses_total", "counter", "JSON outputs by mode and whether they could be parsed.")
+    for mode, counts in sorted(snap.get("parses", {}).items()):
+        w.sample("json_parses_total", counts["parsed"], mode=mode, result="parsed")
+        w.sample("json_parses_total", counts["failed"], mode=mode, result="failed")
+
+    w.family("concurrency_limit", "gauge", "Current adaptive concurrency limit per backend.")
+    for backend, limit in sorted(snap["concurrency"].items()):
+        w.sample("concurrency_limit", limit, backend=backend)
+
+    breakers = sorted(snap["breakers"].items())
+    w.family("circuit_breaker_open", "gauge", "1 if the backend's circuit breaker is open, 0.5 if half-open.")
+    for backend, entry in breakers:
+        w.sample("circuit_breaker_open", {"open": 1, "half_open": 0.5}.get(entry["state"], 0), backend=backend)
+    w.family("circuit_breaker_opens_total", "counter", "Times the backend's circuit breaker opened.")
+    for backend, entry in breakers:
+        w.sample("circuit_breaker_opens_total", entry["opens"], backend=backend)
+    w.family("circuit_breaker_rejections_total", "counter", "Calls failed fast by an open circuit breaker, never sent.")
+    for backend, entry in breakers:
+        w.sample("circuit_breaker_rejections_total", entry["rejections"], backend=backend)
+
+    w.family("rate_limit_wait_seconds_total", "counter", "Time spent waiting on backend rate limits.")
+    for backend, stats in sorted(snap["rate_limits"].items()):
+        w.sample("rate_limit_wait_seconds_total", stats["total_wait_ms"] / 1000, backend=backend)
+
+    w.family("pipeline_step_duration_seconds", "histogram", "Pipeline step latency (e.g. video tts/image/clip).")
+    for (pipeline, step), entry in sorted(snap["steps"].items()):
+        w.histogram("pipeline_step_duration_seconds", entry["latency"], pipeline=pipeline, step=step)
+    w.family("pipeline_step_failures_total", "counter", "Failed pipeline steps.")
+    for (pipeline, step), entry in sorted(snap["steps"].items()):
+        w.sample("pipeline_step_failures_total", entry["failures"], pipeline=pipeline, step=step)
+
+    gauges: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+    for (name, labels), value in snap["gauges"].items():
+        gauges.setdefault(name, []).append((labels, value))
+    for name in sorted(gauges):
+        w.family(name, "gauge", f"Current {name.replace('_', ' ')}.")
+        for labels, value in sorted(gauges[name]):
+            w.sample(name, value, **dict(labels))
+
+    return "\n".join(w.lines) + "\n"
+
+
+class MetricsExporter:
+    """Serves or writes the metrics until stopped."""
+
+    def __init__(
+        self,
+        mode: str = "http",
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        textfile: Optional[Path] = None,
+        interval_sec: float = 15,
+        process: str = ""
+    ):
+        if mode not in ("http", "textfile"):
+            raise ValueError(f"Unknown metrics_export mode '{mode}' (expected http or textfile)")
+        if mode == "textfile" and not textfile:
+            raise ValueError("metrics_export mode 'textfile' needs a 'textfile' path")
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.textfile = Path(textfile) if textfile else None
+        self.interval_sec = interval_sec
+        self.process = process
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None, process: str = "") -> Optional["MetricsExporter"]:
+        """Build from the 'metrics_export' section; None unless enabled."""
+        config = config or {}
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            mode=config.get("mode", "http"),
+            host=config.get("host", "127.0.0.1"),
+            port=config.get("port", 9464),
+            textfile=config.get("textfile"),
+            interval_sec=config.get("interval_sec", 15),
+            process=process
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsExporter":
+        if self.mode == "http":
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/metrics", "/"):
+                        self.send_error(404)
+                        return
+                    body = render_metrics(process=exporter.process).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    logger.debug("metrics: " + format % args)
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+            self._thread.start()
+            logger.info(f"Serving metrics at {self.url}")
+        else:
+            self._thread = threading.Thread(target=self._write_loop, name="metrics-textfile", daemon=True)
+            self._thread.start()
+            logger.info(f"Writing metrics to {self.textfile} every {self.interval_sec}s")
+        atexit.register(self.stop)
+        return self
+
+    def write_textfile(self):
+        """Atomically replace the textfile (the collector must never read a partial file)."""
+        self.textfile.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.textfile.with_name(self.textfile.name + ".tmp")
+        tmp_path.write_text(render_metrics(process=self.process), encoding="utf-8")
+        tmp_path.replace(self.textfile)
+
+    def _write_loop(self):
+        while True:
+            try:
+                self.write_textfile()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics textfile {self.textfile}: {e}")
+            if self._stop.wait(self.interval_sec):
+                return
+
+    def stop(self):
+        """Stop serving; the textfile gets a final write with the end-of-run values."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        elif self.textfile:
+            if self._thread:
+                self._thread.join(timeout=5)
+            try:
+                self.write_textfile()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics textfile {self.textfile}: {e}")
@@ -16,6 +16,7 @@ import urllib.request
 import urllib.error
 import json
 import logging
+import re
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 
@@ -51,6 +52,8 @@ class DetectedEndpoint:
 DEFAULT_OLLAMA_URL = "http://localhost:11434"
 DEFAULT_LLAMACPP_URL = "http://localhost:8080"
 
+_NUM_CTX = re.compile(r"^\s*num_ctx\s+(\d+)", re.MULTILINE)
+
 # API endpoints to try for brute-force detection
 API_SUFFIXES = [
     ("/api/tags", "Ollama"),
@@ -79,6 +82,7 @@ class ModelDetector:
         self.endpoints = endpoints or []
         self.verbose = verbose
         self._cache: Dict[str, DetectedEndpoint] = {}
+        self._context_cache: Dict[Tuple[str, Optional[str]], Optional[int]] = {}
         
     def _log(self, message: str):
         """Log a detection message if verbose mode is enabled."""
@@ -209,6 +213,51 @@ class ModelDetector:
         self._cache[endpoint_url] = result
         return result
     
+    def _request_json(self, url: str, body: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """GET (or POST body to) url and decode the JSON reply; None on any failure."""
+        try:
+            req = urllib.request.Request(
+                url,
+                data=json.dumps(body).encode("utf-8") if body is not None else None,
+                headers={"Accept": "application/json", "Content-Type": "application/json"},
+                method="POST" if body is not None else "GET"
+            )
+            with urllib.request.urlopen(req, timeout=3) as response:
+                data = json.loads(response.read().decode("utf-8"))
+                return data if isinstance(data, dict) else None
+        except Exception:
+            return None
+
+    def detect_context_window(self, api_base: str, model: Optional[str] = None) -> Optional[int]:
+        """Context length the server runs the model with; None if it does not say.
+
+        Ollama: num_ctx from /api/show (only set when the Modelfile sets it;
+        otherwise the server's own default applies, which it does not report).
+        llama.cpp: n_ctx from /props. Results are cached per endpoint and model.
+        """
+        base = api_base.rstrip("/")
+        if base.endswith("/v1"):
+            base = base[:-3]
+        key = (base, model)
+        if key in self._context_cache:
+            return self._context_cache[key]
+
+        n_ctx = None
+        if model:
+            shown = self._request_json(f"{base}/api/show", {"model": model})
+            match = _NUM_CTX.search(str((shown or {}).get("parameters") or ""))
+            if match:
+                n_ctx = int(match.group(1))
+        if n_ctx is None:
+            props = self._request_json(f"{base}/props")
+            if props:
+                settings = props.get("default_generation_settings") or {}
+                n_ctx = settings.get("n_ctx") or props.get("n_ctx")
+        n_ctx = int(n_ctx) if isinstance(n_ctx, (int, float)) and n_ctx > 0 else None
+        self._log(f"Context window for {model or 'default model'} @ {base}: {n_ctx or 'unknown'}")
+        self._context_cache[key] = n_ctx
+        return n_ctx
+
     def detect_quick(self) -> Optional[DetectedEndpoint]:
         """Quick detection - tries default endpoints with their expected API.
         
@@ -346,6 +395,7 @@ class ModelDetector:
     def clear_cache(self):
         """Clear detection cache."""
         self._cache.clear()
+        self._context_cache.clear()
 
 
 # Global detector instance with verbose output enabled
@@ -12,14 +12,40 @@ This is NOT the same as the OpenAI direct API adapter.
 """
 import json
 import logging
+import re
 import socket
+import threading
 import time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 from .base import AgentInterface
-from .exceptions import AgentExecutionError, AgentAuthenticationError
+from .exceptions import AgentExecutionError, AgentAuthenticationError, AgentCancelledError
+from .http_pool import get_http_client
+from .performance import performance_monitor
+from .schemas import STRUCTURED_OUTPUT_STYLES, request_fields
 
 logger = logging.getLogger(__name__)
 
+# Streaming early-stop: once a marker appears the useful output is complete
+# (orchestrate.py only keeps the first <svg>...</svg> block), so the rest of
+# the generation is cut off instead of waiting for the model to finish.
+STREAM_STOP_MARKERS = {
+    "CREATE_SLIDE_SVG": ("</svg>",),
+    "CREATE_CONCEPTUAL_SVG": ("</svg>", "NO_CONCEPTUAL_SVG_NEEDED"),
+}
+
+STREAM_PROGRESS_INTERVAL = 15  # seconds between progress log lines
+
+# A 400 is only blamed on the schema when its body mentions it
+SCHEMA_ERROR_PATTERN = re.compile(r"response_format|json_schema|guided_json|\bformat\b|schema", re.IGNORECASE)
+
+
+def _error_body(error: Exception) -> str:
+    """The body of an HTTPError, or '' if it cannot be read."""
+    try:
+        return error.read().decode("utf-8", "replace")
+    except Exception:
+        return ""
+
 
 class OpenAICompatibleAdapter(AgentInterface):
     """OpenAI-compatible API adapter.
@@ -38,6 +64,13 @@ class OpenAICompatibleAdapter(AgentInterface):
         self.model = agent_config.get("model", None)  # Will be set dynamically from endpoint
         self.max_retries = agent_config.get("max_retries", 3)
         self.retry_delay = agent_config.get("retry_delay", 5)
+        self.stream = agent_config.get("stream", False)
+        # Schema-constrained decoding for JSON modes (see agents/schemas.py); None/"off" disables
+        style = agent_config.get("structured_output", "response_format")
+        self.structured_output = style if style in STRUCTURED_OUTPUT_STYLES else None
+        self._structured_output_lock = threading.Lock()
+        # Shared keep-alive pool, reused by every worker thread
+        self._http = get_http_client(agent_config.get("http_pool_size"), agent_config.get("http2", False))
         self._detected_models = None
     
     @staticmethod
@@ -52,12 +85,29 @@ class OpenAICompatibleAdapter(AgentInterface):
     
     def _build_request(self, prompt: str, mode: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Build API request payload."""
-        return {
+        payload = {
             "model": options.get("model", self.model) if options else self.model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": options.get("temperature", 0.7) if options else 0.7,
-            "max_tokens": options.get("max_tokens", 4096) if options else 4096
+            "max_tokens": (options or {}).get("max_tokens") or 4096  # The prompt packer's output budget, when enabled
         }
+        if self.structured_output:
+            payload.update(request_fields(mode, self.structured_output))
+        return payload
+
+    def _drop_structured_output(self, request_data: Dict[str, Any], error_body: str) -> bool:
+        """Remove schema fields if the 400 names them; False if the error is about something else."""
+        fields = [key for key in STRUCTURED_OUTPUT_STYLES if key in request_data]
+        if not fields or not SCHEMA_ERROR_PATTERN.search(error_body):
+            return False
+        for key in fields:
+            del request_data[key]
+        # The adapter is shared by every worker thread: downgrade (and warn) once
+        with self._structured_output_lock:
+            if self.structured_output is not None:
+                logger.warning(f"  ⚠️ {self.api_base} rejected structured output ({self.structured_output}); continuing without it")
+                self.structured_output = None
+        return True
     
     def execute(
         self,
@@ -68,8 +118,11 @@ class OpenAICompatibleAdapter(AgentInterface):
         retry_delay: int = 5,
         options: Optional[Dict[str, Any]] = None
     ) -> str:
-        """Execute agent via OpenAI-compatible API."""
-        import urllib.request
+        """Execute agent via OpenAI-compatible API.
+
+        options["cancel"] (a threading.Event) aborts the call: the connection
+        is closed and AgentCancelledError raised instead of retrying.
+        """
         import urllib.error
         import time
         
@@ -82,6 +135,10 @@ class OpenAICompatibleAdapter(AgentInterface):
         
         request_data = self._build_request(prompt, mode, options)
         request_data["model"] = actual_model
+        stream = options.get("stream", self.stream) if options else self.stream
+        if stream:
+            request_data["stream"] = True
+            stop_markers = (options or {}).get("stop_markers", STREAM_STOP_MARKERS.get(mode, ()))
         
         headers = {
             "Content-Type": "application/json",
@@ -90,20 +147,16 @@ class OpenAICompatibleAdapter(AgentInterface):
         
         logger.info(f"🔹 [{self.NAME}] Calling {mode} (model={actual_model}, endpoint={self.api_base})")
         
+        cancel = (options or {}).get("cancel")
         attempt = 0
         last_error = None
         
         while attempt < max_retries:
+            if cancel is not None and cancel.is_set():
+                raise AgentCancelledError(self.NAME)
             try:
                 logger.info(f"  ℹ Calling {self.NAME} for {mode}... (Attempt {attempt + 1}/{max_retries})")
                 
-                req = urllib.request.Request(
-                    f"{self.api_base}/chat/completions",
-                    data=json.dumps(request_data).encode('utf-8'),
-                    headers=headers,
-                    method='POST'
-                )
-                
                 # Local models need much longer timeout
                 # Check if this is a local endpoint
                 is_local = 'localhost' in self.api_base or '127.0.0.1' in self.api_base
@@ -115,17 +168,38 @@ class OpenAICompatibleAdapter(AgentInterface):
                 if is_local:
                     logger.info(f"  ℹ Waiting for local model response... (this may take several minutes)")
                 
-                with urllib.request.urlopen(req, timeout=request_timeout) as response:
+                with self._http.request(
+                    "POST",
+                    f"{self.api_base}/chat/completions",
+                    body=json.dumps(request_data).encode('utf-8'),
+                    headers=headers,
+                    timeout=request_timeout,
+                    cancel=cancel
+                ) as response:
+                    if stream:
+                        content, stats = self._read_stream(response, mode, stop_markers, cancel)
+                        performance_monitor.record_stream(self.NAME, mode, **stats)
+                        logger.info(
+                            f"  ✅ [{self.NAME}] {mode} completed ({len(content)} characters, "
+                            f"TTFT {stats['ttft_ms']:.0f}ms, {stats['tokens_per_sec']} tok/s"
+                            f"{', stopped early' if stats['stopped_early'] else ''})"
+                        )
+                        return content
                     result = json.loads(response.read().decode('utf-8'))
                     content = result["choices"][0]["message"]["content"]
                     logger.info(f"  ✅ [{self.NAME}] {mode} completed ({len(content)} characters)")
                     return content
                 
+            except AgentCancelledError:
+                raise
+            
             except urllib.error.HTTPError as e:
                 last_error = e
                 if e.code == 401:
                     logger.error(f"  ❌ Authentication failed for {self.api_base}")
                     raise AgentAuthenticationError("Authentication failed", self.NAME)
+                elif e.code == 400 and self._drop_structured_output(request_data, _error_body(e)):
+                    continue  # Older servers: retry at once without the schema
                 elif e.code == 429:
                     logger.warning(f"  ⚠️ Rate limited (429), retrying in {retry_delay}s...")
                 else:
@@ -149,6 +223,9 @@ class OpenAICompatibleAdapter(AgentInterface):
                     logger.warning(f"  ℹ Local models may need more time. Retrying...")
                 else:
                     logger.warning(f"  ⚠️ Request failed: {str(e)}")
+            
+            if cancel is not None and cancel.is_set():
+                raise AgentCancelledError(self.NAME)  # The error came from closing the connection
                 
             attempt += 1
             
@@ -164,6 +241,88 @@ class OpenAICompatibleAdapter(AgentInterface):
             max_retries
         )
     
+    def _read_stream(
+        self,
+        response: Iterable[bytes],
+        mode: str,
+        stop_markers: Tuple[str, ...] = (),
+        cancel: Optional[threading.Event] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Consume an SSE chat completion stream.
+
+        Returns the generated text and timing stats. Reading stops at
+        `data: [DONE]` or as soon as one of stop_markers has been generated;
+        the connection is then closed so the server stops generating.
+        Setting `cancel` closes the connection and raises AgentCancelledError.
+        """
+        start = time.time()
+        ttft_ms = None
+        last_progress = start
+        text = ""
+        chunks = 0
+        completion_tokens = None
+        stopped_early = False
+
+        for raw_line in response:
+            if cancel is not None and cancel.is_set():
+                if hasattr(response, "close"):
+                    response.close()
+                raise AgentCancelledError(self.NAME)
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if not line.startswith("data:"):
+                continue  # Blank separators, comments and event: lines
+            data = line[5:].strip()
+            if data == "[DONE]":
+                for _ in response:
+                    pass  # Drain the chunk terminator so the connection can be reused
+                break
+
+            event = json.loads(data)
+            if event.get("error"):
+                raise AgentExecutionError(f"Stream error: {event['error']}", self.NAME)
+            if event.get("usage"):
+                completion_tokens = event["usage"].get("completion_tokens", completion_tokens)
+            choices = event.get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if not delta:
+                continue
+
+            now = time.time()
+            if ttft_ms is None:
+                ttft_ms = (now - start) * 1000
+            chunks += 1
+            text += delta
+
+            if now - last_progress >= STREAM_PROGRESS_INTERVAL:
+                last_progress = now
+                logger.info(f"  ⏳ {mode}: {chunks} tokens so far ({len(text)} characters)")
+
+            # Only the tail can contain a marker that was just completed
+            search_from = max(0, len(text) - len(delta) - max((len(m) for m in stop_markers), default=0))
+            cut = None
+            for marker in stop_markers:
+                i = text.find(marker, search_from)
+                if i != -1 and (cut is None or i + len(marker) < cut):
+                    cut = i + len(marker)
+            if cut is not None:
+                text = text[:cut]
+                stopped_early = True
+                break
+
+        if stopped_early and hasattr(response, "close"):
+            response.close()
+
+        duration = time.time() - start
+        tokens = completion_tokens or chunks
+        generation_time = duration - (ttft_ms or 0) / 1000
+        return text, {
+            "ttft_ms": round(ttft_ms if ttft_ms is not None else duration * 1000, 2),
+            "tokens": tokens,
+            "duration_ms": round(duration * 1000, 2),
+            "tokens_per_sec": round(tokens / generation_time, 1) if generation_time > 0 else 0.0,
+            "stopped_early": stopped_early
+        }
+
     def _fetch_models_from_api(self) -> List[str]:
         """Fetch models from API endpoint with proper error handling."""
         import urllib.request
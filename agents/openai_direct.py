@@ -8,7 +8,8 @@ import json
 import logging
 from typing import Optional, List, Dict, Any
 from .base import AgentInterface
-from .exceptions import AgentExecutionError, AgentAuthenticationError
+from .exceptions import AgentExecutionError, AgentAuthenticationError, AgentCancelledError
+from .http_pool import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,8 @@ class OpenAIDirectAdapter(AgentInterface):
         self.max_retries = agent_config.get("max_retries", 3)
         self.retry_delay = agent_config.get("retry_delay", 5)
         self.api_base = "https://api.openai.com/v1"
+        # Shared keep-alive pool, reused by every worker thread
+        self._http = get_http_client(agent_config.get("http_pool_size"), agent_config.get("http2", False))
     
     def _build_request(self, prompt: str, mode: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Build API request payload."""
@@ -37,7 +40,7 @@ class OpenAIDirectAdapter(AgentInterface):
             "model": options.get("model", self.model) if options else self.model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": options.get("temperature", 0.7) if options else 0.7,
-            "max_tokens": options.get("max_tokens", 4096) if options else 4096
+            "max_tokens": (options or {}).get("max_tokens") or 4096  # The prompt packer's output budget, when enabled
         }
     
     def execute(
@@ -50,7 +53,6 @@ class OpenAIDirectAdapter(AgentInterface):
         options: Optional[Dict[str, Any]] = None
     ) -> str:
         """Execute agent via OpenAI API."""
-        import urllib.request
         import urllib.error
         
         request_data = self._build_request(prompt, mode, options)
@@ -62,19 +64,22 @@ class OpenAIDirectAdapter(AgentInterface):
             "Authorization": f"Bearer {self.api_key}"
         }
         
+        cancel = (options or {}).get("cancel")
         attempt = 0
         while attempt < max_retries:
+            if cancel is not None and cancel.is_set():
+                raise AgentCancelledError(self.NAME)
             try:
                 logger.info(f"Calling {self.NAME} for {mode}... (Attempt {attempt + 1}/{max_retries})")
                 
-                req = urllib.request.Request(
+                with self._http.request(
+                    "POST",
                     f"{self.api_base}/chat/completions",
-                    data=json.dumps(request_data).encode('utf-8'),
+                    body=json.dumps(request_data).encode('utf-8'),
                     headers=headers,
-                    method='POST'
-                )
-                
-                with urllib.request.urlopen(req, timeout=120) as response:
+                    timeout=120,
+                    cancel=cancel
+                ) as response:
                     result = json.loads(response.read().decode('utf-8'))
                     return result["choices"][0]["message"]["content"]
                 
@@ -92,6 +97,8 @@ class OpenAIDirectAdapter(AgentInterface):
                     logger.warning(f"HTTP error: {e.code}")
                     attempt += 1
             except Exception as e:
+                if cancel is not None and cancel.is_set():
+                    raise AgentCancelledError(self.NAME)
                 logger.warning(f"Request failed: {str(e)}")
                 attempt += 1
             
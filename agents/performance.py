@@ -2,12 +2,97 @@
 Performance monitoring for PPTPlaner agent system.
 
 Provides metrics collection and reporting for agent execution.
+
+Call latencies go into log-bucketed histograms (overall, per agent and
+per agent/mode/model) that give p50/p90/p99 within a few percent, so
+memory and summary cost depend on the number of buckets, not calls.
+Only the most recent calls are kept individually, in a ring buffer.
 """
+import math
 import time
 import threading
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
+
+RECENT_CALLS_SIZE = 500  # Calls kept individually for get_recent_calls
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """Streaming latency histogram with logarithmic buckets.
+
+    Bucket i covers [growth**i, growth**(i+1)) ms; with the default growth
+    of 2**(1/8) a percentile is off by at most ~9% of its value. Count,
+    sum, min and max are exact.
+    """
+    
+    def __init__(self, growth: float = 2 ** (1 / 8)):
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    def record(self, value_ms: float):
+        value_ms = max(0.0, value_ms)
+        index = math.floor(math.log(value_ms) / self._log_growth) if value_ms >= 1 else 0
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def percentile(self, p: float) -> float:
+        """Approximate p-th percentile: geometric middle of its bucket, clamped to min/max."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, max(self.min, self.growth ** (index + 0.5)))
+        return self.max
+    
+    def cumulative_counts(self, bounds_ms: List[float]) -> List[int]:
+        """Approximate number of values <= each bound (buckets placed at their middle)."""
+        counts = []
+        for bound in bounds_ms:
+            counts.append(sum(n for index, n in self.buckets.items() if self.growth ** (index + 0.5) <= bound))
+        return counts
+    
+    def merge(self, other: "LatencyHistogram"):
+        """Add another histogram's values (same growth) into this one."""
+        for index, n in other.buckets.items():
+            self.buckets[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def copy(self) -> "LatencyHistogram":
+        other = LatencyHistogram(self.growth)
+        other.buckets.update(self.buckets)
+        other.count, other.total, other.min, other.max = self.count, self.total, self.min, self.max
+        return other
+    
+    def to_dict(self) -> Dict[str, float]:
+        stats = {
+            "count": self.count,
+            "avg_ms": round(self.mean, 2),
+            "min_ms": round(self.min, 2) if self.count else 0.0,
+            "max_ms": round(self.max, 2)
+        }
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = round(self.percentile(p), 2)
+        return stats
 
 
 @dataclass
@@ -59,9 +144,30 @@ class PerformanceMonitor:
         if self._initialized:
             return
         self._initialized = True
-        self._metrics: List[AgentCallMetrics] = []
+        self._recent: deque = deque(maxlen=RECENT_CALLS_SIZE)
+        self._successful = 0
+        self._latency = LatencyHistogram()
+        self._agent_latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._agent_successes: Dict[str, int] = defaultdict(int)
+        self._mode_latency: Dict[Tuple[str, str, Optional[str]], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._mode_successes: Dict[Tuple[str, str, Optional[str]], int] = defaultdict(int)
+        self._retries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._steps: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._step_failures: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._tokens: Dict[str, Dict[str, int]] = defaultdict(lambda: {"prompt": 0, "completion": 0})
+        self._reworks: Dict[str, int] = defaultdict(int)
+        self._parses: Dict[str, Dict[str, int]] = defaultdict(lambda: {"parsed": 0, "failed": 0})
         self._metrics_lock = threading.Lock()
         self._start_time = time.time()
+        self._cache_hits: Dict[str, int] = defaultdict(int)
+        self._cache_misses: Dict[str, int] = defaultdict(int)
+        self._concurrency: Dict[str, Dict[str, Any]] = {}
+        self._streams: Dict[str, float] = defaultdict(float)  # Running totals
+        self._hedges: Dict[str, Dict[str, float]] = {}  # Running totals per mode
+        self._rate_waits: Dict[str, Dict[str, float]] = {}
+        self._breakers: Dict[str, Dict[str, Any]] = {}
     
     def record_call(
         self,
@@ -88,38 +194,325 @@ class PerformanceMonitor:
         )
         
         with self._metrics_lock:
-            self._metrics.append(metrics)
+            self._recent.append(metrics)
+            self._latency.record(duration_ms)
+            self._agent_latency[agent_name].record(duration_ms)
+            self._mode_latency[(agent_name, mode, model)].record(duration_ms)
+            if retry_count:
+                self._retries[(agent_name, mode)] += 1
+            if success:
+                self._successful += 1
+                self._agent_successes[agent_name] += 1
+                self._mode_successes[(agent_name, mode, model)] += 1
+            else:
+                self._errors[(agent_name, error_category or "unknown")] += 1
+    
+    def record_pipeline_step(self, pipeline: str, step: str, duration_ms: float, success: bool = True):
+        """Record one step of a non-agent pipeline (e.g. video TTS / image / clip)."""
+        with self._metrics_lock:
+            self._steps[(pipeline, step)].record(duration_ms)
+            if not success:
+                self._step_failures[(pipeline, step)] += 1
+    
+    def record_tokens(self, mode: str, prompt_tokens: int, completion_tokens: int):
+        """Record (estimated) prompt/completion tokens of a successful call."""
+        with self._metrics_lock:
+            self._tokens[mode]["prompt"] += prompt_tokens
+            self._tokens[mode]["completion"] += completion_tokens
+    
+    def record_rework(self, mode: str):
+        """Record a call that carries rework feedback from a failed validation."""
+        with self._metrics_lock:
+            self._reworks[mode] += 1
+    
+    def record_parse(self, mode: str, success: bool):
+        """Record whether a mode's JSON output could be parsed."""
+        with self._metrics_lock:
+            self._parses[mode]["parsed" if success else "failed"] += 1
+
+    def get_parse_stats(self) -> Dict[str, Any]:
+        """Get parsed/failed JSON outputs per mode."""
+        with self._metrics_lock:
+            return self._parse_stats_locked()
+
+    def _parse_stats_locked(self) -> Dict[str, Any]:
+        return {mode: dict(counts) for mode, counts in sorted(self._parses.items())}
+
+    def get_token_stats(self) -> Dict[str, Any]:
+        """Get estimated tokens and rework calls per mode."""
+        with self._metrics_lock:
+            return self._token_stats_locked()
+    
+    def _token_stats_locked(self) -> Dict[str, Any]:
+        return {
+            mode: {**self._tokens.get(mode, {"prompt": 0, "completion": 0}), "reworks": self._reworks.get(mode, 0)}
+            for mode in sorted(set(self._tokens) | set(self._reworks))
+        }
+    
+    def set_gauge(self, name: str, value: float, **labels: str):
+        """Set a point-in-time value such as queue depth or active workers."""
+        with self._metrics_lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the raw counters and histograms, for metric exporters."""
+        with self._metrics_lock:
+            return {
+                "calls": {
+                    key: {"latency": histogram.copy(), "successes": self._mode_successes[key]}
+                    for key, histogram in self._mode_latency.items()
+                },
+                "retries": dict(self._retries),
+                "errors": dict(self._errors),
+                "cache_hits": dict(self._cache_hits),
+                "cache_misses": dict(self._cache_misses),
+                "concurrency": {backend: state["limit"] for backend, state in self._concurrency.items()},
+                "breakers": {backend: dict(entry, history=None) for backend, entry in self._breakers.items()},
+                "rate_limits": self._rate_limit_stats_locked(),
+                "steps": {
+                    key: {"latency": histogram.copy(), "failures": self._step_failures[key]}
+                    for key, histogram in self._steps.items()
+                },
+                "gauges": dict(self._gauges),
+                "tokens": {mode: dict(counts) for mode, counts in self._tokens.items()},
+                "reworks": dict(self._reworks),
+                "parses": self._parse_stats_locked(),
+                "uptime_seconds": time.time() - self._start_time
+            }
+    
+    def record_cache_hit(self, mode: str):
+        """Record a response served from the response cache."""
+        with self._metrics_lock:
+            self._cache_hits[mode] += 1
+    
+    def record_cache_miss(self, mode: str):
+        """Record a response cache lookup that fell through to the agent."""
+        with self._metrics_lock:
+            self._cache_misses[mode] += 1
+    
+    def record_concurrency_limit(self, backend: str, limit: int, reason: str):
+        """Record a concurrency limit change for a backend."""
+        with self._metrics_lock:
+            state = self._concurrency.setdefault(backend, {
+                "limit": limit, "min_seen": limit, "max_seen": limit,
+                "changes": 0, "history": deque(maxlen=200)
+            })
+            if reason != "initial":
+                state["changes"] += 1
+            state["limit"] = limit
+            state["min_seen"] = min(state["min_seen"], limit)
+            state["max_seen"] = max(state["max_seen"], limit)
+            state["history"].append({"timestamp": time.time(), "limit": limit, "reason": reason})
+    
+    def record_stream(
+        self,
+        agent_name: str,
+        mode: str,
+        ttft_ms: float,
+        tokens: int,
+        duration_ms: float,
+        tokens_per_sec: float,
+        stopped_early: bool = False
+    ):
+        """Record time-to-first-token and throughput of a streamed call."""
+        with self._metrics_lock:
+            self._streams["calls"] += 1
+            self._streams["ttft_ms"] += ttft_ms
+            self._streams["max_ttft_ms"] = max(self._streams["max_ttft_ms"], ttft_ms)
+            self._streams["tokens_per_sec"] += tokens_per_sec
+            self._streams["tokens"] += tokens
+            self._streams["early_stops"] += int(stopped_early)
+    
+    def record_rate_limit_wait(self, backend: str, wait_ms: float):
+        """Record time a call spent waiting for its backend's rate limit."""
+        with self._metrics_lock:
+            state = self._rate_waits.setdefault(backend, {"calls": 0, "waits": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0})
+            state["calls"] += 1
+            if wait_ms > 0:
+                state["waits"] += 1
+                state["total_wait_ms"] += wait_ms
+                state["max_wait_ms"] = max(state["max_wait_ms"], wait_ms)
+    
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Get rate-limit wait counts and times per backend."""
+        with self._metrics_lock:
+            return self._rate_limit_stats_locked()
+    
+    def _rate_limit_stats_locked(self) -> Dict[str, Any]:
+        return {
+            backend: {
+                "calls": state["calls"],
+                "waits": state["waits"],
+                "total_wait_ms": round(state["total_wait_ms"], 2),
+                "max_wait_ms": round(state["max_wait_ms"], 2)
+            }
+            for backend, state in self._rate_waits.items()
+        }
+    
+    def record_breaker_transition(self, backend: str, previous: str, state: str, reason: str = ""):
+        """Record a circuit breaker state change for a backend."""
+        with self._metrics_lock:
+            entry = self._breaker_entry_locked(backend, previous)
+            entry["state"] = state
+            if state == "open":
+                entry["opens"] += 1
+            entry["history"].append({"timestamp": time.time(), "from": previous, "to": state, "reason": reason})
+    
+    def record_breaker_rejection(self, backend: str):
+        """Record a call the breaker failed fast without sending it."""
+        with self._metrics_lock:
+            self._breaker_entry_locked(backend, "open")["rejections"] += 1
+    
+    def _breaker_entry_locked(self, backend: str, state: str) -> Dict[str, Any]:
+        return self._breakers.setdefault(backend, {"state": state, "opens": 0, "rejections": 0, "history": deque(maxlen=200)})
+    
+    def get_breaker_stats(self) -> Dict[str, Any]:
+        """Get current breaker state, open count, rejected calls and transitions per backend."""
+        with self._metrics_lock:
+            return {
+                backend: {**stats, "history": list(self._breakers[backend]["history"])}
+                for backend, stats in self._breaker_stats_locked().items()
+            }
+    
+    def _breaker_stats_locked(self) -> Dict[str, Any]:
+        return {
+            backend: {
+                "state": entry["state"], "opens": entry["opens"],
+                "rejections": entry["rejections"], "transitions": len(entry["history"])
+            }
+            for backend, entry in self._breakers.items()
+        }
+    
+    def record_hedge(
+        self,
+        mode: str,
+        candidates: int,
+        wall_ms: float,
+        sequential_ms: float,
+        won: bool,
+        cancelled: int = 0
+    ):
+        """Record one round of hedged candidate generation.
+
+        sequential_ms is what the sequential rework loop would have spent to
+        reach the same result (every candidate up to the winner, one by one).
+        """
+        with self._metrics_lock:
+            totals = self._hedges.setdefault(mode, {
+                "rounds": 0, "wins": 0, "candidates": 0, "cancelled": 0, "wall_ms": 0.0, "sequential_ms": 0.0
+            })
+            totals["rounds"] += 1
+            totals["wins"] += 1 if won else 0
+            totals["candidates"] += candidates
+            totals["cancelled"] += cancelled
+            totals["wall_ms"] += wall_ms
+            totals["sequential_ms"] += sequential_ms
+    
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """Get hedged-generation wall time versus the sequential equivalent, per mode."""
+        with self._metrics_lock:
+            return self._hedge_stats_locked()
+    
+    def _hedge_stats_locked(self) -> Dict[str, Any]:
+        return {
+            mode: {
+                "rounds": totals["rounds"],
+                "wins": totals["wins"],
+                "candidates": totals["candidates"],
+                "cancelled": totals["cancelled"],
+                "wall_ms": round(totals["wall_ms"], 2),
+                "sequential_ms": round(totals["sequential_ms"], 2),
+                "speedup": round(totals["sequential_ms"] / totals["wall_ms"], 2) if totals["wall_ms"] else 0.0
+            }
+            for mode, totals in self._hedges.items()
+        }
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Get TTFT, tokens/sec and early-stop counts for streamed calls."""
+        with self._metrics_lock:
+            return self._stream_stats_locked()
+    
+    def _stream_stats_locked(self) -> Dict[str, Any]:
+        count = int(self._streams["calls"])
+        if not count:
+            return {}
+        return {
+            "calls": count,
+            "avg_ttft_ms": round(self._streams["ttft_ms"] / count, 2),
+            "max_ttft_ms": round(self._streams["max_ttft_ms"], 2),
+            "avg_tokens_per_sec": round(self._streams["tokens_per_sec"] / count, 1),
+            "tokens": int(self._streams["tokens"]),
+            "early_stops": int(self._streams["early_stops"])
+        }
+    
+    def get_concurrency_stats(self) -> Dict[str, Any]:
+        """Get current concurrency limit and change history per backend."""
+        with self._metrics_lock:
+            return {
+                backend: {
+                    "limit": state["limit"],
+                    "min_seen": state["min_seen"],
+                    "max_seen": state["max_seen"],
+                    "changes": state["changes"],
+                    "history": list(state["history"])
+                }
+                for backend, state in self._concurrency.items()
+            }
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss counters."""
+        with self._metrics_lock:
+            return self._cache_stats_locked()
+    
+    def _cache_stats_locked(self) -> Dict[str, Any]:
+        hits = sum(self._cache_hits.values())
+        misses = sum(self._cache_misses.values())
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0,
+            "by_mode": {
+                mode: {"hits": self._cache_hits.get(mode, 0), "misses": self._cache_misses.get(mode, 0)}
+                for mode in sorted(set(self._cache_hits) | set(self._cache_misses))
+            }
+        }
+    
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Get latency percentiles per agent/mode/model ("agent/mode/model" keys)."""
+        with self._metrics_lock:
+            return self._latency_stats_locked()
+    
+    def _latency_stats_locked(self) -> Dict[str, Any]:
+        return {
+            f"{agent}/{mode}/{model or 'default'}": histogram.to_dict()
+            for (agent, mode, model), histogram in sorted(
+                self._mode_latency.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or "")
+            )
+        }
     
     def get_summary(self) -> Dict[str, Any]:
-        """Get performance summary."""
+        """Get performance summary (cost grows with histogram buckets, not calls)."""
         with self._metrics_lock:
-            if not self._metrics:
+            if not self._latency.count:
+                if self._cache_hits:
+                    return {"status": "no_data", "cache": self._cache_stats_locked()}
                 return {"status": "no_data"}
             
-            total_calls = len(self._metrics)
-            successful = sum(1 for m in self._metrics if m.success)
+            total_calls = self._latency.count
+            successful = self._successful
             failed = total_calls - successful
-            
-            durations = [m.duration_ms for m in self._metrics]
-            avg_duration = sum(durations) / len(durations)
-            max_duration = max(durations)
-            min_duration = min(durations)
-            
-            # Group by agent
-            by_agent = defaultdict(list)
-            for m in self._metrics:
-                by_agent[m.agent_name].append(m)
+            overall = self._latency.to_dict()
             
             agent_stats = {}
-            for agent, calls in by_agent.items():
-                agent_durations = [c.duration_ms for c in calls]
+            for agent, histogram in self._agent_latency.items():
+                stats = histogram.to_dict()
                 agent_stats[agent] = {
-                    "calls": len(calls),
-                    "avg_ms": round(sum(agent_durations) / len(agent_durations), 2),
-                    "max_ms": round(max(agent_durations), 2),
-                    "success_rate": round(
-                        sum(1 for c in calls if c.success) / len(calls) * 100, 1
-                    )
+                    "calls": histogram.count,
+                    "avg_ms": stats["avg_ms"],
+                    "max_ms": stats["max_ms"],
+                    **{f"p{p}_ms": stats[f"p{p}_ms"] for p in PERCENTILES},
+                    "success_rate": round(self._agent_successes[agent] / histogram.count * 100, 1)
                 }
             
             return {
@@ -127,23 +520,57 @@ class PerformanceMonitor:
                 "successful": successful,
                 "failed": failed,
                 "success_rate": round(successful / total_calls * 100, 1),
-                "avg_duration_ms": round(avg_duration, 2),
-                "max_duration_ms": round(max_duration, 2),
-                "min_duration_ms": round(min_duration, 2),
+                "avg_duration_ms": overall["avg_ms"],
+                "max_duration_ms": overall["max_ms"],
+                "min_duration_ms": overall["min_ms"],
+                **{f"p{p}_duration_ms": overall[f"p{p}_ms"] for p in PERCENTILES},
                 "uptime_seconds": round(time.time() - self._start_time, 1),
-                "agents": agent_stats
+                "agents": agent_stats,
+                "latency": self._latency_stats_locked(),
+                "cache": self._cache_stats_locked(),
+                "concurrency": {
+                    backend: {k: state[k] for k in ("limit", "min_seen", "max_seen", "changes")}
+                    for backend, state in self._concurrency.items()
+                },
+                "streaming": self._stream_stats_locked(),
+                "hedging": self._hedge_stats_locked(),
+                "rate_limits": self._rate_limit_stats_locked(),
+                "circuit_breakers": self._breaker_stats_locked(),
+                "tokens": self._token_stats_locked(),
+                "parsing": self._parse_stats_locked()
             }
     
     def get_recent_calls(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get most recent agent calls."""
+        """Get most recent agent calls (up to RECENT_CALLS_SIZE are kept)."""
         with self._metrics_lock:
-            recent = self._metrics[-limit:]
+            recent = list(self._recent)[-limit:] if limit > 0 else []
             return [m.to_dict() for m in reversed(recent)]
     
     def reset(self):
         """Reset all metrics."""
         with self._metrics_lock:
-            self._metrics.clear()
+            self._recent.clear()
+            self._successful = 0
+            self._latency = LatencyHistogram()
+            self._agent_latency.clear()
+            self._agent_successes.clear()
+            self._mode_latency.clear()
+            self._mode_successes.clear()
+            self._retries.clear()
+            self._errors.clear()
+            self._steps.clear()
+            self._step_failures.clear()
+            self._gauges.clear()
+            self._cache_hits.clear()
+            self._cache_misses.clear()
+            self._concurrency.clear()
+            self._streams.clear()
+            self._hedges.clear()
+            self._rate_waits.clear()
+            self._breakers.clear()
+            self._tokens.clear()
+            self._reworks.clear()
+            self._parses.clear()
             self._start_time = time.time()
     
     def print_report(self):
@@ -154,8 +581,11 @@ class PerformanceMonitor:
         print("📊 PPTPlaner 效能報告")
         print("="*60)
         
+        cache = summary.get("cache")
         if summary.get("status") == "no_data":
             print("  沒有效能數據")
+            if cache:
+                print(f"  快取命中: {cache['hits']} (全部由快取回應)")
             return
         
         print(f"\n📈 總覽")
@@ -165,6 +595,7 @@ class PerformanceMonitor:
         print(f"  平均延遲: {summary['avg_duration_ms']}ms")
         print(f"  最大延遲: {summary['max_duration_ms']}ms")
         print(f"  最小延遲: {summary['min_duration_ms']}ms")
+        print(f"  延遲百分位: p50 {summary['p50_duration_ms']}ms / p90 {summary['p90_duration_ms']}ms / p99 {summary['p99_duration_ms']}ms")
         
         if "agents" in summary:
             print(f"\n🤖 Agent 效能")
@@ -172,8 +603,67 @@ class PerformanceMonitor:
                 print(f"\n  {agent}:")
                 print(f"    呼叫數: {stats['calls']}")
                 print(f"    平均延遲: {stats['avg_ms']}ms")
+                print(f"    延遲百分位: p50 {stats['p50_ms']}ms / p90 {stats['p90_ms']}ms / p99 {stats['p99_ms']}ms")
                 print(f"    成功率: {stats['success_rate']}%")
         
+        if summary.get("latency"):
+            print(f"\n⏱️ 各模式延遲 (agent/mode/model)")
+            for key, stats in summary["latency"].items():
+                print(f"  {key}: {stats['count']} 次, p50 {stats['p50_ms']}ms / p90 {stats['p90_ms']}ms / p99 {stats['p99_ms']}ms")
+        
+        if summary.get("concurrency"):
+            print(f"\n⚙️ 並行度控制")
+            for backend, stats in summary["concurrency"].items():
+                print(f"\n  {backend}:")
+                print(f"    目前並行數: {stats['limit']} (範圍 {stats['min_seen']}-{stats['max_seen']})")
+                print(f"    調整次數: {stats['changes']}")
+        
+        stream = summary.get("streaming")
+        if stream:
+            print(f"\n🌊 串流回應")
+            print(f"  串流呼叫數: {stream['calls']}")
+            print(f"  平均首 token 延遲: {stream['avg_ttft_ms']}ms (最大 {stream['max_ttft_ms']}ms)")
+            print(f"  平均生成速度: {stream['avg_tokens_per_sec']} tokens/s")
+            print(f"  提前終止: {stream['early_stops']}")
+        
+        if summary.get("rate_limits"):
+            print(f"\n🚦 速率限制")
+            for backend, stats in summary["rate_limits"].items():
+                print(f"\n  {backend}:")
+                print(f"    等待次數: {stats['waits']}/{stats['calls']}")
+                print(f"    總等待時間: {stats['total_wait_ms']}ms (最長 {stats['max_wait_ms']}ms)")
+        
+        if summary.get("circuit_breakers"):
+            print(f"\n🔌 斷路器")
+            for backend, stats in summary["circuit_breakers"].items():
+                print(f"\n  {backend}:")
+                print(f"    目前狀態: {stats['state']}")
+                print(f"    開路次數: {stats['opens']} (狀態轉換 {stats['transitions']} 次)")
+                print(f"    快速失敗（未送出）的呼叫: {stats['rejections']}")
+        
+        if summary.get("hedging"):
+            print(f"\n🏁 多候選並行生成")
+            for mode, stats in summary["hedging"].items():
+                print(f"\n  {mode}:")
+                print(f"    回合數: {stats['rounds']} (通過 {stats['wins']}，取消 {stats['cancelled']}/{stats['candidates']} 個候選)")
+                print(f"    實際耗時: {stats['wall_ms']}ms，逐一生成估計: {stats['sequential_ms']}ms (加速 {stats['speedup']}x)")
+        
+        if summary.get("tokens"):
+            print(f"\n🔤 Token 用量 (估算) 與重做次數")
+            for mode, stats in summary["tokens"].items():
+                print(f"  {mode}: 輸入 {stats['prompt']} / 輸出 {stats['completion']} tokens, 重做 {stats['reworks']} 次")
+        
+        if summary.get("parsing"):
+            print(f"\n🧩 JSON 解析")
+            for mode, stats in summary["parsing"].items():
+                print(f"  {mode}: 成功 {stats['parsed']} / 失敗 {stats['failed']}")
+        
+        if cache and (cache["hits"] or cache["misses"]):
+            print(f"\n💾 回應快取")
+            print(f"  命中: {cache['hits']}")
+            print(f"  未命中: {cache['misses']}")
+            print(f"  命中率: {cache['hit_rate']}%")
+        
         print("\n" + "="*60)
 
 
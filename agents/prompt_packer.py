@@ -0,0 +1,322 @@
+"""
+Context-window-aware prompt packing for PPTPlaner agent calls.
+
+run_agent assembles a prompt from the preamble, the mode's instructions,
+inlined files, the full slide deck and the rework history. On small-context
+local models (8k is common for Ollama / llama.cpp) that silently overflows.
+The packer counts tokens per section, reserves the mode's output budget and,
+if the prompt does not fit, trims the lower-priority sections in order:
+
+1. old rework feedback (the latest round is kept)
+2. distant slides (furthest from the current page first; headings are kept)
+3. source text (passages / paragraphs from the end; the opening is kept)
+
+The context window comes from config overrides, then the known cloud
+models, then the local server itself (Ollama num_ctx, llama.cpp n_ctx via
+ModelDetector). When it is still unknown the prompt is sent untrimmed.
+
+Tokens are counted with tiktoken when it is installed, otherwise with the
+rate limiter's CJK-aware estimate.
+
+Usage:
+    packer = PromptPacker.from_config(cfg.get("prompt_budget"))
+    packed = packer.pack(sections, agent="ollama", model="qwen2.5:7b", mode="MEMO", page="03",
+                         api_base="http://localhost:11434/v1")
+    prompt = "\n".join(packed.parts)
+    options["max_tokens"] = packed.output_tokens
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .rate_limit import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Patterns are matched against the model name first, then the agent name.
+# Local servers run with the context they were started with (Ollama's
+# num_ctx, llama.cpp's -c), not the model's maximum, so those are asked for.
+DEFAULT_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gemini*": 1_000_000,
+    "antigravity": 1_000_000,
+    "claude*": 200_000,
+    "gpt-4.1*": 1_000_000,
+    "gpt-4o*": 128_000,
+    "openai": 128_000,
+    "codex": 200_000,
+}
+
+# Output tokens reserved (and sent as max_tokens) per mode
+DEFAULT_OUTPUT_TOKENS: Dict[str, int] = {
+    "ANALYZE_SOURCE_DOCUMENT": 2048,
+    "PLAN": 2048,
+    "DECK": 8192,
+    "DECK_SLIDE": 1536,
+    "MEMO": 3072,
+    "CREATE_*_SVG": 4096,
+    "VALIDATE_*": 768,
+}
+DEFAULT_OUTPUT = 4096
+
+DEFAULT_SAFETY_MARGIN = 256  # Chat template and tokenizer mismatch
+
+# Section kinds in the order they are trimmed; "fixed" sections are never touched
+TRIM_ORDER = ("feedback", "slides", "source")
+
+# run_agent variables (glob patterns) and the kind of section they become
+SECTION_KINDS: Dict[str, str] = {
+    "rework_feedback": "feedback",
+    "full_slides_content": "slides",
+    "source_*": "source",
+}
+
+_FEEDBACK_ROUND = re.compile(r"\n\n(?=Attempt \d+)")
+_SLIDE_HEADING = re.compile(r"(?m)^(?=### )")
+_SLIDE_PAGE = re.compile(r"### (\d+)")
+_PASSAGE_BREAK = re.compile(r"\n\n(?:\[\.\.\.\]\n\n)?")
+
+_tiktoken_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken (cl100k_base) if installed, else estimate_tokens()."""
+    global _tiktoken_encoding
+    if not text:
+        return 0
+    if _tiktoken_encoding is None:
+        try:
+            import tiktoken
+            _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # ImportError, or no cached encoding offline
+            _tiktoken_encoding = False
+    if _tiktoken_encoding:
+        return len(_tiktoken_encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _lookup(table: Dict[str, int], *names: Optional[str]) -> Optional[int]:
+    """First value whose key equals or glob-matches one of names (tried in order)."""
+    for name in names:
+        if not name:
+            continue
+        if name in table:
+            return table[name]
+        for pattern, value in table.items():
+            if fnmatchcase(name.lower(), pattern.lower()):
+                return value
+    return None
+
+
+def section_kind(key: str) -> str:
+    """Trim kind for a run_agent variable; 'fixed' if it must be kept whole."""
+    for pattern, kind in SECTION_KINDS.items():
+        if fnmatchcase(key, pattern):
+            return kind
+    return "fixed"
+
+
+def output_budget(mode: str, overrides: Optional[Dict[str, int]] = None) -> int:
+    """Output tokens to reserve (and request as max_tokens) for a mode."""
+    return _lookup({**DEFAULT_OUTPUT_TOKENS, **(overrides or {})}, mode) or DEFAULT_OUTPUT
+
+
+@dataclass
+class Section:
+    """One part of the prompt; kind is 'fixed', 'feedback', 'slides' or 'source'."""
+    name: str
+    text: str
+    kind: str = "fixed"
+    tokens: int = 0
+
+
+@dataclass
+class PackedPrompt:
+    """Packed prompt parts plus the token accounting behind them."""
+    parts: List[str]
+    tokens: Dict[str, int]
+    trimmed: Dict[str, int] = field(default_factory=dict)  # Section name -> tokens removed
+    context_window: Optional[int] = None  # None: unknown, nothing was trimmed
+    output_tokens: int = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.tokens.values())
+
+    @property
+    def fits(self) -> bool:
+        return self.context_window is None or self.total + self.output_tokens <= self.context_window
+
+
+class PromptPacker:
+    """
+    Fits prompt sections into a model's context window.
+
+    Sections are only rewritten when the prompt does not fit, so prompts
+    (and their cache keys) are unchanged for large-context models.
+    """
+
+    def __init__(
+        self,
+        context_windows: Optional[Dict[str, int]] = None,
+        output_tokens: Optional[Dict[str, int]] = None,
+        local_context: Optional[int] = None,
+        safety_margin: int = DEFAULT_SAFETY_MARGIN,
+        detect: Optional[Callable[[str, Optional[str]], Optional[int]]] = None
+    ):
+        self.context_windows = {**DEFAULT_CONTEXT_WINDOWS, **(context_windows or {})}
+        self.output_tokens = output_tokens or {}
+        self.local_context = local_context  # Fallback when the window is unknown; None = don't trim
+        self.safety_margin = safety_margin
+        self.detect = detect  # (api_base, model) -> context window reported by the server
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "PromptPacker":
+        """Create from the 'prompt_budget' section of config.yaml."""
+        config = config or {}
+        detect = None
+        if config.get("detect", True):
+            from .model_detector import default_detector
+            detect = default_detector.detect_context_window
+        return cls(
+            context_windows=config.get("context_windows"),
+            output_tokens=config.get("output_tokens"),
+            local_context=config.get("local_context"),
+            safety_margin=config.get("safety_margin", DEFAULT_SAFETY_MARGIN),
+            detect=detect
+        )
+
+    def context_window(self, agent: str, model: Optional[str] = None, api_base: Optional[str] = None) -> Optional[int]:
+        """Context window for a model: configured or known, else reported by its server, else local_context."""
+        window = _lookup(self.context_windows, model, agent)
+        if window is None and api_base and self.detect:
+            window = self.detect(api_base, model)
+        return window or self.local_context
+
+    def pack(
+        self,
+        sections: List[Section],
+        agent: str,
+        model: Optional[str] = None,
+        mode: str = "",
+        page: Optional[str] = None,
+        api_base: Optional[str] = None
+    ) -> PackedPrompt:
+        """Count each section's tokens and trim low-priority ones until the prompt fits.
+
+        If the context window is unknown, nothing is trimmed.
+        """
+        window = self.context_window(agent, model, api_base)
+        output = output_budget(mode, self.output_tokens)
+        if window:
+            # Never reserve more than half the window for output
+            output = min(output, window // 2)
+        for section in sections:
+            section.tokens = count_tokens(section.text)
+        original = [section.tokens for section in sections]
+
+        budget = window - output - self.safety_margin if window else 0
+        excess = sum(s.tokens for s in sections) - budget if window else 0
+        for kind in TRIM_ORDER:
+            for section in sections:
+                if excess <= 0:
+                    break
+                if section.kind != kind:
+                    continue
+                section.text = _TRIMMERS[kind](section.text, excess, page)
+                before, section.tokens = section.tokens, count_tokens(section.text)
+                excess -= before - section.tokens
+
+        packed = PackedPrompt(parts=[s.text for s in sections], tokens={}, context_window=window, output_tokens=output)
+        for section, before in zip(sections, original):
+            # Sections may share a name (e.g. the prompt's framing lines); report them together
+            packed.tokens[section.name] = packed.tokens.get(section.name, 0) + section.tokens
+            if section.tokens < before:
+                packed.trimmed[section.name] = packed.trimmed.get(section.name, 0) + before - section.tokens
+        if excess > 0:
+            logger.warning(f"{mode} prompt is {packed.total} tokens, over the {budget} available in a {window}-token context")
+        return packed
+
+
+def _unframe(text: str) -> Tuple[str, str, str]:
+    """Split an inlined "Content for 'x':" block into (opening fence, body, closing fence)."""
+    head, sep, rest = text.partition("```\n")
+    if not sep:
+        return "", text, ""
+    body, end_sep, tail = rest.rpartition("\n```")
+    if not end_sep:
+        return head + sep, rest, ""
+    return head + sep, body, end_sep + tail
+
+
+def _drop_units(units: List[str], order: List[int], excess: int, replace=None) -> Tuple[List[str], int]:
+    """Drop (or replace) units in the given order until excess tokens are saved."""
+    saved = 0
+    for i in order:
+        if saved >= excess:
+            break
+        replacement = replace(units[i]) if replace else ""
+        saved += count_tokens(units[i]) - count_tokens(replacement)
+        units[i] = replacement
+    return units, saved
+
+
+def _trim_feedback(text: str, excess: int, page: Optional[str]) -> str:
+    """Drop the oldest rework rounds ("Attempt N: ..."), keeping the latest one."""
+    rounds = _FEEDBACK_ROUND.split(text)
+    if len(rounds) < 2:
+        return text
+    rounds, _ = _drop_units(rounds, list(range(len(rounds) - 1)), excess)
+    dropped = rounds.count("")
+    if not dropped:
+        return text
+    note = f"[{dropped} earlier feedback round(s) omitted to fit the context window]"
+    return "\n\n".join([note] + [r for r in rounds if r])
+
+
+def _trim_slides(text: str, excess: int, page: Optional[str]) -> str:
+    """Reduce the slides furthest from the current page to their heading lines."""
+    head, body, tail = _unframe(text)
+    blocks = _SLIDE_HEADING.split(body)
+    current = int(page) if page and str(page).isdigit() else None
+
+    def distance(i: int) -> int:
+        match = _SLIDE_PAGE.match(blocks[i])
+        if not match:
+            return -1  # Text before the first heading is kept
+        return abs(int(match.group(1)) - current) if current is not None else len(blocks) - i
+
+    order = sorted((i for i in range(len(blocks)) if distance(i) > 0), key=distance, reverse=True)
+    blocks, _ = _drop_units(blocks, order, excess, replace=_slide_heading)
+    return head + "".join(blocks) + tail
+
+
+def _slide_heading(block: str) -> str:
+    """A slide block reduced to its '### page: topic' line, keeping the spacing after it."""
+    heading = block.split("\n", 1)[0]
+    return heading + (block[len(block.rstrip("\n")):] or "\n")
+
+
+def _trim_source(text: str, excess: int, page: Optional[str]) -> str:
+    """Drop passages/paragraphs from the end, then cut the last one; the opening is kept."""
+    head, body, tail = _unframe(text)
+    units = _PASSAGE_BREAK.split(body)
+    saved, removed = 0, 0
+    while len(units) > 1 and saved < excess:
+        unit = units.pop()
+        saved += count_tokens(unit)
+        removed += 1
+    if saved < excess and units:
+        # One huge paragraph: cut it proportionally
+        keep = max(0, int(len(units[0]) * (1 - (excess - saved) / max(1, count_tokens(units[0])))))
+        saved += count_tokens(units[0][keep:])
+        units[0] = units[0][:keep]
+        removed += 1
+    if not removed:
+        return text
+    note = f"\n\n[... {saved} tokens of source text omitted to fit the context window ...]"
+    return head + "\n\n".join(units) + note + tail
+
+
+_TRIMMERS = {"feedback": _trim_feedback, "slides": _trim_slides, "source": _trim_source}
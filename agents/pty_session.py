@@ -0,0 +1,398 @@
+"""
+Long-lived agy sessions and event-driven terminal reads.
+
+One-shot agy calls pay process startup and auth bootstrap every time, which
+dominates short VALIDATE calls. An AgySessionPool keeps N interactive agy
+processes in pseudo-terminals and feeds them prompts: each prompt is written
+to a file and the session receives one line asking it to follow that file
+and finish with a unique sentinel line, so the reply boundary is known
+without parsing the TUI. The sentinel only counts on a line of its own
+(ANSI codes and carriage returns ignored), so the terminal's echo of the
+request, wrapped or not, never ends the reply; a session that prints
+nothing at all within first_output_timeout is treated as broken.
+
+Reads are event-driven: on POSIX the PTY/pipe fd is waited on with a
+selector; on Windows (winpty has no selectable handle) a reader thread
+blocks on the PTY and hands chunks over a queue. Neither busy-polls.
+
+Sessions are health-checked (process alive, startup banner seen, no
+failed/timed-out request) and recycled after max_calls requests or
+max_age_sec seconds.
+
+Usage:
+    pool = AgySessionPool("agy", size=2)
+    output = pool.run(prompt, timeout=600)
+    pool.close()
+"""
+import codecs
+import logging
+import os
+import queue
+import re
+import selectors
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+FIRST_OUTPUT_TIMEOUT = 30  # Seconds without any output (not even the echo) before a session counts as broken
+
+SENTINEL_INSTRUCTION = (
+    "Read the file {path} and follow the instructions in it exactly. "
+    "When your answer is complete, print the line {sentinel} on its own."
+)
+_ANSI = re.compile(r"\x1b(?:\[[0-9;?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+# End of the echoed request line, however the terminal wrapped it
+_ECHO_END = re.compile(r"on\s+its\s+own\.")
+
+
+def clean_terminal_text(text: str) -> str:
+    """Strip ANSI escape sequences and carriage returns from terminal output."""
+    return _ANSI.sub("", text).replace("\r", "")
+
+
+def split_reply(text: str, sentinel: str, instruction: str) -> Optional[str]:
+    """Return the reply in cleaned terminal output, or None until the sentinel line arrives.
+
+    The reply starts after the echoed request (if the terminal echoed it)
+    and ends at the first line consisting only of the sentinel.
+    """
+    text = clean_terminal_text(text)
+    start = 0
+    echo = _ECHO_END.search(text, 0, len(instruction) * 2)  # The echo comes first
+    if echo:
+        start = echo.end()
+    end = re.compile(rf"(?m)^[ \t]*{re.escape(sentinel)}[ \t]*$").search(text, start)
+    if not end:
+        return None
+    return text[start:end.start()].strip()
+
+
+class SessionError(Exception):
+    """A pooled session failed, timed out or died."""
+
+
+class OutputReader:
+    """Blocking-read interface with a timeout; returns "" on timeout, None on EOF."""
+
+    def read(self, timeout: Optional[float]) -> Optional[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FdReader(OutputReader):
+    """Reads a POSIX fd (PTY master or pipe) using a selector."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(fd, selectors.EVENT_READ)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def read(self, timeout: Optional[float]) -> Optional[str]:
+        if not self._selector.select(timeout):
+            return ""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except OSError:  # EIO on a PTY whose child exited
+            data = b""
+        if not data:
+            return None
+        return self._decoder.decode(data)
+
+    def close(self):
+        self._selector.close()
+
+
+class ThreadReader(OutputReader):
+    """Reads through a blocking read function on a background thread."""
+
+    def __init__(self, read_fn: Callable[[int], object]):
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._thread = threading.Thread(target=self._pump, args=(read_fn,), daemon=True)
+        self._thread.start()
+
+    def _pump(self, read_fn: Callable[[int], object]):
+        try:
+            while True:
+                chunk = read_fn(READ_SIZE)
+                if not chunk:
+                    break
+                self._queue.put(chunk if isinstance(chunk, str) else self._decoder.decode(chunk))
+        except (EOFError, OSError, ValueError):
+            pass
+        self._queue.put(None)
+
+    def read(self, timeout: Optional[float]) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return ""
+
+
+def read_until(
+    reader: OutputReader,
+    timeout: float,
+    done: Optional[Callable[[str], bool]] = None,
+    idle: Optional[float] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    progress_interval: float = 30
+) -> tuple:
+    """Collect output until done(text), EOF, `idle` seconds of silence or timeout.
+
+    Returns (text, reason) with reason in "done", "eof", "idle", "timeout".
+    """
+    text = ""
+    start = time.monotonic()
+    last_data = start
+    last_progress = start
+    while True:
+        now = time.monotonic()
+        remaining = timeout - (now - start)
+        if remaining <= 0:
+            return text, "timeout"
+        wait = remaining
+        if idle is not None:
+            wait = min(wait, max(0.0, idle - (now - last_data)))
+        if on_progress:
+            wait = min(wait, progress_interval)
+        chunk = reader.read(wait)
+        now = time.monotonic()
+        if chunk is None:
+            return text, "eof"
+        if chunk:
+            text += chunk
+            last_data = now
+            if done and done(text):
+                return text, "done"
+        elif idle is not None and now - last_data >= idle:
+            return text, "idle"
+        if on_progress and now - last_progress >= progress_interval:
+            on_progress(now - start)
+            last_progress = now
+
+
+class PtyProcessHandle:
+    """A command running in a pseudo-terminal (pty on POSIX, winpty on Windows)."""
+
+    def __init__(self, command: str, cwd: Optional[str] = None):
+        self.command = command
+        if os.name == "nt":
+            from winpty import PtyProcess
+            self._proc = PtyProcess.spawn(command, cwd=cwd)
+            self.reader: OutputReader = ThreadReader(self._proc.read)
+            self._write = self._proc.write
+        else:
+            import pty
+            master, slave = pty.openpty()
+            self._proc = subprocess.Popen(
+                command, shell=True, cwd=cwd, stdin=slave, stdout=slave, stderr=slave,
+                start_new_session=True, close_fds=True
+            )
+            os.close(slave)
+            self._master = master
+            self.reader = FdReader(master)
+            self._write = lambda text: os.write(master, text.encode("utf-8"))
+
+    def write(self, text: str):
+        self._write(text)
+
+    def is_alive(self) -> bool:
+        if os.name == "nt":
+            return self._proc.isalive()
+        return self._proc.poll() is None
+
+    def kill(self):
+        try:
+            if os.name == "nt":
+                if self._proc.isalive():
+                    self._proc.kill()
+            else:
+                if self._proc.poll() is None:
+                    self._proc.kill()
+                self._proc.wait(timeout=5)
+        except Exception as e:
+            logger.debug(f"Error killing session process: {e}")
+        self.reader.close()
+        if os.name != "nt":
+            try:
+                os.close(self._master)
+            except OSError:
+                pass
+
+
+class AgySession:
+    """One long-lived interactive agy process."""
+
+    def __init__(
+        self,
+        command: str,
+        prompt_dir: Path,
+        startup_timeout: float = 60,
+        ready_idle: float = 2.0,
+        cwd: Optional[str] = None,
+        first_output_timeout: float = FIRST_OUTPUT_TIMEOUT
+    ):
+        self.command = command
+        self.prompt_dir = Path(prompt_dir)
+        self.first_output_timeout = first_output_timeout
+        self.created = time.monotonic()
+        self.calls = 0
+        self.broken = False
+        self._handle = PtyProcessHandle(command, cwd=cwd)
+        # Health check: the process must survive startup and print its banner/prompt
+        banner, reason = read_until(self._handle.reader, startup_timeout, idle=ready_idle)
+        if reason == "eof" or not self._handle.is_alive():
+            self.close()
+            raise SessionError(f"agy session exited during startup: {banner[-200:].strip()}")
+        logger.debug(f"agy session ready ({len(banner)} chars of banner)")
+
+    def is_healthy(self, max_calls: int, max_age: float) -> bool:
+        return (
+            not self.broken
+            and self._handle.is_alive()
+            and self.calls < max_calls
+            and time.monotonic() - self.created < max_age
+        )
+
+    def ask(self, prompt: str, timeout: float, on_progress: Optional[Callable[[float], None]] = None) -> str:
+        """Send one prompt and return the reply up to the sentinel line."""
+        sentinel = f"<<END-{uuid.uuid4().hex[:12]}>>"
+        self.prompt_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="agy_session_", suffix=".txt", dir=self.prompt_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(prompt)
+            self.calls += 1
+            instruction = SENTINEL_INSTRUCTION.format(path=path, sentinel=sentinel)
+            self._handle.write(instruction + "\r")
+            started = time.monotonic()
+            # A live session echoes the request or starts answering at once; silence means it is stuck
+            text, reason = read_until(self._handle.reader, min(timeout, self.first_output_timeout), done=bool)
+            if reason == "timeout":
+                reason = "produced no output"
+            elif reason == "done" and split_reply(text, sentinel, instruction) is None:
+                more, reason = read_until(
+                    self._handle.reader, timeout - (time.monotonic() - started),
+                    done=lambda t: split_reply(text + t, sentinel, instruction) is not None,
+                    on_progress=on_progress
+                )
+                text += more
+            reply = split_reply(text, sentinel, instruction) if reason == "done" else None
+            if reply is None:
+                self.broken = True
+                raise SessionError(f"agy session {reason} after {len(text)} chars")
+            return reply
+        except OSError as e:
+            self.broken = True
+            raise SessionError(f"agy session I/O error: {e}") from e
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        self._handle.kill()
+
+
+class AgySessionPool:
+    """Bounded pool of healthy agy sessions, recycled by call count and age."""
+
+    def __init__(
+        self,
+        command: str,
+        size: int = 2,
+        max_calls: int = 20,
+        max_age_sec: float = 1800,
+        startup_timeout: float = 60,
+        prompt_dir: Optional[Path] = None,
+        cwd: Optional[str] = None,
+        session_factory: Optional[Callable[[], AgySession]] = None,
+        first_output_timeout: float = FIRST_OUTPUT_TIMEOUT
+    ):
+        self.size = max(1, int(size))
+        self.max_calls = max_calls
+        self.max_age = max_age_sec
+        self._factory = session_factory or (lambda: AgySession(
+            command, prompt_dir or Path(tempfile.gettempdir()) / "pptplaner_agy", startup_timeout,
+            cwd=cwd, first_output_timeout=first_output_timeout
+        ))
+        self._idle: List[AgySession] = []
+        self._open = 0  # idle + checked out
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"sessions_started": 0, "sessions_recycled": 0, "requests": 0, "reuses": 0}
+
+    @contextmanager
+    def session(self) -> Iterator[AgySession]:
+        """Check out a healthy session, starting one if the pool has room."""
+        session = None
+        with self._cond:
+            while session is None:
+                if self._closed:
+                    raise SessionError("Session pool is closed")
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if candidate.is_healthy(self.max_calls, self.max_age):
+                        session = candidate
+                        self.stats["reuses"] += 1
+                        break
+                    self._retire(candidate)
+                if session is None and self._open < self.size:
+                    self._open += 1
+                    break
+                if session is None:
+                    self._cond.wait()  # Releases the lock while waiting
+        if session is None:
+            try:
+                session = self._factory()  # Started outside the lock
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.stats["sessions_started"] += 1
+        try:
+            yield session
+        finally:
+            with self._cond:
+                if self._closed or not session.is_healthy(self.max_calls, self.max_age):
+                    self._retire(session)
+                else:
+                    self._idle.append(session)
+                self._cond.notify()
+
+    def _retire(self, session: AgySession):
+        """Close a session and free its slot (caller holds the lock)."""
+        self._open -= 1
+        self.stats["sessions_recycled"] += 1
+        threading.Thread(target=session.close, daemon=True).start()  # Never block the pool on a kill
+
+    def run(self, prompt: str, timeout: float = 600, on_progress: Optional[Callable[[float], None]] = None) -> str:
+        with self.session() as session:
+            with self._cond:
+                self.stats["requests"] += 1
+            return session.ask(prompt, timeout, on_progress)
+
+    def close(self):
+        """Stop idle sessions now; checked-out ones are stopped when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self.stats["sessions_recycled"] += len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            session.close()  # Synchronous: also runs from atexit
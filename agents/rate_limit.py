@@ -0,0 +1,191 @@
+"""
+Token-bucket rate limiting per agent backend.
+
+Each backend has up to two buckets: requests per minute and tokens per
+minute. A call reserves one request and its estimated tokens from both;
+if a bucket runs dry the reservation drives it negative and the caller
+waits until it refills. Reservations queue callers in arrival order, and
+locks are held only while the buckets are updated, never while sleeping.
+
+Bucket state lives either in memory (this process) or in a small JSON
+file guarded by an OS file lock, so several orchestrator processes on the
+same machine share one budget per backend.
+
+Usage:
+    limiter = RateLimiter("antigravity", requests_per_min=12, state_dir=Path(".cache/ratelimit"))
+    waited = limiter.acquire(tokens=estimate_tokens(prompt))
+    output = agent.execute(...)
+    limiter.record_usage(estimated, estimate_tokens(prompt) + estimate_tokens(output))
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BURST_SECONDS = 10  # Bucket capacity, in seconds' worth of the rate
+
+_WIDE_CHARS = re.compile(r"[\u1100-\u11ff\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")  # CJK / Hangul / full-width
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per four other characters."""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive inter-process lock on a file (held only for short updates)."""
+    with open(path, "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class _MemoryStore:
+    """Bucket state shared by the threads of this process."""
+
+    def __init__(self):
+        self._state: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def update(self, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._lock:
+            return fn(self._state)
+
+
+class _FileStore:
+    """Bucket state shared by every process on the machine."""
+
+    def __init__(self, state_dir: Path, backend: str):
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", backend)
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = state_dir / f"{safe}.json"
+        self.lock_path = state_dir / f"{safe}.lock"
+        self._thread_lock = threading.Lock()  # flock is per open file; this keeps threads cheap
+
+    def update(self, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._thread_lock, _file_lock(self.lock_path):
+            try:
+                state = json.loads(self.path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                state = {}
+            result = fn(state)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(state), encoding="utf-8")
+            tmp_path.replace(self.path)
+            return result
+
+
+class RateLimiter:
+    """Requests/min and tokens/min token buckets for one backend."""
+
+    def __init__(
+        self,
+        backend: str,
+        requests_per_min: Optional[float] = None,
+        tokens_per_min: Optional[float] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS,
+        state_dir: Optional[Path] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.backend = backend
+        self.limits = {
+            name: (rate / 60.0, max(1.0, rate * burst_seconds / 60.0))
+            for name, rate in (("requests", requests_per_min), ("tokens", tokens_per_min))
+            if rate
+        }
+        self._store = _FileStore(state_dir, backend) if state_dir else _MemoryStore()
+        self._clock = clock
+        self._sleep = sleep
+
+    @classmethod
+    def from_config(cls, backend: str, agent: str, config: Optional[Dict[str, Any]] = None) -> Optional["RateLimiter"]:
+        """Build from the 'rate_limits' section; None if the backend is unlimited."""
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        backends = config.get("backends") or {}
+        limits = backends.get(backend) or backends.get(agent) or {}
+        if not (limits.get("requests_per_min") or limits.get("tokens_per_min")):
+            return None
+        state_dir = None
+        if config.get("coordinator", "file") == "file":
+            state_dir = Path(config.get("dir") or ".cache/ratelimit")
+        return cls(
+            backend,
+            limits.get("requests_per_min"),
+            limits.get("tokens_per_min"),
+            limits.get("burst_seconds", config.get("burst_seconds", DEFAULT_BURST_SECONDS)),
+            state_dir
+        )
+
+    def _refill(self, state: Dict[str, Any], now: float):
+        for name, (rate, capacity) in self.limits.items():
+            bucket = state.setdefault(name, {"level": capacity, "updated": now})
+            elapsed = max(0.0, now - bucket["updated"])
+            bucket["level"] = min(capacity, bucket["level"] + elapsed * rate)
+            bucket["updated"] = now
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Take one request and `tokens` from the buckets; returns seconds to wait."""
+        if not self.limits:
+            return 0.0
+        amounts = {"requests": 1, "tokens": tokens}
+
+        def take(state: Dict[str, Any]) -> float:
+            now = self._clock()
+            self._refill(state, now)
+            wait = 0.0
+            for name, (rate, _) in self.limits.items():
+                bucket = state[name]
+                bucket["level"] -= amounts[name]
+                if bucket["level"] < 0:
+                    wait = max(wait, -bucket["level"] / rate)
+            return wait
+
+        return self._store.update(take)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Reserve capacity and sleep (outside any lock) until it is available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"⏳ Rate limit for {self.backend}: waiting {wait:.1f}s")
+            self._sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real size of a call is known."""
+        if "tokens" not in self.limits or actual_tokens == estimated_tokens:
+            return
+
+        def correct(state: Dict[str, Any]):
+            self._refill(state, self._clock())
+            state["tokens"]["level"] -= actual_tokens - estimated_tokens
+
+        self._store.update(correct)
@@ -1,37 +1,251 @@
 """
 RetryStrategy - Configurable retry logic for agent execution.
+
+Retries use exponential backoff with jitter, so workers that failed
+together do not retry in lockstep. Two shared guards keep a dead backend
+from multiplying retries across pages and workers:
+
+- CircuitBreaker (one per backend): after `failure_threshold` consecutive
+  failures the circuit opens and calls fail fast with CircuitOpenError.
+  After `reset_timeout` seconds it lets `half_open_max_calls` probe calls
+  through (half-open); a success closes it, a failure re-opens it.
+- RetryBudget (one per run): retries are allowed up to `min_retries` plus
+  `ratio` per call made, so a failing run cannot spend unbounded retries.
+
+Usage:
+    breaker = CircuitBreaker("ollama@localhost", failure_threshold=3)
+    budget = RetryBudget(ratio=0.2, min_retries=10)
+    strategy = RetryStrategy(max_retries=3, delay=5, breaker=breaker, budget=budget)
+    output = strategy.execute_with_retry(agent.execute, prompt, mode)
 """
+import logging
+import random
+import threading
 import time
-from typing import Callable, Tuple, Any
-from .exceptions import AgentExecutionError
+from typing import Any, Callable, Dict, Optional, Tuple
+from .exceptions import AgentExecutionError, CircuitOpenError, RetryBudgetExhaustedError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def jittered_delay(
+    attempt: int,
+    delay: float,
+    backoff_factor: float = 2.0,
+    max_delay: float = 60.0,
+    rng: Callable[[], float] = random.random
+) -> float:
+    """Exponential backoff with "equal jitter": half fixed, half random.
+
+    Attempt 0 waits between delay/2 and delay, attempt 1 between delay and
+    2*delay, and so on, capped at max_delay.
+    """
+    ceiling = min(max_delay, delay * (backoff_factor ** attempt))
+    return ceiling / 2 + rng() * ceiling / 2
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one backend.
+
+    Thread-safe. Transitions are logged and reported to the
+    PerformanceMonitor.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @classmethod
+    def from_config(cls, name: str, agent: str, config: Optional[Dict[str, Any]] = None) -> Optional["CircuitBreaker"]:
+        """Build from the 'retry.breaker' section; None if disabled.
+
+        Per-backend values under `backends.<agent name>` override the globals.
+        """
+        config = dict(config or {})
+        overrides = (config.pop("backends", None) or {}).get(agent) or {}
+        config.update(overrides)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            name,
+            failure_threshold=config.get("failure_threshold", 5),
+            reset_timeout=config.get("reset_timeout", 60.0),
+            half_open_max_calls=config.get("half_open_max_calls", 1)
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._check_reset_locked()
+            return self._state
+
+    def allows_calls(self) -> bool:
+        """True unless the circuit is open (half-open counts as usable)."""
+        return self.state != OPEN
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError (fast-fail); rejections are counted."""
+        with self._lock:
+            self._check_reset_locked()
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = self._opened_at + self.reset_timeout - self._clock()
+            elif self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    retry_in = 0.0
+                else:
+                    self._probes += 1
+        if retry_in is not None:
+            from .performance import performance_monitor
+            performance_monitor.record_breaker_rejection(self.name)
+            raise CircuitOpenError(self.name, retry_in)
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition_locked(CLOSED, "probe succeeded")
+
+    def on_cancel(self):
+        """A call its caller abandoned: neither success nor failure, but frees a probe slot."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def on_failure(self, reason: str = ""):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._transition_locked(OPEN, f"probe failed: {reason}" if reason else "probe failed")
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._transition_locked(OPEN, f"{self._failures} consecutive failures")
+
+    def _check_reset_locked(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition_locked(HALF_OPEN, f"{self.reset_timeout:.0f}s elapsed")
+
+    def _transition_locked(self, state: str, reason: str):
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        self._probes = 0
+        if state == CLOSED:
+            self._failures = 0
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Circuit breaker {self.name}: {previous} -> {state} ({reason})")
+        from .performance import performance_monitor
+        performance_monitor.record_breaker_transition(self.name, previous, state, reason)
+
+
+class RetryBudget:
+    """Run-wide cap on retries: min_retries plus `ratio` per call made."""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "RetryBudget":
+        config = config or {}
+        return cls(config.get("budget_ratio", 0.2), config.get("budget_min", 10))
+
+    def record_call(self):
+        """Count a first attempt (earns `ratio` retries)."""
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False if it is exhausted."""
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.calls:
+                self.denied += 1
+                return False
+            self.retries += 1
+            return True
 
 
 class RetryStrategy:
     """Configurable retry strategy."""
-    
+
     def __init__(
         self,
         max_retries: int = 3,
         delay: int = 5,
         backoff_factor: float = 2.0,
-        retryable_exceptions: Tuple[type, ...] | None = None
+        retryable_exceptions: Tuple[type, ...] | None = None,
+        jitter: bool = True,
+        max_delay: float = 60.0,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[RetryBudget] = None
     ):
         self.max_retries = max_retries
         self.delay = delay
         self.backoff_factor = backoff_factor
         self.retryable_exceptions = retryable_exceptions or (AgentExecutionError,)
-    
+        self.jitter = jitter
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.budget = budget
+
+    def get_delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt + 1`."""
+        if self.jitter:
+            return jittered_delay(attempt, self.delay, self.backoff_factor, self.max_delay)
+        return min(self.max_delay, self.delay * (self.backoff_factor ** attempt))
+
     def execute_with_retry(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
-        """Execute function with retry logic."""
+        """Execute function with retry logic.
+
+        Raises CircuitOpenError without calling func if the breaker is open,
+        and the last error once the retry budget is exhausted.
+        """
         last_exception = None
-        
+        if self.budget:
+            self.budget.record_call()
+
         for attempt in range(self.max_retries):
+            if self.breaker:
+                self.breaker.before_call()
             try:
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
             except self.retryable_exceptions as e:
                 last_exception = e
+                if self.breaker:
+                    self.breaker.on_failure(str(e))
                 if attempt < self.max_retries - 1:
-                    sleep_time = self.delay * (self.backoff_factor ** attempt)
-                    time.sleep(sleep_time)
-        
+                    if self.budget and not self.budget.try_spend():
+                        raise RetryBudgetExhaustedError(f"Retry budget exhausted after: {e}") from e
+                    time.sleep(self.get_delay(attempt))
+                continue
+            except Exception as e:
+                if self.breaker:
+                    self.breaker.on_failure(str(e))
+                raise
+            if self.breaker:
+                self.breaker.on_success()
+            return result
+
         raise last_exception
@@ -0,0 +1,91 @@
+"""
+Mode-based routing of agent calls.
+
+Maps a prompt mode ("MEMO") or mode glob ("VALIDATE_*") to an ordered
+chain of agent/model/endpoint routes, so that e.g. pass/fail validators
+run on a small fast local model while generation stays on the strong
+default agent. The run's default agent (--agent / --gemini-model) is
+always the last link of every chain.
+
+config.yaml:
+    routing:
+      VALIDATE_*:
+        - { agent: llamacpp, api_base: "http://localhost:8080/v1", model: qwen2.5-7b }
+        - { agent: ollama, model: llama3.1:8b }
+      CREATE_*_SVG: { agent: claude }
+
+Rules are matched exact-name first, then globs in config order.
+
+Usage:
+    router = ModeRouter(config.get("routing"))
+    for route in router.routes_for("VALIDATE_MEMO", Route("antigravity")):
+        ...
+"""
+import logging
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """One agent/model/endpoint a mode can be sent to."""
+    agent: Optional[str] = None      # None = the run's default agent
+    model: Optional[str] = None
+    api_base: Optional[str] = None
+    api_key: Optional[str] = None
+
+    @classmethod
+    def from_config(cls, value: Any) -> "Route":
+        """Build a route from a mapping or a bare agent name."""
+        if isinstance(value, str):
+            return cls(agent=value)
+        if not isinstance(value, dict):
+            raise ValueError(f"Invalid route {value!r}: expected an agent name or a mapping")
+        unknown = set(value) - {"agent", "model", "api_base", "api_key"}
+        if unknown:
+            raise ValueError(f"Invalid route {value!r}: unknown keys {', '.join(sorted(unknown))}")
+        return cls(value.get("agent"), value.get("model"), value.get("api_base"), value.get("api_key"))
+
+    def with_defaults(self, default: "Route") -> "Route":
+        """Fill the agent (and its model) from the default route when omitted."""
+        if self.agent:
+            return self
+        return Route(default.agent, self.model or default.model, self.api_base, self.api_key)
+
+    def describe(self) -> str:
+        text = self.agent or "default"
+        if self.model:
+            text += f":{self.model}"
+        if self.api_base:
+            text += f"@{self.api_base}"
+        return text
+
+
+class ModeRouter:
+    """Resolves a mode to its fallback chain of routes."""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        self.rules: Dict[str, List[Route]] = {}
+        for pattern, value in (rules or {}).items():
+            chain = value if isinstance(value, list) else [value]
+            try:
+                self.rules[str(pattern)] = [Route.from_config(item) for item in chain]
+            except ValueError as e:
+                logger.warning(f"Ignoring routing rule '{pattern}': {e}")
+
+    def match(self, mode: str) -> Optional[str]:
+        """Pattern that applies to a mode: exact name first, then globs in order."""
+        if mode in self.rules:
+            return mode
+        return next((pattern for pattern in self.rules if fnmatchcase(mode, pattern)), None)
+
+    def routes_for(self, mode: str, default: Route) -> List[Route]:
+        """Ordered routes for a mode, ending with the default route."""
+        pattern = self.match(mode)
+        chain = [route.with_defaults(default) for route in self.rules.get(pattern, [])] if pattern else []
+        if default not in chain:
+            chain.append(default)
+        return chain
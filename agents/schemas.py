@@ -0,0 +1,113 @@
+"""
+JSON schemas for the modes whose output is parsed as JSON.
+
+OpenAI-compatible local backends can constrain decoding to a schema, so
+the model cannot produce truncated, nested or otherwise unparseable JSON
+(each of which costs a full rework cycle). The schemas mirror the output
+formats in scripts/prompts/*.md; request_fields() turns one into the
+request parameters understood by the backend:
+
+- "response_format": OpenAI-style {"type": "json_schema", ...}; llama.cpp
+  server, Ollama (0.5+) and vLLM all accept it (llama.cpp compiles the
+  schema to a GBNF grammar)
+- "json_schema": llama.cpp's top-level schema field
+- "guided_json": vLLM's guided decoding parameter
+- "format": Ollama's native structured output field
+
+Usage:
+    from agents.schemas import request_fields
+    payload.update(request_fields("VALIDATE_MEMO", "response_format"))
+"""
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional
+
+STRUCTURED_OUTPUT_STYLES = ("response_format", "json_schema", "guided_json", "format")
+
+_STRING = {"type": "string"}
+_OPTIONAL_STRING = {"type": ["string", "null"]}
+_PAGE = {"type": ["string", "integer"]}
+
+_SLIDE = {
+    "type": "object",
+    "properties": {"page": _PAGE, "topic": _STRING, "content": _STRING},
+    "required": ["page", "topic", "content"],
+}
+
+_VERDICT = {
+    "type": "object",
+    "properties": {
+        "is_valid": {"type": "boolean"},
+        "is_acceptable": {"type": "boolean"},
+        "feedback": _STRING,
+        "quality_score": {"type": "number"},
+    },
+    "required": ["is_valid", "is_acceptable", "feedback"],
+}
+
+# Exact modes first; glob patterns are matched in order after them
+MODE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "ANALYZE_SOURCE_DOCUMENT": {
+        "type": "object",
+        "properties": {
+            "document_title": _STRING,
+            "document_subtitle": _OPTIONAL_STRING,
+            "document_authors": _OPTIONAL_STRING,
+            "publication_info": _OPTIONAL_STRING,
+            "source_url": _OPTIONAL_STRING,
+            "project_title": _STRING,
+            "glossary": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"term": _STRING, "translation": _STRING},
+                    "required": ["term", "translation"],
+                },
+            },
+            "summary": _STRING,
+            "overview": _STRING,
+        },
+        "required": ["document_title", "project_title", "summary", "overview"],
+    },
+    "PLAN": {
+        "type": "object",
+        "properties": {
+            "pages": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {"page": _PAGE, "topic": _STRING},
+                    "required": ["page", "topic"],
+                },
+            },
+        },
+        "required": ["pages"],
+    },
+    "DECK": {
+        "type": "object",
+        "properties": {"slides": {"type": "array", "minItems": 1, "items": _SLIDE}},
+        "required": ["slides"],
+    },
+    "DECK_SLIDE": _SLIDE,
+    "VALIDATE_*": _VERDICT,
+}
+
+
+def schema_for(mode: str) -> Optional[Dict[str, Any]]:
+    """Return the JSON schema for a mode's output, or None for free-form modes."""
+    if mode in MODE_SCHEMAS:
+        return MODE_SCHEMAS[mode]
+    for pattern, schema in MODE_SCHEMAS.items():
+        if any(c in pattern for c in "*?[") and fnmatchcase(mode, pattern):
+            return schema
+    return None
+
+
+def request_fields(mode: str, style: str = "response_format") -> Dict[str, Any]:
+    """Request parameters constraining a mode's output to its schema ({} if none applies)."""
+    schema = schema_for(mode)
+    if schema is None or style not in STRUCTURED_OUTPUT_STYLES:
+        return {}
+    if style == "response_format":
+        return {"response_format": {"type": "json_schema", "json_schema": {"name": mode.lower(), "schema": schema}}}
+    return {style: schema}
@@ -0,0 +1,298 @@
+"""
+AgentSession - Run-scoped agent context shared by all worker threads.
+
+Resolving an agent used to happen on every call: parse config.yaml, probe
+local endpoints with ModelDetector, pick a model and build a fresh adapter.
+A session does that work once per orchestrator run and hands out the
+same adapter instances to every memo/SVG worker.
+
+Usage:
+    session = AgentSession.from_config_file(CONFIG_PATH)
+    resolved = session.resolve("ollama", model_name=None)
+    agent = session.get_agent(resolved)
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base import AgentInterface
+from .concurrency import AdaptiveConcurrencyController
+from .factory import AgentFactory
+from .rate_limit import RateLimiter
+from .retry import CircuitBreaker, RetryBudget
+from .routing import ModeRouter, Route
+
+logger = logging.getLogger(__name__)
+
+# CLI agents use their own command-line tools, not API endpoints
+CLI_AGENTS = ("antigravity", "claude")
+# API agents whose endpoint and model are auto-detected
+LOCAL_API_AGENTS = ("openai-compatible", "ollama", "llamacpp")
+DEFAULT_API_BASE = "http://localhost:11434/v1"  # Default Ollama
+
+
+@dataclass(frozen=True)
+class ResolvedAgent:
+    """Agent name, model and endpoint after detection and model filtering."""
+    agent: str
+    model: Optional[str]
+    api_base: Optional[str]
+    api_key: Optional[str] = None
+
+    def to_config(self) -> Dict[str, Any]:
+        """Build the config dict expected by AgentFactory.create."""
+        return {
+            "agent": self.agent,
+            "agent_config": {
+                "model": self.model,
+                "api_base": self.api_base,
+                "api_key": self.api_key
+            }
+        }
+
+
+class AgentSession:
+    """
+    Holds resolved config, detected endpoint/model and adapter instances.
+
+    Thread-safe: resolution and adapter creation happen under a lock, so
+    concurrent workers trigger endpoint detection at most once.
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        info: Optional[Callable[[str], None]] = None,
+        warning: Optional[Callable[[str], None]] = None
+    ):
+        self.config = config or {}
+        self._info = info or logger.info
+        self._warning = warning or logger.warning
+        self._lock = threading.RLock()
+        self._detected: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._resolved: Dict[Tuple[Optional[str], ...], ResolvedAgent] = {}
+        self._agents: Dict[ResolvedAgent, AgentInterface] = {}
+        self._controllers: Dict[str, AdaptiveConcurrencyController] = {}
+        self._rate_limiters: Dict[str, Optional[RateLimiter]] = {}
+        self._breakers: Dict[str, Optional[CircuitBreaker]] = {}
+        self.retry_budget = RetryBudget.from_config(self.config.get("retry"))
+        self.router = ModeRouter(self.config.get("routing"))
+        self.stats = {"resolve_calls": 0, "detections": 0, "adapters_created": 0, "adapter_reuses": 0}
+
+    @classmethod
+    def from_config_file(cls, config_path: Path, overrides: Optional[Dict[str, Any]] = None, **kwargs) -> "AgentSession":
+        """Create a session from a YAML config file, parsed once."""
+        import yaml
+        config_data = {}
+        if Path(config_path).exists():
+            try:
+                config_data = yaml.safe_load(Path(config_path).read_text(encoding="utf-8")) or {}
+            except Exception as e:
+                logger.warning(f"Failed to parse {config_path}: {e}")
+        if overrides:
+            config_data.update(overrides)
+        return cls(config_data, **kwargs)
+
+    @staticmethod
+    def normalize_agent_name(agent: str) -> str:
+        """Normalize agent name, mapping deprecated gemini to antigravity."""
+        agent = agent.lower().strip()
+        return "antigravity" if agent == "gemini" else agent
+
+    @property
+    def agent_config(self) -> Dict[str, Any]:
+        return self.config.get("agent_config") or {}
+
+    def _configured_endpoint(self) -> Optional[str]:
+        # --api-base on the command line wins over config.yaml
+        return self.config.get("api_base") or self.agent_config.get("api_base")
+
+    def _detect_endpoint(self) -> Tuple[Optional[str], Optional[str]]:
+        """Detect API base and model for local API agents (once per session)."""
+        if self._detected is not None:
+            return self._detected
+
+        from .model_detector import ModelDetector, default_detector
+        self.stats["detections"] += 1
+        detected_api_base, detected_model = None, None
+
+        custom_endpoint = self._configured_endpoint()
+        if custom_endpoint:
+            self._info(f"🔹 Using configured endpoint: {custom_endpoint}")
+            detector = ModelDetector(endpoints=[custom_endpoint], verbose=True)
+            result = detector.detect_endpoint(custom_endpoint.rstrip('/'))
+
+            if result.available:
+                detected_api_base = custom_endpoint
+                if "/v1" not in detected_api_base:
+                    detected_api_base += "/v1"
+                self._info(f"✅ Configured endpoint is valid ({result.type})")
+
+                if result.models:
+                    detected_model = result.models[0].name
+                    self._info(f"🔹 Using model from config: {detected_model}")
+            else:
+                self._warning(f"⚠️ Configured endpoint failed: {result.error}")
+                self._info(f"🔹 Falling back to auto-detection...")
+
+        # Auto-detect if no custom endpoint or custom failed
+        if not detected_api_base:
+            self._info(f"🔹 Scanning for local AI servers...")
+            try:
+                endpoints = default_detector.detect_all()
+                available = [e for e in endpoints if e.available]
+                if available:
+                    first_endpoint = available[0]
+                    detected_api_base = first_endpoint.url
+                    if "/v1" not in detected_api_base:
+                        detected_api_base += "/v1"
+                    self._info(f"🔹 Auto-detected {first_endpoint.type} at {detected_api_base}")
+
+                    if first_endpoint.models:
+                        detected_model = first_endpoint.models[0].name
+                        self._info(f"🔹 Auto-detected model: {detected_model}")
+                else:
+                    self._warning(f"⚠️ No local AI servers found")
+            except Exception as e:
+                self._warning(f"⚠️ Auto-detection failed: {e}")
+
+        self._detected = (detected_api_base, detected_model)
+        return self._detected
+
+    def routes_for(self, mode: str, agent: str, model_name: Optional[str] = None) -> List[Route]:
+        """Fallback chain of routes for a mode (see 'routing' in config.yaml)."""
+        default = Route(self.normalize_agent_name(agent), model_name)
+        return [
+            Route(self.normalize_agent_name(r.agent), r.model, r.api_base, r.api_key)
+            for r in self.router.routes_for(mode, default)
+        ]
+
+    def resolve_route(self, route: Route) -> ResolvedAgent:
+        return self.resolve(route.agent, route.model, api_base=route.api_base, api_key=route.api_key)
+
+    def resolve(
+        self,
+        agent: str,
+        model_name: Optional[str] = None,
+        api_base: Optional[str] = None,
+        api_key: Optional[str] = None
+    ) -> ResolvedAgent:
+        """Resolve agent name, effective model and API base (memoized).
+
+        An explicit api_base (from a routing rule) skips endpoint detection.
+        """
+        agent = self.normalize_agent_name(agent)
+        key = (agent, model_name, api_base, api_key)
+        with self._lock:
+            self.stats["resolve_calls"] += 1
+            if key in self._resolved:
+                return self._resolved[key]
+
+            if api_base and agent not in CLI_AGENTS:
+                resolved = ResolvedAgent(agent, model_name, api_base, api_key or self.agent_config.get("api_key"))
+                self._info(f"🔹 Routed agent config: {agent} model={model_name or 'default'}, api_base={api_base}")
+                self._resolved[key] = resolved
+                return resolved
+
+            detected_api_base, detected_model = None, None
+            if agent in LOCAL_API_AGENTS:
+                detected_api_base, detected_model = self._detect_endpoint()
+
+            api_base = None
+            if agent not in CLI_AGENTS:
+                api_base = self._configured_endpoint() or detected_api_base
+                if not api_base:
+                    api_base = DEFAULT_API_BASE
+                    self._warning(f"⚠️ Using default Ollama endpoint: {api_base}")
+
+            effective_model = model_name
+            if agent in CLI_AGENTS:
+                self._info(f"🔹 Using {agent} CLI mode (no API endpoint needed)")
+                # Don't pass gemini model names to claude, and vice versa
+                if model_name:
+                    if agent == "claude" and "gemini" in model_name.lower():
+                        self._info(f"⚠️ Ignoring gemini model name for Claude, using default")
+                        effective_model = None
+                    elif agent == "antigravity" and "claude" in model_name.lower():
+                        self._info(f"⚠️ Ignoring claude model name for Antigravity, using default")
+                        effective_model = None
+                else:
+                    self._info(f"🔹 Using {agent} default model")
+            elif agent in LOCAL_API_AGENTS:
+                if model_name and "gemini" in model_name.lower():
+                    self._info(f"⚠️ Ignoring gemini model name, will use detected model")
+                    effective_model = None
+                elif model_name and "claude" in model_name.lower():
+                    self._info(f"⚠️ Ignoring claude model name for local model")
+                    effective_model = None
+                # An explicit model (routing rule or CLI) wins over the server's first listed one
+                if not effective_model and detected_model:
+                    effective_model = detected_model
+                    self._info(f"🔹 Using detected model: {detected_model}")
+
+            resolved = ResolvedAgent(
+                agent=agent,
+                model=effective_model,
+                api_base=api_base,
+                api_key=api_key or self.agent_config.get("api_key")
+            )
+            self._info(f"🔹 Agent config: model={effective_model or 'default'}, api_base={api_base}")
+            self._resolved[key] = resolved
+            return resolved
+
+    def get_agent(self, resolved: ResolvedAgent) -> AgentInterface:
+        """Return a shared adapter instance for the resolved agent."""
+        with self._lock:
+            agent = self._agents.get(resolved)
+            if agent is not None:
+                self.stats["adapter_reuses"] += 1
+                return agent
+            config = resolved.to_config()
+            # Adapter options from config.yaml (e.g. stream, command_override)
+            config["agent_config"] = {**self.agent_config, **config["agent_config"]}
+            agent = AgentFactory.create(config)
+            self._agents[resolved] = agent
+            self.stats["adapters_created"] += 1
+            self._info(f"✅ Created agent instance: {agent.NAME}")
+            return agent
+
+    @staticmethod
+    def backend_key(resolved: ResolvedAgent) -> str:
+        """Identify the backend serving a resolved agent (agent + endpoint)."""
+        return f"{resolved.agent}@{resolved.api_base}" if resolved.api_base else resolved.agent
+
+    def get_controller(self, resolved: ResolvedAgent) -> AdaptiveConcurrencyController:
+        """Return the shared concurrency controller for the agent's backend."""
+        key = self.backend_key(resolved)
+        with self._lock:
+            controller = self._controllers.get(key)
+            if controller is None:
+                controller = AdaptiveConcurrencyController.from_config(
+                    key, resolved.agent, self.config.get("concurrency")
+                )
+                self._controllers[key] = controller
+            return controller
+
+    def get_rate_limiter(self, resolved: ResolvedAgent) -> Optional[RateLimiter]:
+        """Return the shared rate limiter for the agent's backend, or None if unlimited."""
+        key = self.backend_key(resolved)
+        with self._lock:
+            if key not in self._rate_limiters:
+                self._rate_limiters[key] = RateLimiter.from_config(key, resolved.agent, self.config.get("rate_limits"))
+            return self._rate_limiters[key]
+
+    def get_breaker(self, resolved: ResolvedAgent) -> Optional[CircuitBreaker]:
+        """Return the shared circuit breaker for the agent's backend, or None if disabled."""
+        key = self.backend_key(resolved)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker.from_config(
+                    key, resolved.agent, (self.config.get("retry") or {}).get("breaker")
+                )
+            return self._breakers[key]
+
+    def with_model(self, resolved: ResolvedAgent, model: Optional[str]) -> ResolvedAgent:
+        """Return a copy of resolved using an explicit model (e.g. user switch)."""
+        return ResolvedAgent(resolved.agent, model, resolved.api_base, resolved.api_key)
@@ -0,0 +1,164 @@
+"""
+Span tracing in the Chrome trace event format.
+
+Records where a run spends its time: phases, page tasks, agent calls,
+retries, validator calls and file writes, each on the thread that ran it.
+The resulting trace.json opens in Perfetto (https://ui.perfetto.dev) or
+chrome://tracing, which shows the critical path and idle workers.
+
+Tracing is off by default; every call is a cheap no-op until enable().
+
+Usage:
+    from agents.tracing import tracer
+
+    tracer.enable()
+    with tracer.span("MEMO", "agent", attempt=1):
+        ...
+    phase = tracer.begin("Planning", "phase")
+    ...
+    tracer.end(phase)
+    tracer.write(output_dir / "trace.json")
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Enough for a few thousand slides' worth of calls; beyond it events are dropped
+DEFAULT_MAX_EVENTS = 200000
+
+
+class Span:
+    """An open span started with Tracer.begin()."""
+
+    __slots__ = ("name", "cat", "args", "start_us", "tid")
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any], start_us: float, tid: int):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start_us = start_us
+        self.tid = tid
+
+
+class Tracer:
+    """Thread-safe collector of trace events (singleton: use `tracer`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.max_events = DEFAULT_MAX_EVENTS
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded events and restart the clock."""
+        with self._lock:
+            self._events: List[Dict[str, Any]] = []
+            self._threads: Dict[int, str] = {}
+            self._dropped = 0
+            self._origin = time.perf_counter()
+
+    def enable(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self.max_events = max_events
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _tid(self) -> int:
+        # Native thread IDs match what OS tools (top -H, py-spy) report
+        thread = threading.current_thread()
+        tid = threading.get_native_id()
+        if tid not in self._threads:
+            with self._lock:
+                self._threads[tid] = thread.name
+        return tid
+
+    def _append(self, event: Dict[str, Any]):
+        event["pid"] = os.getpid()
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self._dropped += 1
+                return
+            self._events.append(event)
+
+    def begin(self, name: str, cat: str = "", **args: Any) -> Optional[Span]:
+        """Open a span that may end in another code path (e.g. a phase)."""
+        if not self.enabled:
+            return None
+        return Span(name, cat, args, self._now_us(), self._tid())
+
+    def end(self, span: Optional[Span], **args: Any):
+        """Close a span from begin(); extra args (e.g. the outcome) are merged in."""
+        if span is None or not self.enabled:
+            return
+        self._append({
+            "name": span.name, "cat": span.cat, "ph": "X", "tid": span.tid,
+            "ts": round(span.start_us, 1), "dur": round(self._now_us() - span.start_us, 1),
+            "args": {**span.args, **args}
+        })
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args: Any) -> Iterator[Optional[Span]]:
+        """Trace the enclosed block; an exception is recorded in the span's args."""
+        span = self.begin(name, cat, **args)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        self.end(span)
+
+    def instant(self, name: str, cat: str = "", **args: Any):
+        """Record a point-in-time event (e.g. a cache hit or a circuit fast-fail)."""
+        if not self.enabled:
+            return
+        self._append({
+            "name": name, "cat": cat, "ph": "i", "s": "t", "tid": self._tid(),
+            "ts": round(self._now_us(), 1), "args": args
+        })
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Recorded events plus thread-name metadata, in Chrome trace format."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = self._dropped
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "PPTPlaner"}}]
+        meta += [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        if dropped:
+            meta.append({"name": "dropped_events", "ph": "M", "pid": pid, "tid": 0, "args": {"count": dropped}})
+        return meta + sorted(events, key=lambda e: e["ts"])
+
+    def write(self, path: Path) -> Optional[Path]:
+        """Write trace.json atomically; returns the path, or None if tracing is off."""
+        if not self.enabled:
+            return None
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"traceEvents": self.events(), "displayTimeUnit": "ms"}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        tmp_path.replace(path)
+        if self._dropped:
+            logger.warning(f"Trace buffer full: dropped {self._dropped} events (max_events={self.max_events})")
+        return path
+
+
+# Global tracer instance
+tracer = Tracer()
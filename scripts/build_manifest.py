@@ -0,0 +1,120 @@
+"""
+build_manifest - Input-hash manifest for incremental regeneration.
+
+Records, for every generated artifact in an output folder (slide markdown,
+memo, slide SVG, conceptual SVG, guide.html), a hash of the inputs and
+prompt versions that produced it. On a re-run an artifact is regenerated
+only if its inputs changed, and because dependents hash their upstream
+artifacts (a conceptual SVG hashes its memo, guide.html hashes every page
+file), changes propagate like in a build system.
+
+Artifacts are keyed by a logical id ("memo:03"), so a renamed topic replaces
+the old file instead of leaving an orphan next to it.
+
+Usage:
+    manifest = BuildManifest(output_dir)
+    inputs = BuildManifest.hash_inputs(slide_content, glossary_text, prompt_version)
+    if not manifest.is_fresh("memo:03", memo_path, inputs):
+        ...generate...
+        manifest.record("memo:03", memo_path, inputs)
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+MANIFEST_NAME = ".build_manifest.json"
+MANIFEST_VERSION = 1
+
+STATUS_GENERATED = "generated"
+STATUS_NOT_NEEDED = "not_needed"  # e.g. NO_CONCEPTUAL_SVG_NEEDED: no file, still up to date
+
+
+def file_hash(path: Path) -> Optional[str]:
+    """sha256 of a file's bytes, or None if it does not exist."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class BuildManifest:
+    """Thread-safe, atomically persisted artifact manifest for one output folder."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._artifacts: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == MANIFEST_VERSION:
+                    self._artifacts = data.get("artifacts") or {}
+            except (json.JSONDecodeError, OSError):
+                pass  # Corrupt manifest: everything is treated as stale
+
+    @staticmethod
+    def hash_inputs(*parts: Any) -> str:
+        """Stable hash of any JSON-serializable inputs."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def hash_files(paths: Iterable[Path], root: Path) -> str:
+        """Hash the names and contents of a set of files (order-independent)."""
+        entries = sorted((Path(p).relative_to(root).as_posix(), file_hash(p)) for p in paths)
+        return BuildManifest.hash_inputs(entries)
+
+    def _rel(self, path: Path) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.output_dir).as_posix()
+        except ValueError:
+            return str(path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._artifacts.get(key)
+            return dict(entry) if entry else None
+
+    def is_fresh(self, key: str, path: Path, inputs: str) -> bool:
+        """True if the artifact was produced from these inputs and is still on disk."""
+        entry = self.get(key)
+        if not entry or entry.get("inputs") != inputs or entry.get("path") != self._rel(path):
+            return False
+        return entry.get("status") == STATUS_NOT_NEEDED or Path(path).exists()
+
+    def is_modified(self, key: str, path: Path) -> bool:
+        """True if the file on disk differs from what was last recorded (hand-edited)."""
+        entry = self.get(key)
+        if not entry or entry.get("output") is None:
+            return False
+        current = file_hash(path)
+        return current is not None and current != entry["output"]
+
+    def record(self, key: str, path: Path, inputs: str, status: str = STATUS_GENERATED):
+        """Record an artifact; removes the file previously recorded under the same key if it moved."""
+        rel = self._rel(path)
+        with self._lock:
+            previous = self._artifacts.get(key)
+            if previous and previous.get("path") != rel:
+                old_path = self.output_dir / previous["path"]
+                if old_path.exists():
+                    old_path.unlink()
+            self._artifacts[key] = {
+                "path": rel,
+                "inputs": inputs,
+                "output": file_hash(path),
+                "status": status,
+                "updated": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            self._save_locked()
+
+    def _save_locked(self):
+        data = {"version": MANIFEST_VERSION, "artifacts": self._artifacts}
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.path)
@@ -0,0 +1,104 @@
+"""
+checkpoint - Per-phase run checkpoints keyed by the source document hash.
+
+Phase 1 (analysis) runs before the output folder is known, so a crash in a
+later phase used to cost the whole ANALYZE_SOURCE_DOCUMENT / VALIDATE_ANALYSIS
+loop again on restart. Each finished phase is now saved to
+output/.checkpoints/<source hash>.json together with a hash of its inputs;
+`--resume` reloads every phase whose inputs still match and continues at
+the first incomplete one.
+
+Per-page memo/SVG statuses are recorded as well. Whether a page artifact is
+actually up to date is decided by the output folder's build manifest.
+
+Usage:
+    checkpoint = RunCheckpoint.for_source(OUTPUT_ROOT, source_path)
+    analysis = checkpoint.load("analysis", inputs)
+    if analysis is None:
+        analysis = ...run phase...
+        checkpoint.save("analysis", inputs, analysis)
+"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from scripts.build_manifest import file_hash
+
+CHECKPOINT_DIR = ".checkpoints"
+CHECKPOINT_VERSION = 1
+
+# Phases in pipeline order; "pages" covers the parallel memo/SVG phase
+PHASES = ("analysis", "plan", "deck", "pages", "guide")
+
+
+class RunCheckpoint:
+    """Thread-safe, atomically persisted checkpoint for one source document."""
+
+    def __init__(self, path: Path, source_hash: str):
+        self.path = Path(path)
+        self.source_hash = source_hash
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {"version": CHECKPOINT_VERSION, "source_hash": source_hash, "phases": {}, "pages": {}}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == CHECKPOINT_VERSION and data.get("source_hash") == source_hash:
+                    self._data.update(data)
+            except (json.JSONDecodeError, OSError):
+                pass  # Corrupt checkpoint: start over
+
+    @classmethod
+    def for_source(cls, output_root: Path, source_path: Path) -> "RunCheckpoint":
+        source_hash = file_hash(source_path) or ""
+        return cls(Path(output_root) / CHECKPOINT_DIR / f"{source_hash[:16]}.json", source_hash)
+
+    @property
+    def output_dir(self) -> Optional[Path]:
+        value = self._data.get("output_dir")
+        return Path(value) if value else None
+
+    def set_output_dir(self, output_dir: Path):
+        with self._lock:
+            self._data["output_dir"] = str(output_dir)
+            self._save_locked()
+
+    def load(self, phase: str, inputs: str) -> Optional[Any]:
+        """Saved result of a phase, or None if missing or produced from other inputs."""
+        with self._lock:
+            entry = self._data["phases"].get(phase)
+        if not entry or entry.get("inputs") != inputs:
+            return None
+        return entry.get("data")
+
+    def save(self, phase: str, inputs: str, data: Any = None):
+        with self._lock:
+            self._data["phases"][phase] = {"inputs": inputs, "data": data, "updated": time.strftime("%Y-%m-%d %H:%M:%S")}
+            if phase in ("analysis", "plan", "deck"):
+                # Upstream output changed: later phases must be redone
+                for later in PHASES[PHASES.index(phase) + 1:]:
+                    self._data["phases"].pop(later, None)
+            self._save_locked()
+
+    def record_page(self, task_name: str, status: str):
+        """Record the outcome of a per-page task ("Memo Page 03" -> "Generated")."""
+        with self._lock:
+            self._data["pages"][task_name] = status
+            self._save_locked()
+
+    def page_statuses(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._data["pages"])
+
+    def first_incomplete_phase(self) -> Optional[str]:
+        """First phase without a checkpoint, or None if the run completed."""
+        with self._lock:
+            done = self._data["phases"]
+            return next((phase for phase in PHASES if phase not in done), None)
+
+    def _save_locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._data, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
@@ -0,0 +1,205 @@
+"""
+hedging - Speculative K-candidate generation for rework loops.
+
+The memo/SVG rework loops are sequential: generate, validate, generate
+again. When the first-pass acceptance rate is low, the page's latency is
+several full round-trips. A hedged round launches K candidates at once;
+each is validated as soon as it finishes, the first accepted one wins and
+the remaining candidates are cancelled: queued ones never start, and ones
+still generating get their cancel event set. generate(index, cancel) passes
+the event on to run_agent, which closes the candidate's stream, connection
+or CLI process and returns without retrying, pausing or exiting; a
+candidate that finishes anyway skips validation and is discarded.
+
+Extra candidates (beyond the first) are bounded by a per-run HedgeLimiter
+so hedging cannot multiply the load on a backend without limit. With K=1
+a round is a plain call in the caller's thread, identical to the old loop.
+
+Usage:
+    limiter = HedgeLimiter(max_in_flight=4)
+    round_ = run_candidates(
+        generate=lambda i, cancel: run_agent(..., cancel=cancel),
+        evaluate=lambda raw: (VALID, svg, "") or (REJECTED, None, feedback),
+        k=3, limiter=limiter, mode="CREATE_SLIDE_SVG"
+    )
+    if round_.winner: ...
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+VALID = "valid"
+ACCEPTABLE = "acceptable"
+REJECTED = "rejected"
+CANCELLED = "cancelled"
+
+# evaluate(raw) -> (verdict, value, feedback)
+Verdict = Tuple[str, Any, str]
+
+
+class HedgeLimiter:
+    """Per-run cap on extra candidate calls in flight across all pages."""
+
+    def __init__(self, max_in_flight: int = 4):
+        self.max_in_flight = max(0, int(max_in_flight))
+        self._slots = threading.BoundedSemaphore(self.max_in_flight) if self.max_in_flight else None
+
+    def try_acquire(self) -> bool:
+        return self._slots.acquire(blocking=False) if self._slots else False
+
+    def release(self):
+        if self._slots:
+            self._slots.release()
+
+
+@dataclass
+class Candidate:
+    """One generated candidate and its verdict."""
+    index: int
+    output: Any = None
+    verdict: str = REJECTED
+    value: Any = None
+    feedback: str = ""
+    seconds: float = 0.0
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class HedgeRound:
+    """Outcome of one round of (possibly hedged) generation."""
+    candidates: List[Candidate] = field(default_factory=list)  # Finished, in completion order
+    winner: Optional[Candidate] = None
+    launched: int = 0
+    wall_seconds: float = 0.0
+
+    @property
+    def cancelled(self) -> int:
+        return self.launched - sum(1 for c in self.candidates if c.verdict != CANCELLED)
+
+    @property
+    def sequential_seconds(self) -> float:
+        """Time the sequential loop would need for the same result.
+
+        Sum of every candidate up to the winner in launch order; candidates
+        still running when the winner landed count with the elapsed time
+        (a lower bound).
+        """
+        finished = {c.index: c.seconds for c in self.candidates if c.verdict != CANCELLED}
+        last = self.winner.index if self.winner else self.launched - 1
+        return sum(finished.get(i, self.wall_seconds) for i in range(last + 1))
+
+    @property
+    def last_output(self) -> Any:
+        outputs = [c.output for c in self.candidates if c.output is not None]
+        return outputs[-1] if outputs else None
+
+    def first(self, verdict: str) -> Optional[Candidate]:
+        return next((c for c in self.candidates if c.verdict == verdict), None)
+
+    @property
+    def feedback(self) -> str:
+        """Rework feedback for the next round, one line per rejected candidate."""
+        rejected = [c for c in self.candidates if c.verdict not in (VALID, CANCELLED)]
+        if len(rejected) == 1:
+            return rejected[0].feedback
+        return "\n".join(f"Candidate {c.index + 1}: {c.feedback}" for c in sorted(rejected, key=lambda c: c.index))
+
+
+def run_candidates(
+    generate: Callable[[int, Optional[threading.Event]], Any],
+    evaluate: Callable[[Any], Verdict],
+    k: int = 1,
+    limiter: Optional[HedgeLimiter] = None,
+    mode: str = ""
+) -> HedgeRound:
+    """Generate up to k candidates concurrently; the first VALID one wins.
+
+    generate(index, cancel) produces a raw candidate and should stop soon
+    after `cancel` is set (None with k=1); evaluate(raw) validates it.
+    The first candidate always runs; the others only if the limiter has a
+    free slot. With k=1 everything runs in the caller's thread.
+    """
+    result = HedgeRound()
+    start = time.perf_counter()
+
+    if k <= 1:
+        result.launched = 1
+        candidate = _run_one(0, generate, evaluate, None)
+        if candidate.error:
+            raise candidate.error
+        result.candidates.append(candidate)
+        result.winner = candidate if candidate.verdict == VALID else None
+        result.wall_seconds = time.perf_counter() - start
+        return result
+
+    cancel = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=k, thread_name_prefix=f"hedge-{mode or 'candidate'}")
+    futures = {executor.submit(_run_one, 0, generate, evaluate, cancel): 0}
+    for index in range(1, k):
+        if not (limiter and limiter.try_acquire()):
+            break
+        futures[executor.submit(_run_one, index, generate, evaluate, cancel, limiter)] = index
+    result.launched = len(futures)
+
+    pending = set(futures)
+    try:
+        while pending and result.winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                candidate = future.result()
+                result.candidates.append(candidate)
+                if candidate.verdict == VALID and result.winner is None:
+                    result.winner = candidate
+    finally:
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    result.wall_seconds = time.perf_counter() - start
+
+    errors = [c.error for c in result.candidates if c.error]
+    if errors and len(errors) == len(result.candidates) and not pending:
+        raise errors[0]
+
+    _record(result, mode)
+    return result
+
+
+def _run_one(
+    index: int,
+    generate: Callable[[int, Optional[threading.Event]], Any],
+    evaluate: Callable[[Any], Verdict],
+    cancel: Optional[threading.Event],
+    limiter: Optional[HedgeLimiter] = None
+) -> Candidate:
+    candidate = Candidate(index)
+    start = time.perf_counter()
+    try:
+        candidate.output = generate(index, cancel)
+        if cancel is not None and cancel.is_set():
+            candidate.verdict = CANCELLED  # Another candidate already won: skip validation
+        else:
+            candidate.verdict, candidate.value, candidate.feedback = evaluate(candidate.output)
+    except BaseException as e:  # Includes SystemExit from print_error in a worker thread
+        if cancel is not None and cancel.is_set():
+            candidate.verdict = CANCELLED  # Aborted because another candidate won
+        else:
+            candidate.error = e
+            candidate.feedback = f"Generation failed: {e}"
+    finally:
+        candidate.seconds = time.perf_counter() - start
+        if limiter:
+            limiter.release()
+    return candidate
+
+
+def _record(result: HedgeRound, mode: str):
+    from agents.performance import performance_monitor
+    performance_monitor.record_hedge(
+        mode,
+        candidates=result.launched,
+        wall_ms=result.wall_seconds * 1000,
+        sequential_ms=result.sequential_seconds * 1000,
+        won=result.winner is not None,
+        cancelled=result.cancelled
+    )
@@ -0,0 +1,383 @@
+"""
+mock_llm_server - Offline OpenAI-compatible stand-in for benchmarking.
+
+Serves /v1/models and /v1/chat/completions with canned, mode-aware
+responses that the orchestrator accepts (analysis/plan/deck JSON, memo
+Markdown, slide and conceptual SVGs, validator verdicts), so a full
+orchestrate.py run costs no model quota. Latency distribution, failure
+rate, validator reject rate and token throughput are configurable, and
+the server records calls per mode and how many requests were in flight.
+
+The mode is read from the orchestrator's prompt ("Your specific task is
+'MEMO'."); PLAN returns one page per '## ' heading of the source, so
+make_synthetic_source(path, slides=N) yields an N-slide deck.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8089 --median-ms 800 --failure-rate 0.02
+    python scripts/mock_llm_server.py --write-source bench.md --slides 50
+    python scripts/orchestrate.py --source bench.md --agent openai-compatible --api-base http://127.0.0.1:8089/v1
+
+    server = MockLLMServer(MockBehavior(median_ms=20, tokens_per_sec=2000)).start()
+    ...
+    server.stop(); print(server.stats())
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MODEL_ID = "mock-llm"
+
+_MODE = re.compile(r"Your specific task is '([A-Z_]+)'")
+_VAR = re.compile(r"^- (\w+): (.*)$", re.MULTILINE)
+_BLOCK = re.compile(r"(?:Provided )?Content for '([^']+)':\n```\n(.*?)\n```", re.DOTALL)
+
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 960 540" width="960" height="540">'
+    '<rect x="0" y="0" width="960" height="540" fill="#f8f9fb"/>'
+    '<rect x="60" y="150" width="840" height="300" rx="16" fill="#ffffff" stroke="#3b6fd8" stroke-width="3"/>'
+    '<text x="480" y="100" font-size="32" text-anchor="middle" fill="#1f2d3d">{title}</text>'
+    '<text x="480" y="300" font-size="22" text-anchor="middle" fill="#3b4a5a">{subtitle}</text>'
+    '</svg>'
+)
+
+
+@dataclass
+class MockBehavior:
+    """How the mock server behaves; per_mode_ms overrides the median latency per mode."""
+    median_ms: float = 800.0
+    distribution: str = "lognormal"      # lognormal, uniform or fixed
+    sigma: float = 0.5                   # lognormal shape; uniform spans median * (1 ± sigma)
+    per_mode_ms: Dict[str, float] = field(default_factory=dict)
+    failure_rate: float = 0.0            # HTTP 500 responses
+    rate_limit_rate: float = 0.0         # HTTP 429 responses
+    reject_rate: float = 0.0             # validator verdicts with is_valid false
+    tokens_per_sec: Optional[float] = None  # Generation throughput; None = no generation time
+    seed: Optional[int] = None
+
+    def latency_seconds(self, mode: str, rng: random.Random) -> float:
+        median = self.per_mode_ms.get(mode, self.median_ms) / 1000
+        if self.distribution == "fixed" or median <= 0:
+            return max(0.0, median)
+        if self.distribution == "uniform":
+            return rng.uniform(median * max(0.0, 1 - self.sigma), median * (1 + self.sigma))
+        return rng.lognormvariate(math.log(median), self.sigma)
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def make_synthetic_source(path: Path, slides: int = 10, paragraphs: int = 3) -> Path:
+    """Write a Markdown source with one '## ' section per slide."""
+    lines = [f"# Synthetic Benchmark Document ({slides} slides)", ""]
+    for n in range(1, slides + 1):
+        lines += [f"## Section {n}: Topic {n}", ""]
+        for p in range(paragraphs):
+            lines += [
+                f"Section {n} paragraph {p + 1} explains concept {n}.{p + 1} with supporting evidence, "
+                f"a worked example and its relation to section {max(1, n - 1)}. " * 3,
+                ""
+            ]
+    path = Path(path)
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def mode_response(mode: str, prompt: str, rng: random.Random, reject_rate: float = 0.0) -> str:
+    """Canned output for a mode, shaped like what the orchestrator parses."""
+    variables = dict(_VAR.findall(prompt))
+    blocks = dict(_BLOCK.findall(prompt))
+    source = next(iter(blocks.values()), "")
+    topic = variables.get("topic", "Topic")
+    page = variables.get("page", "01")
+
+    if mode.startswith("VALIDATE"):
+        valid = rng.random() >= reject_rate
+        return json.dumps({
+            "is_valid": valid, "is_acceptable": True, "quality_score": 9 if valid else 6,
+            "feedback": "" if valid else "Tighten the wording and add one concrete example."
+        })
+    if mode == "ANALYZE_SOURCE_DOCUMENT":
+        title = next((line[2:].strip() for line in source.splitlines() if line.startswith("# ")), "Mock Document")
+        return json.dumps({
+            "document_title": title, "project_title": "MockBenchmark", "document_authors": "Mock Author",
+            "summary": "A synthetic document used for benchmarking.", "overview": "Sections of synthetic text.",
+            "glossary": [{"term": "benchmark", "translation": "基準測試"}]
+        }, ensure_ascii=False)
+    if mode in ("PLAN", "PLAN_FROM_SLIDES"):
+        headings = [line[3:].strip() for line in source.splitlines() if line.startswith("## ")] or ["Overview"]
+        return json.dumps({"pages": [
+            {"page": n, "topic": heading, "key_points": [f"Point {n}.1", f"Point {n}.2"]}
+            for n, heading in enumerate(headings, 1)
+        ]}, ensure_ascii=False)
+    if mode == "DECK":
+        plan = json.loads(variables.get("plan_json") or "{}")
+        pages = plan.get("pages") or plan.get("slides") or []
+        return json.dumps({"slides": [
+            {"page": p.get("page"), "topic": p.get("topic"), "content": _slide_markdown(p.get("topic", "Topic"))}
+            for p in pages
+        ]}, ensure_ascii=False)
+    if mode == "DECK_SLIDE":
+        return json.dumps({"page": page, "topic": topic, "content": _slide_markdown(topic)}, ensure_ascii=False)
+    if mode == "MEMO":
+        return (
+            f"# {topic}\n\n"
+            + f"This page introduces {topic}. The speaker walks through the key points, "
+              "connects them to the previous page and closes with a short summary. " * 4
+        )
+    if mode in ("CREATE_SLIDE_SVG", "CREATE_CONCEPTUAL_SVG"):
+        subtitle = "Concept map" if mode == "CREATE_CONCEPTUAL_SVG" else "Key points"
+        return SVG_TEMPLATE.format(title=_xml_escape(topic[:30]), subtitle=subtitle)
+    return "OK"
+
+
+def _slide_markdown(topic: str) -> str:
+    return f"# {topic}\n\n- First key point\n- Second key point\n- Third key point\n"
+
+
+def _xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class MockLLMServer:
+    """Threaded OpenAI-compatible HTTP server with per-mode call statistics."""
+
+    def __init__(self, behavior: Optional[MockBehavior] = None, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior or MockBehavior()
+        self.host = host
+        self.port = port
+        self._rng = random.Random(self.behavior.seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}/v1"
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls: Dict[str, int] = defaultdict(int)
+            self._failures: Dict[str, int] = defaultdict(int)
+            self._in_flight = 0
+            self._max_in_flight = 0
+            self._busy_seconds = 0.0
+            self._completion_tokens = 0
+            self._constrained = 0
+            self._started = time.perf_counter()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls/failures per mode, peak and average requests in flight, tokens generated, schema-constrained calls."""
+        with self._lock:
+            wall = time.perf_counter() - self._started
+            return {
+                "calls": sum(self._calls.values()),
+                "calls_by_mode": dict(self._calls),
+                "failures": sum(self._failures.values()),
+                "max_in_flight": self._max_in_flight,
+                "avg_in_flight": round(self._busy_seconds / wall, 2) if wall > 0 else 0.0,
+                "busy_seconds": round(self._busy_seconds, 3),
+                "completion_tokens": self._completion_tokens,
+                "constrained_calls": self._constrained
+            }
+
+    def complete(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait out the sampled latency and decide the outcome; runs in the handler thread.
+
+        Failed requests are settled here; successful ones stay in flight
+        until _finish() once the response (or stream) has been sent.
+        """
+        prompt = "\n".join(m.get("content") or "" for m in request.get("messages") or [])
+        match = _MODE.search(prompt)
+        mode = match.group(1) if match else "UNKNOWN"
+        behavior = self.behavior
+        with self._lock:
+            self._calls[mode] += 1
+            self._constrained += any(key in request for key in ("response_format", "json_schema", "guided_json", "format"))
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            latency = behavior.latency_seconds(mode, self._rng)
+            roll = self._rng.random()
+            rng = random.Random(self._rng.random())
+        start = time.perf_counter()
+        status = 500
+        try:
+            time.sleep(latency)
+            if roll < behavior.failure_rate:
+                status = 500
+            elif roll < behavior.failure_rate + behavior.rate_limit_rate:
+                status = 429
+            else:
+                status = 200
+            content = mode_response(mode, prompt, rng, behavior.reject_rate) if status == 200 else ""
+            return {"status": status, "mode": mode, "content": content, "started": start}
+        finally:
+            if status != 200:
+                with self._lock:
+                    self._failures[mode] += 1
+                    self._in_flight -= 1
+                    self._busy_seconds += time.perf_counter() - start
+
+    def _finish(self, started: float, tokens: int):
+        """Settle a successful request's stats."""
+        with self._lock:
+            self._in_flight -= 1
+            self._busy_seconds += time.perf_counter() - started
+            self._completion_tokens += tokens
+
+    def start(self) -> "MockLLMServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like real inference servers
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": MODEL_ID, "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                result = server.complete(request)
+                if result["status"] != 200:
+                    message = "rate limited" if result["status"] == 429 else "mock server error"
+                    self._send_json(result["status"], {"error": {"message": message}})
+                    return
+                content = result["content"]
+                tokens = count_tokens(content)
+                # Stats are settled before the last byte goes out, so a client that
+                # has its reply never sees the request still in flight
+                settled = []
+
+                def finish():
+                    if not settled:
+                        settled.append(True)
+                        server._finish(result["started"], tokens)
+
+                try:
+                    if request.get("stream"):
+                        self._stream(content, finish)
+                    else:
+                        if server.behavior.tokens_per_sec:
+                            time.sleep(tokens / server.behavior.tokens_per_sec)
+                        finish()
+                        self._send_json(200, {
+                            "id": "chatcmpl-mock", "object": "chat.completion", "model": request.get("model") or MODEL_ID,
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                            "usage": {"prompt_tokens": count_tokens(json.dumps(request.get("messages"))), "completion_tokens": tokens}
+                        })
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client stopped reading (e.g. streaming early stop)
+                finally:
+                    finish()
+
+            def _stream(self, content: str, finish):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+                delay = 1 / server.behavior.tokens_per_sec if server.behavior.tokens_per_sec else 0
+                for piece in pieces:
+                    self._chunk(f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': piece}}]})}\n\n")
+                    if delay:
+                        time.sleep(delay)
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': {'completion_tokens': len(pieces)}})}\n\n")
+                finish()
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, text: str):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        self.reset_stats()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--median-ms", type=float, default=800, help="Median response latency")
+    parser.add_argument("--distribution", choices=("lognormal", "uniform", "fixed"), default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Latency spread")
+    parser.add_argument("--mode-ms", action="append", default=[], metavar="MODE=MS", help="Per-mode median latency, e.g. MEMO=3000")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Fraction of validator calls that reject")
+    parser.add_argument("--tokens-per-sec", type=float, default=None, help="Generation throughput")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--write-source", type=Path, help="Write a synthetic source document and exit")
+    parser.add_argument("--slides", type=int, default=10, help="Slides in the synthetic source")
+    args = parser.parse_args()
+
+    if args.write_source:
+        make_synthetic_source(args.write_source, args.slides)
+        print(f"Wrote {args.slides}-slide source to {args.write_source}")
+        return
+
+    per_mode = {mode: float(ms) for mode, ms in (item.split("=", 1) for item in args.mode_ms)}
+    behavior = MockBehavior(
+        median_ms=args.median_ms, distribution=args.distribution, sigma=args.sigma, per_mode_ms=per_mode,
+        failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate, reject_rate=args.reject_rate,
+        tokens_per_sec=args.tokens_per_sec, seed=args.seed
+    )
+    server = MockLLMServer(behavior, args.host, args.port).start()
+    print(f"Mock LLM server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(server.stats()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
-import sys, os, json, subprocess, shutil, argparse, webbrowser, re, time
+import sys, os, json, subprocess, shutil, argparse, webbrowser, re, time, atexit, threading
 from pathlib import Path
 import yaml
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Ensure project root is in Python path for agent imports
 ROOT = Path(__file__).resolve().parents[1]
@@ -25,6 +24,7 @@ PROMPTS_DIR = ROOT / "scripts" / "prompts"
 ERROR_LOG_PATH = ROOT / "error.log"
 PAUSE_LOCK_PATH = ROOT / ".pause_lock"
 RUNTIME_CONFIG_PATH = ROOT / ".runtime_config.json"
+DEFAULT_CACHE_DIR = ROOT / ".cache" / "responses"
 
 # --- Research Logger ---
 class ResearchLogger:
@@ -173,6 +173,283 @@ def fix_svg_layout(svg_code: str) -> str:
             
     return svg_code
 
+def build_source_index(source_path: Path, output_dir: Path, cfg: dict):
+    """Build (or load) the BM25 passage index used for per-page prompts."""
+    index_cfg = cfg.get("source_index") or {}
+    if not index_cfg.get("enabled", True):
+        return None
+    from scripts.source_index import SourceIndex, DEFAULT_CHUNK_CHARS
+    try:
+        index = SourceIndex.load_or_build(source_path, output_dir / ".source_index.json", index_cfg.get("chunk_chars", DEFAULT_CHUNK_CHARS))
+    except (OSError, UnicodeDecodeError) as e:
+        print_warning(f"Source index unavailable, memos will use the full source: {e}")
+        return None
+    stats = index.stats()
+    print_info(f"Source index: {stats['passages']} passages from {stats['source_chars']} chars (top {index_cfg.get('top_k', 6)} per page)")
+    return index
+
+# --- Response Cache ---
+_response_cache = None
+
+def init_response_cache(cfg: dict):
+    """Set up the on-disk response cache unless disabled by --no-cache or config."""
+    global _response_cache
+    cache_cfg = cfg.get("response_cache") or {}
+    if cfg.get("no_cache") or not cache_cfg.get("enabled", True):
+        _response_cache = None
+        print_info("Response cache disabled")
+        return
+
+    from agents.cache import ResponseCache
+    cache_dir = Path(cfg.get("cache_dir") or cache_cfg.get("dir") or DEFAULT_CACHE_DIR)
+    if not cache_dir.is_absolute():
+        cache_dir = ROOT / cache_dir
+    try:
+        _response_cache = ResponseCache(
+            cache_dir,
+            max_size_mb=cache_cfg.get("max_size_mb", 512),
+            max_age_days=cache_cfg.get("max_age_days", 30)
+        )
+        print_info(f"Response cache: {cache_dir}")
+    except OSError as e:
+        _response_cache = None
+        print_warning(f"Response cache unavailable ({e}), continuing without cache")
+
+# --- Build Manifest ---
+_build_manifest = None
+
+def init_build_manifest(output_dir: Path):
+    """Load the output folder's input-hash manifest for incremental regeneration."""
+    global _build_manifest
+    from scripts.build_manifest import BuildManifest
+    _build_manifest = BuildManifest(output_dir)
+
+def prompt_version(*modes: str) -> str:
+    """Hash of the prompt files behind the given modes (incl. the safety preamble)."""
+    from scripts.build_manifest import BuildManifest
+    specs = parse_agent_specs()
+    return BuildManifest.hash_inputs([specs.get(m, "") for m in ("_SAFETY_PREAMBLE",) + modes])
+
+def artifact_is_fresh(key: str, path: Path, inputs: str, adopt_min_size: int | None = None) -> bool:
+    """True if `path` was built from `inputs` and can be skipped.
+
+    With adopt_min_size, a file from before the manifest existed (no entry
+    yet) is adopted as up to date if it is larger than that many bytes.
+    """
+    if _build_manifest is None:
+        return adopt_min_size is not None and path.exists() and path.stat().st_size > adopt_min_size
+    if _build_manifest.is_fresh(key, path, inputs):
+        return True
+    if adopt_min_size is not None and _build_manifest.get(key) is None and path.exists() and path.stat().st_size > adopt_min_size:
+        _build_manifest.record(key, path, inputs)
+        return True
+    return False
+
+def record_artifact(key: str, path: Path, inputs: str, status: str = "generated"):
+    if _build_manifest is not None:
+        _build_manifest.record(key, path, inputs, status)
+
+# --- Hedged Generation ---
+_hedge_limiter = None
+
+def init_hedging(cfg: dict):
+    """Enable hedged K-candidate generation if configured (see 'hedging' in config.yaml)."""
+    global _hedge_limiter
+    hedge_cfg = cfg.get("hedging") or {}
+    if hedge_cfg.get("enabled", False):
+        from scripts.hedging import HedgeLimiter
+        _hedge_limiter = HedgeLimiter(hedge_cfg.get("max_in_flight", 4))
+        modes = ", ".join(f"{m}×{n}" for m, n in (hedge_cfg.get("modes") or {}).items() if n > 1)
+        print_info(f"Hedged generation enabled ({modes or 'no modes'}; max {_hedge_limiter.max_in_flight} extra calls in flight)")
+
+def hedge_candidates(cfg: dict, mode: str) -> int:
+    """Number of concurrent candidates per rework round for a mode (1 = sequential)."""
+    if _hedge_limiter is None:
+        return 1
+    return max(1, int(((cfg.get("hedging") or {}).get("modes") or {}).get(mode, 1)))
+
+def candidate_vars(vars_map: dict, index: int, k: int) -> dict:
+    """Give each extra candidate a distinct prompt, so it gets its own sample and cache entry."""
+    if index == 0:
+        return vars_map
+    return {**vars_map, "candidate": f"{index + 1} of {k} (offer a different take from the other candidates)"}
+
+# --- Metrics Export ---
+_metrics_exporter = None
+
+def init_metrics_export(cfg: dict):
+    """Start the Prometheus metrics endpoint / textfile writer if configured (see 'metrics_export')."""
+    global _metrics_exporter
+    export_cfg = dict(cfg.get("metrics_export") or {})
+    if not export_cfg.get("enabled", False):
+        return
+    from agents.metrics_export import MetricsExporter
+    if export_cfg.get("textfile"):
+        export_cfg["textfile"] = str(ROOT / export_cfg["textfile"])  # Relative paths are under the project root
+    try:
+        _metrics_exporter = MetricsExporter.from_config(export_cfg, process="orchestrate").start()
+    except (OSError, ValueError) as e:
+        print_warning(f"Metrics export disabled: {e}")
+        return
+    target = _metrics_exporter.url if _metrics_exporter.mode == "http" else _metrics_exporter.textfile
+    print_info(f"📈 Exporting metrics to {target}")
+
+# --- Tracing ---
+_trace_path = None
+_phase = None  # (name, trace span, start time)
+
+def init_tracing(cfg: dict):
+    """Enable span tracing if configured (see 'tracing' in config.yaml) or --trace is given."""
+    trace_cfg = cfg.get("tracing") or {}
+    if not (cfg.get("trace") or trace_cfg.get("enabled", False)):
+        return
+    from agents.tracing import tracer, DEFAULT_MAX_EVENTS
+    tracer.reset()
+    tracer.enable(trace_cfg.get("max_events", DEFAULT_MAX_EVENTS))
+    atexit.register(save_trace)  # Failed runs (print_error exits) still leave a trace
+    print_info("🧭 Tracing enabled; trace.json will be written to the output directory")
+
+def mark_phase(name: str | None, success: bool = True):
+    """Close the current phase (trace span and recorded duration) and start the next; None only closes."""
+    global _phase
+    from agents.performance import performance_monitor
+    from agents.tracing import tracer
+    if _phase:
+        phase_name, span, start = _phase
+        tracer.end(span)
+        performance_monitor.record_pipeline_step("orchestrate", phase_name, (time.perf_counter() - start) * 1000, success)
+    _phase = (name, tracer.begin(name, "phase"), time.perf_counter()) if name else None
+
+def set_trace_output(output_dir: Path):
+    global _trace_path
+    _trace_path = output_dir / "trace.json"
+
+def save_trace() -> Path | None:
+    """Write trace.json to the run's output directory (no-op if tracing is off)."""
+    from agents.tracing import tracer
+    if _trace_path is None:
+        return None
+    mark_phase(None)
+    try:
+        return tracer.write(_trace_path)
+    except OSError as e:
+        print_warning(f"Failed to write {_trace_path}: {e}")
+        return None
+
+def write_output(path: Path, content: str):
+    """Write an output file, traced as an 'io' span."""
+    from agents.tracing import tracer
+    with tracer.span(f"write {path.name}", "io", bytes=len(content)):
+        path.write_text(content, encoding="utf-8")
+
+# --- Run History ---
+_run_history = None
+_run_info = {}
+
+def init_run_history(cfg: dict):
+    """Record this run's metrics summary in the run history database (see 'run_history')."""
+    global _run_history
+    history_cfg = cfg.get("run_history") or {}
+    if not history_cfg.get("enabled", True):
+        return
+    from scripts.run_history import RunHistory
+    _run_history = RunHistory(ROOT / history_cfg.get("path", ".cache/run_history.sqlite"))
+    _run_info.update({
+        "source": Path(cfg.get("source") or "").name, "agent": cfg.get("agent"),
+        "model": cfg.get("gemini_model"), "prompts": prompt_version(*parse_agent_specs())
+    })
+    atexit.register(save_run_history, "failed")  # Runs that exit early are kept out of the baseline
+
+def save_run_history(status: str = "complete"):
+    """Store the run summary once; later calls are no-ops."""
+    global _run_history
+    if _run_history is None:
+        return
+    from agents.performance import performance_monitor
+    from scripts.run_history import summarize_snapshot
+    history, _run_history = _run_history, None
+    mark_phase(None, success=status == "complete")
+    if status == "complete" and _cassette is not None and _cassette.replaying:
+        status = "replay"  # Model latency was simulated; kept out of the baseline of real runs
+    try:
+        run_id = history.record("orchestrate", summarize_snapshot(performance_monitor.snapshot()), status, **_run_info)
+    except Exception as e:  # sqlite3.Error / OSError: history must never fail a run
+        print_warning(f"Failed to record run history: {e}")
+        return
+    if status == "complete":
+        print_info(f"📚 Run #{run_id} recorded; check for regressions with: python scripts/run_history.py compare")
+
+# --- Cassette ---
+_cassette = None
+_cassette_on_miss = "error"
+
+def init_cassette(cfg: dict):
+    """Record agent calls with --record, or answer them from a past run with --replay (see 'cassette')."""
+    global _cassette, _cassette_on_miss
+    cassette_cfg = cfg.get("cassette") or {}
+    _cassette = None
+    _cassette_on_miss = cassette_cfg.get("on_miss", "error")
+    from agents.cassette import Cassette
+    if cfg.get("replay"):
+        replay_latency = cfg.get("replay_latency") or cassette_cfg.get("replay_latency", False)
+        latency_scale = cfg.get("latency_scale") or cassette_cfg.get("latency_scale", 1.0)
+        try:
+            _cassette = Cassette.load(cfg["replay"], replay_latency=replay_latency, latency_scale=latency_scale)
+        except (OSError, ValueError, KeyError) as e:
+            print_error(f"Cannot load cassette {cfg['replay']}: {e}")
+        timing = f"recorded latencies ×{latency_scale}" if replay_latency else "no latency"
+        print_info(f"📼 Replaying {_cassette.stats()['entries']} recorded calls from {_cassette.path} ({timing})")
+    elif cfg.get("record") or cassette_cfg.get("record", False):
+        _cassette = Cassette()  # Path is set once the output directory is known
+        print_info("📼 Recording agent calls; cassette.jsonl will be written to the output directory")
+
+def set_cassette_output(output_dir: Path):
+    from agents.cassette import CASSETTE_FILENAME
+    if _cassette is not None and not _cassette.replaying:
+        _cassette.set_path(output_dir / CASSETTE_FILENAME)
+
+# --- Prompt Budget ---
+_prompt_packer = None
+
+def init_prompt_packer(cfg: dict):
+    """Fit prompts into each model's context window unless disabled (see 'prompt_budget')."""
+    global _prompt_packer
+    budget_cfg = cfg.get("prompt_budget") or {}
+    if not budget_cfg.get("enabled", True):
+        _prompt_packer = None
+        return
+    from agents.prompt_packer import PromptPacker
+    _prompt_packer = PromptPacker.from_config(budget_cfg)
+
+# --- Agent Session ---
+_agent_session = None
+
+def get_agent_session(cfg: dict | None = None):
+    """Return the run-scoped AgentSession, creating it on first use.
+
+    Config is parsed once; endpoint detection and adapter construction are
+    shared by every run_agent call and worker thread.
+    """
+    global _agent_session
+    if _agent_session is None or cfg is not None:
+        from agents.session import AgentSession
+        overrides = {}
+        if cfg and cfg.get("api_base"):
+            overrides["api_base"] = cfg["api_base"]
+        if cfg and cfg.get("rate_limits"):
+            # Shared bucket state lives under the project root, like the response cache
+            rate_cfg = dict(cfg["rate_limits"])
+            rate_cfg["dir"] = str(ROOT / rate_cfg.get("dir", ".cache/ratelimit"))
+            overrides["rate_limits"] = rate_cfg
+        if cfg and cfg.get("page_workers"):
+            # --workers pins the limit instead of adapting it
+            n = cfg["page_workers"]
+            overrides["concurrency"] = {"initial": n, "min": n, "max": n}
+        _agent_session = AgentSession.from_config_file(
+            CONFIG_PATH, overrides=overrides, info=print_info, warning=print_warning
+        )
+    return _agent_session
+
 # --- AI & Command Execution ---
 _agent_specs_cache = None
 def parse_agent_specs():
@@ -231,151 +508,55 @@ def wait_for_user_action() -> str | None:
     
     return None
 
-def run_agent(agent: str, mode: str, vars_map: dict, retries: int = 3, delay: int = 5, model_name: str | None = None) -> str:
+def next_usable_route(session, routes: list, mode: str):
+    """Pop routes until one yields an adapter; returns (resolved, agent) or (None, None)."""
+    while routes:
+        route = routes.pop(0)
+        try:
+            resolved = session.resolve_route(route)
+            breaker = session.get_breaker(resolved)
+            if breaker and not breaker.allows_calls():
+                print_warning(f"Route {route.describe()} for {mode} skipped: circuit breaker open")
+                continue
+            return resolved, session.get_agent(resolved)
+        except Exception as e:
+            print_warning(f"Route {route.describe()} for {mode} is unavailable: {e}")
+    return None, None
+
+def run_agent(agent: str, mode: str, vars_map: dict, retries: int = 3, delay: int = 5, model_name: str | None = None, cancel: threading.Event | None = None) -> str:
     """Execute agent with given prompt and mode.
     
     Supports both CLI-based agents (antigravity, claude) and API-based agents
     (openai-compatible, openai).
     
     Backward compatible with gemini CLI via automatic mapping.
+    
+    Setting `cancel` (e.g. for a losing hedged candidate) aborts the call in
+    flight and raises AgentCancelledError, with no fallback, retry, pause or exit.
     """
-    from agents import AgentFactory
-    from agents.exceptions import AgentAuthenticationError, AgentQuotaExceededError
+    from agents.error_parser import parse_cli_error
     from agents.logging_config import agent_logger
+    from agents.performance import performance_monitor
+    from agents.rate_limit import estimate_tokens
+    from agents.retry import jittered_delay
+    from agents.exceptions import AgentCancelledError, CircuitOpenError
+    from agents.tracing import tracer
     
     # Backward compatibility: map "gemini" to "antigravity"
     if agent.lower().strip() == "gemini":
         print_info("⚠️  Gemini CLI is deprecated. Using Antigravity CLI.")
         agent = "antigravity"
     
-    # Load config to get agent-specific settings
-    config_data = {}
-    if CONFIG_PATH.exists():
-        try:
-            config_data = yaml.safe_load(CONFIG_PATH.read_text(encoding='utf-8'))
-        except Exception:
-            pass
-    
-    # Define CLI agent types (these use their own CLI, not API endpoints)
-    cli_agents = ["antigravity", "claude"]
-    
-    # For OpenAI-compatible agents, auto-detect endpoint if not configured
-    detected_api_base = None
-    detected_model = None
-    if agent.lower().strip() in ["openai-compatible", "ollama", "llamacpp"]:
-        from agents.model_detector import ModelDetector, default_detector
-        
-        # Get custom endpoint from config if specified
-        custom_endpoint = config_data.get("agent_config", {}).get("api_base")
-        
-        if custom_endpoint:
-            print_info(f"🔹 Using configured endpoint: {custom_endpoint}")
-            # Create a detector for just this endpoint
-            detector = ModelDetector(endpoints=[custom_endpoint], verbose=True)
-            result = detector.detect_endpoint(custom_endpoint.rstrip('/'))
-            
-            if result.available:
-                detected_api_base = custom_endpoint
-                if "/v1" not in detected_api_base:
-                    detected_api_base += "/v1"
-                print_info(f"✅ Configured endpoint is valid ({result.type})")
-                
-                if result.models:
-                    detected_model = result.models[0].name
-                    print_info(f"🔹 Using model from config: {detected_model}")
-            else:
-                print_warning(f"⚠️ Configured endpoint failed: {result.error}")
-                print_info(f"🔹 Falling back to auto-detection...")
-                detected_api_base = None
-                detected_model = None
-        
-        # Auto-detect if no custom endpoint or custom failed
-        if not detected_api_base:
-            print_info(f"🔹 Scanning for local AI servers...")
-            try:
-                endpoints = default_detector.detect_all()
-                available = [e for e in endpoints if e.available]
-                if available:
-                    first_endpoint = available[0]
-                    detected_api_base = first_endpoint.url
-                    if "/v1" not in detected_api_base:
-                        detected_api_base += "/v1"
-                    print_info(f"🔹 Auto-detected {first_endpoint.type} at {detected_api_base}")
-                    
-                    if first_endpoint.models:
-                        detected_model = first_endpoint.models[0].name
-                        print_info(f"🔹 Auto-detected model: {detected_model}")
-                else:
-                    print_warning(f"⚠️ No local AI servers found")
-            except Exception as e:
-                print_warning(f"⚠️ Auto-detection failed: {e}")
-    
-    # Get API base from config or detection
-    # CLI agents don't need api_base
-    api_base = None
-    if agent.lower().strip() not in cli_agents:
-        api_base = config_data.get("agent_config", {}).get("api_base") or detected_api_base
-        if not api_base:
-            api_base = "http://localhost:11434/v1"  # Default Ollama
-            print_warning(f"⚠️ Using default Ollama endpoint: {api_base}")
-    
-    # Determine effective model based on agent type
-    effective_model = model_name
-    
-    # CLI agents: Don't run auto-detection for CLI agents - they use their own CLI
-    if agent.lower().strip() in cli_agents:
-        # CLI agents use their own command-line tools, not API endpoints
-        # No auto-detection needed
-        detected_api_base = None
-        detected_model = None
-        print_info(f"🔹 Using {agent} CLI mode (no API endpoint needed)")
-    
-    # CLI agents: Only use model_name if it's valid for this agent
-    if agent.lower().strip() in ["antigravity", "claude"]:
-        # CLI agents have their own default models
-        # Don't pass gemini model names to claude, and vice versa
-        if model_name:
-            if agent.lower().strip() == "claude" and "gemini" in model_name.lower():
-                print_info(f"⚠️ Ignoring gemini model name for Claude, using default")
-                effective_model = None
-            elif agent.lower().strip() == "antigravity" and "claude" in model_name.lower():
-                print_info(f"⚠️ Ignoring claude model name for Antigravity, using default")
-                effective_model = None
-        else:
-            print_info(f"🔹 Using {agent} default model")
-    
-    # OpenAI-compatible agents: Use detected model or let adapter handle it
-    elif agent.lower().strip() in ["openai-compatible", "ollama", "llamacpp"]:
-        if detected_model:
-            effective_model = detected_model
-            print_info(f"🔹 Using detected model: {detected_model}")
-        elif model_name and "gemini" in model_name.lower():
-            # Don't use gemini model names for local models
-            print_info(f"⚠️ Ignoring gemini model name, will use detected model")
-            effective_model = None
-        elif model_name and "claude" in model_name.lower():
-            print_info(f"⚠️ Ignoring claude model name for local model")
-            effective_model = None
-    
-    # Build agent config
-    agent_config = {
-        "agent": agent.lower().strip(),
-        "agent_config": {
-            "model": effective_model,
-            "api_base": api_base,
-            "api_key": config_data.get("agent_config", {}).get("api_key")
-        }
-    }
-    
-    print_info(f"🔹 Agent config: model={effective_model or 'default'}, api_base={api_base}"), 
-    
-    # Create agent instance
-    try:
-        agent_instance = AgentFactory.create(agent_config)
-        print_info(f"✅ Created agent instance: {agent_instance.NAME}")
-    except Exception as e:
-        print_error(f"Failed to create agent '{agent}': {e}")
+    # Resolved config, detected endpoint/model and adapters are shared per run.
+    # The mode's routing chain (config.yaml 'routing') ends with the default agent.
+    session = get_agent_session()
+    routes = session.routes_for(mode, agent, model_name)
+    resolved, agent_instance = next_usable_route(session, routes, mode)
+    if agent_instance is None:
+        print_error(f"Failed to create agent '{agent}' for {mode}: no usable route")
         return ""
+    effective_model = resolved.model
+    controller = session.get_controller(resolved)
 
     instructions = parse_agent_specs().get(mode)
     if not instructions: print_error(f"在 AGENTS.md 中找不到模式 '{mode}'。")
@@ -383,9 +564,15 @@ def run_agent(agent: str, mode: str, vars_map: dict, retries: int = 3, delay: in
     safety_preamble_path = PROMPTS_DIR / "_SAFETY_PREAMBLE.md"
     safety_preamble = safety_preamble_path.read_text(encoding="utf-8").strip() if safety_preamble_path.exists() else "You are an AI assistant."
 
-    prompt_parts = [safety_preamble, f"Your specific task is '{mode}'.", "--- INSTRUCTIONS ---", instructions, "--- CONTEXT & INPUTS ---"]
+    from agents.prompt_packer import Section, section_kind
+    sections = [
+        Section("preamble", safety_preamble), Section("framing", f"Your specific task is '{mode}'."),
+        Section("framing", "--- INSTRUCTIONS ---"), Section("instructions", instructions), Section("framing", "--- CONTEXT & INPUTS ---")
+    ]
     log_inputs = {}
     rework_feedback = vars_map.get("rework_feedback")
+    if rework_feedback:
+        performance_monitor.record_rework(mode)
 
     for key, value in vars_map.items():
         if key == "rework_feedback":
@@ -393,50 +580,149 @@ def run_agent(agent: str, mode: str, vars_map: dict, retries: int = 3, delay: in
             continue
         if key.endswith("_path") and value and os.path.exists(value):
             file_content = Path(value).read_text(encoding='utf-8')
-            prompt_parts.append(f"Content for '{os.path.basename(value)}':\n```\n{file_content}\n```")
+            sections.append(Section(key, f"Content for '{os.path.basename(value)}':\n```\n{file_content}\n```", section_kind(key)))
             log_inputs[key] = f"[File Content from {os.path.basename(value)}]"
         elif key.endswith("_content") and value: 
-            prompt_parts.append(f"Provided Content for '{key}':\n```\n{value}\n```")
+            sections.append(Section(key, f"Provided Content for '{key}':\n```\n{value}\n```", section_kind(key)))
             log_inputs[key] = value
         else: 
-            prompt_parts.append(f"- {key}: {value}")
+            sections.append(Section(key, f"- {key}: {value}"))
             log_inputs[key] = value
     
     if rework_feedback:
-        prompt_parts.append("\n" + "="*40 + "\n!!! CRITICAL FEEDBACK !!!\n" + rework_feedback + "\n" + "="*40 + "\n")
-
-    prompt_parts.append("--- YOUR TASK ---")
-    prompt_parts.append("Generate your response. Output ONLY the content required (e.g., pure JSON, pure Markdown). No conversational text.")
-    final_prompt = "\n".join(prompt_parts)
-
+        sections.append(Section("framing", "\n" + "="*40 + "\n!!! CRITICAL FEEDBACK !!!"))
+        sections.append(Section("rework_feedback", rework_feedback, "feedback"))
+        sections.append(Section("framing", "="*40 + "\n"))
+
+    sections.append(Section("framing", "--- YOUR TASK ---"))
+    sections.append(Section("framing", "Generate your response. Output ONLY the content required (e.g., pure JSON, pure Markdown). No conversational text."))
+
+    # Fit the prompt into the primary route's context window; fallbacks reuse it
+    call_options = {"workspace": str(ROOT)}  # Pass project root as workspace
+    if cancel is not None:
+        call_options["cancel"] = cancel
+    if _prompt_packer:
+        packed = _prompt_packer.pack(sections, resolved.agent, effective_model, mode, vars_map.get("page"), resolved.api_base)
+        call_options["max_tokens"] = packed.output_tokens
+        rlog_data(f"Prompt Tokens ({mode})", {
+            **packed.tokens, "total": packed.total, "output_reserved": packed.output_tokens,
+            "context_window": packed.context_window, "trimmed": packed.trimmed
+        })
+        if packed.trimmed:
+            trimmed = ", ".join(f"{name} -{tokens}" for name, tokens in packed.trimmed.items())
+            print_info(f"✂️  {mode} prompt trimmed to fit {packed.context_window} tokens ({trimmed})")
+    final_prompt = "\n".join(section.text for section in sections)
+
+    # Replay answers every call from the cassette (bypassing the response cache)
+    replaying = _cassette is not None and _cassette.replaying
+    recording = _cassette is not None and not replaying
+    if replaying and not _cassette.has(mode, final_prompt):
+        if _cassette_on_miss != "live":
+            print_error(f"No recorded response for {mode} in {_cassette.path} (inputs or prompts changed since recording?)")
+            return ""
+        print_warning(f"No recorded response for {mode}; calling {resolved.agent} instead")
+        replaying = False
+
+    cache_key = None
+    if _response_cache and not replaying:
+        cache_key = _response_cache.make_key(resolved.agent, effective_model, mode, final_prompt)
+        cached = _response_cache.get(cache_key)
+        if cached:
+            performance_monitor.record_cache_hit(mode)
+            tracer.instant(f"cache hit {mode}", "cache", mode=mode)
+            print_info(f"💾 Cache hit for {mode} ({len(cached)} chars)")
+            rlog_data(f"Agent Inputs ({mode})", log_inputs)
+            rlog_block(f"Agent Raw Output ({mode}, cached)", cached)
+            if recording:
+                _cassette.record(mode, final_prompt, response=cached, agent=resolved.agent, model=effective_model, cached=True)
+            return cached
+        performance_monitor.record_cache_miss(mode)
+
+    session.retry_budget.record_call()
     attempt = 0
     while attempt < retries:
-        # Log agent call with timing - use effective_model, not original model_name
-        timing = agent_logger.log_agent_call(
-            agent_instance.NAME, mode, effective_model, attempt + 1, retries
-        )
-        
+        if cancel is not None and cancel.is_set():
+            raise AgentCancelledError(agent_instance.NAME)
+        timing = None  # Set once the call is dispatched; waits are recorded separately
         print_info(f"Calling {agent_instance.NAME} for {mode}... (Attempt {attempt + 1}/{retries})")
         print_info(f"  ℹ️  這可能需要 1-10 分鐘，請耐心等待...")
         rlog_data(f"Agent Inputs ({mode})", log_inputs)
 
+        # Validator calls get their own category so they can be told apart in the trace
+        call_span = tracer.begin(
+            mode, "validator" if mode.startswith("VALIDATE") else "agent",
+            agent=resolved.agent, model=effective_model or "default", attempt=attempt + 1
+        )
         try:
-            output = agent_instance.execute(
-                prompt=final_prompt,
-                mode=mode,
-                max_retries=retries,  # Let adapter handle retries for local models
-                retry_delay=delay,
-                options={
-                    "workspace": str(ROOT)  # Pass project root as workspace
-                }
+            # Open circuit: fail fast before waiting on rate limits or slots
+            breaker = session.get_breaker(resolved)
+            if breaker:
+                breaker.before_call()
+            # Per-backend rate limit first (no concurrency slot is held while waiting)
+            rate_limiter = session.get_rate_limiter(resolved)
+            if rate_limiter:
+                prompt_tokens = estimate_tokens(final_prompt)
+                with tracer.span("rate_limit_wait", "wait"):
+                    waited = rate_limiter.acquire(prompt_tokens)
+                performance_monitor.record_rate_limit_wait(session.backend_key(resolved), waited * 1000)
+            # Per-backend adaptive concurrency: wait for a slot, report the outcome
+            with tracer.span("slot_wait", "wait"):
+                generation = controller.acquire()
+            # Log agent call with timing - use effective_model, not original model_name
+            timing = agent_logger.log_agent_call(
+                agent_instance.NAME, mode, effective_model, attempt + 1, retries
             )
+            call_start = time.time()
+            try:
+                if replaying:
+                    output = _cassette.replay(mode, final_prompt)
+                else:
+                    output = agent_instance.execute(
+                        prompt=final_prompt,
+                        mode=mode,
+                        max_retries=1,  # Retries happen here, under the breaker, budget and jittered backoff
+                        retry_delay=delay,
+                        options=call_options
+                    )
+            except Exception as e:
+                if cancel is not None and cancel.is_set():
+                    # Abandoned by the caller: not a backend failure
+                    if breaker:
+                        breaker.on_cancel()
+                    raise AgentCancelledError(agent_instance.NAME) from e
+                if recording:
+                    _cassette.record(mode, final_prompt, error=str(e), latency_ms=(time.time() - call_start) * 1000, agent=resolved.agent, model=effective_model)
+                controller.on_error(generation, parse_cli_error(str(e)).category)
+                if breaker:
+                    breaker.on_failure(str(e))
+                raise
+            finally:
+                controller.release()
+            latency_ms = (time.time() - call_start) * 1000
+            controller.on_success(generation, latency_ms, mode, estimate_tokens(output))
+            if recording:
+                _cassette.record(mode, final_prompt, response=output, latency_ms=latency_ms, agent=resolved.agent, model=effective_model)
+            if breaker:
+                breaker.on_success()
+            if rate_limiter:
+                rate_limiter.record_usage(prompt_tokens, prompt_tokens + estimate_tokens(output))
             
             agent_logger.log_agent_response(timing, True, len(output))
+            performance_monitor.record_tokens(mode, estimate_tokens(final_prompt), estimate_tokens(output))
+            tracer.end(call_span, chars=len(output))
             rlog_block(f"Agent Raw Output ({mode})", output)
-            if output: return output
+            if output:
+                if cache_key:
+                    _response_cache.put(cache_key, output, {"agent": resolved.agent, "model": effective_model, "mode": mode})
+                return output
             attempt += 1
         except Exception as e:
-            agent_logger.log_agent_response(timing, False, error_msg=str(e))
+            if cancel is not None and cancel.is_set():
+                tracer.end(call_span, error="cancelled")
+                raise AgentCancelledError(agent_instance.NAME) from e
+            if timing is not None:  # Breaker rejections never reached the agent; counted by the breaker
+                agent_logger.log_agent_response(timing, False, error_msg=str(e))
+            tracer.end(call_span, error=str(e)[:200])
             print_error(f"Agent execution failed: {str(e)}", exit_code=None)
             
             # Check if it's an authentication or quota error
@@ -446,65 +732,77 @@ def run_agent(agent: str, mode: str, vars_map: dict, retries: int = 3, delay: in
             elif "quota" in error_str or "exhausted" in error_str:
                 print_error("API quota 已用盡。", exit_code=None)
             
-            new_model = wait_for_user_action()
-            if new_model:
-                agent_config["agent_config"]["model"] = new_model
-                agent_instance = AgentFactory.create(agent_config)
+            # Next route in the mode's fallback chain before asking the user
+            fallback, fallback_instance = next_usable_route(session, routes, mode)
+            if fallback_instance is not None:
+                print_warning(f"Falling back to {fallback.agent} (model={fallback.model or 'default'}) for {mode}")
+                tracer.instant(f"fallback {mode}", "retry", agent=fallback.agent, model=fallback.model or "default")
+                resolved, agent_instance, effective_model = fallback, fallback_instance, fallback.model
+                controller = session.get_controller(resolved)
+                if cache_key:
+                    cache_key = _response_cache.make_key(resolved.agent, effective_model, mode, final_prompt)
+                attempt = 0
+                continue
+            
+            if isinstance(e, CircuitOpenError):
+                tracer.instant(f"circuit open {mode}", "retry", backend=e.backend)
+                break  # Fast-fail: no pause or retries against an open circuit
             
             attempt += 1
-
-        if attempt < retries: time.sleep(delay)
+            # Earlier failures are retried automatically; pause for the user before the last attempt
+            if attempt + 1 >= retries:
+                new_model = wait_for_user_action()
+                if new_model:
+                    agent_instance = session.get_agent(session.with_model(resolved, new_model))
+                    effective_model = new_model
+                    if cache_key:
+                        cache_key = _response_cache.make_key(resolved.agent, effective_model, mode, final_prompt)
+
+        if attempt < retries:
+            if not session.retry_budget.try_spend():
+                print_warning(f"Retry budget for this run is exhausted; giving up on {mode}")
+                break
+            with tracer.span("retry_backoff", "retry", mode=mode, attempt=attempt):
+                if cancel is not None:
+                    cancel.wait(jittered_delay(attempt - 1, delay))
+                else:
+                    time.sleep(jittered_delay(attempt - 1, delay))
 
     print_error(f"AI failed to generate a response for {mode} after {retries} attempts.", exit_code=1)
     return ""
 
 def parse_ai_json_output(output: str, mode: str) -> dict | None:
-    json_match = re.search(r'(\{.*\})', output, re.DOTALL)
-    if json_match:
-        try:
-            outer_data = json.loads(json_match.group(1))
-            if isinstance(outer_data, dict) and "response" in outer_data and isinstance(outer_data["response"], str):
-                 return parse_ai_json_output(outer_data["response"], f"{mode} (Nested)")
-        except: pass
-
-    clean_output = output.strip()
-    match = re.search(r"```(?:json)?\s*(.*?)```", clean_output, re.DOTALL)
-    if match: clean_output = match.group(1).strip()
-    else:
-        json_match_inner = re.search(r'(\{.*\})', clean_output, re.DOTALL)
-        if json_match_inner: clean_output = json_match_inner.group(1).strip()
-
-    try:
-        data = json.loads(clean_output)
-        if isinstance(data, dict) and "response" in data and isinstance(data["response"], str):
-             return parse_ai_json_output(data["response"], f"{mode} (Nested)")
-        return data
-    except json.JSONDecodeError:
-        rlog(f"Standard JSON parse failed for {mode}.")
-    
-    # Heuristic fallback (simplified for brevity, original logic was preserved)
-    if any(x in mode for x in ["DECK", "slides", "PLAN"]):
-        extracted_items = []
-        raw_text = clean_output
-        chunks = re.split(r',?\s*\{\s*"page":', raw_text)
-        for chunk in chunks:
-            if not chunk.strip(): continue
-            item = {}
-            p_m = re.search(r'^\s*"(\d+)"', chunk)
-            if p_m: item["page"] = p_m.group(1)
-            else: continue
-            t_m = re.search(r'"topic":\s*"(.*?)"', chunk)
-            if t_m: item["topic"] = t_m.group(1)
-            c_m = re.search(r'"content":\s*"', chunk)
-            if c_m:
-                start = c_m.end()
-                end = chunk.rfind('"')
-                if end > start: item["content"] = chunk[start:end].replace('\\"', '"').replace('\\n', '\n')
-            if item.get("page"): extracted_items.append(item)
-        if extracted_items:
-            if "PLAN" in mode: return {"pages": extracted_items}
-            return {"slides": extracted_items}
-    return None
+    """Parse a JSON mode's output; failures are counted per mode (json_parses_total)."""
+    from agents.performance import performance_monitor
+    data = _parse_ai_json_output(output, mode)
+    if output:  # An empty output is a failed call, already counted as such
+        performance_monitor.record_parse(mode, bool(data))
+    return data
+
+# Modes whose output is a list of pages/slides, where a truncated prefix is still useful
+PREFIX_RECOVERY_MODES = ("DECK", "PLAN")
+
+def _parse_ai_json_output(output: str, mode: str) -> dict | None:
+    from scripts.tolerant_json import extract_json
+    result = extract_json(output)
+    if result is None:
+        rlog(f"No JSON found in {mode} output.")
+        return None
+    data = result.value
+    if isinstance(data, list):
+        # A bare list of pages/slides (or one salvaged from a broken wrapper)
+        if mode not in PREFIX_RECOVERY_MODES:
+            return None
+        data = {"pages": data} if mode == "PLAN" else {"slides": data}
+    if not result.complete:
+        if mode not in PREFIX_RECOVERY_MODES:
+            # A single object cut short may still look valid (a truncated "content"); retry instead
+            rlog(f"{mode} output was truncated or malformed; rejecting the partial object.")
+            return None
+        items = data.get("slides") or data.get("pages")
+        kept = f" ({len(items)} complete items kept)" if isinstance(items, list) else ""
+        rlog(f"{mode} output was truncated or malformed; recovered the valid prefix{kept}.")
+    return data
 
 def get_config(args: argparse.Namespace) -> dict:
     cfg = yaml.safe_load(CONFIG_PATH.read_text(encoding="utf-8")) if CONFIG_PATH.exists() else {}
@@ -514,83 +812,267 @@ def get_config(args: argparse.Namespace) -> dict:
     cfg.update({k: v for k, v in vars(args).items() if v is not None})
     return cfg
 
-def process_memo_page(i, slide, source_path, full_slides_content, notes_dir, glossary_text, cfg, args):
+def process_deck_slide(i, page, plan_data, glossary_text, source_path, cfg, args, source_index=None):
+    """Generate and validate one slide; a failed validation reworks only this slide."""
+    p_num = str(page.get("page") or i + 1).zfill(2)
+    p_topic = page.get("topic", "Topic")
+
+    if source_index:
+        top_k = (cfg.get("source_index") or {}).get("top_k", 6)
+        source_vars = {"source_passages_content": source_index.passages_for(p_topic, top_k)}
+    else:
+        source_vars = {"source_file_path": str(source_path)}
+    plan_json = json.dumps(plan_data, ensure_ascii=False)
+    slide_vars = {**source_vars, "plan_json": plan_json, "page": p_num, "topic": p_topic, "glossary": glossary_text}
+
+    final_slide, acceptable_slide, current_slide, feedback_history = None, None, None, []
+    for attempt in range(args.slide_reworks + 1):
+        raw = run_agent(cfg["agent"], "DECK_SLIDE", slide_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
+        parsed = parse_ai_json_output(raw, "DECK_SLIDE")
+        if parsed and parsed.get("slides"):
+            parsed = parsed["slides"][0]  # Heuristic fallback wraps salvaged slides in a list
+        if not (parsed and parsed.get("content")):
+            feedback_history.append(f"Attempt {attempt+1}: Failed to parse slide JSON output.")
+            slide_vars["rework_feedback"] = "\n\n".join(feedback_history)
+            continue
+
+        current_slide = {"page": p_num, "topic": parsed.get("topic") or p_topic, "content": parsed["content"]}
+        val_json = run_agent(cfg["agent"], "VALIDATE_DECK_SLIDE", {"slide_json": json.dumps(current_slide, ensure_ascii=False), "plan_json": plan_json, "glossary": glossary_text}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
+        val_res = parse_ai_json_output(val_json, "VALIDATE_DECK_SLIDE")
+
+        if val_res and val_res.get("is_valid"):
+            final_slide = current_slide; break
+        elif val_res and val_res.get("is_acceptable"):
+            if not acceptable_slide: acceptable_slide = current_slide
+
+        feedback = val_res.get("feedback", "") if val_res else "Validation failed"
+        feedback_history.append(f"Attempt {attempt+1}: {feedback}")
+        slide_vars["rework_feedback"] = "\n\n".join(feedback_history)
+
+    slide = final_slide or acceptable_slide or current_slide
+    status = "Valid" if final_slide else "Acceptable" if acceptable_slide else "Unvalidated" if current_slide else "Failed"
+    return p_num, slide, f"{status} ({len(feedback_history)} reworks)"
+
+def generate_deck_per_slide(plan_data, glossary_text, source_path, cfg, args, source_index=None) -> dict | None:
+    """Fan DECK out per planned page and assemble the validated slides.
+
+    Pages that produced no slide are generated once more; any still missing
+    get a title-only placeholder so the slides that did pass are kept.
+    Returns None only for a plan without pages.
+    """
+    from scripts.task_scheduler import TaskScheduler
+    pages = plan_data.get("pages") or plan_data.get("slides") or []
+    if not pages:
+        return None
+    session = get_agent_session()
+    controller = session.get_controller(session.resolve(cfg["agent"], cfg.get("gemini_model")))
+
+    def on_slide_complete(name, result, error):
+        if error is not None:
+            print_error(f"{name} failed: {error}", exit_code=None)
+        else:
+            print_success(f"{name}: {result[2]}")
+
+    def run_slides(indices, label=""):
+        scheduler = TaskScheduler(max_workers=controller.max_limit, limit=lambda: controller.limit, name="deck")
+        names = {}
+        for i in indices:
+            # The index keeps names unique when pages repeat or are missing
+            names[i] = scheduler.add(f"Deck Slide {str(pages[i].get('page') or i + 1).zfill(2)} #{i + 1}{label}", process_deck_slide, i, pages[i], plan_data, glossary_text, source_path, cfg, args, source_index=source_index)
+        results = scheduler.run(on_complete=on_slide_complete)
+        stats = scheduler.stats()
+        print_info(f"Phase 3 wall time: {stats['wall_seconds']}s for {stats['executed']} slides (utilization {stats['utilization']}% of {controller.max_limit} workers)")
+        return {i: results[name][1] for i, name in names.items() if isinstance(results.get(name), tuple) and results[name][1]}
+
+    slides = run_slides(range(len(pages)))
+    failed = [i for i in range(len(pages)) if i not in slides]
+    if failed:
+        print_warning(f"{len(failed)} of {len(pages)} slides could not be generated; retrying only those")
+        slides.update(run_slides(failed, " (retry)"))
+    for i in range(len(pages)):
+        if i not in slides:
+            p_num, p_topic = str(pages[i].get("page") or i + 1).zfill(2), pages[i].get("topic", "Topic")
+            print_warning(f"Slide {p_num} ({p_topic}) is still missing; writing a title-only placeholder to fill in")
+            slides[i] = {"page": p_num, "topic": p_topic, "content": f"# {p_topic}\n"}
+
+    ordered = [slides[i] for i in range(len(pages))]
+    ordered.sort(key=lambda slide: int(slide["page"]) if str(slide["page"]).isdigit() else 0)
+    return {"slides": ordered}
+
+def process_memo_page(i, slide, source_path, full_slides_content, notes_dir, glossary_text, cfg, args, source_index=None):
     p_num = str(slide.get("page")).zfill(2)
     p_topic = slide.get("topic", "Topic")
     safe_topic = sanitize_filename(p_topic)
     memo_path = notes_dir / f"note-{p_num}_{safe_topic}-zh.md"
 
-    if memo_path.exists() and memo_path.stat().st_size > 100:
-        return p_num, f"Skipped (Exists)"
+    if source_index:
+        # Only the passages relevant to this slide, not the whole source
+        top_k = (cfg.get("source_index") or {}).get("top_k", 6)
+        source_vars = {"source_passages_content": source_index.passages_for(f"{p_topic}\n{slide.get('content', '')}", top_k)}
+        source_input = source_vars["source_passages_content"]
+    else:
+        from scripts.build_manifest import file_hash
+        source_vars = {"source_file_path": str(source_path)}
+        source_input = file_hash(source_path)
+
+    from scripts.build_manifest import BuildManifest
+    inputs = BuildManifest.hash_inputs(
+        p_topic, slide.get("content", ""), glossary_text, source_input, args.custom_instruction or "",
+        prompt_version("MEMO", "VALIDATE_MEMO")
+    )
+    if artifact_is_fresh(f"memo:{p_num}", memo_path, inputs, adopt_min_size=100):
+        return p_num, "Skipped (Up to date)"
 
     memo_vars = {
-        "source_file_path": str(source_path),
+        **source_vars,
         "current_slide_content": slide.get("content", ""),
         "full_slides_content": full_slides_content,
         "page": p_num, "topic": p_topic, "glossary": glossary_text,
         "custom_instruction": args.custom_instruction or ""
     }
     
-    final_memo, acceptable_memo, feedback_history = "", "", []
-    for attempt in range(args.memo_reworks + 1):
-        raw = run_agent(cfg["agent"], "MEMO", memo_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
+    from scripts.hedging import ACCEPTABLE, REJECTED, VALID, run_candidates
+    k = hedge_candidates(cfg, "MEMO")
+
+    def evaluate_memo(raw):
         val_json = run_agent(cfg["agent"], "VALIDATE_MEMO", {"memo_content": raw, "slide_content": slide.get("content", "")}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
         val_res = parse_ai_json_output(val_json, "VALIDATE_MEMO")
-        
         if val_res and val_res.get("is_valid"):
-            final_memo = raw; break
-        elif val_res and val_res.get("is_acceptable"):
-            if not acceptable_memo: acceptable_memo = raw
-        
+            return VALID, raw, ""
         feedback = val_res.get("feedback", "") if val_res else "Validation failed"
-        feedback_history.append(f"Attempt {attempt+1}: {feedback}")
+        return (ACCEPTABLE if val_res and val_res.get("is_acceptable") else REJECTED), raw, feedback
+    
+    final_memo, acceptable_memo, raw, feedback_history = "", "", "", []
+    for attempt in range(args.memo_reworks + 1):
+        round_ = run_candidates(
+            lambda i, cancel: run_agent(cfg["agent"], "MEMO", candidate_vars(memo_vars, i, k), retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"), cancel=cancel),
+            evaluate_memo, k, _hedge_limiter, "MEMO"
+        )
+        raw = round_.last_output or raw
+        if round_.winner:
+            final_memo = round_.winner.value; break
+        acceptable = round_.first(ACCEPTABLE)
+        if acceptable and not acceptable_memo: acceptable_memo = acceptable.value
+        
+        feedback_history.append(f"Attempt {attempt+1}: {round_.feedback}")
         memo_vars["rework_feedback"] = "\n\n".join(feedback_history)
 
     memo_content = final_memo or acceptable_memo or raw
-    memo_path.write_text(memo_content, encoding="utf-8")
+    write_output(memo_path, memo_content)
+    record_artifact(f"memo:{p_num}", memo_path, inputs)
     return p_num, "Generated"
 
-def process_svg_page(i, slide, source_path, slides_dir, notes_dir, glossary_text, cfg, args):
+def precheck_svg_feedback(svg_code: str, cfg: dict, label: str) -> str:
+    """Run the local SVG checks; returns rework feedback, or "" if the SVG may go to the LLM validator."""
+    precheck_cfg = cfg.get("svg_precheck") or {}
+    if not precheck_cfg.get("enabled", True):
+        return ""
+    from scripts.svg_precheck import precheck_svg
+    result = precheck_svg(svg_code, precheck_cfg)
+    if result.is_valid:
+        return ""
+    print_warning(f"{label}: local check failed ({len(result.issues)} issues), skipping LLM validation")
+    rlog_block(f"SVG Precheck ({label})", result.feedback)
+    return result.feedback
+
+def process_slide_svg(i, slide, slides_dir, glossary_text, cfg, args):
     p_num = str(slide.get("page")).zfill(2)
-    p_topic = slide.get("topic", "Topic")
-    safe_topic = sanitize_filename(p_topic)
-    
-    # 1. Slide SVG
+    safe_topic = sanitize_filename(slide.get("topic", "Topic"))
+
     slide_svg_path = slides_dir / f"{p_num}_{safe_topic}.svg"
-    if not (slide_svg_path.exists() and slide_svg_path.stat().st_size > 500):
-        svg_vars = {"slide_content": slide.get("content", ""), "glossary": glossary_text}
-        final_svg = ""
-        for attempt in range(args.slide_svg_reworks + 1):
-            raw = run_agent(cfg["agent"], "CREATE_SLIDE_SVG", svg_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
-            match = re.search(r"<svg.*?</svg>", raw, re.DOTALL)
-            if match:
-                current_svg = fix_svg_layout(match.group(0))
-                val_json = run_agent(cfg["agent"], "VALIDATE_SLIDE_SVG", {"svg_code": current_svg}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
-                val_res = parse_ai_json_output(val_json, "VALIDATE_SLIDE_SVG")
-                if val_res and (val_res.get("is_valid") or val_res.get("is_acceptable")):
-                    final_svg = current_svg; break
-        if final_svg: slide_svg_path.write_text(final_svg, encoding="utf-8")
-
-    # 2. Conceptual SVG
+    from scripts.build_manifest import BuildManifest
+    inputs = BuildManifest.hash_inputs(
+        slide.get("content", ""), glossary_text, prompt_version("CREATE_SLIDE_SVG", "VALIDATE_SLIDE_SVG")
+    )
+    if artifact_is_fresh(f"slide_svg:{p_num}", slide_svg_path, inputs, adopt_min_size=500):
+        return p_num, "Skipped (Up to date)"
+
+    svg_vars = {"slide_content": slide.get("content", ""), "glossary": glossary_text}
+    from scripts.hedging import REJECTED, VALID, run_candidates
+    k = hedge_candidates(cfg, "CREATE_SLIDE_SVG")
+
+    def evaluate_svg(raw):
+        match = re.search(r"<svg.*?</svg>", raw, re.DOTALL)
+        if not match:
+            return REJECTED, None, "No <svg>...</svg> element found in the output."
+        current_svg = fix_svg_layout(match.group(0))
+        feedback = precheck_svg_feedback(current_svg, cfg, f"Page {p_num} slide SVG")
+        if feedback:
+            return REJECTED, None, feedback
+        val_json = run_agent(cfg["agent"], "VALIDATE_SLIDE_SVG", {"svg_code": current_svg}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
+        val_res = parse_ai_json_output(val_json, "VALIDATE_SLIDE_SVG")
+        if val_res and (val_res.get("is_valid") or val_res.get("is_acceptable")):
+            return VALID, current_svg, ""
+        return REJECTED, None, val_res.get("feedback", "") if val_res else "Validation failed"
+
+    final_svg, feedback_history = "", []
+    for attempt in range(args.slide_svg_reworks + 1):
+        round_ = run_candidates(
+            lambda i, cancel: run_agent(cfg["agent"], "CREATE_SLIDE_SVG", candidate_vars(svg_vars, i, k), retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"), cancel=cancel),
+            evaluate_svg, k, _hedge_limiter, "CREATE_SLIDE_SVG"
+        )
+        if round_.winner:
+            final_svg = round_.winner.value; break
+        feedback_history.append(f"Attempt {attempt+1}: {round_.feedback}")
+        svg_vars["rework_feedback"] = "\n\n".join(feedback_history)
+    if final_svg:
+        write_output(slide_svg_path, final_svg)
+        record_artifact(f"slide_svg:{p_num}", slide_svg_path, inputs)
+    return p_num, "Generated" if final_svg else "No valid SVG"
+
+def process_conceptual_svg(i, slide, slides_dir, notes_dir, glossary_text, cfg, args):
+    p_num = str(slide.get("page")).zfill(2)
+    safe_topic = sanitize_filename(slide.get("topic", "Topic"))
+
     conceptual_svg_path = slides_dir / f"{p_num}_{safe_topic}_conceptual.svg"
-    if not (conceptual_svg_path.exists() and conceptual_svg_path.stat().st_size > 500):
-        memo_file = notes_dir / f"note-{p_num}_{safe_topic}-zh.md"
-        memo_content = memo_file.read_text(encoding="utf-8") if memo_file.exists() else ""
-        con_vars = {"slide_content": slide.get("content", ""), "memo_content": memo_content, "glossary": glossary_text}
-        final_con = ""
-        for attempt in range(args.conceptual_svg_reworks + 1):
-            raw = run_agent(cfg["agent"], "CREATE_CONCEPTUAL_SVG", con_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
-            if "NO_CONCEPTUAL_SVG_NEEDED" in raw: break
-            match = re.search(r"<svg.*?</svg>", raw, re.DOTALL)
-            if match:
-                current_con = fix_svg_layout(match.group(0))
-                val_json = run_agent(cfg["agent"], "VALIDATE_CONCEPTUAL_SVG", {"svg_code": current_con}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
-                val_res = parse_ai_json_output(val_json, "VALIDATE_CONCEPTUAL_SVG")
-                if val_res and (val_res.get("is_valid") or val_res.get("is_acceptable")):
-                    final_con = current_con; break
-        if final_con: conceptual_svg_path.write_text(final_con, encoding="utf-8")
-    
-    return p_num, "Processed"
+    memo_file = notes_dir / f"note-{p_num}_{safe_topic}-zh.md"
+    memo_content = memo_file.read_text(encoding="utf-8") if memo_file.exists() else ""
+
+    # Depends on the memo: a regenerated memo makes this SVG stale
+    from scripts.build_manifest import BuildManifest
+    inputs = BuildManifest.hash_inputs(
+        slide.get("content", ""), memo_content, glossary_text, prompt_version("CREATE_CONCEPTUAL_SVG", "VALIDATE_CONCEPTUAL_SVG")
+    )
+    if artifact_is_fresh(f"conceptual_svg:{p_num}", conceptual_svg_path, inputs, adopt_min_size=500):
+        return p_num, "Skipped (Up to date)"
+    con_vars = {"slide_content": slide.get("content", ""), "memo_content": memo_content, "glossary": glossary_text}
+    from scripts.hedging import REJECTED, VALID, run_candidates
+    k = hedge_candidates(cfg, "CREATE_CONCEPTUAL_SVG")
+
+    def evaluate_con(raw):
+        if "NO_CONCEPTUAL_SVG_NEEDED" in raw:
+            return VALID, "NO_CONCEPTUAL_SVG_NEEDED", ""
+        match = re.search(r"<svg.*?</svg>", raw, re.DOTALL)
+        if not match:
+            return REJECTED, None, "No <svg>...</svg> element found in the output."
+        current_con = fix_svg_layout(match.group(0))
+        feedback = precheck_svg_feedback(current_con, cfg, f"Page {p_num} conceptual SVG")
+        if feedback:
+            return REJECTED, None, feedback
+        val_json = run_agent(cfg["agent"], "VALIDATE_CONCEPTUAL_SVG", {"svg_code": current_con}, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
+        val_res = parse_ai_json_output(val_json, "VALIDATE_CONCEPTUAL_SVG")
+        if val_res and (val_res.get("is_valid") or val_res.get("is_acceptable")):
+            return VALID, current_con, ""
+        return REJECTED, None, val_res.get("feedback", "") if val_res else "Validation failed"
+
+    final_con, feedback_history = "", []
+    for attempt in range(args.conceptual_svg_reworks + 1):
+        round_ = run_candidates(
+            lambda i, cancel: run_agent(cfg["agent"], "CREATE_CONCEPTUAL_SVG", candidate_vars(con_vars, i, k), retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"), cancel=cancel),
+            evaluate_con, k, _hedge_limiter, "CREATE_CONCEPTUAL_SVG"
+        )
+        if round_.winner and round_.winner.value == "NO_CONCEPTUAL_SVG_NEEDED":
+            conceptual_svg_path.unlink(missing_ok=True)  # Stale SVG from earlier inputs
+            record_artifact(f"conceptual_svg:{p_num}", conceptual_svg_path, inputs, status="not_needed")
+            return p_num, "Not needed"
+        if round_.winner:
+            final_con = round_.winner.value; break
+        feedback_history.append(f"Attempt {attempt+1}: {round_.feedback}")
+        con_vars["rework_feedback"] = "\n\n".join(feedback_history)
+    if final_con:
+        write_output(conceptual_svg_path, final_con)
+        record_artifact(f"conceptual_svg:{p_num}", conceptual_svg_path, inputs)
+    return p_num, "Generated" if final_con else "No valid SVG"
 
 def main():
     parser = argparse.ArgumentParser(description="PPTPlaner Orchestrator")
@@ -611,21 +1093,55 @@ def main():
     parser.add_argument("--slide-svg-reworks", type=int, default=3)
     parser.add_argument("--conceptual-svg-reworks", type=int, default=3)
     parser.add_argument("--agent-retries", dest="agent_execution_retries", type=int, default=3)
+    parser.add_argument("--workers", dest="page_workers", type=int, help="Pin concurrency to N workers (default: adaptive per backend, see 'concurrency' in config.yaml)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the agent, bypassing the response cache")
+    parser.add_argument("--cache-dir", help=f"Response cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--resume", action="store_true", help="Reuse checkpointed phases for this source and continue at the first incomplete one")
+    parser.add_argument("--trace", action="store_true", help="Write a Chrome trace (trace.json, open in Perfetto) to the output directory")
+    parser.add_argument("--record", action="store_true", help="Record every agent call to cassette.jsonl in the output directory")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Answer agent calls from a recorded cassette (file or output directory) instead of the model")
+    parser.add_argument("--replay-latency", action="store_true", help="With --replay, wait for each call's recorded latency")
+    parser.add_argument("--latency-scale", type=float, help="With --replay-latency, multiply recorded latencies by this factor (e.g. 0.1)")
     args = parser.parse_args()
 
     init_logger(ROOT)
     cfg = get_config(args)
     print_header(f"PPTPlaner v{cfg['version']} - Started")
+    init_response_cache(cfg)
+    init_hedging(cfg)
+    init_metrics_export(cfg)
+    init_tracing(cfg)
+    init_run_history(cfg)
+    init_cassette(cfg)
+    init_prompt_packer(cfg)
+    get_agent_session(cfg)
     
     source_path = Path(args.source)
     if not source_path.exists(): print_error(f"Source file not found: {source_path}")
 
+    # Checkpoints are always written; --resume reuses the ones whose inputs still match
+    from scripts.build_manifest import BuildManifest
+    from scripts.checkpoint import RunCheckpoint
+    checkpoint = RunCheckpoint.for_source(OUTPUT_ROOT, source_path)
+    if args.resume:
+        next_phase = checkpoint.first_incomplete_phase()
+        print_info(f"Resuming {source_path.name}: " + (f"continuing at phase '{next_phase}'" if next_phase else "previous run completed, refreshing stale artifacts"))
+
+    def resumed(phase, inputs):
+        return checkpoint.load(phase, inputs) if args.resume else None
+
     # Phase 1: Analysis
     print_header("Phase 1: Analysis & Planning")
+    mark_phase("Analysis & Planning")
     analysis_vars = {"source_file_path": str(source_path), "custom_instruction": args.custom_instruction or "", "manual_title": args.manual_title or "", "manual_author": args.manual_author or "", "manual_url": args.manual_url or ""}
+    analysis_inputs = BuildManifest.hash_inputs(
+        checkpoint.source_hash, analysis_vars, prompt_version("ANALYZE_SOURCE_DOCUMENT", "VALIDATE_ANALYSIS")
+    )
     
-    analysis_data, acceptable_analysis, analysis_feedback_history = {}, {}, []
-    for attempt in range(args.analysis_reworks + 1):
+    analysis_data, acceptable_analysis, analysis_feedback_history, current_analysis = resumed("analysis", analysis_inputs) or {}, {}, [], {}
+    if analysis_data:
+        print_success("Analysis restored from checkpoint")
+    for attempt in range(0 if analysis_data else args.analysis_reworks + 1):
         raw = run_agent(cfg["agent"], "ANALYZE_SOURCE_DOCUMENT", analysis_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
         current_analysis = parse_ai_json_output(raw, "ANALYZE_SOURCE_DOCUMENT")
         
@@ -653,6 +1169,8 @@ def main():
             print_detail(f"Feedback: {feedback[:150]}...")
 
     analysis_data = analysis_data or acceptable_analysis or current_analysis or {}
+    if analysis_data and checkpoint.load("analysis", analysis_inputs) != analysis_data:
+        checkpoint.save("analysis", analysis_inputs, analysis_data)
     
     # Add review for Phase 1
     report_add_step("Analysis complete", f"Title: {analysis_data.get('document_title', 'Unknown')}")
@@ -669,13 +1187,20 @@ def main():
 
     safe_title = sanitize_filename(project_folder_name)[:50]
     existing_dirs = sorted(list(OUTPUT_ROOT.glob(f"*_{safe_title}")), reverse=True)
-    output_dir = existing_dirs[0] if existing_dirs else OUTPUT_ROOT / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_title}"
+    if args.resume and checkpoint.output_dir and checkpoint.output_dir.exists():
+        output_dir = checkpoint.output_dir
+    else:
+        output_dir = existing_dirs[0] if existing_dirs else OUTPUT_ROOT / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_title}"
     output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint.set_output_dir(output_dir)
     slides_dir, notes_dir = output_dir / "slides", output_dir / "notes"
     slides_dir.mkdir(exist_ok=True); notes_dir.mkdir(exist_ok=True)
 
     # Reinitialize logger to output directory (stores logs with output)
     init_logger(ROOT, output_dir)
+    init_build_manifest(output_dir)
+    set_trace_output(output_dir)
+    set_cassette_output(output_dir)
     
     # Initialize review report for quality tracking
     init_review_report(output_dir, args.source)
@@ -685,7 +1210,9 @@ def main():
     report_start_phase("Analysis & Planning")
     report_add_step("Starting document analysis")
 
-    if glossary: (output_dir / "glossary.json").write_text(json.dumps(glossary, indent=2, ensure_ascii=False), encoding="utf-8")
+    source_index = build_source_index(source_path, output_dir, cfg)
+
+    if glossary: write_output(output_dir / "glossary.json", json.dumps(glossary, indent=2, ensure_ascii=False))
     
     # Write overview.md with proper formatting for build_guide.py
     # Use document_title for the main display heading
@@ -697,14 +1224,21 @@ def main():
     
     overview_md += f"\n## Summary\n{analysis_data.get('summary') or 'No summary available.'}\n"
     overview_md += f"\n## Overview\n{analysis_data.get('overview') or 'No overview available.'}\n"
-    (output_dir / "overview.md").write_text(overview_md, encoding="utf-8")
+    write_output(output_dir / "overview.md", overview_md)
 
     # Phase 2: Planning
     print_header("Phase 2: Planning")
+    mark_phase("Planning")
     report_start_phase("Planning")
     report_add_step("Creating presentation plan")
     plan_path = output_dir / ".plan.json"
-    if plan_path.exists():
+    plan_inputs = BuildManifest.hash_inputs(
+        checkpoint.source_hash, glossary_text, args.custom_instruction or "", prompt_version("PLAN", "VALIDATE_PLAN")
+    )
+    plan_data = resumed("plan", plan_inputs)
+    if plan_data:
+        print_success("Plan restored from checkpoint")
+    elif plan_path.exists():
         plan_data = json.loads(plan_path.read_text(encoding="utf-8"))
     else:
         plan_vars = {"source_file_path": str(source_path), "glossary": glossary_text, "custom_instruction": args.custom_instruction or ""}
@@ -737,7 +1271,9 @@ def main():
                 print_detail(f"Feedback: {feedback[:150]}...")
         
         plan_data = plan_data or acceptable_plan or current_plan or {}
-        if plan_data: plan_path.write_text(json.dumps(plan_data, indent=2, ensure_ascii=False), encoding="utf-8")
+        if plan_data: write_output(plan_path, json.dumps(plan_data, indent=2, ensure_ascii=False))
+    if plan_data and checkpoint.load("plan", plan_inputs) != plan_data:
+        checkpoint.save("plan", plan_inputs, plan_data)
     
     # Add review for Phase 2
     report_add_step("Planning complete", f"Slides: {len(plan_data.get('slides', []))}")
@@ -749,12 +1285,29 @@ def main():
 
     # Phase 3: Deck
     print_header("Phase 3: Deck Generation")
+    mark_phase("Deck Generation")
     report_start_phase("Deck Generation")
     report_add_step("Generating slide content")
     deck_vars = {"source_file_path": str(source_path), "plan_json": json.dumps(plan_data, ensure_ascii=False), "glossary": glossary_text}
+    deck_cfg = cfg.get("deck") or {}
+    # Per-slide calls carry their page's passages; without the index each would resend the whole source
+    per_slide = deck_cfg.get("per_slide", True) and source_index is not None
+    if deck_cfg.get("per_slide", True) and not per_slide:
+        print_info("No source index; generating the deck in one call so the source is sent once")
+    deck_inputs = BuildManifest.hash_inputs(
+        checkpoint.source_hash, deck_vars, per_slide,
+        prompt_version("DECK", "VALIDATE_DECK", "DECK_SLIDE", "VALIDATE_DECK_SLIDE")
+    )
     
-    deck_data, acceptable_deck, deck_feedback_history = {}, {}, []
-    for attempt in range(args.slide_reworks + 1):
+    deck_data, acceptable_deck, deck_feedback_history, current_deck = resumed("deck", deck_inputs) or {}, {}, [], {}
+    if deck_data:
+        print_success(f"Deck restored from checkpoint ({len(deck_data.get('slides', []))} slides)")
+    elif per_slide and (plan_data.get("pages") or plan_data.get("slides")):
+        # Per-slide fan-out: only slides that fail validation are regenerated
+        deck_data = generate_deck_per_slide(plan_data, glossary_text, source_path, cfg, args, source_index=source_index) or {}
+        if not deck_data:
+            print_warning("Falling back to holistic deck generation")
+    for attempt in range(0 if deck_data else args.slide_reworks + 1):
         raw = run_agent(cfg["agent"], "DECK", deck_vars, retries=cfg["agent_execution_retries"], model_name=cfg.get("gemini_model"))
         current_deck = parse_ai_json_output(raw, "DECK")
         
@@ -783,11 +1336,23 @@ def main():
 
     deck_data = deck_data or acceptable_deck or current_deck or {"slides": []}
     last_deck_content = deck_data.get("slides", [])
+    if last_deck_content and checkpoint.load("deck", deck_inputs) != deck_data:
+        checkpoint.save("deck", deck_inputs, deck_data)
     
     full_slides_content = ""
     for slide in last_deck_content:
         p_num, topic = str(slide.get("page")).zfill(2), slide.get("topic", "Topic")
-        (slides_dir / f"{p_num}_{sanitize_filename(topic)}.md").write_text(slide.get("content", ""), encoding="utf-8")
+        slide_path = slides_dir / f"{p_num}_{sanitize_filename(topic)}.md"
+        inputs = BuildManifest.hash_inputs(slide.get("content", ""))
+        entry = _build_manifest.get(f"slide:{p_num}") if _build_manifest else None
+        if entry and entry["inputs"] == inputs and _build_manifest.is_modified(f"slide:{p_num}", slide_path):
+            # Deck output for this page is unchanged but the file was edited by hand:
+            # keep the edit and let its memo/SVGs pick it up
+            slide["content"] = slide_path.read_text(encoding="utf-8")
+            print_info(f"Keeping hand-edited slide {slide_path.name}")
+        else:
+            write_output(slide_path, slide.get("content", ""))
+            record_artifact(f"slide:{p_num}", slide_path, inputs)
         full_slides_content += f"### {p_num}: {topic}\n{slide.get('content')}\n\n"
     
     # Add review for Phase 3
@@ -797,21 +1362,41 @@ def main():
     report_complete_phase()
 
     # Phase 4 & 5: Parallel Generation
+    # Each page's slide SVG starts immediately; its conceptual SVG starts as
+    # soon as the page's own memo lands. All tasks share one worker budget.
     print_header("Phase 4 & 5: Parallel Memo & SVG Generation")
+    mark_phase("Memo & SVG Generation")
     report_start_phase("Memo & SVG Generation")
     report_add_step("Generating memos and SVGs in parallel")
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        memo_futures = [executor.submit(process_memo_page, i, s, source_path, full_slides_content, notes_dir, glossary_text, cfg, args) for i, s in enumerate(last_deck_content)]
-        for future in as_completed(memo_futures):
-            p_num, status = future.result()
-            print_success(f"Memo Page {p_num}: {status}")
-
-    if not args.no_svg:
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            svg_futures = [executor.submit(process_svg_page, i, s, source_path, slides_dir, notes_dir, glossary_text, cfg, args) for i, s in enumerate(last_deck_content)]
-            for future in as_completed(svg_futures):
-                p_num, status = future.result()
-                print_success(f"SVG Page {p_num}: {status}")
+    from scripts.task_scheduler import TaskScheduler
+    session = get_agent_session()
+    controller = session.get_controller(session.resolve(cfg["agent"], cfg.get("gemini_model")))
+    scheduler = TaskScheduler(max_workers=controller.max_limit, limit=lambda: controller.limit, name="pages")
+    for i, s in enumerate(last_deck_content):
+        # The index keeps names unique when pages repeat or are missing
+        page_id = f"{str(s.get('page')).zfill(2)} #{i + 1}"
+        memo_task = scheduler.add(f"Memo Page {page_id}", process_memo_page, i, s, source_path, full_slides_content, notes_dir, glossary_text, cfg, args, source_index=source_index)
+        if not args.no_svg:
+            scheduler.add(f"Slide SVG Page {page_id}", process_slide_svg, i, s, slides_dir, glossary_text, cfg, args)
+            scheduler.add(f"Conceptual SVG Page {page_id}", process_conceptual_svg, i, s, slides_dir, notes_dir, glossary_text, cfg, args, deps=[memo_task])
+
+    page_failures = []
+
+    def on_page_task_complete(name, result, error):
+        if error is not None:
+            page_failures.append(name)
+            checkpoint.record_page(name, f"Failed: {error}")
+            print_error(f"{name} failed: {error}", exit_code=None)
+        else:
+            checkpoint.record_page(name, result[1])
+            print_success(f"{name}: {result[1]}")
+
+    scheduler.run(on_complete=on_page_task_complete)
+    if not page_failures:
+        checkpoint.save("pages", deck_inputs)
+    stats = scheduler.stats()
+    print_info(f"Phase 4/5 wall time: {stats['wall_seconds']}s for {stats['executed']} tasks (busy {stats['busy_seconds']}s, utilization {stats['utilization']}% of {controller.max_limit} workers)")
+    print_info(f"Concurrency for {controller.name}: limit {controller.limit} (range {controller.min_limit}-{controller.max_limit})")
     
     # Add review for Phase 4 & 5
     report_add_step("Memo generation complete", f"Pages: {len(last_deck_content)}")
@@ -822,17 +1407,42 @@ def main():
 
     # Finalize
     print_header("Phase 6: Finalizing")
+    mark_phase("Finalizing")
     report_start_phase("Finalizing")
     report_add_step("Building guide.html")
     build_script = ROOT / "scripts" / "build_guide.py"
     if build_script.exists():
-        subprocess.run([sys.executable, str(build_script), f"--output-dir={output_dir}"])
+        from scripts.build_manifest import file_hash
+        guide_path = output_dir / "guide.html"
+        page_files = [p for d in (slides_dir, notes_dir) for p in d.iterdir() if p.is_file()]
+        page_files += [p for p in (output_dir / "overview.md", output_dir / "glossary.json") if p.exists()]
+        guide_inputs = BuildManifest.hash_inputs(
+            BuildManifest.hash_files(page_files, output_dir),
+            file_hash(build_script), file_hash(ROOT / "templates" / "guide.html.j2")
+        )
+        if artifact_is_fresh("guide", guide_path, guide_inputs):
+            print_info("guide.html is up to date")
+        else:
+            subprocess.run([sys.executable, str(build_script), f"--output-dir={output_dir}"])
+            if guide_path.exists():
+                record_artifact("guide", guide_path, guide_inputs)
+        if guide_path.exists():
+            checkpoint.save("guide", guide_inputs)
     
     # Complete final phase and save report
     report_add_step("All files generated")
     report_add_review("Completeness", 9, "All output files generated successfully")
     report_complete_phase()
     report_save()
+    trace_path = save_trace()
+    if trace_path:
+        print_info(f"🧭 Trace written to {trace_path} (open in https://ui.perfetto.dev)")
+    if _cassette is not None:
+        stats = _cassette.stats()
+        if _cassette.replaying:
+            print_info(f"📼 Replayed {stats['replayed']} calls from the cassette ({stats['repeats']} repeated, {stats['misses']} missing)")
+        else:
+            print_info(f"📼 Recorded {stats['recorded']} calls to {stats['path']}")
     
     # --- Video Pipeline Notice ---
     if cfg.get("video", {}).get("enabled", False):
@@ -843,6 +1453,12 @@ def main():
         print_info("Or with custom output:")
         print_info(f"  python scripts/video_pipeline.py --output-dir {output_dir}")
 
+    from agents.performance import performance_monitor
+    performance_monitor.print_report()
+    save_run_history("complete")
+    if _metrics_exporter:
+        _metrics_exporter.stop()
+
     os.startfile(output_dir)
     print_header("Run Complete!")
 
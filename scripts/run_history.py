@@ -0,0 +1,310 @@
+"""
+run_history - Per-run metrics history in SQLite, with regression detection.
+
+Each orchestrate / video run appends one summary of its PerformanceMonitor
+metrics (phase and video step durations, calls, latency percentiles,
+estimated tokens, reworks, JSON parse failures and cache hits per mode) to
+.cache/run_history.sqlite. The CLI compares the latest run against the
+median of the complete runs before it and flags what got worse, e.g.
+
+    VALIDATE_MEMO p95 latency up 40% (12.1s -> 16.9s) [prompts changed since baseline]
+
+Usage:
+    python scripts/run_history.py list
+    python scripts/run_history.py compare --window 5 --threshold 0.25
+    python scripts/run_history.py compare --process video --run 42
+
+Runs are stored with status "complete", "failed" or "replay" (an
+orchestrate --replay run); only complete runs form the baseline.
+
+    history = RunHistory(ROOT / ".cache" / "run_history.sqlite")
+    history.record("orchestrate", summarize_snapshot(performance_monitor.snapshot()), status="complete")
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import sys
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_DB_PATH = ROOT / ".cache" / "run_history.sqlite"
+
+# name: (label, unit, higher_is_worse)
+METRICS: Dict[str, Tuple[str, str, bool]] = {
+    "run_ms": ("run time", "ms", True),
+    "calls": ("calls", "count", True),
+    "failures": ("failed calls", "count", True),
+    "retries": ("retries", "count", True),
+    "reworks": ("reworks", "count", True),
+    "avg_ms": ("avg latency", "ms", True),
+    "p50_ms": ("p50 latency", "ms", True),
+    "p95_ms": ("p95 latency", "ms", True),
+    "prompt_tokens": ("prompt tokens", "tokens", True),
+    "completion_tokens": ("completion tokens", "tokens", True),
+    "cache_hits": ("cache hits", "count", False),
+    "parse_failures": ("JSON parse failures", "count", True),
+    "step_ms": ("total time", "ms", True),
+    "step_p95_ms": ("p95 time", "ms", True),
+    "step_failures": ("failures", "count", True),
+}
+
+# Changes smaller than this are noise whatever the percentage
+MIN_DELTA = {"ms": 1000, "count": 1, "tokens": 500}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    process TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    info TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS runs_by_process ON runs (process, status, started_at);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, name, key)
+);
+"""
+
+
+def summarize_snapshot(snapshot: Dict[str, Any]) -> Dict[Tuple[str, str], float]:
+    """Flatten a PerformanceMonitor snapshot into {(metric, key): value}.
+
+    Calls are aggregated per mode across agents/models; steps are keyed
+    "pipeline/step" (orchestrate phases are steps of the "orchestrate" pipeline).
+    """
+    from agents.performance import LatencyHistogram
+
+    metrics: Dict[Tuple[str, str], float] = {("run_ms", ""): snapshot["uptime_seconds"] * 1000}
+    per_mode: Dict[str, LatencyHistogram] = {}
+    for (agent, mode, model), entry in snapshot["calls"].items():
+        per_mode.setdefault(mode, LatencyHistogram()).merge(entry["latency"])
+        metrics[("failures", mode)] = metrics.get(("failures", mode), 0) + entry["latency"].count - entry["successes"]
+    for mode, histogram in per_mode.items():
+        metrics[("calls", mode)] = histogram.count
+        metrics[("avg_ms", mode)] = round(histogram.mean, 1)
+        metrics[("p50_ms", mode)] = round(histogram.percentile(50), 1)
+        metrics[("p95_ms", mode)] = round(histogram.percentile(95), 1)
+    for (agent, mode), count in snapshot["retries"].items():
+        metrics[("retries", mode)] = metrics.get(("retries", mode), 0) + count
+    for mode, count in snapshot.get("reworks", {}).items():
+        metrics[("reworks", mode)] = count
+    for mode, counts in snapshot.get("tokens", {}).items():
+        metrics[("prompt_tokens", mode)] = counts["prompt"]
+        metrics[("completion_tokens", mode)] = counts["completion"]
+    for mode, counts in snapshot.get("parses", {}).items():
+        metrics[("parse_failures", mode)] = counts["failed"]
+    for mode, count in snapshot["cache_hits"].items():
+        metrics[("cache_hits", mode)] = count
+    for (pipeline, step), entry in snapshot["steps"].items():
+        key = f"{pipeline}/{step}"
+        metrics[("step_ms", key)] = round(entry["latency"].total, 1)
+        metrics[("step_p95_ms", key)] = round(entry["latency"].percentile(95), 1)
+        metrics[("step_failures", key)] = entry["failures"]
+    return metrics
+
+
+@dataclass
+class Regression:
+    """One metric that got worse than its baseline."""
+    name: str
+    key: str
+    baseline: float
+    value: float
+
+    @property
+    def change(self) -> float:
+        return (self.value - self.baseline) / self.baseline if self.baseline else float("inf")
+
+    def describe(self) -> str:
+        label, unit, higher_is_worse = METRICS.get(self.name, (self.name, "count", True))
+        direction = "up" if self.value > self.baseline else "down"
+        percent = f"{abs(self.change) * 100:.0f}%" if self.baseline else "from 0"
+        subject = f"{self.key} {label}" if self.key else label
+        return f"{subject} {direction} {percent} ({_format(self.baseline, unit)} -> {_format(self.value, unit)})"
+
+
+def _format(value: float, unit: str) -> str:
+    if unit == "ms":
+        return f"{value / 1000:.1f}s"
+    return f"{value:g}"
+
+
+def find_regressions(
+    latest: Dict[Tuple[str, str], float],
+    baseline_runs: List[Dict[Tuple[str, str], float]],
+    threshold: float = 0.25
+) -> List[Regression]:
+    """Metrics of `latest` worse than the baseline median by more than `threshold`.
+
+    A metric missing from a baseline run counts as 0 there (e.g. no cache
+    hits); metrics that no run has a baseline for are skipped.
+    """
+    regressions = []
+    for (name, key), value in sorted(latest.items()):
+        values = [run[(name, key)] for run in baseline_runs if (name, key) in run]
+        if not values:
+            continue
+        values += [0.0] * (len(baseline_runs) - len(values))
+        baseline = statistics.median(values)
+        _, unit, higher_is_worse = METRICS.get(name, (name, "count", True))
+        delta = value - baseline if higher_is_worse else baseline - value
+        if delta < MIN_DELTA.get(unit, 0) or delta <= 0:
+            continue
+        if baseline and delta / baseline <= threshold:
+            continue
+        regressions.append(Regression(name, key, baseline, value))
+    return sorted(regressions, key=lambda r: r.change, reverse=True)
+
+
+class RunHistory:
+    """SQLite store of per-run metric summaries (one connection per call, safe across processes)."""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record(
+        self,
+        process: str,
+        metrics: Dict[Tuple[str, str], float],
+        status: str = "complete",
+        started_at: Optional[float] = None,
+        **info: Any
+    ) -> int:
+        """Store one run; returns its id. `info` holds context such as source, agent or prompt hash."""
+        finished_at = time.time()
+        run_ms = metrics.get(("run_ms", ""), 0)
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (process, started_at, finished_at, status, info) VALUES (?, ?, ?, ?, ?)",
+                (process, started_at or finished_at - run_ms / 1000, finished_at, status, json.dumps(info, ensure_ascii=False))
+            )
+            conn.executemany(
+                "INSERT INTO metrics (run_id, name, key, value) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, name, key, value) for (name, key), value in metrics.items()]
+            )
+            return cursor.lastrowid
+
+    def runs(self, process: Optional[str] = None, status: Optional[str] = None, before: Optional[int] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs first."""
+        where, params = [], []
+        for column, value in (("process", process), ("status", status)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        sql = "SELECT id, process, started_at, finished_at, status, info FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [
+            {"id": row[0], "process": row[1], "started_at": row[2], "finished_at": row[3], "status": row[4], "info": json.loads(row[5])}
+            for row in rows
+        ]
+
+    def metrics(self, run_id: int) -> Dict[Tuple[str, str], float]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT name, key, value FROM metrics WHERE run_id = ?", (run_id,)).fetchall()
+        return {(name, key): value for name, key, value in rows}
+
+    def compare(
+        self,
+        process: str = "orchestrate",
+        run_id: Optional[int] = None,
+        window: int = 5,
+        threshold: float = 0.25
+    ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], List[Regression]]:
+        """Compare a run (default: the latest complete one) with the `window` complete runs before it.
+
+        Returns (run, baseline_runs, regressions); run is None if there is no run.
+        """
+        if run_id is None:
+            latest = self.runs(process, status="complete", limit=1)
+        else:
+            latest = [r for r in self.runs(process, before=run_id + 1, limit=1) if r["id"] == run_id]
+        if not latest:
+            return None, [], []
+        run = latest[0]
+        baseline = self.runs(process, status="complete", before=run["id"], limit=window)
+        regressions = find_regressions(self.metrics(run["id"]), [self.metrics(r["id"]) for r in baseline], threshold)
+        return run, baseline, regressions
+
+
+def _describe_run(run: Dict[str, Any]) -> str:
+    info = run["info"]
+    started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started_at"]))
+    details = ", ".join(f"{k}={v}" for k, v in info.items() if k in ("source", "agent", "model") and v)
+    return f"#{run['id']} {run['process']} {started} {run['status']} ({run['finished_at'] - run['started_at']:.0f}s){' ' + details if details else ''}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run metrics history and regression check")
+    parser.add_argument("--db", type=Path, default=None, help=f"History database (default: run_history.path in config.yaml, else {DEFAULT_DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="Show recent runs")
+    list_parser.add_argument("--process", help="orchestrate or video (default: both)")
+    list_parser.add_argument("--limit", type=int, default=20)
+    compare_parser = sub.add_parser("compare", help="Flag regressions of a run against a rolling baseline (exit code 1 if any)")
+    compare_parser.add_argument("--process", default="orchestrate")
+    compare_parser.add_argument("--run", type=int, help="Run id to check (default: latest complete run)")
+    compare_parser.add_argument("--window", type=int, default=5, help="Number of earlier complete runs in the baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="Relative change that counts as a regression")
+    compare_parser.add_argument("--min-runs", type=int, default=3, help="Skip the check with fewer baseline runs")
+    args = parser.parse_args(argv)
+
+    db_path = args.db
+    if db_path is None:
+        import yaml
+        config_path = ROOT / "config.yaml"
+        cfg = (yaml.safe_load(config_path.read_text(encoding="utf-8")) or {}) if config_path.exists() else {}
+        db_path = ROOT / ((cfg.get("run_history") or {}).get("path") or DEFAULT_DB_PATH)
+    history = RunHistory(db_path)
+
+    if args.command == "list":
+        for run in history.runs(args.process, limit=args.limit):
+            print(_describe_run(run))
+        return 0
+
+    run, baseline, regressions = history.compare(args.process, args.run, args.window, args.threshold)
+    if run is None:
+        print(f"No {args.process} runs recorded in {db_path}")
+        return 0
+    print(f"Run {_describe_run(run)}")
+    if len(baseline) < args.min_runs:
+        print(f"  Only {len(baseline)} earlier complete runs (need {args.min_runs}); no baseline yet")
+        return 0
+    print(f"  Baseline: median of runs #{baseline[-1]['id']}-#{baseline[0]['id']} ({len(baseline)} runs)")
+    prompts = run["info"].get("prompts")
+    note = " [prompts changed since baseline]" if prompts and prompts != baseline[0]["info"].get("prompts") else ""
+    if not regressions:
+        print(f"  ✓ No regressions above {args.threshold:.0%}")
+        return 0
+    for regression in regressions:
+        print(f"  ⚠ {regression.describe()}{note}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+source_index - BM25 passage index over the source document.
+
+Per-page prompts (MEMO) used to inline the whole source file, so prompt size
+grew with the document and was paid again for every page and every rework.
+The index splits the source into passages once, persists them next to the
+run, and returns only the top-k passages relevant to a slide.
+
+Tokenization is CJK-aware: Latin words are lowercased, CJK text is indexed
+as character bigrams (the usual approach for Chinese/Japanese BM25).
+
+Usage:
+    index = SourceIndex.load_or_build(source_path, output_dir / ".source_index.json")
+    passages = index.passages_for(slide_content, k=6)
+"""
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+INDEX_VERSION = 1
+DEFAULT_CHUNK_CHARS = 1200
+DEFAULT_TOP_K = 6
+
+# BM25 parameters (Robertson/Sparck Jones defaults)
+K1 = 1.5
+B = 0.75
+
+_LATIN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")  # Kana + CJK ideographs
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased Latin words plus CJK character bigrams."""
+    text = text.lower()
+    tokens = _LATIN.findall(text)
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def split_passages(text: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """Split text into passages of about chunk_chars, on paragraph boundaries.
+
+    Paragraphs longer than chunk_chars are cut on sentence ends (or hard-cut).
+    """
+    passages: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph]
+        if len(paragraph) > chunk_chars:
+            pieces = []
+            for sentence in re.split(r"(?<=[.!?。！？])\s*", paragraph):
+                while len(sentence) > chunk_chars:
+                    pieces.append(sentence[:chunk_chars])
+                    sentence = sentence[chunk_chars:]
+                if pieces and len(pieces[-1]) + len(sentence) <= chunk_chars:
+                    pieces[-1] += sentence
+                elif sentence:
+                    pieces.append(sentence)
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > chunk_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class SourceIndex:
+    """Okapi BM25 index over source passages."""
+
+    def __init__(self, passages: List[str], source_hash: str = "", chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        self.passages = passages
+        self.source_hash = source_hash
+        self.chunk_chars = chunk_chars
+        self.source_chars = sum(len(p) for p in passages)
+        self._term_freqs = [Counter(tokenize(p)) for p in passages]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_freq: Counter = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(passages)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    @classmethod
+    def build(cls, source_path: Path, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> "SourceIndex":
+        text = Path(source_path).read_text(encoding="utf-8")
+        return cls(split_passages(text, chunk_chars), file_sha256(source_path), chunk_chars)
+
+    @classmethod
+    def load_or_build(cls, source_path: Path, index_path: Path, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> "SourceIndex":
+        """Load a persisted index if it matches the source, otherwise rebuild and save it."""
+        source_hash = file_sha256(source_path)
+        index_path = Path(index_path)
+        if index_path.exists():
+            try:
+                data = json.loads(index_path.read_text(encoding="utf-8"))
+                if (data.get("version") == INDEX_VERSION and data.get("source_hash") == source_hash
+                        and data.get("chunk_chars") == chunk_chars):
+                    return cls(data["passages"], source_hash, chunk_chars)
+            except (json.JSONDecodeError, KeyError, TypeError):
+                pass
+        index = cls.build(source_path, chunk_chars)
+        index.save(index_path)
+        return index
+
+    def save(self, index_path: Path):
+        """Persist passages atomically (BM25 statistics are rebuilt on load)."""
+        index_path = Path(index_path)
+        data = {
+            "version": INDEX_VERSION,
+            "source_hash": self.source_hash,
+            "chunk_chars": self.chunk_chars,
+            "passages": self.passages
+        }
+        tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(index_path)
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[Tuple[int, float]]:
+        """Return up to k (passage index, score) pairs, best first."""
+        query_terms = set(tokenize(query))
+        scores = []
+        for i, tf in enumerate(self._term_freqs):
+            norm = K1 * (1 - B + B * self._lengths[i] / self._avg_length) if self._avg_length else K1
+            score = 0.0
+            for term in query_terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (K1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((i, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:k]
+
+    def passages_for(self, query: str, k: int = DEFAULT_TOP_K) -> str:
+        """Top-k passages for a query, joined in document order.
+
+        Small sources that fit in k passages are returned whole.
+        """
+        if len(self.passages) <= k:
+            return "\n\n".join(self.passages)
+        hits = sorted(i for i, _ in self.search(query, k))
+        if not hits:
+            hits = list(range(min(k, len(self.passages))))  # No overlap: fall back to the opening
+        return "\n\n[...]\n\n".join(self.passages[i] for i in hits)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "passages": len(self.passages),
+            "source_chars": self.source_chars,
+            "chunk_chars": self.chunk_chars,
+            "vocabulary": len(self._idf)
+        }
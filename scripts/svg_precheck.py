@@ -0,0 +1,291 @@
+"""
+svg_precheck - Deterministic local checks for generated SVGs.
+
+Runs before VALIDATE_SLIDE_SVG / VALIDATE_CONCEPTUAL_SVG so that broken
+SVGs (malformed XML, bad viewBox, text running off the canvas, unreadable
+font sizes, runaway element counts) are rejected instantly with concrete
+rework feedback instead of costing an LLM validation round-trip.
+
+The checks are intentionally conservative: anything they cannot measure
+reliably (rotated/skewed text, percentage coordinates) is skipped and left
+to the LLM judge.
+
+Usage:
+    result = precheck_svg(svg_code, cfg.get("svg_precheck"))
+    if not result.is_valid:
+        rework_feedback = result.feedback
+"""
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_LIMITS = {
+    "min_font_size": 10,         # rendered px, relative to a 960px-wide canvas
+    "max_elements": 1500,
+    "overflow_tolerance": 8,     # px the text box may exceed the canvas
+    "max_issues": 8,             # feedback lines reported per SVG
+}
+
+# Average glyph advance as a fraction of font-size
+WIDE_CHAR_EM = 1.0    # CJK / full-width
+NARROW_CHAR_EM = 0.55  # Latin, digits, punctuation
+
+REFERENCE_WIDTH = 960  # fix_svg_layout's default 16:9 canvas
+
+_NUMBER = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(px)?\s*$")
+_TRANSFORM = re.compile(r"(\w+)\s*\(([^)]*)\)")
+_CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+# Simple CSS rules from <style>, keyed by selector (".title", "text")
+Rules = Dict[str, Dict[str, str]]
+
+# Identity transform as (scale_x, scale_y, translate_x, translate_y)
+Transform = Tuple[float, float, float, float]
+
+
+@dataclass
+class SvgCheckResult:
+    """Outcome of the local SVG checks."""
+    issues: List[str] = field(default_factory=list)
+    element_count: int = 0
+    text_count: int = 0
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.issues
+
+    @property
+    def feedback(self) -> str:
+        """Rework feedback listing every problem found."""
+        return "Local SVG check failed:\n" + "\n".join(f"- {issue}" for issue in self.issues)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    """Parse a plain or px length; returns None for %, em and other units."""
+    if value is None:
+        return None
+    match = _NUMBER.match(value)
+    return float(match.group(1)) if match else None
+
+
+def _declarations(css: str) -> Dict[str, str]:
+    declarations = {}
+    for declaration in css.split(";"):
+        key, _, value = declaration.partition(":")
+        if value.strip():
+            declarations[key.strip()] = value.replace("!important", "").strip()
+    return declarations
+
+
+def _css_rules(root: ET.Element) -> Rules:
+    """Collect class and tag rules from <style> blocks (no combinators)."""
+    rules: Rules = {}
+    for element in root.iter():
+        if _local_name(element.tag) != "style" or not element.text:
+            continue
+        css = re.sub(r"/\*.*?\*/", "", element.text, flags=re.DOTALL)
+        for selectors, body in _CSS_RULE.findall(css):
+            declarations = _declarations(body)
+            for selector in selectors.split(","):
+                selector = selector.strip()
+                if re.fullmatch(r"\.?[\w-]+", selector):
+                    rules.setdefault(selector, {}).update(declarations)
+    return rules
+
+
+def _style_value(element: ET.Element, name: str, rules: Optional[Rules] = None) -> Optional[str]:
+    """Resolve a property: inline style, then class rules, tag rules, attribute."""
+    inline = _declarations(element.get("style") or "")
+    if name in inline:
+        return inline[name]
+    if rules:
+        for cls in reversed((element.get("class") or "").split()):
+            if name in rules.get(f".{cls}", {}):
+                return rules[f".{cls}"][name]
+        tag_rule = rules.get(_local_name(element.tag), {})
+        if name in tag_rule:
+            return tag_rule[name]
+    return element.get(name)
+
+
+def _apply_transform(parent: Optional[Transform], transform: Optional[str]) -> Optional[Transform]:
+    """Compose translate/scale transforms; None means 'not measurable'."""
+    if parent is None:
+        return None
+    sx, sy, tx, ty = parent
+    if not transform:
+        return parent
+    for name, raw_args in _TRANSFORM.findall(transform):
+        try:
+            args = [float(a) for a in re.split(r"[\s,]+", raw_args.strip()) if a]
+        except ValueError:
+            return None
+        if name == "translate" and args:
+            tx += sx * args[0]
+            ty += sy * (args[1] if len(args) > 1 else 0)
+        elif name == "scale" and args:
+            sx *= args[0]
+            sy *= args[1] if len(args) > 1 else args[0]
+        else:
+            return None  # rotate / skew / matrix
+    return sx, sy, tx, ty
+
+
+def estimate_text_width(text: str, font_size: float) -> float:
+    """Rough rendered width of a single line of text."""
+    width = 0.0
+    for char in text:
+        wide = unicodedata.east_asian_width(char) in ("W", "F")
+        width += WIDE_CHAR_EM if wide else NARROW_CHAR_EM
+    return width * font_size
+
+
+def _parse_viewbox(root: ET.Element, result: SvgCheckResult) -> Optional[Tuple[float, float, float, float]]:
+    viewbox = root.get("viewBox")
+    if viewbox is None:
+        width, height = _number(root.get("width")), _number(root.get("height"))
+        if width and height:
+            return 0.0, 0.0, width, height
+        result.issues.append("The <svg> element needs a viewBox (e.g. viewBox=\"0 0 960 540\").")
+        return None
+    try:
+        min_x, min_y, width, height = [float(v) for v in re.split(r"[\s,]+", viewbox.strip())]
+    except ValueError:
+        result.issues.append(f"Invalid viewBox \"{viewbox}\": expected four numbers.")
+        return None
+    if width <= 0 or height <= 0:
+        result.issues.append(f"viewBox \"{viewbox}\" must have a positive width and height.")
+        return None
+    ratio = width / height
+    if not 0.5 <= ratio <= 4:
+        result.issues.append(f"viewBox \"{viewbox}\" has an unusable aspect ratio ({ratio:.2f}); use 16:9, e.g. 0 0 960 540.")
+    for attr in ("width", "height"):
+        value = _number(root.get(attr))
+        if value is not None and value <= 0:
+            result.issues.append(f"The <svg> {attr} attribute must be positive.")
+    return min_x, min_y, width, height
+
+
+def _text_lines(text_el: ET.Element) -> List[Tuple[ET.Element, str]]:
+    """Split a <text> into measurable lines: positioned tspans are their own line."""
+    positioned = [t for t in text_el if _local_name(t.tag) == "tspan" and t.get("x") is not None]
+    if not positioned:
+        return [(text_el, "".join(text_el.itertext()).strip())]
+    lines = []
+    lead = (text_el.text or "").strip()
+    if lead:
+        lines.append((text_el, lead))
+    for tspan in positioned:
+        lines.append((tspan, "".join(tspan.itertext()).strip()))
+    return lines
+
+
+def _check_text(
+    text_el: ET.Element,
+    transform: Optional[Transform],
+    inherited_size: float,
+    inherited_anchor: str,
+    viewbox: Optional[Tuple[float, float, float, float]],
+    rules: Rules,
+    limits: Dict[str, Any],
+    result: SvgCheckResult
+):
+    font_size = _number(_style_value(text_el, "font-size", rules)) or inherited_size
+    anchor = _style_value(text_el, "text-anchor", rules) or inherited_anchor
+    min_font = limits["min_font_size"] * ((viewbox[2] / REFERENCE_WIDTH) if viewbox else 1)
+    tolerance = limits["overflow_tolerance"]
+
+    for line_el, text in _text_lines(text_el):
+        if not text:
+            continue
+        size = _number(_style_value(line_el, "font-size", rules)) or font_size
+        line_anchor = _style_value(line_el, "text-anchor", rules) or anchor
+        line_transform = _apply_transform(transform, line_el.get("transform")) if line_el is not text_el else transform
+        snippet = text if len(text) <= 24 else text[:24] + "…"
+
+        scale = line_transform[0] if line_transform else 1.0
+        if size * scale < min_font:
+            result.issues.append(
+                f"Text \"{snippet}\" renders at {size * scale:.1f}px; use at least {limits['min_font_size']}px so it stays readable."
+            )
+
+        x, y = _number(line_el.get("x")), _number(line_el.get("y") or text_el.get("y"))
+        if line_transform is None or viewbox is None or x is None or y is None:
+            continue
+        sx, sy, tx, ty = line_transform
+        width = estimate_text_width(text, size) * sx
+        left = tx + sx * x
+        if line_anchor == "middle":
+            left -= width / 2
+        elif line_anchor == "end":
+            left -= width
+        right, baseline = left + width, ty + sy * y
+        min_x, min_y, vb_w, vb_h = viewbox
+        if left < min_x - tolerance or right > min_x + vb_w + tolerance:
+            result.issues.append(
+                f"Text \"{snippet}\" (~{width:.0f}px wide at x={left:.0f}..{right:.0f}) overflows the {vb_w:.0f}px canvas; "
+                f"shorten it, wrap it into <tspan> lines or reduce the font size."
+            )
+        elif baseline - size * sy < min_y - tolerance or baseline > min_y + vb_h + tolerance:
+            result.issues.append(f"Text \"{snippet}\" at y={baseline:.0f} lies outside the {vb_h:.0f}px-high canvas.")
+
+
+def precheck_svg(svg_code: str, limits: Optional[Dict[str, Any]] = None) -> SvgCheckResult:
+    """Run all local checks on an SVG string."""
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    result = SvgCheckResult()
+
+    try:
+        root = ET.fromstring(svg_code)
+    except ET.ParseError as e:
+        result.issues.append(f"The SVG is not well-formed XML ({e}); escape '&' as '&amp;' and close every tag.")
+        return result
+    if _local_name(root.tag) != "svg":
+        result.issues.append(f"The root element must be <svg>, not <{_local_name(root.tag)}>.")
+        return result
+
+    viewbox = _parse_viewbox(root, result)
+    rules = _css_rules(root)
+    root_size = _number(_style_value(root, "font-size", rules)) or 16.0
+    root_anchor = _style_value(root, "text-anchor", rules) or "start"
+
+    result.element_count = sum(1 for _ in root.iter())
+
+    # Depth-first walk carrying transform, font-size and text-anchor
+    stack = [(root, (1.0, 1.0, 0.0, 0.0), root_size, root_anchor)]
+    has_content = False
+    while stack:
+        element, transform, size, anchor = stack.pop()
+        name = _local_name(element.tag)
+        if name in ("defs", "style", "title", "desc", "metadata", "clipPath", "mask", "pattern", "symbol"):
+            continue  # Not rendered in place
+        transform = _apply_transform(transform, element.get("transform")) if element is not root else transform
+        if name == "svg" and element is not root:
+            transform = None  # Nested viewport: coordinates no longer map to the canvas
+        if name == "text":
+            has_content = True
+            result.text_count += 1
+            _check_text(element, transform, size, anchor, viewbox, rules, limits, result)
+            continue
+        if name in ("rect", "circle", "ellipse", "line", "polyline", "polygon", "path", "image", "use", "foreignObject"):
+            has_content = True
+        size = _number(_style_value(element, "font-size", rules)) or size
+        anchor = _style_value(element, "text-anchor", rules) or anchor
+        for child in reversed(list(element)):
+            stack.append((child, transform, size, anchor))
+
+    if result.element_count > limits["max_elements"]:
+        result.issues.append(
+            f"The SVG has {result.element_count} elements (limit {limits['max_elements']}); simplify the drawing."
+        )
+    if not has_content:
+        result.issues.append("The SVG has no visible content (no text or shapes).")
+
+    del result.issues[limits["max_issues"]:]
+    return result
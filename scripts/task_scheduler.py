@@ -0,0 +1,185 @@
+"""
+TaskScheduler - Dependency-driven task runner with one global worker budget.
+
+Replaces barriered thread pools: a task starts as soon as all of its
+dependencies have finished, instead of waiting for a whole phase.
+
+Usage:
+    scheduler = TaskScheduler(max_workers=4)
+    scheduler.add("memo:01", process_memo_page, ...)
+    scheduler.add("slide_svg:01", process_slide_svg, ...)
+    scheduler.add("conceptual_svg:01", process_conceptual_svg, ..., deps=["memo:01"])
+    results = scheduler.run(on_complete=lambda name, result, error: ...)
+"""
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class DependencyFailedError(Exception):
+    """A task was skipped because one of its dependencies failed."""
+
+    def __init__(self, task: str, dependency: str):
+        super().__init__(f"Task '{task}' skipped: dependency '{dependency}' failed")
+        self.task = task
+        self.dependency = dependency
+
+
+@dataclass
+class ScheduledTask:
+    """A unit of work in the scheduler graph."""
+    name: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    deps: List[str] = field(default_factory=list)
+    rank: int = 1  # Length of the longest chain starting at this task
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+class TaskScheduler:
+    """
+    Runs a DAG of tasks on a bounded thread pool.
+
+    Ready tasks are started longest-chain first, so work that unlocks other
+    tasks (e.g. a memo feeding a conceptual SVG) is never starved by leaves.
+    A failed task marks all of its dependents as failed with
+    DependencyFailedError without running them.
+    """
+
+    def __init__(self, max_workers: int = 4, limit: Optional[Callable[[], int]] = None, name: str = "tasks"):
+        """
+        Args:
+            max_workers: Thread pool size (hard upper bound on concurrency)
+            limit: Optional callable returning the current concurrency limit,
+                   re-read every time the scheduler looks for work
+            name: Label for the queue depth / active worker gauges
+        """
+        self.max_workers = max(1, max_workers)
+        self._limit = limit
+        self.name = name
+        self._tasks: Dict[str, ScheduledTask] = {}
+        self._wall_seconds = 0.0
+
+    def add(self, name: str, func: Callable[..., Any], *args: Any, deps: Optional[List[str]] = None, **kwargs: Any) -> str:
+        """Add a task. Dependencies must be added before run()."""
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task name: {name}")
+        self._tasks[name] = ScheduledTask(name, func, args, kwargs, list(deps or []))
+        return name
+
+    def current_limit(self) -> int:
+        """Return the concurrency limit in effect right now."""
+        if self._limit is None:
+            return self.max_workers
+        return max(1, min(self.max_workers, int(self._limit())))
+
+    def _compute_ranks(self, dependents: Dict[str, List[str]]):
+        """Assign each task the length of its longest downstream chain."""
+        ranks: Dict[str, int] = {}
+        visiting = set()
+
+        def rank(name: str) -> int:
+            if name in ranks:
+                return ranks[name]
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at task '{name}'")
+            visiting.add(name)
+            ranks[name] = 1 + max((rank(d) for d in dependents[name]), default=0)
+            visiting.discard(name)
+            return ranks[name]
+
+        for name in self._tasks:
+            self._tasks[name].rank = rank(name)
+
+    def _execute(self, task: ScheduledTask) -> Any:
+        from agents.tracing import tracer
+        task.started = time.perf_counter()
+        try:
+            with tracer.span(task.name, "task", scheduler=self.name, deps=task.deps):
+                return task.func(*task.args, **task.kwargs)
+        finally:
+            task.finished = time.perf_counter()
+
+    def run(self, on_complete: Optional[Callable[[str, Any, Optional[BaseException]], None]] = None) -> Dict[str, Any]:
+        """Run all tasks and return {name: result or exception}.
+
+        on_complete(name, result, error) is called from the scheduling
+        thread as each task finishes (including skipped dependents).
+        """
+        dependents: Dict[str, List[str]] = {name: [] for name in self._tasks}
+        waiting: Dict[str, set] = {}
+        for task in self._tasks.values():
+            for dep in task.deps:
+                if dep not in self._tasks:
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+                dependents[dep].append(task.name)
+            waiting[task.name] = set(task.deps)
+        self._compute_ranks(dependents)
+
+        results: Dict[str, Any] = {}
+        ready: List[Tuple[int, int, str]] = []
+        order = {name: i for i, name in enumerate(self._tasks)}
+        for name, deps in waiting.items():
+            if not deps:
+                heapq.heappush(ready, (-self._tasks[name].rank, order[name], name))
+
+        def finish(name: str, result: Any, error: Optional[BaseException]):
+            results[name] = error if error is not None else result
+            if on_complete:
+                on_complete(name, result, error)
+            for child in dependents[name]:
+                if child in results:
+                    continue
+                if error is not None:
+                    finish(child, None, DependencyFailedError(child, name))
+                    continue
+                waiting[child].discard(name)
+                if not waiting[child]:
+                    heapq.heappush(ready, (-self._tasks[child].rank, order[child], child))
+
+        start = time.perf_counter()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as executor:
+            while ready or running:
+                while ready and len(running) < self.current_limit():
+                    _, _, name = heapq.heappop(ready)
+                    if name in results:
+                        continue
+                    running[executor.submit(self._execute, self._tasks[name])] = name
+
+                self._report(len(ready), len(self._tasks) - len(results) - len(ready) - len(running), len(running))
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    finish(name, None if error else future.result(), error)
+
+        self._wall_seconds = time.perf_counter() - start
+        self._report(0, 0, 0)
+        return results
+
+    def _report(self, ready: int, blocked: int, running: int):
+        """Publish queue depth and active workers (e.g. for the metrics exporter)."""
+        from agents.performance import performance_monitor
+        performance_monitor.set_gauge("scheduler_queue_depth", ready, scheduler=self.name, state="ready")
+        performance_monitor.set_gauge("scheduler_queue_depth", max(0, blocked), scheduler=self.name, state="blocked")
+        performance_monitor.set_gauge("scheduler_active_workers", running, scheduler=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return wall time, busy time and worker utilization of the last run."""
+        ran = [t for t in self._tasks.values() if t.started is not None and t.finished is not None]
+        busy = sum(t.finished - t.started for t in ran)
+        wall = self._wall_seconds
+        return {
+            "tasks": len(self._tasks),
+            "executed": len(ran),
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(busy, 3),
+            "utilization": round(busy / (wall * self.max_workers) * 100, 1) if wall > 0 else 0.0
+        }
@@ -0,0 +1,272 @@
+"""
+tolerant_json - Linear-time JSON extraction from model output.
+
+Replaces the regex salvage in orchestrate.parse_ai_json_output. Model
+output is located (code fence or first '{' / '['), decoded with the C
+json decoder when it is valid, and otherwise read by a single-pass
+recursive-descent parser that tolerates what models actually emit:
+
+- truncation: the valid prefix is kept, closing every open container and
+  dropping only the element that was cut off (so a DECK cut mid-slide
+  keeps every slide emitted before it)
+- unescaped double quotes and raw newlines inside strings (a quote only
+  ends a string if the JSON around it continues, e.g. with ', "key":')
+- trailing or missing commas, leading zeros, invalid escapes such as \\d
+- the agent's {"response": "<json string>"} envelope, even when it is
+  itself truncated
+
+Every character is read a bounded number of times (no regex
+backtracking), so large DECK outputs parse in linear time.
+
+Usage:
+    result = extract_json(output)
+    if result and not result.complete:
+        print(f"Recovered a truncated prefix ({result.value})")
+"""
+import json
+import re
+from json.decoder import scanstring
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+ENVELOPE_KEY = "response"
+MAX_CANDIDATES = 8   # '{' / '[' positions tried before giving up
+MAX_ENVELOPE_DEPTH = 3
+
+_FENCE = re.compile(r"```(?:json)?[ \t]*\n?")
+_STRING_RUN = re.compile(r'(?:[^"\\]+|\\.)*+', re.DOTALL)
+_ESCAPE = re.compile(r'\\(?:u([0-9a-fA-F]{4})|(.))', re.DOTALL)
+_CUT_ESCAPE = re.compile(r"\\(?:u[0-9a-fA-F]{0,3})?\Z")  # Escape cut off at the end of a partial string
+_SURROGATE = re.compile("[\ud800-\udfff]")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\r\n"
+_VALUE_START = '"{[-0123456789tfn'
+_decoder = json.JSONDecoder(strict=False)
+
+
+@dataclass
+class ParseResult:
+    """A JSON value found in model output; complete is False if it was recovered from a prefix."""
+    value: Any
+    complete: bool = True
+    start: int = 0
+
+
+class _Parser:
+    """Single-pass parser; each method returns (value, next position, complete)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.n = len(text)
+
+    def skip(self, pos: int) -> int:
+        text, n = self.text, self.n
+        while pos < n and text[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def value(self, pos: int, in_object: bool = False) -> Tuple[Any, int, bool]:
+        pos = self.skip(pos)
+        if pos >= self.n:
+            return None, pos, False
+        c = self.text[pos]
+        if c == "{":
+            return self.object(pos + 1)
+        if c == "[":
+            return self.array(pos + 1)
+        if c == '"':
+            return self.string(pos + 1, key=False, in_object=in_object)
+        if c in "-0123456789":
+            return self.number(pos)
+        for word, literal in _LITERALS.items():
+            if self.text.startswith(word, pos):
+                return literal, pos + len(word), True
+            if word.startswith(self.text[pos:pos + len(word)]) and pos + len(word) > self.n:
+                return None, self.n, False  # Cut off mid-literal
+        return None, pos, False
+
+    def number(self, pos: int) -> Tuple[Any, int, bool]:
+        match = _NUMBER.match(self.text, pos)
+        if not match:
+            return None, pos, False
+        end = match.end()
+        if end >= self.n:
+            return None, end, False  # Digits may continue past the cut
+        token = match.group()
+        return (float(token) if any(c in token for c in ".eE") else int(token)), end, True
+
+    def string(self, pos: int, key: bool, in_object: bool = False) -> Tuple[str, int, bool]:
+        """Read a string body; a quote only closes it if what follows fits the JSON around it."""
+        text, n = self.text, self.n
+        start = pos
+        while True:
+            end = _STRING_RUN.match(text, pos).end()  # Up to the next unescaped quote
+            if end >= n:
+                return _decode_string(text[start:n], partial=True), n, False
+            if self.closes_string(self.skip(end + 1), key, in_object):
+                return _decode_string(text[start:end]), end + 1, True
+            pos = end + 1  # An unescaped quote inside the text
+
+    def closes_string(self, after: int, key: bool, in_object: bool = False) -> bool:
+        if after >= self.n:
+            return True
+        c = self.text[after]
+        if key:
+            return c == ":"
+        if c in "}]":
+            return True
+        if c != ",":
+            return False
+        nxt = self.skip(after + 1)
+        if nxt >= self.n:
+            return True
+        if not in_object:
+            return self.text[nxt] in '"{[}]-0123456789'
+        if self.text[nxt] == "}":
+            return True
+        if self.text[nxt] != '"':
+            return False
+        # In an object the comma must start the next key: '"key":'. Only text up to
+        # the next quote is looked at, which the string would read next anyway.
+        end = _STRING_RUN.match(self.text, nxt + 1).end()
+        colon = self.skip(end + 1)
+        return end >= self.n or colon >= self.n or self.text[colon] == ":"
+
+    def object(self, pos: int) -> Tuple[dict, int, bool]:
+        result = {}
+        while True:
+            pos = self.skip(pos)
+            if pos >= self.n:
+                return result, pos, False
+            c = self.text[pos]
+            if c == "}":
+                return result, pos + 1, True
+            if c == ",":
+                pos += 1
+                continue
+            if c != '"':
+                return result, pos, False
+            key, pos, complete = self.string(pos + 1, key=True)
+            if not complete:
+                return result, pos, False
+            pos = self.skip(pos)
+            if pos >= self.n or self.text[pos] != ":":
+                return result, pos, False
+            value, pos, complete = self.value(pos + 1, in_object=True)
+            # A cut-off container keeps what it holds; a cut-off scalar is dropped
+            # (except the envelope, whose string is itself JSON to be recovered)
+            if complete or isinstance(value, (dict, list)) or (key == ENVELOPE_KEY and isinstance(value, str)):
+                result[key] = value
+            if not complete:
+                return result, pos, False
+
+    def array(self, pos: int) -> Tuple[list, int, bool]:
+        result = []
+        while True:
+            pos = self.skip(pos)
+            if pos >= self.n:
+                return result, pos, False
+            c = self.text[pos]
+            if c == "]":
+                return result, pos + 1, True
+            if c == ",":
+                pos += 1
+                continue
+            if c not in _VALUE_START:
+                return result, pos, False
+            value, pos, complete = self.value(pos)
+            if not complete:
+                return result, pos, False  # Only fully emitted elements are kept
+            result.append(value)
+
+
+def _decode_string(raw: str, partial: bool = False) -> str:
+    """Decode a string body; the C scanner first, escapes one by one if it contains model mistakes."""
+    if partial:
+        raw = _CUT_ESCAPE.sub("", raw)
+    try:
+        value, end = scanstring(raw + '"', 0, False)
+        if end == len(raw) + 1:
+            return value
+    except ValueError:
+        pass
+    value = _ESCAPE.sub(_unescape, raw)
+    if _SURROGATE.search(value):
+        value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")  # Join surrogate pairs
+    return value
+
+
+def _unescape(match: "re.Match") -> str:
+    if match.group(1):
+        return chr(int(match.group(1), 16))
+    return _ESCAPES.get(match.group(2), match.group())  # Unknown escapes (\d, \() are kept as written
+
+
+def parse_prefix(text: str, start: int = 0) -> Optional[ParseResult]:
+    """Parse the JSON value at text[start], recovering a prefix if it is cut off or malformed."""
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+        return ParseResult(value, True, start)
+    except ValueError:
+        pass
+    value, _, complete = _Parser(text).value(start)
+    if value is None and not complete:
+        return None
+    return ParseResult(value, complete, start)
+
+
+def _candidates(text: str) -> List[int]:
+    """Start positions to try: a code fence's body first, then each '{' / '[' in order."""
+    starts = []
+    fence = _FENCE.search(text)
+    if fence:
+        body = [i for i in (text.find("{", fence.end()), text.find("[", fence.end())) if i != -1]
+        if body:
+            starts.append(min(body))
+    pos = 0
+    while len(starts) < MAX_CANDIDATES:
+        found = [i for i in (text.find("{", pos), text.find("[", pos)) if i != -1]
+        if not found:
+            break
+        pos = min(found)
+        if pos not in starts:
+            starts.append(pos)
+        pos += 1
+    return starts
+
+
+def _usable(value: Any) -> bool:
+    """An object, or a non-empty list of objects (a bare slide list); '[1]' in prose is not."""
+    if isinstance(value, dict):
+        return True
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def extract_json(text: str, envelope_key: Optional[str] = ENVELOPE_KEY, _depth: int = 0) -> Optional[ParseResult]:
+    """Find and parse the JSON object in model output.
+
+    The first candidate that parses completely, or recovers a non-empty
+    prefix, wins; later candidates are never preferred, since they may be
+    elements inside it (one slide of a cut-off deck). A
+    {"response": "..."} envelope is unwrapped (its string parsed in turn).
+    """
+    if not text:
+        return None
+    best = None
+    for start in _candidates(text):
+        result = parse_prefix(text, start)
+        if result is not None and _usable(result.value) and (result.complete or result.value):
+            best = result
+            break
+    if best is None:
+        return None
+
+    value = best.value
+    if envelope_key and isinstance(value, dict) and isinstance(value.get(envelope_key), str) and _depth < MAX_ENVELOPE_DEPTH:
+        inner = extract_json(value[envelope_key], envelope_key, _depth + 1)
+        if inner is None:
+            return None
+        return ParseResult(inner.value, inner.complete and best.complete, best.start)
+    return best
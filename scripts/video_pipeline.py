@@ -164,7 +164,21 @@ def main():
     print("-" * 60)
 
     from video.pipeline import run_video_pipeline
+    from agents.metrics_export import MetricsExporter
 
+    export_cfg = dict(config.get("metrics_export") or {})
+    if export_cfg.get("textfile"):
+        export_cfg["textfile"] = str(args.project_root / export_cfg["textfile"])
+    exporter = None
+    try:
+        exporter = MetricsExporter.from_config(export_cfg, process="video")
+        if exporter:
+            exporter.start()
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Metrics export disabled: {e}")
+        exporter = None
+
+    status = "failed"
     try:
         output = run_video_pipeline(
             project_root=args.project_root,
@@ -173,6 +187,7 @@ def main():
         )
 
         if output:
+            status = "complete"
             print(f"\n✅ Video generated: {output}")
             print(f"   Size: {output.stat().st_size:,} bytes")
             return 0
@@ -187,6 +202,28 @@ def main():
         traceback.print_exc()
         return 1
 
+    finally:
+        if exporter:
+            exporter.stop()
+        _record_run_history(config, args.project_root, status, slides=len(slide_files))
+
+
+def _record_run_history(config: dict, project_root: Path, status: str, **info) -> None:
+    """Append this run's step timings to the run history (see 'run_history' in config.yaml)."""
+    history_cfg = config.get("run_history") or {}
+    if not history_cfg.get("enabled", True):
+        return
+    from agents.performance import performance_monitor
+    from scripts.run_history import RunHistory, summarize_snapshot
+
+    try:
+        history = RunHistory(project_root / history_cfg.get("path", ".cache/run_history.sqlite"))
+        run_id = history.record("video", summarize_snapshot(performance_monitor.snapshot()), status, **info)
+    except Exception as e:
+        print(f"⚠️  Failed to record run history: {e}")
+        return
+    print(f"📚 Run #{run_id} recorded (python scripts/run_history.py compare --process video)")
+
 
 if __name__ == "__main__":
     sys.exit(main())
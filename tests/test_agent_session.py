@@ -0,0 +1,131 @@
+"""
+Unit tests for AgentSession.
+"""
+import threading
+import pytest
+from unittest.mock import patch
+from agents.base import AgentInterface
+from agents.registry import AgentRegistry
+from agents.session import AgentSession, ResolvedAgent
+from agents.model_detector import DetectedEndpoint, DetectedModel
+
+
+def _ollama_endpoint():
+    return DetectedEndpoint(
+        url="http://localhost:11434",
+        type="ollama",
+        available=True,
+        models=[DetectedModel(name="qwen2.5", source="ollama", endpoint="http://localhost:11434")]
+    )
+
+
+class TestAgentSession:
+    """Test run-scoped agent resolution and adapter reuse."""
+
+    @pytest.fixture(autouse=True)
+    def setup_registry(self):
+        """Register a stand-in claude adapter."""
+        AgentRegistry.reset()
+
+        class FakeClaude(AgentInterface):
+            NAME = "FakeClaude"
+            COMMAND = "claude"
+
+            def __init__(self, config):
+                self.config = config
+
+            def execute(self, prompt, mode, **kwargs):
+                return "output"
+
+            def get_models(self):
+                return []
+
+            def is_available(self):
+                return True
+
+        AgentRegistry().register("claude", FakeClaude)
+        yield
+        AgentRegistry.reset()
+
+    def test_from_config_file_parses_once(self, tmp_config):
+        """Config file should be parsed into the session."""
+        session = AgentSession.from_config_file(tmp_config)
+        assert session.config["agent"] == "antigravity"
+        assert session.agent_config["model"] == "gemini-1.5-pro"
+
+    def test_gemini_maps_to_antigravity(self):
+        """Deprecated gemini agent should resolve to antigravity."""
+        resolved = AgentSession().resolve("gemini", None)
+        assert resolved.agent == "antigravity"
+        assert resolved.api_base is None
+
+    def test_cli_agent_drops_foreign_model(self):
+        """Claude should ignore gemini model names."""
+        resolved = AgentSession().resolve("claude", "gemini-2.0-flash")
+        assert resolved.model is None
+
+    def test_resolution_is_memoized(self):
+        """Repeated resolves should return the cached result."""
+        session = AgentSession()
+        first = session.resolve("claude", None)
+        second = session.resolve("claude", None)
+        assert first is second
+        assert session.stats["resolve_calls"] == 2
+
+    def test_local_agent_detects_once(self):
+        """Endpoint detection should happen once for any number of calls."""
+        session = AgentSession()
+        with patch("agents.model_detector.default_detector.detect_all", return_value=[_ollama_endpoint()]) as detect:
+            for model_name in (None, "gemini-1.5-pro", None):
+                resolved = session.resolve("ollama", model_name)
+
+        assert detect.call_count == 1
+        assert session.stats["detections"] == 1
+        assert resolved.api_base == "http://localhost:11434/v1"
+        assert resolved.model == "qwen2.5"
+
+    def test_api_base_override(self):
+        """--api-base override should win over auto-detection."""
+        session = AgentSession({"api_base": "http://gpu-box:8000"})
+        with patch("agents.model_detector.ModelDetector.detect_endpoint", return_value=_ollama_endpoint()):
+            resolved = session.resolve("openai-compatible", None)
+        assert resolved.api_base == "http://gpu-box:8000"
+
+    def test_adapter_is_reused(self):
+        """The same resolved agent should map to one adapter instance."""
+        session = AgentSession()
+        resolved = session.resolve("claude", None)
+        assert session.get_agent(resolved) is session.get_agent(resolved)
+        assert session.stats["adapters_created"] == 1
+        assert session.stats["adapter_reuses"] == 1
+
+    def test_with_model_creates_separate_adapter(self):
+        """Switching model should produce a distinct adapter."""
+        session = AgentSession()
+        resolved = session.resolve("claude", None)
+        switched = session.with_model(resolved, "claude-opus-4-20250514")
+        assert session.get_agent(switched) is not session.get_agent(resolved)
+        assert switched.model == "claude-opus-4-20250514"
+
+    def test_concurrent_workers_share_adapter(self):
+        """Parallel workers should all receive the same adapter instance."""
+        session = AgentSession()
+        seen = []
+
+        def worker():
+            seen.append(session.get_agent(session.resolve("claude", None)))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len({id(a) for a in seen}) == 1
+        assert session.stats["adapters_created"] == 1
+
+    def test_resolved_to_config(self):
+        """ResolvedAgent should build a factory-compatible config."""
+        config = ResolvedAgent("ollama", "llama3", "http://x/v1", "key").to_config()
+        assert config["agent"] == "ollama"
+        assert config["agent_config"]["api_base"] == "http://x/v1"
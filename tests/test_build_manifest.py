@@ -0,0 +1,87 @@
+"""
+Unit tests for the incremental-build manifest.
+"""
+from scripts.build_manifest import BuildManifest, MANIFEST_NAME, STATUS_NOT_NEEDED
+
+
+class TestBuildManifest:
+    """Test freshness tracking of generated artifacts."""
+
+    def test_fresh_after_record(self, tmp_path):
+        """An artifact recorded with the same inputs should be up to date."""
+        manifest = BuildManifest(tmp_path)
+        memo = tmp_path / "note-01.md"
+        memo.write_text("memo", encoding="utf-8")
+        inputs = BuildManifest.hash_inputs("slide", "glossary")
+        manifest.record("memo:01", memo, inputs)
+        assert manifest.is_fresh("memo:01", memo, inputs)
+
+    def test_changed_inputs_are_stale(self, tmp_path):
+        """Different inputs should mark the artifact stale."""
+        manifest = BuildManifest(tmp_path)
+        memo = tmp_path / "note-01.md"
+        memo.write_text("memo", encoding="utf-8")
+        manifest.record("memo:01", memo, BuildManifest.hash_inputs("v1"))
+        assert not manifest.is_fresh("memo:01", memo, BuildManifest.hash_inputs("v2"))
+
+    def test_deleted_file_is_stale(self, tmp_path):
+        """A recorded file that was deleted must be regenerated."""
+        manifest = BuildManifest(tmp_path)
+        memo = tmp_path / "note-01.md"
+        memo.write_text("memo", encoding="utf-8")
+        inputs = BuildManifest.hash_inputs("v1")
+        manifest.record("memo:01", memo, inputs)
+        memo.unlink()
+        assert not manifest.is_fresh("memo:01", memo, inputs)
+
+    def test_moved_path_removes_old_file(self, tmp_path):
+        """Renaming a topic should replace the old file rather than orphan it."""
+        manifest = BuildManifest(tmp_path)
+        old, new = tmp_path / "01_Old.svg", tmp_path / "01_New.svg"
+        old.write_text("<svg/>", encoding="utf-8")
+        manifest.record("slide_svg:01", old, "a")
+        assert not manifest.is_fresh("slide_svg:01", new, "a")
+
+        new.write_text("<svg/>", encoding="utf-8")
+        manifest.record("slide_svg:01", new, "b")
+        assert not old.exists()
+        assert manifest.get("slide_svg:01")["path"] == "01_New.svg"
+
+    def test_not_needed_is_fresh_without_file(self, tmp_path):
+        """'Not needed' results should be remembered without a file on disk."""
+        manifest = BuildManifest(tmp_path)
+        svg = tmp_path / "01_conceptual.svg"
+        manifest.record("conceptual_svg:01", svg, "a", status=STATUS_NOT_NEEDED)
+        assert manifest.is_fresh("conceptual_svg:01", svg, "a")
+
+    def test_hand_edit_detected(self, tmp_path):
+        """Editing a generated file should be detected."""
+        manifest = BuildManifest(tmp_path)
+        slide = tmp_path / "01_Intro.md"
+        slide.write_text("generated", encoding="utf-8")
+        manifest.record("slide:01", slide, "a")
+        assert not manifest.is_modified("slide:01", slide)
+        slide.write_text("edited by hand", encoding="utf-8")
+        assert manifest.is_modified("slide:01", slide)
+
+    def test_persisted_across_runs(self, tmp_path):
+        """A new manifest instance should see earlier records."""
+        memo = tmp_path / "note-01.md"
+        memo.write_text("memo", encoding="utf-8")
+        BuildManifest(tmp_path).record("memo:01", memo, "a")
+        assert BuildManifest(tmp_path).is_fresh("memo:01", memo, "a")
+
+    def test_corrupt_manifest_is_ignored(self, tmp_path):
+        """A corrupt manifest should make everything stale instead of crashing."""
+        (tmp_path / MANIFEST_NAME).write_text("{not json", encoding="utf-8")
+        assert BuildManifest(tmp_path).get("memo:01") is None
+
+    def test_hash_files_is_order_independent(self, tmp_path):
+        """File set hashes should not depend on directory listing order."""
+        a, b = tmp_path / "a.md", tmp_path / "b.md"
+        a.write_text("A", encoding="utf-8")
+        b.write_text("B", encoding="utf-8")
+        assert BuildManifest.hash_files([a, b], tmp_path) == BuildManifest.hash_files([b, a], tmp_path)
+        before = BuildManifest.hash_files([a, b], tmp_path)
+        b.write_text("B2", encoding="utf-8")
+        assert BuildManifest.hash_files([a, b], tmp_path) != before
@@ -0,0 +1,124 @@
+"""
+Unit tests for record/replay cassettes.
+"""
+import time
+import pytest
+import scripts.orchestrate as orchestrate
+from agents.base import AgentInterface
+from agents.cassette import Cassette
+from agents.exceptions import AgentExecutionError, CassetteMissError
+from agents.registry import AgentRegistry
+from agents.session import AgentSession
+from scripts.run_history import RunHistory
+
+
+class TestCassette:
+    """Test recording and replaying calls."""
+
+    def test_buffers_until_path_is_set(self, tmp_path):
+        """Calls recorded before the output directory exists should still be written."""
+        cassette = Cassette()
+        cassette.record("PLAN", "plan prompt", response="{}", latency_ms=1200)
+        cassette.set_path(tmp_path / "out" / "cassette.jsonl")
+        cassette.record("MEMO", "memo prompt", response="# Memo", latency_ms=800)
+        assert len((tmp_path / "out" / "cassette.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+        assert cassette.stats()["recorded"] == 2
+
+    def test_replays_identical_prompts_in_order(self, tmp_path):
+        """Repeated prompts should get their answers in recorded order, then repeat the last one."""
+        recorder = Cassette(tmp_path / "cassette.jsonl")
+        recorder.record("VALIDATE_MEMO", "p", response='{"is_valid": false}')
+        recorder.record("VALIDATE_MEMO", "p", response='{"is_valid": true}')
+        cassette = Cassette.load(tmp_path)
+        assert [cassette.replay("VALIDATE_MEMO", "p") for _ in range(3)] == ['{"is_valid": false}', '{"is_valid": true}', '{"is_valid": true}']
+        assert cassette.stats()["repeats"] == 1
+
+    def test_recorded_failure_is_raised_again(self, tmp_path):
+        """A failed call should fail the same way on replay."""
+        recorder = Cassette(tmp_path / "cassette.jsonl")
+        recorder.record("MEMO", "p", error="HTTP 503: overloaded", agent="ollama")
+        recorder.record("MEMO", "p", response="# Memo")
+        cassette = Cassette.load(tmp_path / "cassette.jsonl")
+        with pytest.raises(AgentExecutionError, match="overloaded"):
+            cassette.replay("MEMO", "p")
+        assert cassette.replay("MEMO", "p") == "# Memo"
+
+    def test_miss(self, tmp_path):
+        """A prompt that was never recorded should raise CassetteMissError."""
+        Cassette(tmp_path / "cassette.jsonl").record("MEMO", "p", response="# Memo")
+        cassette = Cassette.load(tmp_path)
+        assert not cassette.has("MEMO", "other prompt")
+        with pytest.raises(CassetteMissError):
+            cassette.replay("PLAN", "p")
+
+    def test_replay_latency_is_scaled(self, tmp_path):
+        """With replay_latency the recorded latency times latency_scale should be reproduced."""
+        Cassette(tmp_path / "cassette.jsonl").record("MEMO", "p", response="# Memo", latency_ms=2000)
+        cassette = Cassette.load(tmp_path, replay_latency=True, latency_scale=0.05)
+        start = time.perf_counter()
+        cassette.replay("MEMO", "p")
+        assert 0.09 <= time.perf_counter() - start < 1
+
+
+class TestRunAgentCassette:
+    """Test recording and replaying through run_agent."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch, tmp_path):
+        """A 'fake' adapter that counts its calls."""
+        AgentRegistry.reset()
+        monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+        monkeypatch.setattr(orchestrate, "_response_cache", None)
+        calls = []
+
+        class FakeAdapter(AgentInterface):
+            NAME = "Fake"
+            COMMAND = "fake"
+
+            def __init__(self, config):
+                self.config = config
+
+            def execute(self, prompt, mode, **kwargs):
+                calls.append(mode)
+                return f"{mode} output {len(calls)}"
+
+            def get_models(self):
+                return []
+
+            def is_available(self):
+                return True
+
+        AgentRegistry().register("fake", FakeAdapter)
+        monkeypatch.setattr(orchestrate, "_agent_session", AgentSession({}))
+        yield calls
+        AgentRegistry.reset()
+
+    def test_record_then_replay(self, setup, monkeypatch, tmp_path):
+        """Replay should return the recorded responses without calling the agent."""
+        monkeypatch.setattr(orchestrate, "_cassette", Cassette())
+        recorded = [orchestrate.run_agent("fake", "MEMO", {"topic": t}, retries=1, delay=0) for t in ("A", "B")]
+        orchestrate.set_cassette_output(tmp_path)
+        assert setup == ["MEMO", "MEMO"]
+
+        monkeypatch.setattr(orchestrate, "_cassette", Cassette.load(tmp_path))
+        replayed = [orchestrate.run_agent("fake", "MEMO", {"topic": t}, retries=1, delay=0) for t in ("B", "A")]
+        assert replayed == recorded[::-1]
+        assert setup == ["MEMO", "MEMO"]
+
+    def test_miss_fails_or_goes_live(self, setup, monkeypatch, tmp_path):
+        """A changed prompt should stop the run unless on_miss is 'live'."""
+        Cassette(tmp_path / "cassette.jsonl").record("MEMO", "old prompt", response="# Memo")
+        monkeypatch.setattr(orchestrate, "_cassette", Cassette.load(tmp_path))
+        with pytest.raises(SystemExit):
+            orchestrate.run_agent("fake", "MEMO", {"topic": "A"}, retries=1, delay=0)
+        monkeypatch.setattr(orchestrate, "_cassette_on_miss", "live")
+        assert orchestrate.run_agent("fake", "MEMO", {"topic": "A"}, retries=1, delay=0) == "MEMO output 1"
+
+    def test_replay_run_is_kept_out_of_the_baseline(self, monkeypatch, tmp_path):
+        """A replayed run should be stored as 'replay', not as a complete run."""
+        history = RunHistory(tmp_path / "history.sqlite")
+        monkeypatch.setattr(orchestrate, "_cassette", Cassette(replaying=True))
+        monkeypatch.setattr(orchestrate, "_run_history", history)
+        orchestrate.save_run_history("complete")
+        assert [run["status"] for run in history.runs()] == ["replay"]
+        assert history.runs("orchestrate", status="complete") == []
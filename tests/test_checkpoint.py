@@ -0,0 +1,70 @@
+"""
+Unit tests for per-phase run checkpoints.
+"""
+import pytest
+from scripts.checkpoint import RunCheckpoint
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "chapter.md"
+    path.write_text("# Chapter\n\nSome content.", encoding="utf-8")
+    return path
+
+
+class TestRunCheckpoint:
+    """Test saving, reloading and invalidating phases."""
+
+    def test_phase_restored_with_same_inputs(self, tmp_path, source):
+        """A saved phase should be reloaded by a later run on the same source."""
+        RunCheckpoint.for_source(tmp_path, source).save("analysis", "in-1", {"document_title": "T"})
+        assert RunCheckpoint.for_source(tmp_path, source).load("analysis", "in-1") == {"document_title": "T"}
+
+    def test_phase_ignored_with_other_inputs(self, tmp_path, source):
+        """Changed inputs (e.g. a new custom instruction) should not reuse the phase."""
+        RunCheckpoint.for_source(tmp_path, source).save("analysis", "in-1", {"document_title": "T"})
+        assert RunCheckpoint.for_source(tmp_path, source).load("analysis", "in-2") is None
+
+    def test_keyed_by_source_hash(self, tmp_path, source):
+        """Editing the source should start from a fresh checkpoint."""
+        RunCheckpoint.for_source(tmp_path, source).save("analysis", "in-1", {"document_title": "T"})
+        source.write_text("# Chapter\n\nRewritten.", encoding="utf-8")
+        checkpoint = RunCheckpoint.for_source(tmp_path, source)
+        assert checkpoint.load("analysis", "in-1") is None
+        assert checkpoint.first_incomplete_phase() == "analysis"
+
+    def test_first_incomplete_phase(self, tmp_path, source):
+        """Resume should continue at the first phase without a checkpoint."""
+        checkpoint = RunCheckpoint.for_source(tmp_path, source)
+        checkpoint.save("analysis", "a", {})
+        checkpoint.save("plan", "p", {"slides": []})
+        assert checkpoint.first_incomplete_phase() == "deck"
+        for phase in ("deck", "pages", "guide"):
+            checkpoint.save(phase, "x")
+        assert checkpoint.first_incomplete_phase() is None
+
+    def test_new_upstream_result_invalidates_later_phases(self, tmp_path, source):
+        """Re-running the plan should drop the deck and page checkpoints."""
+        checkpoint = RunCheckpoint.for_source(tmp_path, source)
+        for phase in ("analysis", "plan", "deck", "pages"):
+            checkpoint.save(phase, "x", {})
+        checkpoint.save("plan", "y", {"slides": [1]})
+        assert checkpoint.load("analysis", "x") == {}
+        assert checkpoint.load("deck", "x") is None
+        assert checkpoint.first_incomplete_phase() == "deck"
+
+    def test_output_dir_and_pages_persisted(self, tmp_path, source):
+        """The output folder and per-page statuses should survive a restart."""
+        checkpoint = RunCheckpoint.for_source(tmp_path, source)
+        checkpoint.set_output_dir(tmp_path / "out")
+        checkpoint.record_page("Memo Page 01", "Generated")
+        again = RunCheckpoint.for_source(tmp_path, source)
+        assert again.output_dir == tmp_path / "out"
+        assert again.page_statuses() == {"Memo Page 01": "Generated"}
+
+    def test_corrupt_checkpoint_is_ignored(self, tmp_path, source):
+        """A corrupt checkpoint file should not break the run."""
+        checkpoint = RunCheckpoint.for_source(tmp_path, source)
+        checkpoint.path.parent.mkdir(parents=True)
+        checkpoint.path.write_text("{broken", encoding="utf-8")
+        assert RunCheckpoint.for_source(tmp_path, source).first_incomplete_phase() == "analysis"
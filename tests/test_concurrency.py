@@ -0,0 +1,176 @@
+"""
+Unit tests for the adaptive (AIMD) concurrency controller.
+"""
+import random
+import threading
+import time
+import pytest
+from agents.concurrency import WARMUP_CALLS, AdaptiveConcurrencyController
+from agents.error_parser import ErrorCategory, parse_cli_error
+from agents.performance import PerformanceMonitor
+
+
+class TestAdaptiveConcurrencyController:
+    """Test AIMD limit adjustments."""
+
+    @pytest.fixture(autouse=True)
+    def reset_monitor(self):
+        PerformanceMonitor().reset()
+        yield
+        PerformanceMonitor().reset()
+
+    def _complete(self, controller, latency_ms=100, mode="MEMO", output_tokens=0):
+        generation = controller.acquire()
+        controller.release()
+        controller.on_success(generation, latency_ms, mode, output_tokens)
+
+    def _warm_up(self, controller, latency_ms=100, mode="MEMO"):
+        for _ in range(WARMUP_CALLS):
+            self._complete(controller, latency_ms, mode)
+
+    def test_initial_limit_clamped(self):
+        """Initial limit should be clamped to [min, max]."""
+        assert AdaptiveConcurrencyController("b", initial=20, max_limit=4).limit == 4
+        assert AdaptiveConcurrencyController("b", initial=0, min_limit=1).limit == 1
+
+    def test_additive_increase_per_window(self):
+        """Limit should grow by one after a full window of healthy calls."""
+        controller = AdaptiveConcurrencyController("b", initial=2, max_limit=8)
+        self._warm_up(controller)
+        assert controller.limit == 2  # No growth before the mode's normal latency is known
+        self._complete(controller)
+        assert controller.limit == 2
+        self._complete(controller)
+        assert controller.limit == 3
+
+    def test_never_exceeds_max(self):
+        """Healthy calls should not push the limit past max."""
+        controller = AdaptiveConcurrencyController("b", initial=1, max_limit=3)
+        for _ in range(50):
+            self._complete(controller)
+        assert controller.limit == 3
+
+    def test_multiplicative_decrease_on_quota(self):
+        """Quota errors should halve the limit."""
+        controller = AdaptiveConcurrencyController("b", initial=8, max_limit=8)
+        generation = controller.acquire()
+        controller.release()
+        controller.on_error(generation, ErrorCategory.QUOTA)
+        assert controller.limit == 4
+
+    def test_burst_backs_off_once(self):
+        """Errors from calls started before a decrease should be ignored."""
+        controller = AdaptiveConcurrencyController("b", initial=8, max_limit=8)
+        generations = [controller.acquire() for _ in range(4)]
+        for generation in generations:
+            controller.release()
+            controller.on_error(generation, ErrorCategory.NETWORK)
+        assert controller.limit == 4
+
+    def test_non_overload_errors_ignored(self):
+        """Auth and config errors say nothing about load."""
+        controller = AdaptiveConcurrencyController("b", initial=4)
+        controller.on_error(0, ErrorCategory.AUTH)
+        controller.on_error(0, ErrorCategory.CONFIG)
+        assert controller.limit == 4
+
+    def test_latency_inflation_backs_off(self):
+        """A window dominated by slow calls should reduce the limit."""
+        controller = AdaptiveConcurrencyController("b", initial=2, max_limit=8, latency_tolerance=2.0)
+        self._warm_up(controller, latency_ms=100)
+        self._complete(controller, latency_ms=100)
+        self._complete(controller, latency_ms=100)
+        assert controller.limit == 3
+        for _ in range(3):
+            self._complete(controller, latency_ms=1000)
+        assert controller.limit == 1
+
+    def test_single_slow_call_is_not_overload(self):
+        """One outlier in a window should not cut the limit, nor move the baseline."""
+        controller = AdaptiveConcurrencyController("b", initial=2, max_limit=8)
+        self._warm_up(controller)
+        self._complete(controller, latency_ms=100)
+        self._complete(controller, latency_ms=5000)
+        assert controller.limit == 3
+        assert controller._baseline_ms["MEMO"] == 100
+
+    def test_latency_is_normalized_per_output_token(self):
+        """Long answers taking proportionally longer should count as healthy."""
+        controller = AdaptiveConcurrencyController("b", initial=2, max_limit=8)
+        for _ in range(WARMUP_CALLS):
+            self._complete(controller, latency_ms=1000, output_tokens=100)
+        for _ in range(2):
+            self._complete(controller, latency_ms=10000, output_tokens=1000)
+        assert controller.limit == 3
+
+    def test_load_independent_noise_keeps_growing(self):
+        """Noisy latency on an idle backend should still reach the max limit."""
+        rng = random.Random(7)
+        controller = AdaptiveConcurrencyController("b", initial=2, max_limit=8)
+        for _ in range(300):
+            mode = rng.choice(["MEMO", "VALIDATE_MEMO"])
+            tokens = rng.randint(200, 1500) if mode == "MEMO" else rng.randint(30, 120)
+            self._complete(controller, 20 * tokens * rng.lognormvariate(0, 0.8), mode, tokens)
+        assert controller.limit >= 7
+
+    def test_min_limit_floor(self):
+        """Limit should never drop below min."""
+        controller = AdaptiveConcurrencyController("b", initial=2, min_limit=2)
+        controller.on_error(0, ErrorCategory.QUOTA)
+        assert controller.limit == 2
+
+    def test_acquire_blocks_at_limit(self):
+        """acquire should block while the backend is saturated."""
+        controller = AdaptiveConcurrencyController("b", initial=1, max_limit=1)
+        controller.acquire()
+        with pytest.raises(TimeoutError):
+            controller.acquire(timeout=0.05)
+        controller.release()
+        controller.acquire(timeout=0.05)
+
+    def test_in_flight_bounded_under_threads(self):
+        """Concurrent callers should never exceed the limit."""
+        controller = AdaptiveConcurrencyController("b", initial=3, max_limit=3)
+        peak = 0
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal peak
+            generation = controller.acquire()
+            with lock:
+                peak = max(peak, controller.in_flight)
+            time.sleep(0.01)
+            controller.release()
+            controller.on_success(generation, 10)
+
+        threads = [threading.Thread(target=worker) for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak <= 3
+
+    def test_from_config_backend_override(self):
+        """Per-backend config should override global values."""
+        config = {"initial": 2, "max": 8, "backends": {"llamacpp": {"initial": 1, "max": 1}}}
+        assert AdaptiveConcurrencyController.from_config("x", "llamacpp", config).max_limit == 1
+        assert AdaptiveConcurrencyController.from_config("y", "ollama", config).max_limit == 8
+
+    def test_history_and_metrics(self):
+        """Limit changes should be recorded locally and in PerformanceMonitor."""
+        controller = AdaptiveConcurrencyController("backend-x", initial=4)
+        controller.on_error(0, ErrorCategory.TIMEOUT)
+
+        history = controller.get_history()
+        assert [h["reason"] for h in history] == ["initial", "timeout"]
+        assert controller.get_metrics()["changes"] == 1
+
+        stats = PerformanceMonitor().get_concurrency_stats()["backend-x"]
+        assert stats["limit"] == 2
+        assert stats["max_seen"] == 4
+
+    def test_error_parser_classifies_rate_limit(self):
+        """HTTP 429 text from adapters should map to a backoff category."""
+        controller = AdaptiveConcurrencyController("b", initial=4)
+        controller.on_error(0, parse_cli_error("HTTP Error 429: Too Many Requests").category)
+        assert controller.limit == 2
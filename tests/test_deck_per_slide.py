@@ -0,0 +1,112 @@
+"""
+Unit tests for per-slide deck generation and rework.
+"""
+import json
+from types import SimpleNamespace
+import pytest
+import scripts.orchestrate as orchestrate
+
+PLAN = {"pages": [{"page": "01", "topic": "Intro"}, {"page": "02", "topic": "Body"}]}
+CFG = {"agent": "fake", "agent_execution_retries": 0}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Fake agent: the first draft of a slide fails validation, reworks pass."""
+    calls = []
+
+    def fake_run_agent(agent, mode, variables, retries=3, model_name=None):
+        calls.append((mode, dict(variables)))
+        if mode == "DECK_SLIDE":
+            body = "fixed" if "rework_feedback" in variables else "draft"
+            return json.dumps({"page": variables["page"], "topic": variables["topic"], "content": f"# {variables['topic']}\n{body}"})
+        slide = json.loads(variables["slide_json"])
+        return json.dumps({"is_valid": "fixed" in slide["content"], "feedback": "Too vague"})
+
+    monkeypatch.setattr(orchestrate, "run_agent", fake_run_agent)
+    return calls
+
+
+class TestProcessDeckSlide:
+    """Test generating and validating a single slide."""
+
+    def test_only_failing_slide_is_reworked(self, calls):
+        """Validator feedback should be fed back into this slide's next attempt."""
+        args = SimpleNamespace(slide_reworks=2)
+        p_num, slide, status = orchestrate.process_deck_slide(1, PLAN["pages"][1], PLAN, "None", "src.md", CFG, args)
+        assert p_num == "02"
+        assert slide == {"page": "02", "topic": "Body", "content": "# Body\nfixed"}
+        assert status.startswith("Valid")
+        generations = [v for mode, v in calls if mode == "DECK_SLIDE"]
+        assert len(generations) == 2
+        assert "Too vague" in generations[1]["rework_feedback"]
+
+    def test_slide_only_sees_its_page(self, calls):
+        """Each call should target one page while keeping the plan as context."""
+        args = SimpleNamespace(slide_reworks=0)
+        orchestrate.process_deck_slide(0, PLAN["pages"][0], PLAN, "None", "src.md", CFG, args)
+        mode, variables = calls[0]
+        assert (variables["page"], variables["topic"]) == ("01", "Intro")
+        assert json.loads(variables["plan_json"]) == PLAN
+
+    def test_unvalidated_draft_kept_when_reworks_run_out(self, calls):
+        """The last parsed draft should be used rather than dropping the page."""
+        args = SimpleNamespace(slide_reworks=0)
+        _, slide, status = orchestrate.process_deck_slide(0, PLAN["pages"][0], PLAN, "None", "src.md", CFG, args)
+        assert slide["content"].endswith("draft")
+        assert status.startswith("Unvalidated")
+
+    def test_unparseable_output_fails(self, monkeypatch):
+        """A slide that never parses should be reported as failed."""
+        monkeypatch.setattr(orchestrate, "run_agent", lambda *a, **k: "not json")
+        args = SimpleNamespace(slide_reworks=1)
+        _, slide, status = orchestrate.process_deck_slide(0, PLAN["pages"][0], PLAN, "None", "src.md", CFG, args)
+        assert slide is None
+        assert status.startswith("Failed")
+
+
+class TestGenerateDeckPerSlide:
+    """Test fanning the deck out over the scheduler."""
+
+    def test_repeated_and_missing_pages(self, calls, monkeypatch):
+        """Slides sharing a page number or lacking one should all be generated, in plan order."""
+        controller = SimpleNamespace(max_limit=2, limit=2)
+        monkeypatch.setattr(orchestrate, "get_agent_session", lambda: SimpleNamespace(resolve=lambda *a: None, get_controller=lambda r: controller))
+        plan = {"pages": [{"page": "01", "topic": "A"}, {"page": "01", "topic": "B"}, {"topic": "C"}, {"topic": "D"}]}
+        args = SimpleNamespace(slide_reworks=1)
+        deck = orchestrate.generate_deck_per_slide(plan, "None", "src.md", CFG, args)
+        assert [s["topic"] for s in deck["slides"]] == ["A", "B", "C", "D"]
+
+    def test_failed_slide_is_retried_alone(self, calls, monkeypatch):
+        """A slide that fails should be regenerated on its own, keeping the slides that passed."""
+        controller = SimpleNamespace(max_limit=2, limit=2)
+        monkeypatch.setattr(orchestrate, "get_agent_session", lambda: SimpleNamespace(resolve=lambda *a: None, get_controller=lambda r: controller))
+        fake_run_agent, flaky = orchestrate.run_agent, []
+
+        def run_agent(agent, mode, variables, retries=3, model_name=None):
+            if mode == "DECK_SLIDE" and variables["topic"] == "Body" and not flaky:
+                flaky.append(1)
+                return "not json"
+            return fake_run_agent(agent, mode, variables, retries, model_name)
+
+        monkeypatch.setattr(orchestrate, "run_agent", run_agent)
+        deck = orchestrate.generate_deck_per_slide(PLAN, "None", "src.md", CFG, SimpleNamespace(slide_reworks=0))
+        assert [s["topic"] for s in deck["slides"]] == ["Intro", "Body"]
+        generated = [v["topic"] for mode, v in calls if mode == "DECK_SLIDE"]
+        assert generated.count("Intro") == 1 and generated.count("Body") == 1
+
+    def test_missing_slide_gets_placeholder(self, calls, monkeypatch):
+        """A slide that fails twice should be filled in rather than discarding the deck."""
+        controller = SimpleNamespace(max_limit=2, limit=2)
+        monkeypatch.setattr(orchestrate, "get_agent_session", lambda: SimpleNamespace(resolve=lambda *a: None, get_controller=lambda r: controller))
+        fake_run_agent = orchestrate.run_agent
+
+        def run_agent(agent, mode, variables, retries=3, model_name=None):
+            if mode == "DECK_SLIDE" and variables["topic"] == "Body":
+                return "not json"
+            return fake_run_agent(agent, mode, variables, retries, model_name)
+
+        monkeypatch.setattr(orchestrate, "run_agent", run_agent)
+        deck = orchestrate.generate_deck_per_slide(PLAN, "None", "src.md", CFG, SimpleNamespace(slide_reworks=0))
+        assert deck["slides"][0]["content"].startswith("# Intro")
+        assert deck["slides"][1] == {"page": "02", "topic": "Body", "content": "# Body\n"}
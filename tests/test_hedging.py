@@ -0,0 +1,157 @@
+"""
+Unit tests for hedged K-candidate generation.
+"""
+import threading
+import time
+import pytest
+from agents.performance import PerformanceMonitor
+from scripts.hedging import ACCEPTABLE, REJECTED, VALID, HedgeLimiter, run_candidates
+
+
+@pytest.fixture(autouse=True)
+def reset_monitor():
+    PerformanceMonitor().reset()
+    yield
+    PerformanceMonitor().reset()
+
+
+def _generate(delays):
+    """Candidate i sleeps delays[i] seconds and returns its index."""
+    def generate(index, cancel=None):
+        time.sleep(delays[index])
+        return index
+    return generate
+
+
+class TestRunCandidates:
+    """Test first-accepted-wins semantics."""
+
+    def test_single_candidate_runs_inline(self):
+        """K=1 should behave like the old sequential loop, in the caller's thread."""
+        threads = []
+
+        def generate(index, cancel):
+            threads.append(threading.current_thread())
+            return "svg"
+
+        round_ = run_candidates(generate, lambda raw: (VALID, raw, ""), k=1)
+        assert round_.winner.value == "svg"
+        assert threads == [threading.current_thread()]
+        assert PerformanceMonitor().get_hedge_stats() == {}
+
+    def test_single_candidate_errors_propagate(self):
+        """Failures with K=1 should surface exactly as before."""
+        def generate(index, cancel):
+            raise RuntimeError("agent down")
+
+        with pytest.raises(RuntimeError):
+            run_candidates(generate, lambda raw: (VALID, raw, ""), k=1)
+
+    def test_first_accepted_wins_and_losers_cancelled(self):
+        """A fast accepted candidate should win without waiting for slow ones."""
+        evaluated = []
+
+        def evaluate(raw):
+            evaluated.append(raw)
+            return (VALID, raw, "") if raw == 1 else (REJECTED, None, "bad")
+
+        start = time.perf_counter()
+        round_ = run_candidates(_generate([0.05, 0.01, 0.5]), evaluate, k=3, limiter=HedgeLimiter(4), mode="CREATE_SLIDE_SVG")
+        assert time.perf_counter() - start < 0.3
+        assert round_.winner.index == 1
+        assert round_.launched == 3
+        assert round_.cancelled >= 1
+        time.sleep(0.6)
+        assert 2 not in evaluated  # The slow loser skipped validation
+
+    def test_losers_are_told_to_stop(self):
+        """A slow loser should see its cancel event and its abort should not count as a failure."""
+        stopped, started = [], threading.Event()
+
+        def generate(index, cancel):
+            if index == 0:
+                started.wait(1)  # Let the loser get going
+                return "fast"
+            started.set()
+            assert cancel.wait(2)  # A cancelled run_agent raises AgentCancelledError
+            stopped.append(index)
+            raise RuntimeError("cancelled")
+
+        round_ = run_candidates(generate, lambda raw: (VALID, raw, ""), k=2, limiter=HedgeLimiter(4))
+        assert round_.winner.output == "fast"
+        deadline = time.monotonic() + 1
+        while not stopped and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stopped == [1]
+
+    def test_cancelled_candidates_are_not_errors(self):
+        """A candidate that raises after the round ended should be marked cancelled, not failed."""
+        from scripts.hedging import CANCELLED, _run_one
+        cancel = threading.Event()
+        cancel.set()
+
+        def generate(index, cancel):
+            raise RuntimeError("connection closed")
+
+        candidate = _run_one(1, generate, lambda raw: (VALID, raw, ""), cancel)
+        assert candidate.verdict == CANCELLED and candidate.error is None
+
+    def test_no_winner_collects_feedback(self):
+        """Without a winner every candidate's feedback should feed the next round."""
+        round_ = run_candidates(
+            _generate([0, 0]), lambda raw: (REJECTED, None, f"issue {raw}"), k=2, limiter=HedgeLimiter(4)
+        )
+        assert round_.winner is None
+        assert round_.feedback == "Candidate 1: issue 0\nCandidate 2: issue 1"
+
+    def test_acceptable_candidates_are_kept(self):
+        """Acceptable (but not valid) candidates should be available as fallback."""
+        round_ = run_candidates(
+            _generate([0, 0]), lambda raw: (ACCEPTABLE, f"memo {raw}", "minor"), k=2, limiter=HedgeLimiter(4)
+        )
+        assert round_.winner is None
+        assert round_.first(ACCEPTABLE).value.startswith("memo")
+
+    def test_limiter_caps_extra_candidates(self):
+        """Extra candidates should only start when the per-run cap allows it."""
+        limiter = HedgeLimiter(max_in_flight=1)
+        assert limiter.try_acquire()
+        round_ = run_candidates(_generate([0, 0, 0]), lambda raw: (VALID, raw, ""), k=3, limiter=limiter)
+        assert round_.launched == 1
+        limiter.release()
+
+        # Candidates overlap, so the extra one still holds the only slot when the third is considered
+        round_ = run_candidates(_generate([0.2, 0.2, 0.2]), lambda raw: (REJECTED, None, "x"), k=3, limiter=limiter)
+        assert round_.launched == 2
+        assert limiter.try_acquire()  # Slot released after the round
+
+    def test_all_candidates_failing_raises(self):
+        """If every candidate errors, the error should propagate."""
+        def generate(index, cancel):
+            raise RuntimeError("agent down")
+
+        with pytest.raises(RuntimeError):
+            run_candidates(generate, lambda raw: (VALID, raw, ""), k=2, limiter=HedgeLimiter(4))
+
+    def test_metrics_compare_with_sequential(self):
+        """Hedged rounds should record wall time against the sequential equivalent."""
+        run_candidates(
+            _generate([0.1, 0.02]), lambda raw: (VALID, raw, "") if raw == 1 else (REJECTED, None, "x"),
+            k=2, limiter=HedgeLimiter(4), mode="CREATE_SLIDE_SVG"
+        )
+        stats = PerformanceMonitor().get_hedge_stats()["CREATE_SLIDE_SVG"]
+        assert stats["rounds"] == 1 and stats["wins"] == 1
+        assert stats["sequential_ms"] > stats["wall_ms"]
+
+    def test_metrics_accumulate_per_mode(self):
+        """Rounds should add up per mode without keeping each round."""
+        monitor = PerformanceMonitor()
+        monitor.record_hedge("MEMO", 2, 100, 300, won=True, cancelled=1)
+        monitor.record_hedge("MEMO", 2, 200, 300, won=False)
+        monitor.record_hedge("CREATE_SLIDE_SVG", 3, 50, 50, won=True)
+        stats = monitor.get_hedge_stats()
+        assert stats["MEMO"] == {
+            "rounds": 2, "wins": 1, "candidates": 4, "cancelled": 1,
+            "wall_ms": 300, "sequential_ms": 600, "speedup": 2.0
+        }
+        assert stats["CREATE_SLIDE_SVG"]["rounds"] == 1
@@ -0,0 +1,190 @@
+"""
+Unit tests for the pooled keep-alive HTTP client.
+"""
+import json
+import sys
+import threading
+import time
+import urllib.error
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents import http_pool
+from agents.http_pool import HTTPClient, get_http_client
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections open between requests
+    disable_nagle_algorithm = True  # Avoid Nagle/delayed-ACK stalls on reused connections
+    ports = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).ports.append(self.client_address[1])
+        if self.path.endswith("/slow"):
+            time.sleep(1)  # A long generation
+        if self.path.endswith("/fail"):
+            body = b'{"error": "rate limited"}'
+            self.send_response(429)
+        else:
+            body = json.dumps({"path": self.path}).encode("utf-8") + b"\n" + b"line\n" * 50
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPClient:
+    """Test connection reuse and error mapping."""
+
+    @pytest.fixture
+    def base_url(self, monkeypatch):
+        for var in ("http_proxy", "HTTP_PROXY", "https_proxy", "HTTPS_PROXY", "all_proxy", "ALL_PROXY"):
+            monkeypatch.delenv(var, raising=False)
+        _KeepAliveHandler.ports = []
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+        httpd.shutdown()
+        httpd.server_close()
+
+    def test_sequential_requests_reuse_connection(self, base_url):
+        """Fully read responses should return their connection to the pool."""
+        client = HTTPClient(pool_size=2)
+        for _ in range(5):
+            with client.request("POST", f"{base_url}/v1/chat/completions", body=b"{}") as response:
+                assert response.status == 200
+                response.read()
+
+        assert client.stats["connections_opened"] == 1
+        assert client.stats["connections_reused"] == 4
+        assert len(set(_KeepAliveHandler.ports)) == 1
+        client.close()
+
+    def test_iterated_response_is_reused(self, base_url):
+        """Line iteration to the end should also release the connection."""
+        client = HTTPClient()
+        for _ in range(3):
+            with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+                assert len(list(response)) == 51
+        assert client.stats["connections_opened"] == 1
+        client.close()
+
+    def test_abandoned_response_closes_connection(self, base_url):
+        """Closing a half-read response must not pool its connection."""
+        client = HTTPClient()
+        with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+            next(iter(response))
+        with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+            response.read()
+        assert client.stats["connections_opened"] == 2
+        client.close()
+
+    def test_http_error_raised_as_urllib_error(self, base_url):
+        """4xx responses should raise urllib.error.HTTPError with the status."""
+        client = HTTPClient()
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            client.request("POST", f"{base_url}/v1/fail", body=b"{}")
+        assert exc_info.value.code == 429
+        assert b"rate limited" in exc_info.value.read()
+
+    def test_stale_connection_is_retried(self, base_url):
+        """A pooled connection closed by the server should be replaced transparently."""
+        client = HTTPClient()
+        with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+            response.read()
+        # Simulate the server dropping the idle connection
+        for conns in client._idle.values():
+            for conn in conns:
+                conn.sock.close()
+                conn.sock = _DeadSocket()
+
+        with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+            assert response.status == 200
+            response.read()
+        client.close()
+
+    def test_cancel_aborts_waiting_request(self, base_url):
+        """Setting the cancel event should break a request blocked on the reply."""
+        client = HTTPClient()
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.monotonic()
+        with pytest.raises(OSError):
+            client.request("POST", f"{base_url}/v1/slow", body=b"{}", cancel=cancel)
+        assert time.monotonic() - start < 0.9
+        assert not client._idle.get(("http", "127.0.0.1", int(base_url.rsplit(":", 1)[1])))
+        client.close()
+
+    def test_concurrent_threads_share_pool(self, base_url):
+        """Worker threads should reuse at most pool_size idle connections."""
+        client = HTTPClient(pool_size=2)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    with client.request("POST", f"{base_url}/v1/x", body=b"{}") as response:
+                        response.read()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors
+        assert client.stats["requests"] == 20
+        assert client.stats["connections_opened"] < 20
+        assert sum(len(c) for c in client._idle.values()) <= 2
+        client.close()
+
+
+class _DeadSocket:
+    """Socket stand-in that fails like a connection reset by the peer."""
+
+    def sendall(self, data):
+        raise BrokenPipeError("connection closed")
+
+    def settimeout(self, timeout):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestSharedClient:
+    """Test the process-wide client registry."""
+
+    @pytest.fixture(autouse=True)
+    def clean_clients(self):
+        http_pool.close_http_clients()
+        yield
+        http_pool.close_http_clients()
+
+    def test_same_settings_share_client(self):
+        """Adapters with the same settings should share one client."""
+        assert get_http_client(4) is get_http_client(4)
+        assert get_http_client(4) is not get_http_client(8)
+
+    def test_http2_falls_back_without_httpx(self, monkeypatch):
+        """http2 without httpx installed should fall back to HTTP/1.1 pooling."""
+        monkeypatch.setitem(sys.modules, "httpx", None)
+        assert isinstance(get_http_client(4, http2=True), HTTPClient)
+
+    def test_adapters_share_client(self):
+        """API adapters should use the shared pooled client."""
+        from agents.openai_compatible import OpenAICompatibleAdapter
+        from agents.openai_direct import OpenAIDirectAdapter
+        a = OpenAICompatibleAdapter({"agent_config": {"http_pool_size": 4}})
+        b = OpenAICompatibleAdapter({"agent_config": {"http_pool_size": 4}})
+        c = OpenAIDirectAdapter({"agent_config": {"http_pool_size": 4}})
+        assert a._http is b._http is c._http
@@ -0,0 +1,110 @@
+"""
+Unit tests for the Prometheus metrics exporter.
+"""
+import urllib.request
+import pytest
+from agents.metrics_export import MetricsExporter, render_metrics
+from agents.performance import performance_monitor
+from scripts.task_scheduler import TaskScheduler
+
+
+@pytest.fixture(autouse=True)
+def monitor():
+    performance_monitor.reset()
+    yield performance_monitor
+    performance_monitor.reset()
+
+
+def sample(text, line_start):
+    """Value of the first sample line starting with line_start."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {line_start!r} in:\n{text}")
+
+
+class TestRenderMetrics:
+    """Test the text exposition format."""
+
+    def test_calls_latency_retries_errors(self, monitor):
+        """Agent calls should export counters, a histogram, retries and error categories."""
+        monitor.record_call("agy", "MEMO", 800, True)
+        monitor.record_call("agy", "MEMO", 20000, False, retry_count=1, error_category="timeout")
+        text = render_metrics(process="orchestrate")
+
+        labels = 'process="orchestrate",agent="agy",mode="MEMO",model="default"'
+        assert sample(text, f'pptplaner_agent_calls_total{{{labels},status="success"}}') == 1
+        assert sample(text, f'pptplaner_agent_calls_total{{{labels},status="failure"}}') == 1
+        assert sample(text, f'pptplaner_agent_call_duration_seconds_bucket{{{labels},le="1"}}') == 1
+        assert sample(text, f'pptplaner_agent_call_duration_seconds_bucket{{{labels},le="+Inf"}}') == 2
+        assert sample(text, f'pptplaner_agent_call_duration_seconds_sum{{{labels}}}') == pytest.approx(20.8)
+        assert sample(text, 'pptplaner_agent_retries_total{process="orchestrate",agent="agy",mode="MEMO"}') == 1
+        assert sample(text, 'pptplaner_agent_errors_total{process="orchestrate",agent="agy",category="timeout"}') == 1
+
+    def test_each_family_declared_once(self, monitor):
+        """HELP/TYPE lines should appear once per metric family."""
+        monitor.record_call("a", "MEMO", 10, True)
+        monitor.record_call("b", "PLAN", 10, True)
+        types = [line for line in render_metrics().splitlines() if line.startswith("# TYPE")]
+        assert len(types) == len(set(types))
+
+    def test_label_escaping(self, monitor):
+        """Quotes and backslashes in label values should be escaped."""
+        monitor.record_call("agy", "MEMO", 10, True, model='we"ird\\model')
+        assert 'model="we\\"ird\\\\model"' in render_metrics()
+
+    def test_values_keep_full_precision(self, monitor):
+        """Large counters and sums should not be rounded to six significant digits."""
+        monitor.record_call("agy", "MEMO", 1234567.891, True)
+        monitor.record_rate_limit_wait("ollama@localhost", 123456789)
+        text = render_metrics()
+        assert 'pptplaner_agent_call_duration_seconds_sum{agent="agy",mode="MEMO",model="default"} 1234.567891' in text
+        assert 'pptplaner_rate_limit_wait_seconds_total{backend="ollama@localhost"} 123456.789' in text
+        assert 'pptplaner_agent_calls_total{agent="agy",mode="MEMO",model="default",status="success"} 1\n' in text
+
+    def test_scheduler_and_pipeline_gauges(self, monitor):
+        """Scheduler queue depth, active workers and pipeline steps should be exported."""
+        scheduler = TaskScheduler(max_workers=2, name="pages")
+        scheduler.add("a", lambda: None)
+        scheduler.add("b", lambda: None, deps=["a"])
+        scheduler.run()
+        monitor.record_pipeline_step("video", "tts", 1500, success=False)
+        text = render_metrics()
+        assert sample(text, 'pptplaner_scheduler_active_workers{scheduler="pages"}') == 0
+        assert sample(text, 'pptplaner_scheduler_queue_depth{scheduler="pages",state="ready"}') == 0
+        assert sample(text, 'pptplaner_pipeline_step_failures_total{pipeline="video",step="tts"}') == 1
+        assert sample(text, 'pptplaner_pipeline_step_duration_seconds_count{pipeline="video",step="tts"}') == 1
+
+
+class TestMetricsExporter:
+    """Test the HTTP endpoint and textfile writer."""
+
+    def test_disabled_by_default(self):
+        """No exporter should be built unless enabled."""
+        assert MetricsExporter.from_config({}) is None
+
+    def test_http_endpoint(self, monitor):
+        """GET /metrics should return the current metrics."""
+        exporter = MetricsExporter.from_config({"enabled": True, "port": 0}, process="video").start()
+        try:
+            monitor.record_call("agy", "MEMO", 10, True)
+            with urllib.request.urlopen(exporter.url, timeout=5) as response:
+                body = response.read().decode("utf-8")
+                assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'pptplaner_agent_calls_total{process="video"' in body
+        finally:
+            exporter.stop()
+
+    def test_textfile_final_write(self, monitor, tmp_path):
+        """The textfile should hold the end-of-run values after stop()."""
+        path = tmp_path / "metrics" / "pptplaner.prom"
+        exporter = MetricsExporter.from_config({"enabled": True, "mode": "textfile", "textfile": path, "interval_sec": 60}).start()
+        monitor.record_call("agy", "MEMO", 10, True)
+        exporter.stop()
+        assert 'status="success"} 1' in path.read_text(encoding="utf-8")
+        assert not list(path.parent.glob("*.tmp"))
+
+    def test_textfile_requires_path(self):
+        """Textfile mode without a path should be rejected."""
+        with pytest.raises(ValueError):
+            MetricsExporter.from_config({"enabled": True, "mode": "textfile"})
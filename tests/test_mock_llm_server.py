@@ -0,0 +1,100 @@
+"""
+Unit tests for the offline mock LLM server.
+"""
+import json
+import random
+import pytest
+from agents.exceptions import AgentExecutionError
+from agents.openai_compatible import OpenAICompatibleAdapter
+from scripts.mock_llm_server import MockBehavior, MockLLMServer, make_synthetic_source, mode_response
+from scripts.svg_precheck import precheck_svg
+
+
+def prompt(mode, **variables):
+    """A prompt laid out like run_agent builds it."""
+    lines = ["You are an AI assistant.", f"Your specific task is '{mode}'.", "--- CONTEXT & INPUTS ---"]
+    for key, value in variables.items():
+        if key.endswith("_content"):
+            lines.append(f"Content for '{key}':\n```\n{value}\n```")
+        else:
+            lines.append(f"- {key}: {value}")
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(MockBehavior(median_ms=0, distribution="fixed", seed=1)) as server:
+        yield server
+
+
+def adapter_for(server, **agent_config):
+    return OpenAICompatibleAdapter({"agent_config": {"api_base": server.url, "model": "mock-llm", **agent_config}})
+
+
+class TestModeResponses:
+    """Test the canned per-mode outputs."""
+
+    def test_plan_has_one_page_per_section(self, tmp_path):
+        """PLAN should follow the '## ' sections of the source."""
+        source = make_synthetic_source(tmp_path / "src.md", slides=7).read_text(encoding="utf-8")
+        plan = json.loads(mode_response("PLAN", prompt("PLAN", source_content=source), random.Random(0)))
+        assert [p["page"] for p in plan["pages"]] == list(range(1, 8))
+
+    def test_deck_slide_and_deck(self):
+        """DECK_SLIDE should echo page/topic; DECK should cover every planned page."""
+        slide = json.loads(mode_response("DECK_SLIDE", prompt("DECK_SLIDE", page="03", topic="Costs"), random.Random(0)))
+        assert (slide["page"], slide["topic"]) == ("03", "Costs") and slide["content"]
+        plan_json = json.dumps({"pages": [{"page": 1, "topic": "A"}, {"page": 2, "topic": "B"}]})
+        deck = json.loads(mode_response("DECK", prompt("DECK", plan_json=plan_json), random.Random(0)))
+        assert [s["topic"] for s in deck["slides"]] == ["A", "B"]
+
+    def test_svgs_pass_local_precheck(self):
+        """Generated SVGs should get past svg_precheck to the validator."""
+        for mode in ("CREATE_SLIDE_SVG", "CREATE_CONCEPTUAL_SVG"):
+            svg = mode_response(mode, prompt(mode, topic="A & B <long topic name that gets cut>"), random.Random(0))
+            assert precheck_svg(svg).is_valid, precheck_svg(svg).feedback
+
+    def test_validator_reject_rate(self):
+        """reject_rate should control the share of is_valid false verdicts."""
+        rng = random.Random(0)
+        verdicts = [json.loads(mode_response("VALIDATE_MEMO", "", rng, reject_rate=0.3))["is_valid"] for _ in range(1000)]
+        assert 250 < verdicts.count(False) < 350
+
+
+class TestMockServer:
+    """Test the HTTP server through the real OpenAI-compatible adapter."""
+
+    def test_chat_completion_and_models(self, server):
+        """The adapter should detect the model and get a mode-aware reply."""
+        adapter = adapter_for(server, model=None)
+        assert adapter.get_models() == ["mock-llm"]
+        memo = adapter.execute(prompt("MEMO", topic="Intro"), "MEMO", max_retries=1)
+        assert memo.startswith("# Intro")
+        stats = server.stats()
+        assert stats["calls_by_mode"] == {"MEMO": 1}
+        assert stats["completion_tokens"] > 0
+
+    def test_streaming(self, server):
+        """Streamed replies should reassemble to the same content."""
+        adapter = adapter_for(server, stream=True)
+        streamed = adapter.execute(prompt("MEMO", topic="Intro"), "MEMO", max_retries=1)
+        assert streamed == mode_response("MEMO", prompt("MEMO", topic="Intro"), random.Random(0))
+
+    def test_failure_rate(self):
+        """failure_rate 1 should make every request an HTTP 500."""
+        with MockLLMServer(MockBehavior(median_ms=0, failure_rate=1.0)) as server:
+            adapter = adapter_for(server)
+            with pytest.raises(AgentExecutionError):
+                adapter.execute(prompt("MEMO"), "MEMO", max_retries=2, retry_delay=0)
+            assert server.stats()["failures"] == 2
+
+    def test_latency_and_concurrency(self):
+        """Latency should follow the configured median; concurrent requests are tracked."""
+        from concurrent.futures import ThreadPoolExecutor
+        with MockLLMServer(MockBehavior(median_ms=100, distribution="fixed")) as server:
+            adapter = adapter_for(server)
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(lambda _: adapter.execute(prompt("MEMO"), "MEMO", max_retries=1), range(4)))
+            stats = server.stats()
+        assert stats["max_in_flight"] == 4
+        assert stats["busy_seconds"] >= 0.4
@@ -0,0 +1,239 @@
+"""
+Unit tests for mode-based agent routing.
+"""
+import time
+from types import SimpleNamespace
+import pytest
+from unittest.mock import patch
+import scripts.orchestrate as orchestrate
+from agents.base import AgentInterface
+from agents.model_detector import DetectedEndpoint, DetectedModel
+from agents.registry import AgentRegistry
+from agents.routing import ModeRouter, Route
+from agents.session import AgentSession
+
+DEFAULT = Route("antigravity", "gemini-2.5-pro")
+
+
+class TestModeRouter:
+    """Test matching modes to route chains."""
+
+    def test_unrouted_mode_uses_default(self):
+        """Modes without a rule should keep using the run's agent."""
+        assert ModeRouter({}).routes_for("MEMO", DEFAULT) == [DEFAULT]
+
+    def test_glob_rule_with_fallback_chain(self):
+        """A glob should route every matching mode, ending with the default."""
+        router = ModeRouter({"VALIDATE_*": [
+            {"agent": "llamacpp", "api_base": "http://localhost:8080/v1", "model": "qwen2.5-7b"},
+            "ollama"
+        ]})
+        chain = router.routes_for("VALIDATE_SLIDE_SVG", DEFAULT)
+        assert chain == [
+            Route("llamacpp", "qwen2.5-7b", "http://localhost:8080/v1"),
+            Route("ollama"),
+            DEFAULT
+        ]
+        assert router.routes_for("CREATE_SLIDE_SVG", DEFAULT) == [DEFAULT]
+
+    def test_exact_rule_beats_glob(self):
+        """An exact mode rule should win over an earlier glob."""
+        router = ModeRouter({"VALIDATE_*": {"agent": "ollama"}, "VALIDATE_MEMO": {"agent": "claude"}})
+        assert router.routes_for("VALIDATE_MEMO", DEFAULT)[0] == Route("claude")
+        assert router.match("VALIDATE_PLAN") == "VALIDATE_*"
+
+    def test_route_without_agent_uses_default_agent(self):
+        """A rule may only swap the model of the default agent."""
+        router = ModeRouter({"VALIDATE_*": {"model": "gemini-2.5-flash"}})
+        assert router.routes_for("VALIDATE_DECK", DEFAULT)[0] == Route("antigravity", "gemini-2.5-flash")
+
+    def test_invalid_rule_is_ignored(self):
+        """Malformed rules should be skipped rather than break the run."""
+        router = ModeRouter({"VALIDATE_*": {"agnet": "ollama"}, "MEMO": 42})
+        assert router.rules == {}
+
+
+class TestSessionRouting:
+    """Test routing through AgentSession and run_agent."""
+
+    @pytest.fixture(autouse=True)
+    def setup_registry(self, monkeypatch, tmp_path):
+        """Register a failing 'small' adapter and a working 'big' one."""
+        AgentRegistry.reset()
+        monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+        calls, adapter_retries = [], []
+
+        class FakeAdapter(AgentInterface):
+            COMMAND = "fake"
+
+            def __init__(self, config):
+                self.config = config
+
+            def execute(self, prompt, mode, **kwargs):
+                calls.append((self.NAME, mode))
+                adapter_retries.append(kwargs.get("max_retries"))
+                if self.NAME == "Small":
+                    raise RuntimeError("connection refused")
+                return f"{self.NAME} output"
+
+            def get_models(self):
+                return []
+
+            def is_available(self):
+                return True
+
+        AgentRegistry().register("small", type("Small", (FakeAdapter,), {"NAME": "Small"}))
+        AgentRegistry().register("big", type("Big", (FakeAdapter,), {"NAME": "Big"}))
+        monkeypatch.setattr(orchestrate, "_response_cache", None)
+        self.calls = calls
+        self.adapter_retries = adapter_retries
+        yield
+        AgentRegistry.reset()
+
+    def test_explicit_endpoint_skips_detection(self):
+        """A routed api_base should be used as-is."""
+        session = AgentSession({"routing": {"VALIDATE_*": {"agent": "ollama", "api_base": "http://gpu-box:11434/v1"}}})
+        route = session.routes_for("VALIDATE_MEMO", "gemini")[0]
+        resolved = session.resolve_route(route)
+        assert resolved.api_base == "http://gpu-box:11434/v1"
+        assert session.stats["detections"] == 0
+
+    def test_routed_model_survives_detection(self):
+        """A route's model should be used even when the local server lists another one first."""
+        endpoint = DetectedEndpoint(
+            url="http://localhost:11434", type="ollama", available=True,
+            models=[DetectedModel(name="qwen2.5:72b", source="ollama", endpoint="http://localhost:11434")]
+        )
+        session = AgentSession({"routing": {"VALIDATE_*": {"agent": "ollama", "model": "llama3.1:8b"}}})
+        with patch("agents.model_detector.default_detector.detect_all", return_value=[endpoint]):
+            routed = session.resolve_route(session.routes_for("VALIDATE_MEMO", "gemini")[0])
+            unrouted = session.resolve("ollama", "gemini-2.5-pro")
+        assert (routed.model, routed.api_base) == ("llama3.1:8b", "http://localhost:11434/v1")
+        assert unrouted.model == "qwen2.5:72b"
+
+    def test_routed_mode_runs_on_routed_agent(self, monkeypatch):
+        """Validators should go to the routed agent, generators to the default."""
+        session = AgentSession({"routing": {"VALIDATE_*": {"agent": "big"}}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        orchestrate.run_agent("small", "VALIDATE_MEMO", {}, retries=1, delay=0)
+        assert self.calls == [("Big", "VALIDATE_MEMO")]
+
+    def test_failing_route_falls_back(self, monkeypatch):
+        """A failing route should fall through to the next one without pausing."""
+        session = AgentSession({"routing": {"VALIDATE_*": ["small"]}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: pytest.fail("should not pause"))
+        output = orchestrate.run_agent("big", "VALIDATE_MEMO", {}, retries=1, delay=0)
+        assert output == "Big output"
+        assert self.calls == [("Small", "VALIDATE_MEMO"), ("Big", "VALIDATE_MEMO")]
+
+    def test_open_breaker_skips_route(self, monkeypatch):
+        """Once a route's breaker opens, later calls should skip it entirely."""
+        session = AgentSession({
+            "routing": {"VALIDATE_*": ["small"]},
+            "retry": {"breaker": {"failure_threshold": 1, "reset_timeout": 600}}
+        })
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        orchestrate.run_agent("big", "VALIDATE_MEMO", {}, retries=1, delay=0)
+        orchestrate.run_agent("big", "VALIDATE_MEMO", {}, retries=1, delay=0)
+        assert self.calls == [("Small", "VALIDATE_MEMO"), ("Big", "VALIDATE_MEMO"), ("Big", "VALIDATE_MEMO")]
+
+    def test_open_breaker_fails_fast(self, monkeypatch):
+        """With no other route, an open breaker should fail without pausing or retrying."""
+        session = AgentSession({"retry": {"breaker": {"failure_threshold": 1, "reset_timeout": 600}}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: None)
+        with pytest.raises(SystemExit):
+            orchestrate.run_agent("small", "MEMO", {}, retries=3, delay=0)
+        assert self.calls == [("Small", "MEMO")]
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: pytest.fail("should not pause"))
+        with pytest.raises(SystemExit):
+            orchestrate.run_agent("small", "MEMO", {}, retries=3, delay=0)
+        assert self.calls == [("Small", "MEMO")]
+
+    def test_breaker_rejections_are_not_agent_calls(self, monkeypatch):
+        """Calls failed fast by the breaker should be counted as rejections, not as failed calls."""
+        from agents.performance import performance_monitor
+        performance_monitor.reset()
+        session = AgentSession({"retry": {"breaker": {"failure_threshold": 1, "reset_timeout": 600}}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: None)
+        for _ in range(2):
+            with pytest.raises(SystemExit):
+                orchestrate.run_agent("small", "MEMO", {}, retries=3, delay=0)
+        assert len(performance_monitor.get_recent_calls()) == 1
+        assert [stats["rejections"] for stats in performance_monitor.get_breaker_stats().values()] == [1]
+        performance_monitor.reset()
+
+    def test_latency_excludes_rate_limit_wait(self, monkeypatch):
+        """The recorded call latency should start once the tokens and the slot are held."""
+        from agents.performance import performance_monitor
+        performance_monitor.reset()
+        session = AgentSession({})
+        limiter = SimpleNamespace(acquire=lambda tokens: time.sleep(0.3) or 0.3, record_usage=lambda *a: None)
+        monkeypatch.setattr(session, "get_rate_limiter", lambda resolved: limiter)
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        assert orchestrate.run_agent("big", "MEMO", {}, retries=1, delay=0) == "Big output"
+        assert performance_monitor.get_recent_calls()[0]["duration_ms"] < 200
+        assert performance_monitor.get_rate_limit_stats()[session.backend_key(session.resolve("big", None))]["total_wait_ms"] >= 300
+        performance_monitor.reset()
+
+    def test_run_agent_owns_retries(self, monkeypatch):
+        """Adapters should make one attempt per call; only the last retry waits for the user."""
+        monkeypatch.setattr(orchestrate, "_agent_session", AgentSession({}))
+        pauses = []
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: pauses.append(len(self.calls)))
+        with pytest.raises(SystemExit):
+            orchestrate.run_agent("small", "MEMO", {}, retries=3, delay=0)
+        assert self.calls == [("Small", "MEMO")] * 3
+        assert self.adapter_retries == [1, 1, 1]
+        assert pauses == [2, 3]
+
+    def test_cancelled_call_stops_without_fallback(self, monkeypatch):
+        """A call cancelled mid-flight should raise at once: no fallback, pause, exit or breaker failure."""
+        import threading
+        from agents.exceptions import AgentCancelledError
+
+        class Aborted(AgentRegistry().get_agent_class("small")):
+            NAME = "Aborted"
+
+            def execute(self, prompt, mode, **kwargs):
+                kwargs["options"]["cancel"].set()  # The winner landed while this call was in flight
+                raise ConnectionResetError("connection closed")
+
+        AgentRegistry().register("aborted", Aborted)
+        session = AgentSession({
+            "routing": {"MEMO": ["aborted"]},
+            "retry": {"breaker": {"failure_threshold": 1, "reset_timeout": 600}}
+        })
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: pytest.fail("should not pause"))
+        with pytest.raises(AgentCancelledError):
+            orchestrate.run_agent("big", "MEMO", {}, retries=3, delay=0, cancel=threading.Event())
+        assert self.calls == []  # The fallback route was not tried
+        route = session.routes_for("MEMO", "big")[0]
+        assert session.get_breaker(session.resolve_route(route)).allows_calls()
+
+    def test_retries_stop_when_budget_is_spent(self, monkeypatch):
+        """An exhausted retry budget should end the call without pausing."""
+        session = AgentSession({"retry": {"budget_ratio": 0, "budget_min": 0}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: pytest.fail("should not pause"))
+        with pytest.raises(SystemExit):
+            orchestrate.run_agent("small", "MEMO", {}, retries=3, delay=0)
+        assert self.calls == [("Small", "MEMO")]
+        assert session.retry_budget.denied == 1
+
+    def test_calls_are_traced(self, monkeypatch):
+        """Each attempt should be a validator span; the fallback an instant event."""
+        from agents.tracing import Tracer
+        tracer = Tracer()
+        tracer.enable()
+        monkeypatch.setattr("agents.tracing.tracer", tracer)
+        session = AgentSession({"routing": {"VALIDATE_*": ["small"]}})
+        monkeypatch.setattr(orchestrate, "_agent_session", session)
+        orchestrate.run_agent("big", "VALIDATE_MEMO", {}, retries=1, delay=0)
+        events = tracer.events()
+        calls = [e for e in events if e.get("cat") == "validator"]
+        assert [(e["args"]["agent"], "error" in e["args"]) for e in calls] == [("small", True), ("big", False)]
+        assert [e["name"] for e in events if e["ph"] == "i"] == ["fallback VALIDATE_MEMO"]
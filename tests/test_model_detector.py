@@ -1,10 +1,53 @@
 """
 Unit tests for model detection.
 """
+import json
+import threading
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from agents.model_detector import ModelDetector, DetectedEndpoint, DetectedModel
 
 
+class _ServerHandler(BaseHTTPRequestHandler):
+    """Ollama /api/show for 'big' (num_ctx set) and 'plain' (not set); llama.cpp /props."""
+    props = None
+
+    def _reply(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/show" and body["model"] == "big":
+            self._reply({"parameters": "stop \"<|im_end|>\"\nnum_ctx 32768"})
+        elif self.path == "/api/show" and body["model"] == "plain":
+            self._reply({"parameters": "temperature 0.7", "model_info": {"llama.context_length": 131072}})
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_GET(self):
+        if self.path == "/props" and self.props:
+            self._reply(self.props)
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ServerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
 class TestModelDetector:
     """Test model detection functionality."""
     
@@ -88,3 +131,27 @@ class TestModelDetector:
         assert endpoint.available
         assert endpoint.type == "ollama"
         assert endpoint.url == "http://localhost:11434"
+
+
+class TestContextWindow:
+    """Test asking local servers for the context length they run with."""
+
+    def test_ollama_num_ctx(self, server_url):
+        """Ollama's num_ctx should be read from /api/show; the /v1 suffix is ignored."""
+        detector = ModelDetector(verbose=False)
+        assert detector.detect_context_window(f"{server_url}/v1", "big") == 32768
+
+    def test_unknown_without_num_ctx(self, server_url):
+        """Without num_ctx the server default applies, which Ollama does not report."""
+        assert ModelDetector(verbose=False).detect_context_window(server_url, "plain") is None
+
+    def test_llamacpp_n_ctx(self, server_url, monkeypatch):
+        """llama.cpp's n_ctx should be read from /props, and cached."""
+        monkeypatch.setattr(_ServerHandler, "props", {"default_generation_settings": {"n_ctx": 16384}})
+        detector = ModelDetector(verbose=False)
+        assert detector.detect_context_window(f"{server_url}/v1", "qwen") == 16384
+        monkeypatch.setattr(_ServerHandler, "props", None)
+        assert detector.detect_context_window(f"{server_url}/v1", "qwen") == 16384
+        detector.clear_cache()
+        assert detector.detect_context_window(f"{server_url}/v1", "qwen") is None
+
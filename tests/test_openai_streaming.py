@@ -0,0 +1,151 @@
+"""
+Unit tests for SSE streaming in OpenAICompatibleAdapter.
+"""
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents.openai_compatible import OpenAICompatibleAdapter
+from agents.performance import PerformanceMonitor
+
+
+def _sse(deltas, done=True):
+    lines = []
+    for delta in deltas:
+        event = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+        lines.append(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+    if done:
+        lines.append(b"data: [DONE]\n\n")
+    return lines
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    deltas = []
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for line in _sse(type(self).deltas):
+                self.wfile.write(line)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReadStream:
+    """Test SSE parsing and early-stop."""
+
+    @pytest.fixture
+    def adapter(self):
+        return OpenAICompatibleAdapter({"agent_config": {"model": "llama3"}})
+
+    def test_concatenates_deltas(self, adapter):
+        """Content deltas should be joined until [DONE]."""
+        text, stats = adapter._read_stream(_sse(["Hel", "lo", " world"]), "MEMO")
+        assert text == "Hello world"
+        assert stats["tokens"] == 3
+        assert stats["stopped_early"] is False
+
+    def test_ignores_non_data_lines(self, adapter):
+        """Comments, blank lines and role-only deltas should be skipped."""
+        lines = [b": keep-alive\n", b"\n", b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n']
+        text, stats = adapter._read_stream(lines + _sse(["ok"]), "MEMO")
+        assert text == "ok"
+        assert stats["tokens"] == 1
+
+    def test_stops_at_svg_close(self, adapter):
+        """SVG modes should stop as soon as </svg> is generated."""
+        deltas = ["<svg>", "<rect/>", "</s", "vg>", " Here is", " an explanation"]
+        text, stats = adapter._read_stream(_sse(deltas), "CREATE_SLIDE_SVG", ("</svg>",))
+        assert text == "<svg><rect/></svg>"
+        assert stats["stopped_early"] is True
+        assert stats["tokens"] == 4
+
+    def test_stops_at_no_svg_needed(self, adapter):
+        """Conceptual SVG mode should stop on the not-needed marker."""
+        deltas = ["NO_CONCEPTUAL", "_SVG_NEEDED", " because..."]
+        markers = ("</svg>", "NO_CONCEPTUAL_SVG_NEEDED")
+        text, _ = adapter._read_stream(_sse(deltas), "CREATE_CONCEPTUAL_SVG", markers)
+        assert text == "NO_CONCEPTUAL_SVG_NEEDED"
+
+    def test_cancel_closes_stream(self, adapter):
+        """A set cancel event should close the response and raise instead of reading on."""
+        from agents.exceptions import AgentCancelledError
+
+        class Response(list):
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        cancel = threading.Event()
+        cancel.set()
+        response = Response(_sse(["<svg>"] * 5))
+        with pytest.raises(AgentCancelledError):
+            adapter._read_stream(response, "CREATE_SLIDE_SVG", cancel=cancel)
+        assert response.closed
+
+    def test_prefers_usage_token_count(self, adapter):
+        """A usage block should override the chunk-based token estimate."""
+        usage = b'data: {"choices": [], "usage": {"completion_tokens": 42}}\n'
+        _, stats = adapter._read_stream(_sse(["a", "b"], done=False) + [usage, b"data: [DONE]\n"], "MEMO")
+        assert stats["tokens"] == 42
+
+
+class TestStreamingExecute:
+    """Test execute() against a local SSE server."""
+
+    @pytest.fixture
+    def server(self):
+        _StreamHandler.requests = []
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StreamHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+        httpd.shutdown()
+        httpd.server_close()
+
+    @pytest.fixture
+    def monitor(self):
+        monitor = PerformanceMonitor()
+        monitor.reset()
+        yield monitor
+        monitor.reset()
+
+    def test_stream_request_and_metrics(self, server, monitor):
+        """stream: true should request SSE and record TTFT and throughput."""
+        _StreamHandler.deltas = ["# Memo", "\n", "text"]
+        adapter = OpenAICompatibleAdapter({"agent_config": {"api_base": server, "model": "llama3", "stream": True}})
+
+        assert adapter.execute("prompt", "MEMO", max_retries=1) == "# Memo\ntext"
+        assert _StreamHandler.requests[0]["stream"] is True
+
+        stats = monitor.get_stream_stats()
+        assert stats["calls"] == 1
+        assert stats["tokens"] == 3
+        assert stats["early_stops"] == 0
+
+    def test_svg_mode_stops_early(self, server, monitor):
+        """CREATE_SLIDE_SVG should return at </svg> and count an early stop."""
+        _StreamHandler.deltas = ["<svg>", "</svg>"] + ["padding"] * 20
+        adapter = OpenAICompatibleAdapter({"agent_config": {"api_base": server, "model": "llama3", "stream": True}})
+
+        assert adapter.execute("prompt", "CREATE_SLIDE_SVG", max_retries=1) == "<svg></svg>"
+        assert monitor.get_stream_stats()["early_stops"] == 1
+
+    def test_option_overrides_config(self, server, monitor):
+        """options['stream'] should override the configured default."""
+        _StreamHandler.deltas = ["x"]
+        adapter = OpenAICompatibleAdapter({"agent_config": {"api_base": server, "model": "llama3"}})
+
+        adapter.execute("prompt", "MEMO", max_retries=1, options={"stream": True})
+        assert _StreamHandler.requests[0]["stream"] is True
+        assert monitor.get_stream_stats()["calls"] == 1
@@ -0,0 +1,137 @@
+"""
+End-to-end orchestrator benchmarks against the offline mock LLM server.
+
+Each benchmark runs orchestrate.main() on a synthetic N-slide source
+(analysis, plan, per-slide deck, memos and both SVGs) and records wall
+time, calls per mode and how busy the workers kept the backend in
+benchmark.extra_info. The benchmarks need pytest-benchmark and are marked
+slow:
+
+    pytest tests/test_orchestrate_benchmark.py -m slow --benchmark-only
+    pytest tests/test_orchestrate_benchmark.py -m slow --benchmark-autosave   # compare later with --benchmark-compare
+"""
+import importlib.util
+import itertools
+import sys
+import time
+import pytest
+import yaml
+import scripts.orchestrate as orchestrate
+from agents.openai_compatible import OpenAICompatibleAdapter
+from agents.performance import performance_monitor
+from agents.registry import AgentRegistry
+from scripts.mock_llm_server import MockBehavior, MockLLMServer, make_synthetic_source
+
+requires_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None, reason="pytest-benchmark is not installed"
+)
+
+WORKERS = 8
+
+
+def write_config(path, api_base, workers=WORKERS):
+    """A config.yaml that points the openai-compatible agent at the mock server."""
+    path.write_text(yaml.safe_dump({
+        "agent": "openai-compatible",
+        "agent_config": {"api_base": api_base, "model": "mock-llm", "max_retries": 2},
+        "concurrency": {"initial": workers, "min": workers, "max": workers},
+        "response_cache": {"enabled": False},
+        "run_history": {"enabled": False},
+    }), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def orchestration(monkeypatch, tmp_path):
+    """run(server, slides) -> stats of one full orchestrate.main() run in tmp_path."""
+    runs = itertools.count()
+    AgentRegistry.reset()  # Other tests may have reset it since the adapters self-registered
+    AgentRegistry().register("openai-compatible", OpenAICompatibleAdapter)
+    real_init_logger = orchestrate.init_logger
+    monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+    monkeypatch.setattr(orchestrate, "init_logger", lambda root_dir, output_dir=None: real_init_logger(tmp_path, output_dir))
+    monkeypatch.setattr(orchestrate, "wait_for_user_action", lambda: None)
+    monkeypatch.setattr(orchestrate.os, "startfile", lambda path: None, raising=False)
+    monkeypatch.setattr(orchestrate, "_response_cache", None)
+    monkeypatch.setattr(orchestrate, "_cassette", None)
+
+    def run(server, slides, extra_args=()):
+        root = tmp_path / f"run{next(runs)}"
+        root.mkdir()
+        source = make_synthetic_source(root / "source.md", slides)
+        monkeypatch.setattr(orchestrate, "CONFIG_PATH", write_config(root / "config.yaml", server.url))
+        monkeypatch.setattr(orchestrate, "OUTPUT_ROOT", root / "output")
+        monkeypatch.setattr(sys, "argv", ["orchestrate.py", "--source", str(source), "--agent", "openai-compatible", "--no-cache", *extra_args])
+        performance_monitor.reset()
+        server.reset_stats()
+        start = time.perf_counter()
+        orchestrate.main()
+        wall = time.perf_counter() - start
+        stats = server.stats()
+        output_dir = next((root / "output").glob("*_MockBenchmark"))
+        return {
+            "slides": slides,
+            "wall_seconds": round(wall, 3),
+            "calls": stats["calls"],
+            "calls_by_mode": stats["calls_by_mode"],
+            "failures": stats["failures"],
+            "constrained_calls": stats["constrained_calls"],
+            "max_in_flight": stats["max_in_flight"],
+            "avg_in_flight": stats["avg_in_flight"],
+            "utilization_pct": round(stats["busy_seconds"] / (wall * WORKERS) * 100, 1),
+            "notes": len(list((output_dir / "notes").glob("*.md"))),
+            "svgs": len(list((output_dir / "slides").glob("*.svg"))),
+            "output_dir": output_dir,
+        }
+
+    yield run
+    AgentRegistry.reset()
+
+
+def test_small_orchestration_end_to_end(orchestration):
+    """A 3-slide run against the mock server should produce every artifact (no plugin needed)."""
+    with MockLLMServer(MockBehavior(median_ms=5, sigma=0.2, seed=7)) as server:
+        stats = orchestration(server, 3)
+    assert stats["notes"] == 3
+    assert stats["svgs"] == 6
+    assert stats["calls_by_mode"]["DECK_SLIDE"] == 3
+    assert stats["failures"] == 0
+    assert stats["constrained_calls"] > 0
+    assert all(counts["failed"] == 0 for counts in performance_monitor.get_parse_stats().values())
+
+
+@requires_benchmark
+@pytest.mark.slow
+@pytest.mark.parametrize("slides", [10, 50, 200])
+def test_benchmark_orchestration(benchmark, orchestration, slides):
+    """Full orchestration on a synthetic source with a realistic-shaped (scaled-down) latency spread."""
+    behavior = MockBehavior(median_ms=30, sigma=0.6, per_mode_ms={"MEMO": 60, "CREATE_SLIDE_SVG": 50}, tokens_per_sec=4000, seed=slides)
+    with MockLLMServer(behavior) as server:
+        stats = benchmark.pedantic(orchestration, args=(server, slides), rounds=1, iterations=1)
+    stats["output_dir"] = str(stats["output_dir"])
+    benchmark.extra_info.update(stats)
+    assert stats["notes"] == slides
+
+
+@requires_benchmark
+@pytest.mark.slow
+def test_benchmark_flaky_backend(benchmark, orchestration):
+    """10 slides with 3% HTTP 500s and 20% validator rejections: what retries and reworks cost."""
+    behavior = MockBehavior(median_ms=30, sigma=0.6, failure_rate=0.03, reject_rate=0.2, seed=3)
+    with MockLLMServer(behavior) as server:
+        stats = benchmark.pedantic(orchestration, args=(server, 10, ("--agent-retries", "4")), rounds=1, iterations=1)
+    stats["output_dir"] = str(stats["output_dir"])
+    benchmark.extra_info.update(stats)
+    assert stats["notes"] == 10
+
+
+
+def test_record_then_replay_offline(orchestration):
+    """A recorded run should replay to the same artifacts without a single model call."""
+    with MockLLMServer(MockBehavior(median_ms=5, sigma=0.2, seed=7)) as server:
+        recorded = orchestration(server, 3, ("--record",))
+        cassette = recorded["output_dir"] / "cassette.jsonl"
+        assert len(cassette.read_text(encoding="utf-8").splitlines()) == recorded["calls"]
+        replayed = orchestration(server, 3, ("--replay", str(cassette), "--replay-latency"))
+    assert replayed["calls"] == 0
+    assert (replayed["notes"], replayed["svgs"]) == (recorded["notes"], recorded["svgs"])
@@ -3,7 +3,7 @@ Unit tests for performance monitoring.
 """
 import pytest
 import time
-from agents.performance import PerformanceMonitor, AgentCallMetrics
+from agents.performance import PerformanceMonitor, AgentCallMetrics, LatencyHistogram
 
 
 class TestPerformanceMonitor:
@@ -122,3 +122,59 @@ class TestPerformanceMonitor:
         
         summary = monitor.get_summary()
         assert summary["total_calls"] == 50
+    
+    def test_percentiles(self, monitor):
+        """Percentiles should be within the histogram's bucket error."""
+        for duration in range(1, 1001):
+            monitor.record_call("agent", "MEMO", duration, True, model="m")
+        
+        summary = monitor.get_summary()
+        assert summary["p50_duration_ms"] == pytest.approx(500, rel=0.1)
+        assert summary["p90_duration_ms"] == pytest.approx(900, rel=0.1)
+        assert summary["p99_duration_ms"] == pytest.approx(990, rel=0.1)
+        assert summary["agents"]["agent"]["p99_ms"] == summary["p99_duration_ms"]
+        assert summary["latency"]["agent/MEMO/m"]["count"] == 1000
+    
+    def test_latency_by_mode_and_model(self, monitor):
+        """Latency should be tracked separately per agent/mode/model."""
+        monitor.record_call("agent", "MEMO", 100, True)
+        monitor.record_call("agent", "VALIDATE_MEMO", 10, True, model="small")
+        
+        latency = monitor.get_latency_stats()
+        assert set(latency) == {"agent/MEMO/default", "agent/VALIDATE_MEMO/small"}
+        assert latency["agent/VALIDATE_MEMO/small"]["p50_ms"] == 10.0
+    
+    def test_recent_calls_bounded(self, monitor):
+        """Only the most recent calls should be kept individually; totals stay exact."""
+        from agents.performance import RECENT_CALLS_SIZE
+        for i in range(RECENT_CALLS_SIZE + 50):
+            monitor.record_call("agent", "PLAN", i, True)
+        
+        assert len(monitor.get_recent_calls(RECENT_CALLS_SIZE * 2)) == RECENT_CALLS_SIZE
+        assert monitor.get_recent_calls(1)[0]["duration_ms"] == RECENT_CALLS_SIZE + 49
+        assert monitor.get_summary()["total_calls"] == RECENT_CALLS_SIZE + 50
+
+
+class TestLatencyHistogram:
+    """Test the streaming histogram."""
+    
+    def test_exact_aggregates(self):
+        """Count, mean, min and max should be exact."""
+        histogram = LatencyHistogram()
+        for value in (0, 0.5, 3, 7000):
+            histogram.record(value)
+        stats = histogram.to_dict()
+        assert (stats["count"], stats["min_ms"], stats["max_ms"]) == (4, 0.0, 7000.0)
+        assert stats["avg_ms"] == pytest.approx(1750.875, abs=0.01)
+    
+    def test_bucket_count_is_logarithmic(self):
+        """A wide range of values should use few buckets."""
+        histogram = LatencyHistogram()
+        for value in range(1, 600001, 7):
+            histogram.record(value)
+        assert len(histogram.buckets) < 8 * 20  # 8 buckets per doubling
+        assert histogram.percentile(50) == pytest.approx(300000, rel=0.05)
+    
+    def test_empty(self):
+        """An empty histogram should report zeros."""
+        assert LatencyHistogram().percentile(99) == 0.0
@@ -0,0 +1,164 @@
+"""
+Unit tests for context-window-aware prompt packing.
+"""
+import pytest
+import scripts.orchestrate as orchestrate
+from agents.base import AgentInterface
+from agents.openai_compatible import OpenAICompatibleAdapter
+from agents.prompt_packer import PromptPacker, Section, count_tokens, output_budget, section_kind
+from agents.registry import AgentRegistry
+from agents.session import AgentSession
+
+
+def slides(count, body="Slide body text. " * 40):
+    return "".join(f"### {i:02d}: Topic {i}\n{body}\n\n" for i in range(1, count + 1))
+
+
+def passages(count, body="Source passage text. " * 40):
+    return "\n\n[...]\n\n".join(f"Passage {i}: {body}" for i in range(1, count + 1))
+
+
+class TestBudgets:
+    """Test context windows and output budgets."""
+
+    def test_context_windows(self):
+        """Models are matched before agents; local models ask their server, else stay unknown."""
+        reported = {("http://localhost:11434/v1", "llama3"): 32768}
+        packer = PromptPacker(context_windows={"qwen2.5*": 16384}, detect=lambda base, model: reported.get((base, model)))
+        assert packer.context_window("ollama", "qwen2.5:7b", "http://localhost:11434/v1") == 16384
+        assert packer.context_window("ollama", "llama3", "http://localhost:11434/v1") == 32768
+        assert packer.context_window("ollama", "mistral", "http://localhost:11434/v1") is None
+        assert packer.context_window("openai-compatible") is None
+        assert PromptPacker(local_context=8192).context_window("openai-compatible") == 8192
+        assert packer.context_window("claude") == 200_000
+        assert packer.context_window("antigravity", "gemini-2.5-pro") == 1_000_000
+
+    def test_output_budget_per_mode(self):
+        """Each mode reserves its own output budget; config overrides win."""
+        assert output_budget("VALIDATE_MEMO") == 768
+        assert output_budget("DECK") == 8192
+        assert output_budget("DECK_SLIDE") == 1536
+        assert output_budget("CREATE_SLIDE_SVG") == 4096
+        assert output_budget("UNKNOWN") == 4096
+        assert output_budget("MEMO", {"MEMO": 1000}) == 1000
+
+    def test_adapter_sends_packer_budget(self):
+        """max_tokens should come from the packer when it ran, else stay at the previous 4096."""
+        adapter = OpenAICompatibleAdapter({"agent_config": {"model": "llama3"}})
+        assert adapter._build_request("p", "VALIDATE_MEMO")["max_tokens"] == 4096
+        assert adapter._build_request("p", "MEMO", {"max_tokens": 2000})["max_tokens"] == 2000
+
+
+class TestPack:
+    """Test trimming low-priority sections."""
+
+    def test_fitting_prompt_is_untouched(self):
+        """A prompt that fits should come back unchanged, with tokens counted per section."""
+        sections = [Section("instructions", "Write a memo."), Section("full_slides_content", slides(3), "slides")]
+        texts = [s.text for s in sections]
+        packed = PromptPacker().pack(sections, "claude", mode="MEMO", page="02")
+        assert packed.parts == texts
+        assert packed.trimmed == {}
+        assert packed.tokens["full_slides_content"] == count_tokens(texts[1])
+        assert packed.output_tokens == 3072
+
+    def test_unknown_window_is_not_trimmed(self):
+        """Without a known context window the prompt should be sent whole."""
+        sections = [Section("full_slides_content", slides(200), "slides")]
+        text = sections[0].text
+        packed = PromptPacker().pack(sections, "ollama", "llama3", mode="MEMO", api_base="http://localhost:11434/v1")
+        assert packed.parts == [text]
+        assert packed.context_window is None and packed.fits
+        assert packed.output_tokens == 3072
+
+    def test_trim_order(self):
+        """Old feedback goes first, then distant slides; the latest feedback and nearby slides stay."""
+        feedback = "\n\n".join(f"Attempt {i}: " + "Fix the wording. " * 150 for i in range(1, 4))
+        sections = [
+            Section("instructions", "Write a memo."),
+            Section("rework_feedback", feedback, "feedback"),
+            Section("full_slides_content", slides(20), "slides"),
+            Section("source_passages_content", passages(4), "source"),
+        ]
+        packed = PromptPacker(local_context=8192).pack(sections, "ollama", mode="MEMO", page="10")
+        assert packed.fits
+        assert set(packed.trimmed) == {"rework_feedback", "full_slides_content"}
+        assert "earlier feedback round(s) omitted" in packed.parts[1]
+        assert "Attempt 3:" in packed.parts[1] and "Attempt 1:" not in packed.parts[1]
+        deck = packed.parts[2]
+        assert "### 10: Topic 10\nSlide body" in deck and "### 11: Topic 11\nSlide body" in deck
+        assert "### 20: Topic 20\n\n" in deck  # Heading kept, body dropped
+        assert packed.parts[3] == sections[3].text
+
+    def test_source_is_trimmed_last(self):
+        """Source passages are dropped from the end, keeping the code fence intact."""
+        source = f"Provided Content for 'source_passages_content':\n```\n{passages(40)}\n```"
+        sections = [Section("instructions", "Check the plan."), Section("source_passages_content", source, section_kind("source_passages_content"))]
+        packed = PromptPacker(local_context=8192).pack(sections, "ollama", mode="VALIDATE_PLAN")
+        assert packed.fits
+        text = packed.parts[1]
+        assert text.startswith("Provided Content for 'source_passages_content':\n```\nPassage 1:") and text.endswith("\n```")
+        assert "tokens of source text omitted" in text and "Passage 40:" not in text
+
+    def test_fixed_sections_are_kept(self):
+        """Instructions are never trimmed; an oversized prompt is reported, not cut."""
+        sections = [Section("instructions", "Rule. " * 20000)]
+        packed = PromptPacker(local_context=8192).pack(sections, "ollama", mode="MEMO")
+        assert not packed.fits
+        assert packed.parts[0] == sections[0].text
+
+
+class TestRunAgentPacking:
+    """Test packing through run_agent."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch, tmp_path):
+        """A 'fake' adapter that records prompts and options."""
+        AgentRegistry.reset()
+        monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+        monkeypatch.setattr(orchestrate, "_response_cache", None)
+        monkeypatch.setattr(orchestrate, "_cassette", None)
+        monkeypatch.setattr(orchestrate, "_prompt_packer", PromptPacker(context_windows={"fake": 8192}))
+        calls = []
+
+        class FakeAdapter(AgentInterface):
+            NAME = "Fake"
+            COMMAND = "fake"
+
+            def __init__(self, config):
+                self.config = config
+
+            def execute(self, prompt, mode, **kwargs):
+                calls.append((prompt, kwargs.get("options")))
+                return "# Memo"
+
+            def get_models(self):
+                return []
+
+            def is_available(self):
+                return True
+
+        AgentRegistry().register("fake", FakeAdapter)
+        monkeypatch.setattr(orchestrate, "_agent_session", AgentSession({}))
+        yield calls
+        AgentRegistry.reset()
+
+    def test_small_context_prompt_is_packed(self, setup):
+        """A memo prompt with a long deck should be trimmed and sent with the mode's max_tokens."""
+        vars_map = {"full_slides_content": slides(40), "page": "05", "topic": "Topic 5"}
+        assert orchestrate.run_agent("fake", "MEMO", vars_map, retries=1, delay=0) == "# Memo"
+        prompt, options = setup[0]
+        assert options["max_tokens"] == 3072
+        assert count_tokens(prompt) + 3072 <= 8192
+        assert "### 05: Topic 5\nSlide body" in prompt and "### 40: Topic 40\n\n" in prompt
+        assert "- topic: Topic 5" in prompt
+        assert "### 40: Topic 40\n\n\n```\n" in prompt  # The code fence survives trimming
+
+    def test_packing_can_be_disabled(self, setup, monkeypatch):
+        """With prompt_budget disabled the prompt is sent whole."""
+        orchestrate.init_prompt_packer({"prompt_budget": {"enabled": False}})
+        vars_map = {"full_slides_content": slides(40), "page": "05"}
+        orchestrate.run_agent("fake", "MEMO", vars_map, retries=1, delay=0)
+        prompt, options = setup[0]
+        assert slides(40) in prompt
+        assert "max_tokens" not in options
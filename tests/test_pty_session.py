@@ -0,0 +1,239 @@
+"""
+Unit tests for pooled agy sessions and event-driven terminal reads.
+"""
+import os
+import sys
+import textwrap
+import threading
+import time
+import pytest
+from agents.pty_session import AgySession, AgySessionPool, FdReader, SessionError, read_until, split_reply
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="POSIX pty tests")
+
+# Minimal interactive CLI: banner, then answers "Read the file X ... print the line S" requests.
+# "noecho" turns terminal echo off; "ansi" colours the sentinel line like a TUI would.
+FAKE_AGY = textwrap.dedent('''
+    import re, sys, termios
+    if "noecho" in sys.argv:
+        attrs = termios.tcgetattr(0)
+        attrs[3] &= ~termios.ECHO
+        termios.tcsetattr(0, termios.TCSANOW, attrs)
+    print("fake agy ready", flush=True)
+    for line in sys.stdin:
+        match = re.search(r"Read the file (\\S+) .* print the line (\\S+) on its own", line)
+        if not match:
+            continue
+        text = open(match.group(1), encoding="utf-8").read()
+        if text == "exit":
+            sys.exit(1)
+        if text == "hang":
+            continue
+        print("reply:" + text.upper(), flush=True)
+        if "ansi" in sys.argv:
+            print("\\x1b[2m" + match.group(2) + "\\x1b[0m\\r", flush=True)
+        else:
+            print(match.group(2), flush=True)
+''')
+
+
+@pytest.fixture
+def fake_agy(tmp_path):
+    script = tmp_path / "fake_agy.py"
+    script.write_text(FAKE_AGY, encoding="utf-8")
+    return f'"{sys.executable}" -u "{script}"'
+
+
+class TestReadUntil:
+    """Test event-driven reads."""
+
+    def test_wakes_on_data_not_polling(self):
+        """A read should return as soon as data arrives."""
+        read_fd, write_fd = os.pipe()
+        reader = FdReader(read_fd)
+        threading.Timer(0.05, lambda: os.write(write_fd, b"hello")).start()
+        start = time.monotonic()
+        text, reason = read_until(reader, 5, done=lambda t: "hello" in t)
+        assert (text, reason) == ("hello", "done")
+        assert time.monotonic() - start < 1
+        os.close(write_fd)
+        assert read_until(reader, 5) == ("", "eof")
+        reader.close()
+        os.close(read_fd)
+
+    def test_timeout_and_idle(self):
+        """Silence should end a read with 'idle' or 'timeout'."""
+        read_fd, write_fd = os.pipe()
+        reader = FdReader(read_fd)
+        os.write(write_fd, "部分".encode("utf-8")[:4])  # Split multi-byte character
+        assert read_until(reader, 0.2, idle=0.05) == ("部", "idle")
+        assert read_until(reader, 0.05)[1] == "timeout"
+        reader.close()
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+class TestAgySession:
+    """Test a long-lived session against a fake interactive agy."""
+
+    def test_multiple_prompts_one_process(self, fake_agy, tmp_path):
+        """One process should answer several prompts in turn."""
+        session = AgySession(fake_agy, tmp_path, startup_timeout=10, ready_idle=0.3)
+        try:
+            assert session.ask("first", 10) == "reply:FIRST"  # Echoed request stripped
+            assert session.ask("second", 10) == "reply:SECOND"
+            assert session.calls == 2
+            assert session.is_healthy(max_calls=5, max_age=60)
+            assert not list(tmp_path.glob("agy_session_*"))  # Prompt files removed
+        finally:
+            session.close()
+
+    def test_dead_session_is_unhealthy(self, fake_agy, tmp_path):
+        """A session whose process exits mid-request should be marked broken."""
+        session = AgySession(fake_agy, tmp_path, startup_timeout=10, ready_idle=0.3)
+        try:
+            with pytest.raises(SessionError):
+                session.ask("exit", 10)
+            assert not session.is_healthy(max_calls=5, max_age=60)
+        finally:
+            session.close()
+
+    def test_timeout_marks_broken(self, fake_agy, tmp_path):
+        """A request without a reply should time out and break the session."""
+        session = AgySession(fake_agy, tmp_path, startup_timeout=10, ready_idle=0.3)
+        try:
+            with pytest.raises(SessionError, match="timeout"):
+                session.ask("hang", 0.3)
+            assert session.broken
+        finally:
+            session.close()
+
+    @pytest.mark.parametrize("mode", ["noecho", "ansi"])
+    def test_sentinel_without_echo_or_with_ansi(self, fake_agy, tmp_path, mode):
+        """The sentinel should be found on its own line without an echo or inside colour codes."""
+        session = AgySession(f"{fake_agy} {mode}", tmp_path, startup_timeout=10, ready_idle=0.3)
+        try:
+            start = time.monotonic()
+            assert session.ask("first", 10) == "reply:FIRST"
+            assert time.monotonic() - start < 5
+        finally:
+            session.close()
+
+    def test_silent_session_fails_fast(self, fake_agy, tmp_path):
+        """A session printing nothing at all should fail after first_output_timeout, not the full timeout."""
+        session = AgySession(f"{fake_agy} noecho", tmp_path, startup_timeout=10, ready_idle=0.3, first_output_timeout=0.3)
+        try:
+            start = time.monotonic()
+            with pytest.raises(SessionError, match="no output"):
+                session.ask("hang", 30)
+            assert time.monotonic() - start < 5
+            assert session.broken
+        finally:
+            session.close()
+
+    def test_split_reply(self):
+        """A wrapped echo of the request should neither end nor start the reply."""
+        sentinel = "<<END-abc>>"
+        instruction = f"Read the file /tmp/p.txt and follow it. When done, print the line {sentinel} on its own."
+        echo = instruction[:60] + "\r\n" + instruction[60:].replace(sentinel, sentinel + "\r\n") + "\r\n"
+        assert split_reply(echo, sentinel, instruction) is None
+        assert split_reply(echo + "answer\r\n\x1b[1m" + sentinel + "\x1b[0m\r\n", sentinel, instruction) == "answer"
+
+    def test_startup_failure(self, tmp_path):
+        """A command that exits immediately should fail the startup health check."""
+        with pytest.raises(SessionError):
+            AgySession(f'"{sys.executable}" -c "print(1)"', tmp_path, startup_timeout=5, ready_idle=0.3)
+
+
+class TestOneShotSubprocess:
+    """Test the adapter's subprocess fallback read loop."""
+
+    def test_collects_output_until_exit(self):
+        """Output should be read until the process exits."""
+        from agents.antigravity import AntigravityAdapter
+        adapter = AntigravityAdapter({"agent_config": {}})
+        output = adapter._execute_with_subprocess(f'"{sys.executable}" -c "print(\'line1\'); print(\'line2\')"')
+        assert output.split() == ["line1", "line2"]
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = 0
+        self.broken = False
+        self.closed = False
+
+    def is_healthy(self, max_calls, max_age):
+        return not self.broken and self.calls < max_calls
+
+    def ask(self, prompt, timeout, on_progress=None):
+        self.calls += 1
+        if prompt == "fail":
+            self.broken = True
+            raise SessionError("boom")
+        return prompt
+
+    def close(self):
+        self.closed = True
+
+
+class TestAgySessionPool:
+    """Test session reuse and recycling."""
+
+    def _pool(self, **kwargs):
+        sessions = []
+
+        def factory():
+            sessions.append(FakeSession())
+            return sessions[-1]
+
+        return AgySessionPool("agy", session_factory=factory, **kwargs), sessions
+
+    def test_reuses_sessions(self):
+        """Sequential calls should share one session."""
+        pool, sessions = self._pool(size=2)
+        assert [pool.run(p) for p in ("a", "b", "c")] == ["a", "b", "c"]
+        assert len(sessions) == 1
+        assert pool.stats["reuses"] == 2
+
+    def test_recycles_after_max_calls(self):
+        """A session should be replaced once it reaches max_calls."""
+        pool, sessions = self._pool(size=1, max_calls=2)
+        for p in ("a", "b", "c"):
+            pool.run(p)
+        assert len(sessions) == 2
+        assert pool.stats["sessions_recycled"] == 1
+
+    def test_broken_session_replaced(self):
+        """A failed request should retire its session."""
+        pool, sessions = self._pool(size=1)
+        with pytest.raises(SessionError):
+            pool.run("fail")
+        assert pool.run("ok") == "ok"
+        assert len(sessions) == 2
+
+    def test_size_bounds_concurrency(self):
+        """No more than `size` sessions should be started under load."""
+        pool, sessions = self._pool(size=2)
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for _ in range(5):
+                pool.run("x")
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(sessions) <= 2
+        assert pool.stats["requests"] == 20
+
+    def test_close_stops_idle_sessions(self):
+        """Closing the pool should close idle sessions and refuse new calls."""
+        pool, sessions = self._pool(size=1)
+        pool.run("a")
+        pool.close()
+        assert sessions[0].closed
+        with pytest.raises(SessionError):
+            pool.run("b")
@@ -0,0 +1,116 @@
+"""
+Unit tests for the token-bucket rate limiter.
+"""
+import threading
+import pytest
+from agents.rate_limit import RateLimiter, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    """Test request and token buckets."""
+
+    def test_burst_then_paced(self):
+        """After the burst, reservations should queue one interval apart."""
+        clock = FakeClock()
+        limiter = RateLimiter("agy", requests_per_min=60, burst_seconds=2, clock=clock)
+        waits = [limiter.reserve() for _ in range(4)]
+        assert waits == [0.0, 0.0, pytest.approx(1.0), pytest.approx(2.0)]
+
+    def test_refills_over_time(self):
+        """Capacity should come back at the configured rate."""
+        clock = FakeClock()
+        limiter = RateLimiter("agy", requests_per_min=60, burst_seconds=1, clock=clock)
+        assert limiter.reserve() == 0.0
+        clock.now += 1.0
+        assert limiter.reserve() == 0.0
+
+    def test_token_bucket(self):
+        """Large prompts should wait on the tokens/min budget."""
+        clock = FakeClock()
+        limiter = RateLimiter("openai", tokens_per_min=6000, burst_seconds=10, clock=clock)
+        assert limiter.reserve(tokens=1000) == 0.0
+        assert limiter.reserve(tokens=500) == pytest.approx(5.0)
+
+    def test_record_usage_corrects_estimate(self):
+        """Underestimated calls should charge the difference to later callers."""
+        clock = FakeClock()
+        limiter = RateLimiter("openai", tokens_per_min=6000, burst_seconds=10, clock=clock)
+        limiter.reserve(tokens=100)
+        limiter.record_usage(100, 1000)
+        assert limiter.reserve(tokens=100) == pytest.approx(1.0)
+
+    def test_unlimited_backend(self):
+        """Backends without limits should never wait."""
+        assert RateLimiter("ollama").reserve(tokens=10 ** 6) == 0.0
+        assert RateLimiter.from_config("ollama@x", "ollama", {"backends": {"antigravity": {"requests_per_min": 12}}}) is None
+
+    def test_from_config(self, tmp_path):
+        """Per-backend settings should be picked by agent name."""
+        limiter = RateLimiter.from_config(
+            "antigravity", "antigravity",
+            {"dir": str(tmp_path), "backends": {"antigravity": {"requests_per_min": 12}}}
+        )
+        assert limiter.limits["requests"][0] == pytest.approx(0.2)
+
+    def test_no_lock_held_while_sleeping(self):
+        """Waiting callers must not block the bucket for other threads."""
+        held = []
+        limiter = RateLimiter("agy", requests_per_min=60, burst_seconds=1)
+        limiter._sleep = lambda seconds: held.append(limiter._store._lock.locked())
+        for _ in range(3):
+            limiter.acquire()
+        assert held == [False, False]
+
+    def test_file_store_shared_between_limiters(self, tmp_path):
+        """Two limiters on the same state dir (e.g. two processes) share one budget."""
+        clock = FakeClock()
+        first = RateLimiter("agy", requests_per_min=60, burst_seconds=1, state_dir=tmp_path, clock=clock)
+        second = RateLimiter("agy", requests_per_min=60, burst_seconds=1, state_dir=tmp_path, clock=clock)
+        assert first.reserve() == 0.0
+        assert second.reserve() == pytest.approx(1.0)
+        assert (tmp_path / "agy.json").exists()
+
+    def test_file_store_thread_safe(self, tmp_path):
+        """Concurrent reservations should each get a distinct slot."""
+        clock = FakeClock()
+        limiter = RateLimiter("agy", requests_per_min=60, burst_seconds=1, state_dir=tmp_path, clock=clock)
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(limiter.reserve())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(waits) == [pytest.approx(float(i)) for i in range(8)]
+
+
+class TestEstimateTokens:
+    """Test the rough token estimate."""
+
+    def test_cjk_counts_per_character(self):
+        assert estimate_tokens("機器學習") == 4
+
+    def test_latin_counts_per_four_chars(self):
+        assert estimate_tokens("abcdefgh") == 2
+
+
+class TestAntigravityCooldown:
+    """Test that the adapter cooldown does not sleep under its lock."""
+
+    def test_cooldown_sleeps_outside_lock(self, monkeypatch):
+        import agents.antigravity as antigravity
+        adapter = antigravity.AntigravityAdapter({"agent_config": {}})
+        adapter.COOLDOWN_DURATION = 1
+        held = []
+        monkeypatch.setattr(antigravity.time, "sleep", lambda seconds: held.append((round(seconds), adapter._lock.locked())))
+        for _ in range(3):
+            adapter._cooldown()
+        assert [locked for _, locked in held] == [False] * len(held)
+        assert [seconds for seconds, _ in held][-2:] == [1, 2]  # Queued slots, not serialized sleeps
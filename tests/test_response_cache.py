@@ -0,0 +1,134 @@
+"""
+Unit tests for the persistent response cache.
+"""
+import json
+import os
+import time
+import pytest
+from agents.cache import ResponseCache
+from agents.performance import PerformanceMonitor
+
+
+class TestResponseCache:
+    """Test response cache behaviour."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return ResponseCache(tmp_path / "cache")
+
+    def test_key_is_stable(self):
+        """Same inputs should always hash to the same key."""
+        k1 = ResponseCache.make_key("antigravity", None, "PLAN", "prompt")
+        k2 = ResponseCache.make_key(" Antigravity ", "default", "PLAN", "prompt")
+        assert k1 == k2
+
+    def test_key_depends_on_all_parts(self):
+        """Changing agent, model, mode or prompt should change the key."""
+        base = ResponseCache.make_key("ollama", "llama3", "MEMO", "p")
+        assert base != ResponseCache.make_key("claude", "llama3", "MEMO", "p")
+        assert base != ResponseCache.make_key("ollama", "qwen", "MEMO", "p")
+        assert base != ResponseCache.make_key("ollama", "llama3", "DECK", "p")
+        assert base != ResponseCache.make_key("ollama", "llama3", "MEMO", "p2")
+
+    def test_miss_then_hit(self, cache):
+        """A stored response should be replayed on the next lookup."""
+        key = cache.make_key("ollama", "llama3", "PLAN", "prompt")
+        assert cache.get(key) is None
+
+        cache.put(key, '{"pages": []}', {"mode": "PLAN"})
+        assert cache.get(key) == '{"pages": []}'
+
+    def test_persists_across_instances(self, tmp_path):
+        """Entries should survive a new cache instance (process restart)."""
+        key = ResponseCache.make_key("ollama", None, "MEMO", "prompt")
+        ResponseCache(tmp_path / "cache").put(key, "memo text")
+
+        assert ResponseCache(tmp_path / "cache").get(key) == "memo text"
+
+    def test_empty_response_not_stored(self, cache):
+        """Empty output should never be cached."""
+        key = cache.make_key("ollama", None, "MEMO", "prompt")
+        cache.put(key, "")
+        assert cache.get(key) is None
+
+    def test_expired_entry_is_miss(self, tmp_path):
+        """Entries older than max_age should be treated as misses."""
+        cache = ResponseCache(tmp_path / "cache", max_age_days=1)
+        key = cache.make_key("ollama", None, "PLAN", "prompt")
+        cache.put(key, "old")
+
+        path = cache._entry_path(key)
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        entry["created"] = time.time() - 2 * 24 * 3600
+        path.write_text(json.dumps(entry), encoding="utf-8")
+
+        assert cache.get(key) is None
+        assert not path.exists()
+
+    def test_size_eviction_removes_oldest(self, tmp_path):
+        """Exceeding max size should evict least recently used entries first."""
+        cache = ResponseCache(tmp_path / "cache", max_size_mb=0.001)  # ~1KB
+        keys = [cache.make_key("ollama", None, "MEMO", str(i)) for i in range(4)]
+        for i, key in enumerate(keys):
+            cache.put(key, "x" * 400)
+            old = time.time() - 100 + i
+            os.utime(cache._entry_path(key), (old, old))
+
+        cache.evict()
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[-1]) == "x" * 400
+        assert cache.stats()["size_bytes"] <= 1024 * 1.05
+
+    def test_overwrite_does_not_inflate_size(self, tmp_path):
+        """Rewriting a key should replace its size, not add to it (no premature eviction)."""
+        cache = ResponseCache(tmp_path / "cache", max_size_mb=0.001)  # ~1KB
+        other = cache.make_key("ollama", None, "MEMO", "other")
+        cache.put(other, "y" * 300)
+        key = cache.make_key("ollama", None, "MEMO", "same")
+        for _ in range(10):
+            cache.put(key, "x" * 300)
+        assert cache.get(other) == "y" * 300
+        assert cache._size_bytes == sum(p.stat().st_size for p in (tmp_path / "cache").glob("*/*.json"))
+
+    def test_clear(self, cache):
+        """Clearing should remove every entry."""
+        key = cache.make_key("ollama", None, "PLAN", "prompt")
+        cache.put(key, "value")
+        cache.clear()
+        assert cache.stats()["entries"] == 0
+
+
+class TestCacheMetrics:
+    """Test cache counters in PerformanceMonitor."""
+
+    @pytest.fixture
+    def monitor(self):
+        monitor = PerformanceMonitor()
+        monitor.reset()
+        yield monitor
+        monitor.reset()
+
+    def test_hit_miss_counters(self, monitor):
+        """Hits and misses should be counted per mode."""
+        monitor.record_cache_hit("MEMO")
+        monitor.record_cache_hit("MEMO")
+        monitor.record_cache_miss("PLAN")
+
+        stats = monitor.get_cache_stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 66.7
+        assert stats["by_mode"]["MEMO"]["hits"] == 2
+
+    def test_summary_includes_cache(self, monitor):
+        """Summary should expose cache stats alongside call metrics."""
+        monitor.record_call("agent", "PLAN", 100, True)
+        monitor.record_cache_miss("PLAN")
+
+        assert monitor.get_summary()["cache"]["misses"] == 1
+
+    def test_reset_clears_cache_counters(self, monitor):
+        """Reset should clear cache counters."""
+        monitor.record_cache_hit("MEMO")
+        monitor.reset()
+        assert monitor.get_cache_stats()["hits"] == 0
@@ -3,8 +3,9 @@ Unit tests for RetryStrategy.
 """
 import pytest
 import time
-from agents.retry import RetryStrategy
-from agents.exceptions import AgentExecutionError
+from agents.retry import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget, RetryStrategy, jittered_delay
+from agents.exceptions import AgentExecutionError, CircuitOpenError, RetryBudgetExhaustedError
+from agents.performance import performance_monitor
 
 
 class TestRetryStrategy:
@@ -67,3 +68,107 @@ class TestRetryStrategy:
             delay1 = timestamps[1] - timestamps[0]
             delay2 = timestamps[2] - timestamps[1]
             assert delay2 > delay1  # Backoff should increase
+
+    def test_jittered_delay_bounds(self):
+        """Jittered delays should stay within [ceiling/2, ceiling] and respect max_delay."""
+        assert jittered_delay(0, 4, rng=lambda: 0.0) == 2.0
+        assert jittered_delay(1, 4, rng=lambda: 1.0) == 8.0
+        assert jittered_delay(10, 4, max_delay=30, rng=lambda: 1.0) == 30.0
+
+    def test_open_breaker_fails_fast(self):
+        """An open breaker should stop retries and reject calls without running them."""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        strategy = RetryStrategy(max_retries=5, delay=0, breaker=breaker)
+        calls = []
+
+        def always_fail():
+            calls.append(1)
+            raise AgentExecutionError("down", "test")
+
+        with pytest.raises(CircuitOpenError):
+            strategy.execute_with_retry(always_fail)
+        assert len(calls) == 2
+
+    def test_budget_limits_retries(self):
+        """Retries beyond the shared budget should raise instead of retrying."""
+        budget = RetryBudget(ratio=0, min_retries=1)
+        strategy = RetryStrategy(max_retries=5, delay=0, budget=budget)
+        calls = []
+
+        def always_fail():
+            calls.append(1)
+            raise AgentExecutionError("down", "test")
+
+        with pytest.raises(RetryBudgetExhaustedError):
+            strategy.execute_with_retry(always_fail)
+        assert len(calls) == 2
+        assert budget.denied == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    @pytest.fixture(autouse=True)
+    def reset_monitor(self):
+        performance_monitor.reset()
+        yield
+        performance_monitor.reset()
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures up to the threshold should open the circuit."""
+        breaker = CircuitBreaker("b", failure_threshold=3, clock=FakeClock())
+        breaker.on_failure()
+        breaker.on_failure()
+        breaker.on_success()  # Resets the streak
+        breaker.on_failure()
+        breaker.on_failure()
+        assert breaker.state == CLOSED
+        breaker.on_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_probe(self):
+        """After the reset timeout one probe should be admitted; its result decides."""
+        clock = FakeClock()
+        breaker = CircuitBreaker("b", failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.on_failure()
+        clock.now = 30
+        assert breaker.state == HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # Only one probe at a time
+        breaker.on_failure()
+        assert breaker.state == OPEN
+        clock.now = 60
+        breaker.before_call()
+        breaker.on_success()
+        assert breaker.state == CLOSED
+
+    def test_transitions_reported(self):
+        """Transitions should reach the PerformanceMonitor."""
+        clock = FakeClock()
+        breaker = CircuitBreaker("agy", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.on_failure()
+        clock.now = 10
+        breaker.before_call()
+        breaker.on_success()
+        stats = performance_monitor.get_breaker_stats()["agy"]
+        assert stats["state"] == CLOSED
+        assert stats["opens"] == 1
+        assert [(t["from"], t["to"]) for t in stats["history"]] == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+    def test_from_config_backend_override(self):
+        """Per-backend settings should override the globals; disabled yields None."""
+        config = {"failure_threshold": 5, "backends": {"llamacpp": {"failure_threshold": 2}, "claude": {"enabled": False}}}
+        assert CircuitBreaker.from_config("llamacpp@x", "llamacpp", config).failure_threshold == 2
+        assert CircuitBreaker.from_config("ollama", "ollama", config).failure_threshold == 5
+        assert CircuitBreaker.from_config("claude", "claude", config) is None
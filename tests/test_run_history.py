@@ -0,0 +1,111 @@
+"""
+Unit tests for the run metrics history and regression check.
+"""
+import pytest
+from agents.performance import performance_monitor
+from scripts.run_history import RunHistory, find_regressions, main, summarize_snapshot
+
+
+@pytest.fixture(autouse=True)
+def monitor():
+    performance_monitor.reset()
+    yield performance_monitor
+    performance_monitor.reset()
+
+
+def memo_run(history, p95_ms, status="complete", **info):
+    """Record a run whose VALIDATE_MEMO calls all take p95_ms."""
+    return history.record("orchestrate", {("calls", "VALIDATE_MEMO"): 10, ("p95_ms", "VALIDATE_MEMO"): p95_ms}, status, **info)
+
+
+class TestSummarizeSnapshot:
+    """Test flattening PerformanceMonitor metrics into a run summary."""
+
+    def test_modes_steps_tokens_and_cache(self, monitor):
+        """Calls should aggregate per mode across agents; steps keep their pipeline."""
+        monitor.record_call("a", "MEMO", 1000, True)
+        monitor.record_call("b", "MEMO", 3000, False, retry_count=1)
+        monitor.record_tokens("MEMO", 800, 200)
+        monitor.record_rework("MEMO")
+        monitor.record_cache_hit("PLAN")
+        monitor.record_pipeline_step("orchestrate", "Planning", 2500)
+        monitor.record_pipeline_step("video", "tts", 400, success=False)
+        metrics = summarize_snapshot(monitor.snapshot())
+        assert metrics[("calls", "MEMO")] == 2
+        assert metrics[("failures", "MEMO")] == 1
+        assert metrics[("retries", "MEMO")] == 1
+        assert metrics[("avg_ms", "MEMO")] == 2000
+        assert metrics[("p95_ms", "MEMO")] == pytest.approx(3000, rel=0.1)
+        assert metrics[("prompt_tokens", "MEMO")] == 800
+        assert metrics[("reworks", "MEMO")] == 1
+        assert metrics[("cache_hits", "PLAN")] == 1
+        assert metrics[("step_ms", "orchestrate/Planning")] == 2500
+        assert metrics[("step_failures", "video/tts")] == 1
+        assert ("run_ms", "") in metrics
+
+
+class TestFindRegressions:
+    """Test comparing a run with its baseline."""
+
+    def test_flags_latency_increase(self):
+        """A p95 well above the baseline median should be flagged with its change."""
+        baseline = [{("p95_ms", "VALIDATE_MEMO"): v} for v in (10000, 12000, 50000)]
+        (regression,) = find_regressions({("p95_ms", "VALIDATE_MEMO"): 16800}, baseline)
+        assert regression.change == pytest.approx(0.4)
+        assert regression.describe() == "VALIDATE_MEMO p95 latency up 40% (12.0s -> 16.8s)"
+
+    def test_ignores_noise(self):
+        """Changes under the threshold or the absolute floor should not be flagged."""
+        baseline = [{("p95_ms", "MEMO"): 1000, ("calls", "MEMO"): 10}]
+        assert find_regressions({("p95_ms", "MEMO"): 1900, ("calls", "MEMO"): 11}, baseline) == []
+
+    def test_fewer_cache_hits_is_a_regression(self):
+        """For cache hits lower is worse."""
+        baseline = [{("cache_hits", "PLAN"): 10}, {("cache_hits", "PLAN"): 10}]
+        (regression,) = find_regressions({("cache_hits", "PLAN"): 2}, baseline)
+        assert "down 80%" in regression.describe()
+
+
+class TestRunHistory:
+    """Test the SQLite store and CLI."""
+
+    def test_round_trip(self, tmp_path):
+        """Recorded runs and metrics should be read back, newest first."""
+        history = RunHistory(tmp_path / "history.sqlite")
+        first = memo_run(history, 1000, source="doc.md")
+        second = memo_run(history, 2000)
+        assert [r["id"] for r in history.runs("orchestrate")] == [second, first]
+        assert history.runs()[1]["info"] == {"source": "doc.md"}
+        assert history.metrics(first)[("p95_ms", "VALIDATE_MEMO")] == 1000
+
+    def test_compare_uses_complete_runs_only(self, tmp_path):
+        """Failed runs should be left out of the baseline and of 'latest'."""
+        history = RunHistory(tmp_path / "history.sqlite")
+        for _ in range(3):
+            memo_run(history, 10000)
+        memo_run(history, 90000, status="failed")
+        latest = memo_run(history, 15000)
+        memo_run(history, 1, status="failed")
+        run, baseline, regressions = history.compare(window=5)
+        assert run["id"] == latest
+        assert len(baseline) == 3
+        assert [(r.key, r.value) for r in regressions] == [("VALIDATE_MEMO", 15000)]
+
+    def test_cli_exit_code(self, tmp_path, capsys):
+        """compare should exit 1 on regressions and name the prompt change."""
+        db = tmp_path / "history.sqlite"
+        history = RunHistory(db)
+        for _ in range(3):
+            memo_run(history, 10000, prompts="v1")
+        memo_run(history, 10500, prompts="v1")
+        assert main(["--db", str(db), "compare"]) == 0
+        memo_run(history, 14000, prompts="v2")
+        assert main(["--db", str(db), "compare"]) == 1
+        assert "VALIDATE_MEMO p95 latency up 40% (10.0s -> 14.0s) [prompts changed since baseline]" in capsys.readouterr().out
+
+    def test_cli_needs_baseline(self, tmp_path, capsys):
+        """With too few earlier runs there is nothing to compare against."""
+        db = tmp_path / "history.sqlite"
+        memo_run(RunHistory(db), 10000)
+        assert main(["--db", str(db), "compare"]) == 0
+        assert "no baseline yet" in capsys.readouterr().out
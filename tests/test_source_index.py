@@ -0,0 +1,99 @@
+"""
+Unit tests for the BM25 source passage index.
+"""
+import json
+import pytest
+from scripts.source_index import SourceIndex, split_passages, tokenize
+
+
+def _chapter():
+    topics = [
+        ("Gradient descent", "Gradient descent updates weights along the negative gradient of the loss."),
+        ("Overfitting", "Overfitting happens when a model memorizes noise; regularization and dropout help."),
+        ("Transformers", "Transformers use self-attention to relate every token to every other token."),
+        ("機器學習", "監督式學習使用標記資料訓練模型，非監督式學習則從未標記資料中找出結構。"),
+    ]
+    paragraphs = []
+    for i in range(30):
+        title, body = topics[i % len(topics)]
+        paragraphs.append(f"## {title} {i}\n\n{body} Section {i} filler text about unrelated history.")
+    return "\n\n".join(paragraphs)
+
+
+class TestTokenize:
+    """Test CJK-aware tokenization."""
+
+    def test_latin_words_lowercased(self):
+        assert tokenize("Self-Attention in Transformers") == ["self-attention", "in", "transformers"]
+
+    def test_cjk_bigrams(self):
+        assert tokenize("機器學習") == ["機器", "器學", "學習"]
+
+
+class TestSplitPassages:
+    """Test chunking on paragraph boundaries."""
+
+    def test_passages_respect_size(self):
+        """Passages should stay within the chunk size."""
+        passages = split_passages(_chapter(), chunk_chars=300)
+        assert len(passages) > 5
+        assert all(len(p) <= 300 for p in passages)
+
+    def test_long_paragraph_is_cut(self):
+        """A single oversized paragraph should be split into several passages."""
+        passages = split_passages("Sentence. " * 200, chunk_chars=250)
+        assert len(passages) >= 8
+        assert all(len(p) <= 250 for p in passages)
+
+
+class TestSourceIndex:
+    """Test retrieval and persistence."""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / "chapter.md"
+        path.write_text(_chapter(), encoding="utf-8")
+        return path
+
+    def test_top_passages_are_relevant(self, source):
+        """The best hit should contain the query topic."""
+        index = SourceIndex.build(source, chunk_chars=200)
+        best, _ = index.search("How does self-attention work in transformers?", k=3)[0]
+        assert "self-attention" in index.passages[best]
+
+    def test_cjk_query(self, source):
+        """Chinese slide content should retrieve Chinese passages."""
+        index = SourceIndex.build(source, chunk_chars=200)
+        best, _ = index.search("監督式學習與標記資料", k=1)[0]
+        assert "監督式學習" in index.passages[best]
+
+    def test_passages_for_is_bounded(self, source):
+        """Prompt context should be bounded by k passages, not source length."""
+        index = SourceIndex.build(source, chunk_chars=200)
+        context = index.passages_for("gradient descent", k=3)
+        assert len(context) <= 3 * 200 + 2 * len("\n\n[...]\n\n")
+        assert "Gradient descent" in context
+
+    def test_small_source_returned_whole(self, tmp_path):
+        """Sources that fit in k passages should be passed through intact."""
+        path = tmp_path / "short.md"
+        path.write_text("Only paragraph.", encoding="utf-8")
+        assert SourceIndex.build(path).passages_for("anything") == "Only paragraph."
+
+    def test_persisted_and_reused(self, source, tmp_path):
+        """A saved index should be reused while the source is unchanged."""
+        index_path = tmp_path / ".source_index.json"
+        first = SourceIndex.load_or_build(source, index_path, chunk_chars=200)
+        assert json.loads(index_path.read_text(encoding="utf-8"))["source_hash"] == first.source_hash
+
+        again = SourceIndex.load_or_build(source, index_path, chunk_chars=200)
+        assert again.passages == first.passages
+
+    def test_rebuilt_when_source_changes(self, source, tmp_path):
+        """Editing the source should invalidate the persisted index."""
+        index_path = tmp_path / ".source_index.json"
+        SourceIndex.load_or_build(source, index_path, chunk_chars=200)
+        source.write_text("Completely new content.", encoding="utf-8")
+
+        index = SourceIndex.load_or_build(source, index_path, chunk_chars=200)
+        assert index.passages == ["Completely new content."]
@@ -0,0 +1,125 @@
+"""
+Unit tests for schema-constrained decoding of JSON modes.
+"""
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import scripts.orchestrate as orchestrate
+from agents.exceptions import AgentExecutionError
+from agents.metrics_export import render_metrics
+from agents.openai_compatible import OpenAICompatibleAdapter
+from agents.performance import performance_monitor
+from agents.schemas import request_fields, schema_for
+
+
+class _SchemaRejectingHandler(BaseHTTPRequestHandler):
+    """An older server: 400 for any request carrying response_format."""
+    requests = []
+    other_error = None  # Set to answer every request with this 400 instead
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        if self.other_error:
+            payload, status = {"error": self.other_error}, 400
+        elif "response_format" in body:
+            payload, status = {"error": "unknown field response_format"}, 400
+        else:
+            payload, status = {"choices": [{"message": {"content": '{"pages": []}'}}]}, 200
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSchemas:
+    """Test the per-mode schemas and request fields."""
+
+    def test_json_modes_have_schemas(self):
+        """Every parsed mode should have a schema; free-form modes none."""
+        for mode in ("ANALYZE_SOURCE_DOCUMENT", "PLAN", "DECK", "DECK_SLIDE", "VALIDATE_MEMO", "VALIDATE_SLIDE_SVG"):
+            assert schema_for(mode)["type"] == "object"
+        assert schema_for("VALIDATE_PLAN")["required"] == ["is_valid", "is_acceptable", "feedback"]
+        assert schema_for("MEMO") is None
+        assert schema_for("CREATE_SLIDE_SVG") is None
+
+    def test_request_field_styles(self):
+        """Each backend style should carry the same schema."""
+        fields = request_fields("PLAN")
+        assert fields["response_format"]["type"] == "json_schema"
+        assert fields["response_format"]["json_schema"]["schema"] == schema_for("PLAN")
+        assert request_fields("PLAN", "guided_json") == {"guided_json": schema_for("PLAN")}
+        assert request_fields("PLAN", "off") == {}
+        assert request_fields("MEMO", "json_schema") == {}
+
+
+class TestAdapterStructuredOutput:
+    """Test how OpenAICompatibleAdapter sends the schema."""
+
+    def test_payload(self):
+        """JSON modes should get response_format by default; others and 'off' should not."""
+        adapter = OpenAICompatibleAdapter({"agent_config": {"model": "llama3"}})
+        assert "response_format" in adapter._build_request("p", "VALIDATE_MEMO")
+        assert "response_format" not in adapter._build_request("p", "MEMO")
+        off = OpenAICompatibleAdapter({"agent_config": {"model": "llama3", "structured_output": "off"}})
+        assert "response_format" not in off._build_request("p", "PLAN")
+        vllm = OpenAICompatibleAdapter({"agent_config": {"model": "llama3", "structured_output": "guided_json"}})
+        assert vllm._build_request("p", "PLAN")["guided_json"] == schema_for("PLAN")
+
+    def test_rejected_schema_is_dropped(self):
+        """A 400 for the schema should be retried at once without it, and not sent again."""
+        _SchemaRejectingHandler.requests = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _SchemaRejectingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            adapter = OpenAICompatibleAdapter({"agent_config": {"api_base": f"http://127.0.0.1:{server.server_address[1]}/v1", "model": "llama3"}})
+            assert adapter.execute("p", "PLAN", max_retries=1, retry_delay=0) == '{"pages": []}'
+            adapter.execute("p", "PLAN", max_retries=1, retry_delay=0)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert ["response_format" in r for r in _SchemaRejectingHandler.requests] == [True, False, False]
+        assert adapter.structured_output is None
+
+    def test_unrelated_400_keeps_schema(self, monkeypatch):
+        """A 400 that does not mention the schema should fail the call, not drop the schema."""
+        _SchemaRejectingHandler.requests = []
+        monkeypatch.setattr(_SchemaRejectingHandler, "other_error", "prompt is longer than the context window")
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _SchemaRejectingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            adapter = OpenAICompatibleAdapter({"agent_config": {"api_base": f"http://127.0.0.1:{server.server_address[1]}/v1", "model": "llama3"}})
+            with pytest.raises(AgentExecutionError):
+                adapter.execute("p", "PLAN", max_retries=1, retry_delay=0)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert ["response_format" in r for r in _SchemaRejectingHandler.requests] == [True]
+        assert adapter.structured_output == "response_format"
+
+
+class TestParseFailures:
+    """Test the JSON parse counter."""
+
+    @pytest.fixture(autouse=True)
+    def monitor(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+        performance_monitor.reset()
+        yield performance_monitor
+        performance_monitor.reset()
+
+    def test_parses_are_counted_per_mode(self, monitor):
+        """Parsed and failed outputs should be counted; empty (failed call) outputs not at all."""
+        assert orchestrate.parse_ai_json_output('{"is_valid": true}', "VALIDATE_MEMO") == {"is_valid": True}
+        assert orchestrate.parse_ai_json_output('{"response": "{\\"pages\\": [1]}"}', "PLAN") == {"pages": [1]}
+        assert orchestrate.parse_ai_json_output("Sorry, I cannot help", "VALIDATE_MEMO") is None
+        orchestrate.parse_ai_json_output("", "VALIDATE_MEMO")
+        assert monitor.get_parse_stats() == {"PLAN": {"parsed": 1, "failed": 0}, "VALIDATE_MEMO": {"parsed": 1, "failed": 1}}
+        text = render_metrics(monitor.snapshot())
+        assert 'pptplaner_json_parses_total{mode="VALIDATE_MEMO",result="failed"} 1' in text
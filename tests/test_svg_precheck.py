@@ -0,0 +1,99 @@
+"""
+Unit tests for the local SVG pre-validator.
+"""
+import pytest
+from scripts.orchestrate import fix_svg_layout
+from scripts.svg_precheck import precheck_svg, estimate_text_width
+
+GOOD_SVG = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 960 540">
+  <style>.title { font-size: 36px; text-anchor: middle; } .body { font-size: 20px; }</style>
+  <rect width="960" height="540" fill="#f8f9fa"/>
+  <text class="title" x="480" y="80">機器學習概論</text>
+  <text class="body" x="60" y="200">Supervised learning maps inputs to labels
+    <animate attributeName="opacity" from="0" to="1" dur="1s"/>
+  </text>
+</svg>"""
+
+
+class TestPrecheckSvg:
+    """Test deterministic SVG checks."""
+
+    def test_good_svg_passes(self):
+        """A well-formed, in-bounds slide should pass."""
+        result = precheck_svg(GOOD_SVG)
+        assert result.is_valid
+        assert result.text_count == 2
+
+    def test_good_svg_passes_after_layout_fix(self):
+        """The padding group added by fix_svg_layout should not trip the checks."""
+        assert precheck_svg(fix_svg_layout(GOOD_SVG)).is_valid
+
+    def test_malformed_xml(self):
+        """Unescaped '&' should be reported as an XML error."""
+        result = precheck_svg('<svg viewBox="0 0 960 540"><text x="10" y="20">A & B</text></svg>')
+        assert not result.is_valid
+        assert "well-formed" in result.feedback
+
+    def test_missing_viewbox(self):
+        """An SVG without viewBox or size should be rejected."""
+        result = precheck_svg('<svg><rect width="10" height="10"/></svg>')
+        assert any("viewBox" in issue for issue in result.issues)
+
+    def test_bad_viewbox(self):
+        """Zero-sized or garbled viewBoxes should be rejected."""
+        assert not precheck_svg('<svg viewBox="0 0 0 540"><rect width="1" height="1"/></svg>').is_valid
+        assert not precheck_svg('<svg viewBox="0 0 wide"><rect width="1" height="1"/></svg>').is_valid
+
+    def test_text_overflow(self):
+        """Long CJK titles running past the right edge should be flagged."""
+        svg = '<svg viewBox="0 0 960 540"><text x="600" y="80" font-size="40">這是一段非常非常非常長的標題文字</text></svg>'
+        result = precheck_svg(svg)
+        assert any("overflows" in issue for issue in result.issues)
+
+    def test_overflow_respects_anchor_and_transform(self):
+        """Centered text and translated groups should be measured correctly."""
+        centered = '<svg viewBox="0 0 960 540"><text x="480" y="80" font-size="40" text-anchor="middle">十個中文字的標題文字</text></svg>'
+        assert precheck_svg(centered).is_valid
+        shifted = ('<svg viewBox="0 0 960 540"><g transform="translate(700, 0)">'
+                   '<text x="0" y="80" font-size="40">十個中文字的標題文字</text></g></svg>')
+        assert not precheck_svg(shifted).is_valid
+
+    def test_rotated_text_is_skipped(self):
+        """Text under unsupported transforms should be left to the LLM judge."""
+        svg = ('<svg viewBox="0 0 960 540"><g transform="rotate(90)">'
+               '<text x="900" y="80" font-size="40">這是一段非常非常非常長的標題文字</text></g></svg>')
+        assert precheck_svg(svg).is_valid
+
+    def test_positioned_tspans_are_separate_lines(self):
+        """Wrapped lines should be measured one by one."""
+        svg = ('<svg viewBox="0 0 960 540"><text font-size="32" y="100">'
+               '<tspan x="60" dy="0">第一行的文字內容第一行的文字內容</tspan>'
+               '<tspan x="60" dy="40">第二行的文字內容第二行的文字內容</tspan></text></svg>')
+        assert precheck_svg(svg).is_valid
+
+    def test_font_size_floor(self):
+        """Text below the readable floor (after scaling) should be flagged."""
+        svg = '<svg viewBox="0 0 960 540"><g transform="scale(0.5)"><text x="10" y="100" font-size="14">tiny</text></g></svg>'
+        result = precheck_svg(svg)
+        assert any("readable" in issue for issue in result.issues)
+
+    def test_element_limit(self):
+        """Runaway element counts should be rejected."""
+        shapes = "".join(f'<rect x="{i}" y="0" width="1" height="1"/>' for i in range(30))
+        result = precheck_svg(f'<svg viewBox="0 0 960 540">{shapes}</svg>', {"max_elements": 20})
+        assert any("elements" in issue for issue in result.issues)
+
+    def test_empty_svg(self):
+        """An SVG with nothing to render should be rejected."""
+        assert not precheck_svg('<svg viewBox="0 0 960 540"><defs/></svg>').is_valid
+
+    def test_issue_count_is_capped(self):
+        """Feedback should be capped to keep rework prompts short."""
+        texts = "".join(f'<text x="10" y="{20 + i}" font-size="4">t{i}</text>' for i in range(20))
+        result = precheck_svg(f'<svg viewBox="0 0 960 540">{texts}</svg>', {"max_issues": 3})
+        assert len(result.issues) == 3
+
+    @pytest.mark.parametrize("text, expected", [("abcd", 4 * 0.55 * 10), ("中文", 2 * 10)])
+    def test_estimate_text_width(self, text, expected):
+        """CJK glyphs should count as full-width."""
+        assert estimate_text_width(text, 10) == pytest.approx(expected)
@@ -0,0 +1,141 @@
+"""
+Unit tests for the dependency-driven TaskScheduler.
+"""
+import threading
+import time
+import pytest
+from scripts.task_scheduler import TaskScheduler, DependencyFailedError
+
+
+class TestTaskScheduler:
+    """Test DAG scheduling behaviour."""
+
+    def test_runs_all_tasks(self):
+        """Independent tasks should all run and return results."""
+        scheduler = TaskScheduler(max_workers=2)
+        for i in range(5):
+            scheduler.add(f"t{i}", lambda x: x * 2, i)
+
+        results = scheduler.run()
+        assert results == {f"t{i}": i * 2 for i in range(5)}
+
+    def test_dependency_order(self):
+        """A task should start only after its dependencies finished."""
+        finished = []
+        scheduler = TaskScheduler(max_workers=4)
+        scheduler.add("memo", lambda: (time.sleep(0.05), finished.append("memo")))
+        scheduler.add("conceptual", lambda: finished.append("conceptual"), deps=["memo"])
+        scheduler.run()
+
+        assert finished == ["memo", "conceptual"]
+
+    def test_no_phase_barrier(self):
+        """A dependent task should start before unrelated slow tasks finish."""
+        events = []
+        scheduler = TaskScheduler(max_workers=3)
+        scheduler.add("memo_fast", lambda: events.append("memo_fast"))
+        scheduler.add("memo_slow", lambda: (time.sleep(0.2), events.append("memo_slow")))
+        scheduler.add("svg_fast", lambda: events.append("svg_fast"), deps=["memo_fast"])
+        scheduler.run()
+
+        assert events.index("svg_fast") < events.index("memo_slow")
+
+    def test_worker_budget_respected(self):
+        """Concurrency should never exceed max_workers."""
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+        scheduler = TaskScheduler(max_workers=2)
+        for i in range(8):
+            scheduler.add(f"t{i}", work)
+        scheduler.run()
+
+        assert peak <= 2
+
+    def test_dynamic_limit(self):
+        """A limit callable should cap concurrency below the pool size."""
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+        scheduler = TaskScheduler(max_workers=8, limit=lambda: 1)
+        for i in range(4):
+            scheduler.add(f"t{i}", work)
+        scheduler.run()
+
+        assert peak == 1
+
+    def test_failure_skips_dependents(self):
+        """A failed task should mark dependents as failed without running them."""
+        ran = []
+
+        def fail():
+            raise RuntimeError("boom")
+
+        scheduler = TaskScheduler(max_workers=2)
+        scheduler.add("memo", fail)
+        scheduler.add("svg", lambda: ran.append("svg"), deps=["memo"])
+        scheduler.add("other", lambda: "ok")
+        results = scheduler.run()
+
+        assert isinstance(results["memo"], RuntimeError)
+        assert isinstance(results["svg"], DependencyFailedError)
+        assert results["other"] == "ok"
+        assert ran == []
+
+    def test_on_complete_callback(self):
+        """The callback should fire once per task."""
+        seen = []
+        scheduler = TaskScheduler(max_workers=2)
+        scheduler.add("a", lambda: 1)
+        scheduler.add("b", lambda: 2, deps=["a"])
+        scheduler.run(on_complete=lambda name, result, error: seen.append((name, result, error)))
+
+        assert seen == [("a", 1, None), ("b", 2, None)]
+
+    def test_unknown_dependency(self):
+        """Depending on an unknown task should raise ValueError."""
+        scheduler = TaskScheduler()
+        scheduler.add("a", lambda: 1, deps=["missing"])
+        with pytest.raises(ValueError):
+            scheduler.run()
+
+    def test_cycle_detected(self):
+        """Cyclic dependencies should raise ValueError."""
+        scheduler = TaskScheduler()
+        scheduler.add("a", lambda: 1, deps=["b"])
+        scheduler.add("b", lambda: 2, deps=["a"])
+        with pytest.raises(ValueError):
+            scheduler.run()
+
+    def test_wall_time_tracks_critical_path(self):
+        """Wall time should approach the critical path, not the sum of phases."""
+        scheduler = TaskScheduler(max_workers=4)
+        for p in range(4):
+            scheduler.add(f"memo{p}", time.sleep, 0.05)
+            scheduler.add(f"slide{p}", time.sleep, 0.05)
+            scheduler.add(f"concept{p}", time.sleep, 0.05, deps=[f"memo{p}"])
+        scheduler.run()
+
+        stats = scheduler.stats()
+        assert stats["executed"] == 12
+        # 12 x 50ms on 4 workers = 150ms ideal; the old barriered pools
+        # (4 memo workers, then 3 workers doing both SVGs per page) take 250ms
+        assert stats["wall_seconds"] < 0.22
@@ -0,0 +1,188 @@
+"""
+Unit tests and benchmarks for the tolerant JSON parser behind parse_ai_json_output.
+
+The benchmarks compare it with the regex salvage it replaced (kept below as
+legacy_parse) on large DECK outputs; they need pytest-benchmark and are
+marked slow:
+
+    pytest tests/test_tolerant_json.py -m slow --benchmark-only
+"""
+import importlib.util
+import json
+import re
+import time
+import pytest
+import scripts.orchestrate as orchestrate
+from scripts.tolerant_json import extract_json, parse_prefix
+
+requires_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None, reason="pytest-benchmark is not installed"
+)
+
+
+def deck_json(slides, content_chars=600):
+    return json.dumps({"slides": [
+        {"page": f"{i:02d}", "topic": f"Topic {i}", "content": f"# Topic {i}\n" + "- 重點說明 \"quoted\" text\n" * (content_chars // 24)}
+        for i in range(1, slides + 1)
+    ]}, ensure_ascii=False)
+
+
+class TestExtractJson:
+    """Test locating and recovering JSON in model output."""
+
+    def test_valid_json_in_prose_and_fences(self):
+        """Valid JSON should be found after prose, inside a fence or after a '{x}' aside."""
+        assert extract_json('Sure! {"is_valid": true}').value == {"is_valid": True}
+        assert extract_json('```json\n{"pages": [{"page": 1, "topic": "A"}]}\n```').value == {"pages": [{"page": 1, "topic": "A"}]}
+        assert extract_json('Use {braces} carefully: {"is_valid": false}').value == {"is_valid": False}
+        assert extract_json("see [1] for details") is None
+        assert extract_json("no json at all") is None
+
+    def test_truncated_deck_keeps_complete_slides(self):
+        """A DECK cut mid-slide should keep every slide emitted before the cut."""
+        full = deck_json(5)
+        cut = full[:full.index('"page": "05"') + 30]
+        result = extract_json(cut)
+        assert not result.complete
+        assert [s["page"] for s in result.value["slides"]] == ["01", "02", "03", "04"]
+        assert result.value["slides"][3] == json.loads(full)["slides"][3]
+
+    def test_truncated_response_envelope(self):
+        """The agent's {"response": "..."} envelope should be unwrapped even when cut off."""
+        inner = json.dumps({"pages": [{"page": i, "topic": f"T{i}"} for i in range(1, 4)]})
+        envelope = json.dumps({"response": inner, "stats": {}})
+        assert extract_json(envelope).value == json.loads(inner)
+        result = extract_json(envelope[:envelope.index("T3")])
+        assert result.value == {"pages": [{"page": 1, "topic": "T1"}, {"page": 2, "topic": "T2"}]}
+        assert not result.complete
+
+    def test_model_mistakes(self):
+        """Unescaped quotes, raw newlines, trailing commas, leading zeros and stray escapes are tolerated."""
+        text = '{"page": 03, "content": "He said "stop", then\nleft \\d", "tags": ["a", "b",],}'
+        result = parse_prefix(text)
+        assert result.complete
+        assert result.value == {"page": 3, "content": 'He said "stop", then\nleft \\d', "tags": ["a", "b"]}
+
+    def test_quoted_list_inside_value(self):
+        """'", "' inside a value should not end it unless a key follows."""
+        text = '{"content": "he said "yes", "no" later", "page": "01"}'
+        assert parse_prefix(text).value == {"content": 'he said "yes", "no" later', "page": "01"}
+        assert parse_prefix('["a", "b"]').value == ["a", "b"]
+
+    def test_cut_scalars_are_dropped(self):
+        """A value cut off mid-way should be dropped, not guessed."""
+        assert parse_prefix('{"is_valid": true, "score": 12').value == {"is_valid": True}
+        assert parse_prefix('{"is_valid": tr').value == {}
+        assert parse_prefix('{"a": "\\ud83d\\ude00", "b": "\\u00e9"}').value == {"a": "😀", "b": "é"}
+
+
+class TestParseAiJsonOutput:
+    """Test parse_ai_json_output on top of the parser."""
+
+    @pytest.fixture(autouse=True)
+    def no_error_log(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(orchestrate, "ERROR_LOG_PATH", tmp_path / "error.log")
+
+    def test_bare_lists_are_wrapped(self):
+        """A bare page/slide list should be wrapped for PLAN/DECK modes only."""
+        pages = '[{"page": "01", "topic": "A"}, {"page": "02", "topic": "B"}]'
+        assert orchestrate.parse_ai_json_output(pages, "PLAN") == {"pages": json.loads(pages)}
+        assert orchestrate.parse_ai_json_output(pages, "DECK")["slides"][1]["topic"] == "B"
+        assert orchestrate.parse_ai_json_output(pages, "VALIDATE_MEMO") is None
+        assert orchestrate.parse_ai_json_output(pages, "DECK_SLIDE") is None  # One slide is an object, not a deck
+        assert orchestrate.parse_ai_json_output(pages, "VALIDATE_PLAN") is None
+
+    def test_partial_object_is_rejected_outside_deck_and_plan(self):
+        """Single-object modes should retry a truncated reply rather than use a prefix."""
+        slide = '{"page": "01", "topic": "A", "content": "# A\n- one", "notes": "cut'
+        assert orchestrate.parse_ai_json_output(slide, "DECK_SLIDE") is None
+        assert orchestrate.parse_ai_json_output('{"is_valid": true, "feedback": "cut', "VALIDATE_DECK") is None
+        deck = '{"slides": [' + slide[:-len(', "notes": "cut')] + '}, {"page": "02", "topic": "B", "con'
+        assert orchestrate.parse_ai_json_output(deck, "DECK")["slides"][0]["topic"] == "A"
+
+    def test_linear_time_on_unbalanced_braces(self):
+        """Input that made the greedy regex backtrack quadratically should parse at once."""
+        text = '{"content": "' + "{ " * 50000
+        start = time.perf_counter()
+        orchestrate.parse_ai_json_output(text, "DECK")
+        assert time.perf_counter() - start < 1
+
+
+def legacy_parse(output: str, mode: str):
+    """parse_ai_json_output before the tolerant parser, for comparison."""
+    json_match = re.search(r'(\{.*\})', output, re.DOTALL)
+    if json_match:
+        try:
+            outer_data = json.loads(json_match.group(1))
+            if isinstance(outer_data, dict) and "response" in outer_data and isinstance(outer_data["response"], str):
+                return legacy_parse(outer_data["response"], f"{mode} (Nested)")
+        except Exception:
+            pass
+    clean_output = output.strip()
+    match = re.search(r"```(?:json)?\s*(.*?)```", clean_output, re.DOTALL)
+    if match:
+        clean_output = match.group(1).strip()
+    else:
+        json_match_inner = re.search(r'(\{.*\})', clean_output, re.DOTALL)
+        if json_match_inner:
+            clean_output = json_match_inner.group(1).strip()
+    try:
+        data = json.loads(clean_output)
+        if isinstance(data, dict) and "response" in data and isinstance(data["response"], str):
+            return legacy_parse(data["response"], f"{mode} (Nested)")
+        return data
+    except json.JSONDecodeError:
+        pass
+    if any(x in mode for x in ["DECK", "slides", "PLAN"]):
+        extracted_items = []
+        for chunk in re.split(r',?\s*\{\s*"page":', clean_output):
+            if not chunk.strip():
+                continue
+            item = {}
+            p_m = re.search(r'^\s*"(\d+)"', chunk)
+            if not p_m:
+                continue
+            item["page"] = p_m.group(1)
+            t_m = re.search(r'"topic":\s*"(.*?)"', chunk)
+            if t_m:
+                item["topic"] = t_m.group(1)
+            c_m = re.search(r'"content":\s*"', chunk)
+            if c_m:
+                start, end = c_m.end(), chunk.rfind('"')
+                if end > start:
+                    item["content"] = chunk[start:end].replace('\\"', '"').replace('\\n', '\n')
+            extracted_items.append(item)
+        if extracted_items:
+            return {"pages": extracted_items} if "PLAN" in mode else {"slides": extracted_items}
+    return None
+
+
+def _new_parse(output, mode):
+    return extract_json(output).value
+
+
+BENCHMARK_INPUTS = {
+    "valid_200_slides": deck_json(200),
+    "enveloped_200_slides": json.dumps({"response": deck_json(200)}),
+    "truncated_200_slides": deck_json(200)[:-5000],
+    "unescaped_quotes_200_slides": deck_json(200).replace('\\"', '"'),
+}
+
+
+@requires_benchmark
+@pytest.mark.slow
+@pytest.mark.parametrize("parser", [legacy_parse, _new_parse], ids=["legacy", "tolerant"])
+@pytest.mark.parametrize("case", sorted(BENCHMARK_INPUTS))
+def test_benchmark_parse_deck(benchmark, parser, case):
+    """Parse time of a ~150KB DECK output: valid, enveloped, truncated and with unescaped quotes."""
+    result = benchmark(parser, BENCHMARK_INPUTS[case], "DECK")
+    benchmark.extra_info["slides"] = len((result or {}).get("slides") or [])
+
+
+@requires_benchmark
+@pytest.mark.slow
+@pytest.mark.parametrize("parser", [legacy_parse, _new_parse], ids=["legacy", "tolerant"])
+def test_benchmark_unbalanced_braces(benchmark, parser):
+    """Truncated output full of '{' (e.g. code in a slide): quadratic for the greedy regex."""
+    text = '{"slides": [{"page": "01", "content": "' + "function() { " * 5000
+    benchmark.pedantic(parser, args=(text, "DECK"), rounds=3, iterations=1)
@@ -0,0 +1,101 @@
+"""
+Unit tests for Chrome-trace span tracing.
+"""
+import json
+import threading
+import pytest
+from agents.tracing import Tracer
+from scripts.task_scheduler import TaskScheduler
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer()
+    tracer.enable()
+    monkeypatch.setattr("agents.tracing.tracer", tracer)
+    return tracer
+
+
+def spans(tracer, cat=None):
+    return [e for e in tracer.events() if e["ph"] == "X" and (cat is None or e["cat"] == cat)]
+
+
+class TestTracer:
+    """Test span recording and the trace file."""
+
+    def test_disabled_is_noop(self):
+        """Nothing should be recorded until tracing is enabled."""
+        tracer = Tracer()
+        with tracer.span("call", "agent"):
+            pass
+        tracer.instant("hit", "cache")
+        assert tracer.begin("phase") is None
+        assert [e for e in tracer.events() if e["ph"] != "M"] == []
+
+    def test_span_records_duration_and_args(self, tracer):
+        """A span should be a complete event with ts/dur in microseconds and its args."""
+        with tracer.span("MEMO", "agent", attempt=1):
+            pass
+        (event,) = spans(tracer)
+        assert event["name"] == "MEMO" and event["cat"] == "agent"
+        assert event["args"] == {"attempt": 1}
+        assert event["dur"] >= 0 and event["ts"] >= 0
+
+    def test_begin_end_merges_args(self, tracer):
+        """end() should add outcome args to a span opened with begin()."""
+        span = tracer.begin("PLAN", "agent", attempt=2)
+        tracer.end(span, chars=42)
+        assert spans(tracer)[0]["args"] == {"attempt": 2, "chars": 42}
+
+    def test_exception_recorded(self, tracer):
+        """A span left by an exception should carry the error and re-raise."""
+        with pytest.raises(ValueError):
+            with tracer.span("write x.md", "io"):
+                raise ValueError("disk full")
+        assert spans(tracer)[0]["args"]["error"] == "ValueError: disk full"
+
+    def test_thread_ids_and_names(self, tracer):
+        """Spans from other threads should carry their thread ID and a thread_name entry."""
+        with tracer.span("main"):
+            pass
+
+        def work():
+            with tracer.span("work"):
+                pass
+        worker = threading.Thread(target=work, name="pages_0")
+        worker.start(); worker.join()
+        by_name = {e["name"]: e["tid"] for e in spans(tracer)}
+        assert by_name["main"] != by_name["work"]
+        names = {e["tid"]: e["args"]["name"] for e in tracer.events() if e["name"] == "thread_name"}
+        assert names[by_name["work"]] == "pages_0"
+
+    def test_max_events(self, tracer):
+        """Events beyond max_events should be dropped and counted."""
+        tracer.enable(max_events=2)
+        for _ in range(5):
+            tracer.instant("tick")
+        events = tracer.events()
+        assert len([e for e in events if e["ph"] == "i"]) == 2
+        assert [e["args"]["count"] for e in events if e["name"] == "dropped_events"] == [3]
+
+    def test_write_chrome_trace(self, tracer, tmp_path):
+        """write() should produce a loadable Chrome trace JSON file."""
+        with tracer.span("Planning", "phase"):
+            tracer.instant("cache hit PLAN", "cache")
+        path = tracer.write(tmp_path / "out" / "trace.json")
+        data = json.loads(path.read_text(encoding="utf-8"))
+        assert data["displayTimeUnit"] == "ms"
+        assert {e["ph"] for e in data["traceEvents"]} >= {"M", "X", "i"}
+        assert all("pid" in e and "tid" in e for e in data["traceEvents"])
+
+    def test_scheduler_task_spans(self, tracer):
+        """Each scheduled task should appear as a 'task' span on a named worker thread."""
+        scheduler = TaskScheduler(max_workers=2, name="pages")
+        scheduler.add("Memo Page 01", lambda: None)
+        scheduler.add("Conceptual SVG Page 01", lambda: None, deps=["Memo Page 01"])
+        scheduler.run()
+        tasks = {e["name"]: e for e in spans(tracer, "task")}
+        assert set(tasks) == {"Memo Page 01", "Conceptual SVG Page 01"}
+        assert tasks["Conceptual SVG Page 01"]["args"]["deps"] == ["Memo Page 01"]
+        thread_names = {e["args"]["name"] for e in tracer.events() if e["name"] == "thread_name"}
+        assert any(name.startswith("pages") for name in thread_names)
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import shutil
+import time
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 
 @dataclass
@@ -19,6 +21,30 @@ class SlideContext:
     clip_path: Path  # output/<run_id>/clips/slide_01_intro.mp4
 
 
+@contextmanager
+def _timed_step(step: str) -> Iterator[None]:
+    """Record a step's duration and outcome for the metrics exporter."""
+    from agents.performance import performance_monitor
+
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        performance_monitor.record_pipeline_step(
+            "video", step, (time.perf_counter() - start) * 1000, ok
+        )
+
+
+def _report_slides(done: int, failed: int, total: int) -> None:
+    """Publish slide progress gauges for the metrics exporter."""
+    from agents.performance import performance_monitor
+
+    for state, value in (("done", done), ("failed", failed), ("remaining", total - done - failed)):
+        performance_monitor.set_gauge("video_slides", value, state=state)
+
+
 def _check_dependencies() -> None:
     """Check ffmpeg in PATH. Raise RuntimeError if missing."""
     if shutil.which("ffmpeg") is None:
@@ -152,8 +178,10 @@ def run_video_pipeline(
 
     slide_clips: list[Path] = []
     total = len(slide_contexts)
+    failed = 0
 
     for idx, ctx in enumerate(slide_contexts):
+        _report_slides(len(slide_clips), failed, total)
         print_slide_start(idx + 1, total, ctx.slide_id)
 
         # Check if all steps for this slide are done
@@ -173,16 +201,21 @@ def run_video_pipeline(
             cp.mark(ctx.slide_id, "clip", "ok")
             slide_clips.append(ctx.clip_path)
         except TtsProviderError as e:
+            failed += 1
             cp.mark(ctx.slide_id, "tts", "failed", str(e))
             print(f"  ⚠ {ctx.slide_id} — TTS error: {e}", flush=True)
         except ImageProviderError as e:
             # Use fallback (text overlay)
+            failed += 1
             print(f"  ⚠ {ctx.slide_id} — Image error, using fallback: {e}", flush=True)
             cp.mark(ctx.slide_id, "image", "failed", str(e))
         except Exception as e:
+            failed += 1
             cp.mark(ctx.slide_id, "clip", "failed", str(e))
             print(f"  ⚠ {ctx.slide_id} — error: {e}", flush=True)
 
+    _report_slides(len(slide_clips), failed, total)
+
     # Generate outro
     outro_cfg = video_cfg.get("outro", {})
     outro_path = clips_dir / "outro.mp4"
@@ -245,26 +278,29 @@ def run_slide_steps(
     # Step 1: TTS
     tts_provider = _create_tts_provider(tts_cfg)
     wav_path = clips_dir / f"{ctx.slide_id}.wav"
-    tts_provider.generate(ctx.notes_path.read_text(), wav_path)
+    with _timed_step("tts"):
+        tts_provider.generate(ctx.notes_path.read_text(), wav_path)
 
     # Step 2: Image
     img_provider = _create_image_provider(image_cfg)
     img_path = clips_dir / f"{ctx.slide_id}.png"
-    img_provider.generate(
-        title=ctx.content_path.read_text(),
-        bullets=[],
-        output_png=img_path,
-    )
+    with _timed_step("image"):
+        img_provider.generate(
+            title=ctx.content_path.read_text(),
+            bullets=[],
+            output_png=img_path,
+        )
 
     # Step 3: Clip
     from video.steps.step3_clip import compose_clip
 
-    compose_clip(
-        image_path=img_path,
-        wav_path=wav_path,
-        output_mp4=ctx.clip_path,
-        fps=VIDEO_DEFAULT_FPS,
-    )
+    with _timed_step("clip"):
+        compose_clip(
+            image_path=img_path,
+            wav_path=wav_path,
+            output_mp4=ctx.clip_path,
+            fps=VIDEO_DEFAULT_FPS,
+        )
 
 
 def _create_tts_provider(tts_cfg: dict) -> "TtsProvider":